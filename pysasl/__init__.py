@@ -1,7 +1,9 @@
 
+import gc
 import sys
 from collections import OrderedDict
-from typing import Iterable, Optional, Sequence
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, \
+    Sequence, Type
 from typing_extensions import Self
 
 if sys.version_info >= (3, 10):  # pragma: no cover
@@ -11,9 +13,66 @@ else:  # pragma: no cover
 
 from . import mechanism
 from .__about__ import __version__
-from .mechanism import Mechanism, ServerMechanism, ClientMechanism
+from .hashing import BuiltinHash
+from .mechanism import Mechanism, ServerMechanism, ClientMechanism, \
+    VerifyCost
+from .prep import saslprep
 
-__all__ = ['__version__', 'SASLAuth']
+__all__ = ['__version__', 'LoadPolicy', 'SASLAuth']
+
+_builtin_cache: Dict[Type['SASLAuth'], Mapping[bytes, Mechanism]] = {}
+
+
+class LoadPolicy:
+    """Adapts the server mechanisms advertised by :class:`SASLAuth` to a
+    load signal, so that servers can shed expensive authentication work at
+    the negotiation stage.
+
+    While the load signal is at or above *threshold*, server mechanisms are
+    advertised cheapest first, according to their
+    :attr:`~pysasl.mechanism.ServerMechanism.cost`. If *shed_cost* is given,
+    mechanisms with a verification cost at or above it are also withheld
+    until the load drops.
+
+    Args:
+        load: Returns the current load signal, e.g. the ratio of busy to
+            available verification workers.
+        threshold: The load signal value that is considered overloaded.
+        shed_cost: The verification cost of mechanisms to withhold while
+            overloaded.
+
+    """
+
+    __slots__ = ['load', 'threshold', 'shed_cost']
+
+    def __init__(self, load: Callable[[], float], *,
+                 threshold: float = 1.0,
+                 shed_cost: Optional[VerifyCost] = None) -> None:
+        super().__init__()
+        self.load = load
+        self.threshold = threshold
+        self.shed_cost = shed_cost
+
+    def overloaded(self) -> bool:
+        """True if the current load signal is at or above the threshold."""
+        return self.load() >= self.threshold
+
+    def apply(self, mechanisms: Sequence[ServerMechanism]) \
+            -> List[ServerMechanism]:
+        """Return the *mechanisms* that should be advertised given the
+        current load, in the order they should be advertised.
+
+        Args:
+            mechanisms: The available server mechanisms, in preferred order.
+
+        """
+        if not self.overloaded():
+            return list(mechanisms)
+        ordered = sorted(mechanisms, key=lambda mech: mech.cost.verify)
+        shed_cost = self.shed_cost
+        if shed_cost is None:
+            return ordered
+        return [mech for mech in ordered if mech.cost.verify < shed_cost]
 
 
 class SASLAuth:
@@ -21,13 +80,16 @@ class SASLAuth:
 
     Args:
         mechanisms: List of available SASL mechanism objects.
+        load_policy: Adapts the advertised server mechanisms to load.
 
     """
 
-    __slots__ = ['_server_mechanisms', '_client_mechanisms']
+    __slots__ = ['_server_mechanisms', '_client_mechanisms', '_load_policy']
 
-    def __init__(self, mechanisms: Sequence[Mechanism]) -> None:
+    def __init__(self, mechanisms: Sequence[Mechanism], *,
+                 load_policy: Optional[LoadPolicy] = None) -> None:
         super().__init__()
+        self._load_policy = load_policy
         self._server_mechanisms = OrderedDict(
             (mech.name, mech)
             for mech in mechanisms if isinstance(mech, ServerMechanism))
@@ -36,23 +98,28 @@ class SASLAuth:
             for mech in mechanisms if isinstance(mech, ClientMechanism))
 
     @classmethod
-    def defaults(cls) -> Self:
+    def defaults(cls, *, load_policy: Optional[LoadPolicy] = None) -> Self:
         """Uses the default built-in authentication mechanisms, ``PLAIN`` and
         ``LOGIN``.
 
+        Args:
+            load_policy: Adapts the advertised server mechanisms to load.
+
         Returns:
             A new :class:`SASLAuth` object.
 
         """
-        return cls.named([b'PLAIN', b'LOGIN'])
+        return cls.named([b'PLAIN', b'LOGIN'], load_policy=load_policy)
 
     @classmethod
-    def named(cls, names: Iterable[bytes]) -> Self:
+    def named(cls, names: Iterable[bytes], *,
+              load_policy: Optional[LoadPolicy] = None) -> Self:
         """Uses the built-in authentication mechanisms that match a provided
         name.
 
         Args:
             names: The authentication mechanism names.
+            load_policy: Adapts the advertised server mechanisms to load.
 
         Returns:
             A new :class:`SASLAuth` object.
@@ -61,8 +128,48 @@ class SASLAuth:
             KeyError: A mechanism name was not recognized.
 
         """
-        builtin = {m.name: m for m in cls._get_builtin_mechanisms()}
-        return cls([builtin[name] for name in names])
+        builtin = cls._load_builtin_mechanisms()
+        return cls([builtin[name] for name in names], load_policy=load_policy)
+
+    @classmethod
+    def warmup(cls, *, freeze: bool = False) -> None:
+        """Eagerly performs the import and caching work that would otherwise
+        happen on first use, e.g. loading the built-in mechanism entry points,
+        warming the string preparation tables, and populating any lazily-built
+        mechanism caches.
+
+        This is intended to be called once in a parent process before it forks
+        worker processes, so that each worker starts with the work already
+        done. Passing *freeze* as ``True`` will also run a full garbage
+        collection and then :func:`gc.freeze` all surviving objects, which
+        prevents the collector in each worker from writing to (and therefore
+        copying) the memory pages it shares with the parent.
+
+        See Also:
+            :func:`gc.freeze`
+
+        Args:
+            freeze: Move all objects to the permanent garbage collector
+                generation after warming up.
+
+        """
+        for mech in cls._load_builtin_mechanisms().values():
+            mech.warmup()
+        saslprep('warm\u00ADup\u00A0\u2168')
+        saslprep('\u0627\u0628', allow_unassigned=True)
+        for hash_name in ('sha1', 'sha256', 'sha512'):
+            BuiltinHash(hash_name=hash_name, rounds=1).hash('', b'')
+        if freeze:
+            gc.collect()
+            gc.freeze()
+
+    @classmethod
+    def _load_builtin_mechanisms(cls) -> Mapping[bytes, Mechanism]:
+        builtin = _builtin_cache.get(cls)
+        if builtin is None:
+            builtin = {m.name: m for m in cls._get_builtin_mechanisms()}
+            builtin = _builtin_cache.setdefault(cls, builtin)
+        return builtin
 
     @classmethod
     def _get_builtin_mechanisms(cls) -> Iterable[Mechanism]:
@@ -76,8 +183,17 @@ class SASLAuth:
         """List of available :class:`~pysasl.mechanism.ServerMechanism`
         objects.
 
+        If a :class:`LoadPolicy` was given, this list is adapted to the
+        current load and should be read each time mechanisms are advertised.
+        Mechanisms withheld from this list are still available from
+        :meth:`.get_server`.
+
         """
-        return list(self._server_mechanisms.values())
+        mechanisms = list(self._server_mechanisms.values())
+        load_policy = self._load_policy
+        if load_policy is None:
+            return mechanisms
+        return load_policy.apply(mechanisms)
 
     @property
     def client_mechanisms(self) -> Sequence[ClientMechanism]:
@@ -0,0 +1,122 @@
+"""Provides :mod:`asyncio` drivers that run SASL exchanges over a
+:class:`~asyncio.StreamReader` and :class:`~asyncio.StreamWriter`, using the
+base64 line framing of common protocols.
+
+"""
+
+import asyncio
+import re
+from binascii import a2b_base64, b2a_base64
+from typing import Optional, Sequence
+from typing_extensions import Final
+
+from ..exception import InvalidResponse
+
+__all__ = ['Framing', 'IMAP', 'SMTP', 'POP3']
+
+_base64_pattern = re.compile(
+    br'(?:[A-Za-z0-9+/]{4})*(?:[A-Za-z0-9+/]{2}==|[A-Za-z0-9+/]{3}=)?')
+
+
+class Framing:
+    """Describes how a protocol frames the lines of a SASL exchange. In each
+    of these protocols, the server sends base64-encoded challenges with a
+    prefix and the client answers each with a base64-encoded line.
+
+    Initial responses, sent by the client with the authentication command as
+    allowed by `RFC 4959 <https://datatracker.ietf.org/doc/html/rfc4959>`_,
+    `RFC 4954 <https://datatracker.ietf.org/doc/html/rfc4954>`_ and `RFC 5034
+    <https://datatracker.ietf.org/doc/html/rfc5034>`_, are supported by all
+    profiles, using ``=`` for an empty initial response.
+
+    Args:
+        name: The protocol name.
+        challenge_prefix: The prefix of each server challenge line.
+        command: The authentication command sent by the client.
+        success: The prefix of the server response indicating success.
+        tagged: True if client commands and their final server responses are
+            prefixed with a tag, and other server lines are untagged.
+
+    """
+
+    __slots__: Sequence[str] = ['name', 'challenge_prefix', 'command',
+                                'success', 'tagged']
+
+    #: The response line used by the client to cancel authentication.
+    cancel: Final = b'*'
+
+    #: The initial response used to indicate an empty string.
+    empty_initial_response: Final = b'='
+
+    def __init__(self, name: str, challenge_prefix: bytes, *,
+                 command: bytes = b'AUTH', success: bytes,
+                 tagged: bool = False) -> None:
+        super().__init__()
+        self.name: Final = name
+        self.challenge_prefix: Final = challenge_prefix
+        self.command: Final = command
+        self.success: Final = success
+        self.tagged: Final = tagged
+
+    def __repr__(self) -> str:
+        return f'Framing({self.name!r}, {self.challenge_prefix!r})'
+
+
+#: The framing used by IMAP, see `RFC 3501 6.2.2.
+#: <https://datatracker.ietf.org/doc/html/rfc3501#section-6.2.2>`_.
+IMAP: Final = Framing('IMAP', b'+ ', command=b'AUTHENTICATE', success=b'OK',
+                      tagged=True)
+
+#: The framing used by SMTP, see `RFC 4954
+#: <https://datatracker.ietf.org/doc/html/rfc4954>`_.
+SMTP: Final = Framing('SMTP', b'334 ', success=b'235')
+
+#: The framing used by POP3, see `RFC 5034
+#: <https://datatracker.ietf.org/doc/html/rfc5034>`_.
+POP3: Final = Framing('POP3', b'+ ', success=b'+OK')
+
+
+def _encode(data: bytes) -> bytes:
+    return b2a_base64(data, newline=False)
+
+
+def _strip_line(line: bytes) -> memoryview:
+    end = len(line)
+    if line.endswith(b'\n'):
+        end -= 1
+        if line[end - 1:end] == b'\r':
+            end -= 1
+    return memoryview(line)[:end]
+
+
+def _decode(data: memoryview) -> bytes:
+    if not _base64_pattern.fullmatch(data):
+        raise InvalidResponse()
+    return a2b_base64(data)
+
+
+async def _discard_line(reader: asyncio.StreamReader, consumed: int) -> None:
+    while True:
+        await reader.readexactly(consumed)
+        try:
+            await reader.readuntil(b'\n')
+        except asyncio.LimitOverrunError as exc:
+            consumed = exc.consumed
+        else:
+            return
+
+
+async def _read_bounded(reader: asyncio.StreamReader, max_line: int) -> bytes:
+    try:
+        line = await reader.readuntil(b'\n')
+    except asyncio.LimitOverrunError as exc:
+        await _discard_line(reader, exc.consumed)
+        raise InvalidResponse() from exc
+    if len(line) > max_line:
+        raise InvalidResponse()
+    return line
+
+
+async def _read_line(reader: asyncio.StreamReader, max_line: int,
+                     timeout: Optional[float]) -> bytes:
+    return await asyncio.wait_for(_read_bounded(reader, max_line), timeout)
@@ -0,0 +1,181 @@
+import asyncio
+import time
+from typing import Optional, Sequence, List
+from typing_extensions import Final
+
+from . import Framing, _encode, _strip_line, _decode, _read_line
+from ..creds.client import ClientCredentials
+from ..exception import InvalidResponse, UnexpectedChallenge
+from ..mechanism import ClientMechanism, ServerChallenge
+
+__all__ = ['ClientResult', 'ClientAuthenticator']
+
+
+class ClientResult:
+    """The result of a client-side authentication attempt.
+
+    Args:
+        success: True if the server indicated success.
+        response: The final response line from the server.
+        round_trips: The number of server challenges answered.
+        elapsed: The time taken by the exchange, in seconds.
+        queued: The time spent waiting to start the exchange, in seconds.
+
+    """
+
+    __slots__: Sequence[str] = ['success', 'response', 'round_trips',
+                                'elapsed', 'queued']
+
+    def __init__(self, success: bool, response: bytes, round_trips: int,
+                 elapsed: float, queued: float) -> None:
+        super().__init__()
+        self.success: Final = success
+        self.response: Final = response
+        self.round_trips: Final = round_trips
+        self.elapsed: Final = elapsed
+        self.queued: Final = queued
+
+    def __bool__(self) -> bool:
+        return self.success
+
+    def __repr__(self) -> str:
+        return f'ClientResult({self.success!r}, {self.response!r}, ...)'
+
+
+class ClientAuthenticator:
+    """Runs the client side of SASL exchanges on many connections from one
+    event loop, answering server challenges with a
+    :class:`~pysasl.mechanism.ClientMechanism` until the server indicates
+    success or failure.
+
+    At most *concurrency* exchanges are in progress at once, and others wait
+    their turn. When *initial_response* is true and the mechanism produces
+    one, the initial response is sent with the authentication command to
+    save a round trip.
+
+    Args:
+        framing: The framing profile of the protocol.
+        concurrency: The maximum number of exchanges in progress.
+        initial_response: Send initial responses with the command, if the
+            server supports it.
+        max_line: The maximum length of a server response line. Longer lines
+            are discarded up to their end. Each reader buffers up to its own
+            ``limit``, so it should be created with ``limit=max_line``, e.g.
+            by :func:`asyncio.open_connection`.
+        timeout: The maximum time to wait for each server response, in
+            seconds.
+
+    """
+
+    __slots__: Sequence[str] = ['framing', 'concurrency', 'initial_response',
+                                'max_line', 'timeout', '_semaphore']
+
+    def __init__(self, framing: Framing, *,
+                 concurrency: int = 100,
+                 initial_response: bool = True,
+                 max_line: int = 8192,
+                 timeout: Optional[float] = 60.0) -> None:
+        super().__init__()
+        self.framing: Final = framing
+        self.concurrency: Final = concurrency
+        self.initial_response: Final = initial_response
+        self.max_line: Final = max_line
+        self.timeout: Final = timeout
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        semaphore = self._semaphore
+        if semaphore is None:
+            semaphore = self._semaphore = asyncio.Semaphore(self.concurrency)
+        return semaphore
+
+    def _get_challenge(self, line: bytes) -> Optional[memoryview]:
+        prefix = self.framing.challenge_prefix
+        if line.startswith(prefix):
+            return memoryview(line)[len(prefix):]
+        elif line == prefix.rstrip():
+            return memoryview(b'')
+        else:
+            return None
+
+    def _respond(self, mechanism: ClientMechanism, creds: ClientCredentials,
+                 challenges: List[ServerChallenge], data: memoryview) -> bytes:
+        try:
+            challenge = _decode(data)
+        except InvalidResponse as exc:
+            raise UnexpectedChallenge() from exc
+        challenges.append(ServerChallenge(challenge))
+        response = mechanism.client_attempt(creds, challenges).response
+        return _encode(response)
+
+    async def _send(self, writer: asyncio.StreamWriter,
+                    *parts: bytes) -> None:
+        writer.writelines(parts)
+        await asyncio.wait_for(writer.drain(), self.timeout)
+
+    async def _exchange(self, reader: asyncio.StreamReader,
+                        writer: asyncio.StreamWriter,
+                        mechanism: ClientMechanism,
+                        creds: ClientCredentials,
+                        tag: bytes, queued: float) -> ClientResult:
+        framing = self.framing
+        start = time.perf_counter()
+        challenges: List[ServerChallenge] = []
+        command = [framing.command, b' ', mechanism.name]
+        if framing.tagged:
+            command[0:0] = [tag, b' ']
+        if self.initial_response:
+            initial = mechanism.client_attempt(creds, challenges).response
+            if initial:
+                command += [b' ', _encode(initial)]
+        await self._send(writer, *command, b'\r\n')
+        final_prefix = tag + b' ' if framing.tagged else b''
+        while True:
+            line = _strip_line(
+                await _read_line(reader, self.max_line, self.timeout)
+            ).tobytes()
+            challenge = self._get_challenge(line)
+            if challenge is not None:
+                try:
+                    response = self._respond(mechanism, creds, challenges,
+                                             challenge)
+                except UnexpectedChallenge:
+                    response = framing.cancel
+                await self._send(writer, response, b'\r\n')
+            elif not line.startswith(final_prefix):
+                continue
+            elif line[3:4] == b'-' and line[0:3].isdigit():
+                continue
+            else:
+                final = line[len(final_prefix):]
+                success = final.startswith(framing.success)
+                elapsed = time.perf_counter() - start
+                return ClientResult(success, final, len(challenges),
+                                    elapsed, queued)
+
+    async def authenticate(self, reader: asyncio.StreamReader,
+                           writer: asyncio.StreamWriter,
+                           mechanism: ClientMechanism,
+                           creds: ClientCredentials, *,
+                           tag: bytes = b'auth1') -> ClientResult:
+        """Send the authentication command for *mechanism* and respond to
+        server challenges until the server indicates success or failure.
+
+        Args:
+            reader: The connection stream reader.
+            writer: The connection stream writer.
+            mechanism: The mechanism to authenticate with.
+            creds: The credentials to authenticate with.
+            tag: The command tag, for tagged protocols.
+
+        Raises:
+            InvalidResponse: A server response line was too long.
+            asyncio.TimeoutError: A step of the exchange timed out.
+            asyncio.IncompleteReadError: The connection was closed.
+
+        """
+        queued_start = time.perf_counter()
+        async with self._get_semaphore():
+            queued = time.perf_counter() - queued_start
+            return await self._exchange(reader, writer, mechanism, creds,
+                                        tag, queued)
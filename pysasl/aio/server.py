@@ -0,0 +1,103 @@
+import asyncio
+from typing import Optional, Sequence, Tuple, List
+from typing_extensions import Final
+
+from . import Framing, _encode, _strip_line, _decode, _read_line
+from ..creds.server import ServerCredentials
+from ..exception import AuthenticationCancelled
+from ..mechanism import ServerMechanism, ServerChallenge, ChallengeResponse
+
+__all__ = ['ServerExchange']
+
+
+class ServerExchange:
+    """Runs the server side of SASL exchanges on a connection, issuing
+    challenges from a :class:`~pysasl.mechanism.ServerMechanism` and reading
+    the client responses until the mechanism produces credentials.
+
+    One object should be created per connection, and it may be reused for
+    each authentication attempt on that connection.
+
+    Args:
+        reader: The connection stream reader.
+        writer: The connection stream writer.
+        framing: The framing profile of the protocol.
+        max_line: The maximum length of a client response line. Longer lines
+            are discarded up to their end, so the connection may continue.
+            The *reader* buffers up to its own ``limit``, so it should be
+            created with ``limit=max_line``, e.g. by
+            :func:`asyncio.start_server`.
+        timeout: The maximum time to wait for each client response, in
+            seconds.
+
+    """
+
+    __slots__: Sequence[str] = ['reader', 'writer', 'framing', 'max_line',
+                                'timeout', '_responses']
+
+    def __init__(self, reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter, framing: Framing, *,
+                 max_line: int = 8192,
+                 timeout: Optional[float] = 60.0) -> None:
+        super().__init__()
+        self.reader: Final = reader
+        self.writer: Final = writer
+        self.framing: Final = framing
+        self.max_line: Final = max_line
+        self.timeout: Final = timeout
+        self._responses: List[ChallengeResponse] = []
+
+    def _decode_response(self, line: bytes) -> bytes:
+        data = _strip_line(line)
+        cancel = self.framing.cancel
+        if len(data) == len(cancel) and data.tobytes() == cancel:
+            raise AuthenticationCancelled()
+        return _decode(data)
+
+    async def _challenge(self, challenge: bytes) -> bytes:
+        writer = self.writer
+        writer.writelines((self.framing.challenge_prefix, _encode(challenge),
+                           b'\r\n'))
+        await asyncio.wait_for(writer.drain(), self.timeout)
+        line = await _read_line(self.reader, self.max_line, self.timeout)
+        return self._decode_response(line)
+
+    async def authenticate(self, mechanism: ServerMechanism,
+                           initial_response: Optional[bytes] = None) \
+            -> Tuple[ServerCredentials, Optional[bytes]]:
+        """Run the exchange for *mechanism* until it produces credentials.
+
+        Args:
+            mechanism: The mechanism chosen by the client.
+            initial_response: The initial response argument sent with the
+                authentication command, if any, still base64-encoded.
+
+        Returns:
+            The credentials and optional final server response, as returned
+            by :meth:`~pysasl.mechanism.ServerMechanism.server_attempt`.
+
+        Raises:
+            InvalidResponse: The client sent an invalid or too-long response.
+            AuthenticationCancelled: The client cancelled authentication.
+            asyncio.TimeoutError: A step of the exchange timed out.
+            asyncio.IncompleteReadError: The connection was closed.
+
+        """
+        responses = self._responses
+        responses.clear()
+        try:
+            if initial_response is not None:
+                if initial_response == self.framing.empty_initial_response:
+                    response = b''
+                else:
+                    response = self._decode_response(initial_response)
+                responses.append(ChallengeResponse(b'', response))
+            while True:
+                try:
+                    return mechanism.server_attempt(responses)
+                except ServerChallenge as chal:
+                    challenge = chal.data
+                response = await self._challenge(challenge)
+                responses.append(ChallengeResponse(challenge, response))
+        finally:
+            responses.clear()
@@ -0,0 +1,221 @@
+"""Provides an identity with many app-specific passwords, such as one for each
+mail client of a user, where a login costs at most one hash however many
+passwords the user has.
+
+Each app password begins with a short public key ID, followed by a period
+and the random secret, e.g. ``3f9a0c1e.kVt7...``. The passwords of an
+:class:`AppPasswordIdentity` are indexed by key ID, so only the one digest
+with a matching key ID is verified, and secrets without a known key ID fail
+without hashing. Each password may be revoked on its own, and records when it
+was last used.
+
+"""
+
+import secrets
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Iterable, Optional, Sequence, \
+    Tuple, Dict, List
+from typing_extensions import Final
+
+from .cache import Clock
+from .hashing import HashInterface
+from .identity import Identity
+from .prep import saslprep, Preparation
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .cache import VerifiedCache
+
+__all__ = ['AppPassword', 'AppPasswordIdentity']
+
+_key_id_bytes = 4
+_secret_bytes = 18
+
+
+class AppPassword:
+    """One app-specific password of an :class:`AppPasswordIdentity`.
+
+    Args:
+        key_id: The public key ID that prefixes the password.
+        digest: The hashed password, including its key ID.
+        label: A description of the password, e.g. the app it is used by.
+        created: When the password was created, in seconds since the epoch.
+        last_used: When the password last verified, in seconds since the
+            epoch.
+
+    """
+
+    __slots__: Sequence[str] = ['key_id', 'digest', 'label', 'created',
+                                'last_used']
+
+    def __init__(self, key_id: str, digest: str, *, label: str = '',
+                 created: Optional[float] = None,
+                 last_used: Optional[float] = None) -> None:
+        super().__init__()
+        self.key_id: Final = key_id
+        self.digest: Final = digest
+        self.label: Final = label
+        self.created: Final = created
+        self.last_used = last_used
+
+    def __repr__(self) -> str:
+        return f'AppPassword({self.key_id!r}, ..., label={self.label!r})'
+
+
+class AppPasswordIdentity(Identity):
+    """An :class:`~pysasl.identity.Identity` with many app-specific
+    passwords, indexed by their key IDs.
+
+    Args:
+        authcid: The authentication identity, e.g. a login username.
+        passwords: The app passwords of the identity.
+        hash: The hash algorithm to use to verify the passwords.
+        prepare: The string preparation function.
+        cache: Consulted before hashing in :meth:`.compare_secret`, and
+            given each password that verified.
+        on_used: Called with each password after it verifies, e.g. to store
+            its :attr:`~AppPassword.last_used` time.
+        clock: Returns the current time in seconds since the epoch.
+
+    """
+
+    __slots__: Sequence[str] = ['_authcid', '_passwords', '_hash', '_prepare',
+                                '_cache', '_on_used', '_clock', '_lock']
+
+    def __init__(self, authcid: str, passwords: Iterable[AppPassword] = (),
+                 *, hash: HashInterface,
+                 prepare: Preparation = saslprep,
+                 cache: Optional['VerifiedCache'] = None,
+                 on_used: Optional[Callable[[AppPassword], None]] = None,
+                 clock: Clock = time.time) -> None:
+        super().__init__()
+        self._authcid = authcid
+        self._passwords: Dict[str, AppPassword] = {
+            password.key_id: password for password in passwords}
+        self._hash = hash
+        self._prepare = prepare
+        self._cache = cache
+        self._on_used = on_used
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    @property
+    def authcid(self) -> str:
+        return self._authcid
+
+    @property
+    def hash(self) -> HashInterface:
+        """The hash implementation to use to verify the passwords."""
+        return self._hash
+
+    @property
+    def passwords(self) -> List[AppPassword]:
+        """The app passwords of the identity."""
+        with self._lock:
+            return list(self._passwords.values())
+
+    def get(self, key_id: str) -> Optional[AppPassword]:
+        """Return the app password with the given key ID, if any.
+
+        Args:
+            key_id: The public key ID of the password.
+
+        """
+        with self._lock:
+            return self._passwords.get(key_id)
+
+    def create(self, label: str = '') -> Tuple[str, AppPassword]:
+        """Generate and add a new app password.
+
+        Args:
+            label: A description of the password, e.g. the app it is used by.
+
+        Returns:
+            The cleartext password, to show the user once, and the stored
+            password.
+
+        """
+        secret = secrets.token_urlsafe(_secret_bytes)
+        while True:
+            key_id = secrets.token_hex(_key_id_bytes)
+            if key_id in self._passwords:
+                continue
+            cleartext = f'{key_id}.{secret}'
+            digest = self._hash.hash(self._prepare(cleartext))
+            password = AppPassword(key_id, digest, label=label,
+                                   created=self._clock())
+            with self._lock:
+                if self._passwords.setdefault(key_id, password) is password:
+                    return cleartext, password
+
+    def add(self, password: AppPassword) -> None:
+        """Add an app password, replacing any with the same key ID.
+
+        Args:
+            password: The app password to add.
+
+        """
+        with self._lock:
+            self._passwords[password.key_id] = password
+
+    def revoke(self, key_id: str) -> bool:
+        """Remove an app password, so that it no longer verifies.
+
+        Args:
+            key_id: The public key ID of the password.
+
+        Returns:
+            True if the password was found and removed.
+
+        """
+        with self._lock:
+            return self._passwords.pop(key_id, None) is not None
+
+    def compare_authcid(self, authcid: str) -> bool:
+        prepare = self._prepare
+        prepared_this = prepare(self._authcid).encode('utf-8')
+        prepared_that = prepare(authcid).encode('utf-8')
+        return secrets.compare_digest(prepared_this, prepared_that)
+
+    def compare_secret(self, secret: str) -> bool:
+        """Verify *secret* against the app password with its key ID.
+
+        The password is looked up again after hashing, so one revoked while
+        it is being verified does not verify.
+
+        Args:
+            secret: The app password to verify.
+
+        """
+        key_id, sep, _ = secret.partition('.')
+        if not sep:
+            return False
+        with self._lock:
+            password = self._passwords.get(key_id)
+        if password is None:
+            return False
+        prepared = self._prepare(secret)
+        digest = password.digest
+        cache = self._cache
+        cached = cache is not None and cache.contains(self._authcid, digest,
+                                                      prepared)
+        verified = cached or self._hash.verify(prepared, digest)
+        if verified:
+            with self._lock:
+                verified = self._passwords.get(key_id) is password
+        if verified:
+            if cache is not None and not cached:
+                cache.add(self._authcid, digest, prepared)
+            password.last_used = self._clock()
+            on_used = self._on_used
+            if on_used is not None:
+                on_used(password)
+        return verified
+
+    def get_clear_secret(self) -> Optional[str]:
+        """App passwords are never available in cleartext."""
+        return None
+
+    def __repr__(self) -> str:
+        return f'AppPasswordIdentity({self.authcid!r}, ..., ' \
+            f'hash={self._hash!r})'
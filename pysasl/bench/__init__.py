@@ -0,0 +1,289 @@
+"""Provides tools to measure the performance of pysasl, using only the
+standard library. Benchmark results may be saved as JSON baselines, and later
+results compared against them to flag statistically significant
+regressions.
+
+"""
+
+import itertools
+import json
+import platform
+import time
+from statistics import median
+from typing import (Any, Callable, Iterable, Mapping, Optional, Union,
+                    Sequence, List, NamedTuple)
+from typing_extensions import Final, Self, TypeAlias
+
+from .stats import mann_whitney_u
+from ..creds.client import ClientCredentials
+from ..mechanism.crammd5 import CramMD5Mechanism
+from ..mechanism.external import ExternalMechanism
+from ..mechanism.login import LoginMechanism
+from ..mechanism.oauth import OAuth2Mechanism
+from ..mechanism.plain import PlainMechanism
+
+__all__ = ['Benchmark', 'Result', 'Runner', 'Comparison', 'Baseline']
+
+_Builtin: TypeAlias = Union[PlainMechanism, LoginMechanism, CramMD5Mechanism,
+                            ExternalMechanism, OAuth2Mechanism]
+
+_creds = ClientCredentials('user@example.com', 'password')
+
+
+class Benchmark:
+    """A named operation to measure.
+
+    Args:
+        name: The benchmark name.
+        func: Performs the operation once.
+
+    """
+
+    __slots__: Sequence[str] = ['name', 'func']
+
+    def __init__(self, name: str, func: Callable[[], object]) -> None:
+        super().__init__()
+        self.name: Final = name
+        self.func: Final = func
+
+    def __repr__(self) -> str:
+        return f'Benchmark({self.name!r})'
+
+
+class Result:
+    """The measured samples of a benchmark.
+
+    Args:
+        name: The benchmark name.
+        samples: The time taken by one operation in each sample, in seconds.
+
+    """
+
+    __slots__: Sequence[str] = ['name', 'samples']
+
+    def __init__(self, name: str, samples: Sequence[float]) -> None:
+        super().__init__()
+        self.name: Final = name
+        self.samples: Final = samples
+
+    @property
+    def median(self) -> float:
+        """The median time taken by one operation, in seconds."""
+        return median(self.samples)
+
+    def __repr__(self) -> str:
+        return f'Result({self.name!r}, median={self.median!r})'
+
+
+class Runner:
+    """Runs benchmarks, taking several samples of each. Each sample repeats
+    the operation enough times to take at least *min_time*, to reduce the
+    influence of timer resolution.
+
+    Args:
+        repeat: The number of samples to take.
+        min_time: The minimum time taken by a sample, in seconds.
+        timer: Returns the current time, in seconds.
+
+    """
+
+    __slots__: Sequence[str] = ['repeat', 'min_time', 'timer']
+
+    def __init__(self, *, repeat: int = 20, min_time: float = 0.02,
+                 timer: Callable[[], float] = time.perf_counter) -> None:
+        super().__init__()
+        self.repeat: Final = repeat
+        self.min_time: Final = min_time
+        self.timer: Final = timer
+
+    def _time(self, func: Callable[[], object], number: int) -> float:
+        timer = self.timer
+        start = timer()
+        for _ in itertools.repeat(None, number):
+            func()
+        return timer() - start
+
+    def _calibrate(self, func: Callable[[], object]) -> int:
+        number = 1
+        while self._time(func, number) < self.min_time:
+            number *= 2
+        return number
+
+    def run(self, benchmark: Benchmark) -> Result:
+        """Run one benchmark.
+
+        Args:
+            benchmark: The benchmark to run.
+
+        """
+        func = benchmark.func
+        number = self._calibrate(func)
+        samples = [self._time(func, number) / number
+                   for _ in range(self.repeat)]
+        return Result(benchmark.name, samples)
+
+    def run_all(self, benchmarks: Iterable[Benchmark]) -> List[Result]:
+        """Run each benchmark in turn.
+
+        Args:
+            benchmarks: The benchmarks to run.
+
+        """
+        return [self.run(benchmark) for benchmark in benchmarks]
+
+
+class Comparison(NamedTuple):
+    """The comparison of a benchmark result with its baseline."""
+
+    #: The benchmark name.
+    name: str
+
+    #: The median of the baseline samples, in seconds.
+    baseline: float
+
+    #: The median of the new samples, in seconds.
+    current: float
+
+    #: The p-value of the test that the samples share a distribution.
+    p_value: float
+
+    #: One of ``regression``, ``improvement`` or ``unchanged``.
+    verdict: str
+
+    @property
+    def ratio(self) -> float:
+        """The new median relative to the baseline median."""
+        return self.current / self.baseline if self.baseline else 1.0
+
+
+class Baseline:
+    """Saved benchmark samples that later results are compared against.
+
+    Args:
+        samples: The samples of each benchmark, by name.
+        metadata: Describes the environment the samples were taken in.
+
+    """
+
+    __slots__: Sequence[str] = ['samples', 'metadata']
+
+    def __init__(self, samples: Mapping[str, Sequence[float]],
+                 metadata: Optional[Mapping[str, Any]] = None) -> None:
+        super().__init__()
+        self.samples: Final = samples
+        self.metadata: Final = metadata or {}
+
+    @classmethod
+    def from_results(cls, results: Iterable[Result]) -> Self:
+        """Create a baseline from benchmark results, describing the current
+        environment in the metadata.
+
+        Args:
+            results: The benchmark results.
+
+        """
+        metadata = {'python': platform.python_version(),
+                    'implementation': platform.python_implementation(),
+                    'machine': platform.machine()}
+        return cls({result.name: list(result.samples) for result in results},
+                   metadata)
+
+    @classmethod
+    def load(cls, path: str) -> Self:
+        """Load a baseline saved by :meth:`.save`.
+
+        Args:
+            path: The path to the JSON file.
+
+        Raises:
+            ValueError: The file is not a valid baseline.
+
+        """
+        with open(path, 'r') as f:
+            data = json.load(f)
+        if not isinstance(data, dict) or data.get('version') != 1:
+            raise ValueError(f'Invalid baseline: {path}')
+        return cls(data['samples'], data.get('metadata'))
+
+    def save(self, path: str) -> None:
+        """Save the baseline as JSON.
+
+        Args:
+            path: The path to the JSON file.
+
+        """
+        data = {'version': 1, 'metadata': dict(self.metadata),
+                'samples': {name: list(samples)
+                            for name, samples in self.samples.items()}}
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+    def compare(self, results: Iterable[Result], *,
+                alpha: float = 0.01,
+                threshold: float = 0.05) -> List[Comparison]:
+        """Compare benchmark results with the baseline. A result is a
+        regression or improvement if its samples differ significantly from the
+        baseline samples, and its median differs by more than *threshold*.
+
+        Results without baseline samples are skipped.
+
+        Args:
+            results: The benchmark results.
+            alpha: The significance level of the test.
+            threshold: The minimum relative change of the median.
+
+        """
+        comparisons: List[Comparison] = []
+        for result in results:
+            baseline_samples = self.samples.get(result.name)
+            if not baseline_samples:
+                continue
+            baseline = median(baseline_samples)
+            current = result.median
+            p_value = mann_whitney_u(baseline_samples, result.samples)
+            verdict = 'unchanged'
+            if p_value < alpha:
+                if current > baseline * (1.0 + threshold):
+                    verdict = 'regression'
+                elif current < baseline * (1.0 - threshold):
+                    verdict = 'improvement'
+            comparisons.append(Comparison(result.name, baseline, current,
+                                          p_value, verdict))
+        return comparisons
+
+    def __repr__(self) -> str:
+        return f'Baseline({sorted(self.samples)!r})'
+
+
+def _format_time(seconds: float) -> str:
+    if seconds >= 1.0:
+        return f'{seconds:.3f} s'
+    elif seconds >= 0.001:
+        return f'{seconds * 1e3:.3f} ms'
+    else:
+        return f'{seconds * 1e6:.3f} us'
+
+
+def _format_table(rows: Sequence[Sequence[str]]) -> str:
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return '\n'.join(
+        '  '.join(cell.ljust(width) for cell, width in zip(row, widths))
+        .rstrip() for row in rows)
+
+
+def _format_results(results: Sequence[Result]) -> str:
+    rows = [['benchmark', 'median', 'min']]
+    rows += [[result.name, _format_time(result.median),
+              _format_time(min(result.samples))] for result in results]
+    return _format_table(rows)
+
+
+def _format_comparisons(comparisons: Sequence[Comparison]) -> str:
+    rows = [['benchmark', 'baseline', 'current', 'change', 'p-value',
+             'verdict']]
+    rows += [[comp.name, _format_time(comp.baseline),
+              _format_time(comp.current), f'{comp.ratio - 1.0:+.1%}',
+              f'{comp.p_value:.4f}', comp.verdict]
+             for comp in comparisons]
+    return _format_table(rows)
@@ -0,0 +1,428 @@
+"""Generates authentication load against a local :mod:`asyncio` server built
+on :class:`~pysasl.SASLAuth`, to measure throughput and latency percentiles
+of a mix of mechanisms.
+
+Run with ``python -m pysasl.bench.load``. The server and clients share one
+process and event loop, with verification run in a thread pool, so results
+describe the relative cost of mechanisms and hash settings on a host rather
+than the capacity of any particular server.
+
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Optional, Mapping, Sequence, Tuple, List, Dict, NamedTuple
+from typing_extensions import Final
+
+from . import _format_table
+from .stats import percentile
+from .. import SASLAuth
+from ..aio import Framing, IMAP, SMTP, POP3
+from ..aio.client import ClientAuthenticator
+from ..aio.server import ServerExchange
+from ..creds.client import ClientCredentials
+from ..creds.external import ExternalVerificationRequired
+from ..creds.server import ServerCredentials
+from ..exception import AuthenticationError
+from ..hashing import BuiltinHash
+from ..identity import Identity, ClearIdentity, HashedIdentity
+from ..mechanism import ClientMechanism
+from ..token import TokenValidator
+
+__all__ = ['Population', 'LoadServer', 'SessionResult', 'LoadGenerator',
+           'format_report', 'main']
+
+_framings: Mapping[str, Framing] = {'imap': IMAP, 'smtp': SMTP, 'pop3': POP3}
+_failures: Mapping[Framing, bytes] = {IMAP: b'NO', SMTP: b'535', POP3: b'-ERR'}
+_max_line = 8192
+
+
+class Population(TokenValidator):
+    """A synthetic population of identities, each with a password and a
+    bearer token.
+
+    Args:
+        users: The number of identities.
+        rounds: The :class:`~pysasl.hashing.BuiltinHash` rounds used to hash
+            each password.
+
+    """
+
+    __slots__: Sequence[str] = ['users', '_hashed', '_clear', '_tokens']
+
+    def __init__(self, users: int, *, rounds: int) -> None:
+        super().__init__()
+        self.users: Final = users
+        hash = BuiltinHash(rounds=rounds)
+        self._hashed: Dict[str, HashedIdentity] = {}
+        self._clear: Dict[str, ClearIdentity] = {}
+        self._tokens: Dict[str, str] = {}
+        for i in range(users):
+            authcid, secret, token = self.get_secrets(i)
+            self._hashed[authcid] = HashedIdentity.create(
+                authcid, secret, hash=hash)
+            self._clear[authcid] = ClearIdentity(authcid, secret)
+            self._tokens[token] = authcid
+
+    @classmethod
+    def get_secrets(cls, i: int) -> Tuple[str, str, str]:
+        """Return the authentication identity, password and bearer token of
+        an identity.
+
+        Args:
+            i: The index of the identity.
+
+        """
+        return f'user{i}', f'password{i}', f'token{i}'
+
+    def lookup(self, authcid: str, *, clear: bool = False) \
+            -> Optional[Identity]:
+        """Return the identity, if it exists.
+
+        Args:
+            authcid: The authentication identity.
+            clear: Return an identity with a cleartext secret.
+
+        """
+        if clear:
+            return self._clear.get(authcid)
+        return self._hashed.get(authcid)
+
+    def validate(self, token: str, authzid: str) -> bool:
+        return self._tokens.get(token) == authzid
+
+
+class LoadServer:
+    """A server stand-in that accepts one authentication attempt per
+    connection.
+
+    Args:
+        auth: The available mechanisms.
+        population: The identities to authenticate.
+        framing: The framing profile of the protocol.
+        executor: Runs the credential verification.
+        timeout: The maximum time to wait for each client response, in
+            seconds.
+
+    """
+
+    __slots__: Sequence[str] = ['auth', 'population', 'framing', 'executor',
+                                'timeout', '_server']
+
+    def __init__(self, auth: SASLAuth, population: Population, *,
+                 framing: Framing = IMAP,
+                 executor: Optional[Executor] = None,
+                 timeout: Optional[float] = 60.0) -> None:
+        super().__init__()
+        self.auth: Final = auth
+        self.population: Final = population
+        self.framing: Final = framing
+        self.executor: Final = executor
+        self.timeout: Final = timeout
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    def _verify(self, creds: ServerCredentials, clear: bool) -> bool:
+        population = self.population
+        identity = population.lookup(creds.authcid or creds.authzid,
+                                     clear=clear)
+        try:
+            return creds.verify(identity)
+        except ExternalVerificationRequired as exc:
+            if exc.token is None:
+                return exc.identity is not None
+            return population.validate(exc.token, creds.authzid)
+
+    def _final(self, tag: bytes, success: bool) -> bytes:
+        framing = self.framing
+        status = framing.success if success else _failures[framing]
+        if framing.tagged:
+            return b'%b %b done\r\n' % (tag, status)
+        return b'%b done\r\n' % status
+
+    async def _handle(self, reader: asyncio.StreamReader,
+                      writer: asyncio.StreamWriter) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            parts = (await reader.readline()).split()
+            tag = parts.pop(0) if self.framing.tagged and parts else b'*'
+            mech = self.auth.get_server(parts[1]) if len(parts) > 1 else None
+            success = False
+            if mech is not None:
+                initial = parts[2] if len(parts) > 2 else None
+                exchange = ServerExchange(reader, writer, self.framing,
+                                          max_line=_max_line,
+                                          timeout=self.timeout)
+                try:
+                    creds, _ = await exchange.authenticate(mech, initial)
+                except AuthenticationError:
+                    pass
+                else:
+                    clear = mech.name == b'CRAM-MD5'
+                    context = copy_context()
+                    success = await loop.run_in_executor(
+                        self.executor, context.run, self._verify, creds,
+                        clear)
+            writer.write(self._final(tag, success))
+            await writer.drain()
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0, *,
+                    backlog: int = 1000) -> Tuple[str, int]:
+        """Start listening for connections.
+
+        Args:
+            host: The host to listen on.
+            port: The port to listen on, or 0 for any.
+            backlog: The maximum number of queued connections.
+
+        Returns:
+            The host and port of the listening socket.
+
+        """
+        server = self._server = await asyncio.start_server(
+            self._handle, host, port, backlog=backlog, limit=_max_line)
+        sockname = server.sockets[0].getsockname()
+        return sockname[0], sockname[1]
+
+    async def close(self) -> None:
+        """Stop listening for connections."""
+        server = self._server
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+            self._server = None
+
+
+class SessionResult(NamedTuple):
+    """The result of one client session."""
+
+    #: The mechanism name.
+    mechanism: str
+
+    #: True if the session was expected to succeed.
+    expected: bool
+
+    #: True if the session succeeded.
+    success: bool
+
+    #: The time taken to connect and authenticate, in seconds.
+    latency: float
+
+    #: True if the session failed with an exception.
+    error: bool
+
+    @property
+    def unexpected(self) -> bool:
+        """True if the session failed with an exception, or if its outcome
+        did not match the expected outcome.
+
+        """
+        return self.error or self.success != self.expected
+
+
+class LoadGenerator:
+    """Runs many concurrent client sessions, each connecting and running one
+    authentication attempt with a randomly chosen mechanism and identity.
+
+    Args:
+        host: The server host.
+        port: The server port.
+        population: The identities to authenticate as.
+        mix: The relative weights of each mechanism name.
+        failure_ratio: The fraction of sessions that use the wrong secret.
+        concurrency: The maximum number of sessions in progress.
+        framing: The framing profile of the protocol.
+        seed: Seeds the random choices of each session.
+
+    """
+
+    __slots__: Sequence[str] = ['host', 'port', 'population', 'mix',
+                                'failure_ratio', 'concurrency', 'framing',
+                                '_random']
+
+    def __init__(self, host: str, port: int, population: Population, *,
+                 mix: Mapping[str, float],
+                 failure_ratio: float = 0.0,
+                 concurrency: int = 100,
+                 framing: Framing = IMAP,
+                 seed: Optional[int] = None) -> None:
+        super().__init__()
+        self.host: Final = host
+        self.port: Final = port
+        self.population: Final = population
+        self.mix: Final = mix
+        self.failure_ratio: Final = failure_ratio
+        self.concurrency: Final = concurrency
+        self.framing: Final = framing
+        self._random = random.Random(seed)  # noqa: S311
+
+    def _creds(self, name: str, expected: bool) -> ClientCredentials:
+        user = self._random.randrange(self.population.users)
+        authcid, secret, token = self.population.get_secrets(user)
+        if name == 'XOAUTH2':
+            secret = token
+        elif name == 'EXTERNAL':
+            return ClientCredentials('', '', authcid if expected else 'nobody')
+        if not expected:
+            secret = 'wrong' + secret
+        return ClientCredentials(authcid, secret)
+
+    async def _session(self, authenticator: ClientAuthenticator,
+                       semaphore: asyncio.Semaphore, name: str,
+                       mechanism: ClientMechanism, creds: ClientCredentials,
+                       expected: bool, tag: bytes) -> SessionResult:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                reader, writer = await asyncio.open_connection(
+                    self.host, self.port, limit=_max_line)
+                try:
+                    result = await authenticator.authenticate(
+                        reader, writer, mechanism, creds, tag=tag)
+                finally:
+                    writer.close()
+            except (OSError, AuthenticationError, asyncio.TimeoutError,
+                    asyncio.IncompleteReadError):
+                latency = time.perf_counter() - start
+                return SessionResult(name, expected, False, latency, True)
+            latency = time.perf_counter() - start
+            return SessionResult(name, expected, result.success, latency,
+                                 False)
+
+    async def run(self, sessions: int) -> List[SessionResult]:
+        """Run the client sessions and wait for them to finish.
+
+        Args:
+            sessions: The number of sessions to run.
+
+        """
+        authenticator = ClientAuthenticator(
+            self.framing, concurrency=self.concurrency, max_line=_max_line)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+        auth = SASLAuth.named([name.encode('ascii') for name in names])
+        mechanisms = {mech.name.decode('ascii'): mech
+                      for mech in auth.client_mechanisms}
+        rand = self._random
+        tasks: List['asyncio.Future[SessionResult]'] = []
+        for i in range(sessions):
+            name, = rand.choices(names, weights)
+            expected = rand.random() >= self.failure_ratio
+            creds = self._creds(name, expected)
+            tag = b'a%d' % i
+            tasks.append(asyncio.ensure_future(self._session(
+                authenticator, semaphore, name, mechanisms[name], creds,
+                expected, tag)))
+        return list(await asyncio.gather(*tasks))
+
+
+def format_report(results: Sequence[SessionResult], elapsed: float) -> str:
+    """Format the throughput and latency percentiles of the session results,
+    for each mechanism and in total.
+
+    Args:
+        results: The session results.
+        elapsed: The time taken to run all sessions, in seconds. The
+            throughput is reported as ``n/a`` if this is not positive.
+
+    """
+    by_name: Dict[str, List[SessionResult]] = {}
+    for result in results:
+        by_name.setdefault(result.mechanism, []).append(result)
+    groups = sorted(by_name.items()) + [('total', list(results))]
+    rows = [['mechanism', 'sessions', 'success', 'failure', 'unexpected',
+             'p50 ms', 'p95 ms', 'p99 ms']]
+    for name, group in groups:
+        latencies = [result.latency * 1000.0 for result in group]
+        rows.append([name, str(len(group)),
+                     str(sum(1 for result in group if result.success)),
+                     str(sum(1 for result in group if not result.success)),
+                     str(sum(1 for result in group if result.unexpected))] +
+                    [f'{percentile(latencies, pct):.3f}' if latencies else '-'
+                     for pct in (50, 95, 99)])
+    throughput = f'{len(results) / elapsed:.1f}/s' if elapsed > 0.0 \
+        else 'n/a'
+    return '\n'.join((f'sessions: {len(results)}, elapsed: {elapsed:.3f} s, '
+                      f'throughput: {throughput}', '', _format_table(rows)))
+
+
+def _parse_mix(value: str) -> Dict[str, float]:
+    mix: Dict[str, float] = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        mix[name.strip().upper()] = float(weight or 1.0)
+    return mix
+
+
+async def _run(args: argparse.Namespace) -> int:
+    mix = args.mix
+    auth = SASLAuth.named([name.encode('ascii') for name in mix])
+    population = Population(args.users, rounds=args.rounds)
+    framing = _framings[args.framing]
+    with ThreadPoolExecutor(args.workers) as executor:
+        server = LoadServer(auth, population, framing=framing,
+                            executor=executor)
+        host, port = await server.start(backlog=args.concurrency)
+        try:
+            generator = LoadGenerator(
+                host, port, population, mix=mix,
+                failure_ratio=args.failure_ratio,
+                concurrency=args.concurrency, framing=framing,
+                seed=args.seed)
+            start = time.perf_counter()
+            results = await generator.run(args.sessions)
+            elapsed = time.perf_counter() - start
+        finally:
+            await server.close()
+    print(format_report(results, elapsed))
+    return 1 if any(result.unexpected for result in results) else 0
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Run the load generator from the command-line.
+
+    Args:
+        argv: The command-line arguments.
+
+    Returns:
+        The exit status, which is 1 if any session had an unexpected outcome.
+
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m pysasl.bench.load',
+        description='Generate authentication load against a local server.')
+    parser.add_argument('--sessions', type=int, default=2000,
+                        help='number of client sessions')
+    parser.add_argument('--concurrency', type=int, default=200,
+                        help='maximum sessions in progress')
+    parser.add_argument('--mix', type=_parse_mix, metavar='NAME=WEIGHT,...',
+                        default='PLAIN=4,LOGIN=2,CRAM-MD5=1,XOAUTH2=2,'
+                                'EXTERNAL=1',
+                        help='relative weights of each mechanism')
+    parser.add_argument('--failure-ratio', type=float, default=0.1,
+                        help='fraction of sessions using the wrong secret')
+    parser.add_argument('--users', type=int, default=100,
+                        help='number of synthetic identities')
+    parser.add_argument('--rounds', type=int, default=10000,
+                        help='BuiltinHash rounds of each password')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='verification threads')
+    parser.add_argument('--framing', choices=sorted(_framings),
+                        default='imap', help='protocol framing')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='seed of the random session choices')
+    args = parser.parse_args(argv)
+    return asyncio.run(_run(args))
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,234 @@
+"""Measures the memory footprint of server-side authentication with
+:mod:`tracemalloc`, for each built-in mechanism, and checks it against a
+budget.
+
+Two footprints are measured. The *peak* is the most memory allocated at once
+while completing one attempt, including the responses, decoded strings,
+credentials and challenge exceptions. The *in-flight* size and block count
+are what each attempt retains between receiving its final response and
+verifying its credentials, measured over many concurrent attempts.
+
+Run with ``python -m pysasl.bench.memory``. The budgets are advisory, since
+the footprints vary between Python versions and platforms, but the exit
+status is 1 if any mechanism exceeded its budget.
+
+"""
+
+import argparse
+import re
+import sys
+import tracemalloc
+from typing import (Callable, Optional, Mapping, Sequence, Tuple, List,
+                    NamedTuple)
+from typing_extensions import TypeAlias
+
+from . import _Builtin, _creds, _format_table
+from ..creds.server import ServerCredentials
+from ..creds.external import ExternalVerificationRequired
+from ..identity import ClearIdentity
+from ..mechanism import ChallengeResponse, ServerChallenge
+from ..mechanism.crammd5 import CramMD5Mechanism
+from ..mechanism.external import ExternalMechanism
+from ..mechanism.login import LoginMechanism
+from ..mechanism.oauth import OAuth2Mechanism
+from ..mechanism.plain import PlainMechanism
+
+__all__ = ['Footprint', 'Budget', 'BUDGETS', 'measure', 'suite',
+           'check', 'main']
+
+_Session: TypeAlias = Tuple[List[ChallengeResponse], ServerCredentials]
+
+
+class Footprint(NamedTuple):
+    """The measured memory footprint of a mechanism."""
+
+    #: The mechanism name.
+    name: str
+
+    #: The peak bytes allocated while completing one attempt, the least of
+    #: several attempts to exclude one-time allocations.
+    peak: int
+
+    #: The bytes retained by each in-flight attempt.
+    size: float
+
+    #: The memory blocks retained by each in-flight attempt.
+    blocks: float
+
+
+class Budget(NamedTuple):
+    """The maximum memory footprint allowed for a mechanism."""
+
+    #: The maximum of :attr:`Footprint.peak`.
+    peak: int
+
+    #: The maximum of :attr:`Footprint.size`.
+    size: int
+
+    #: The maximum of :attr:`Footprint.blocks`.
+    blocks: int
+
+
+#: The default budgets of each built-in mechanism, by name, which leave
+#: headroom above the footprints measured on CPython.
+BUDGETS: Mapping[str, Budget] = {
+    'PLAIN': Budget(peak=2048, size=448, blocks=8),
+    'LOGIN': Budget(peak=1536, size=448, blocks=8),
+    'CRAM-MD5': Budget(peak=2048, size=512, blocks=8),
+    'EXTERNAL': Budget(peak=1536, size=256, blocks=5),
+    'XOAUTH2': Budget(peak=2048, size=384, blocks=7)}
+
+
+def _wire_responses(mech: _Builtin) -> Sequence[bytes]:
+    challenges: List[ServerChallenge] = []
+    responses: List[bytes] = []
+    while True:
+        try:
+            mech.server_attempt([ChallengeResponse(b'', response)
+                                 for response in responses])
+        except ServerChallenge as chal:
+            challenges.append(chal)
+            response = mech.client_attempt(_creds, challenges)
+            responses.append(response.response)
+        else:
+            return responses
+
+
+def _session_func(mech: _Builtin) -> Callable[[], _Session]:
+    wire = _wire_responses(mech)
+    server_attempt = mech.server_attempt
+
+    def session() -> _Session:
+        responses: List[ChallengeResponse] = []
+        while True:
+            try:
+                creds, _ = server_attempt(responses)
+            except ServerChallenge as chal:
+                response = wire[len(responses)]
+                responses.append(ChallengeResponse(chal.data, response))
+            else:
+                return responses, creds
+    return session
+
+
+def _verify(creds: ServerCredentials, identity: ClearIdentity) -> None:
+    try:
+        creds.verify(identity)
+    except ExternalVerificationRequired:
+        pass
+
+
+def measure(name: str, session: Callable[[], _Session], *,
+            sessions: int = 1000) -> Footprint:
+    """Measure the memory footprint of authentication sessions.
+
+    Args:
+        name: The mechanism name.
+        session: Runs the exchange of one session, returning its responses
+            and credentials.
+        sessions: The number of concurrent in-flight sessions.
+
+    """
+    identity = ClearIdentity(_creds.authcid, _creds.secret)
+    _verify(session()[1], identity)
+    in_flight: List[Optional[_Session]] = [None] * sessions
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    try:
+        peaks: List[int] = []
+        for _ in range(10):
+            tracemalloc.clear_traces()
+            _verify(session()[1], identity)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+        peak = min(peaks)
+        tracemalloc.clear_traces()
+        for i in range(sessions):
+            in_flight[i] = session()
+        size, _ = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+    blocks = sum(stat.count for stat in snapshot.statistics('filename'))
+    return Footprint(name, peak, size / sessions, blocks / sessions)
+
+
+def suite() -> Sequence[Tuple[str, Callable[[], _Session]]]:
+    """Return the session functions of each built-in mechanism, by name."""
+    mechanisms: List[_Builtin] = [
+        PlainMechanism(), LoginMechanism(), CramMD5Mechanism(),
+        ExternalMechanism(), OAuth2Mechanism()]
+    return [(mech.name.decode('ascii'), _session_func(mech))
+            for mech in mechanisms]
+
+
+def check(footprints: Sequence[Footprint],
+          budgets: Mapping[str, Budget] = BUDGETS) -> List[str]:
+    """Check footprints against their budgets.
+
+    Args:
+        footprints: The measured footprints.
+        budgets: The budget of each mechanism name. Mechanisms without a
+            budget are not checked.
+
+    Returns:
+        A description of each exceeded budget.
+
+    """
+    ret: List[str] = []
+    for footprint in footprints:
+        budget = budgets.get(footprint.name)
+        if budget is None:
+            continue
+        for field in Budget._fields:
+            value = getattr(footprint, field)
+            limit = getattr(budget, field)
+            if value > limit:
+                ret.append(f'{footprint.name}: {field} {value:.1f} '
+                           f'exceeds {limit}')
+    return ret
+
+
+def _format_footprints(footprints: Sequence[Footprint]) -> str:
+    rows = [['mechanism', 'peak', 'in-flight', 'blocks']]
+    rows += [[footprint.name, f'{footprint.peak} B', f'{footprint.size:.1f} B',
+              f'{footprint.blocks:.1f}'] for footprint in footprints]
+    return _format_table(rows)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Measure the memory footprints from the command-line.
+
+    Args:
+        argv: The command-line arguments.
+
+    Returns:
+        The exit status.
+
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m pysasl.bench.memory',
+        description='Measure the pysasl per-session memory footprint.')
+    parser.add_argument('--filter', metavar='REGEX',
+                        help='only measure mechanisms matching the pattern')
+    parser.add_argument('--sessions', type=int, default=1000,
+                        help='number of concurrent in-flight sessions')
+    args = parser.parse_args(argv)
+
+    sessions = suite()
+    if args.filter:
+        pattern = re.compile(args.filter)
+        sessions = [(name, session) for name, session in sessions
+                    if pattern.search(name)]
+    footprints = [measure(name, session, sessions=args.sessions)
+                  for name, session in sessions]
+    print(_format_footprints(footprints))
+    exceeded = check(footprints)
+    for line in exceeded:
+        print(line)
+    return 1 if exceeded else 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""Microbenchmarks of the hot paths of an authentication attempt: mechanism
+steps, string preparation, identity comparison and hashing.
+
+Run with ``python -m pysasl.bench.micro``, optionally saving the results as a
+baseline with ``--save`` and comparing with a baseline with ``--baseline``.
+The exit status is 1 if any benchmark regressed.
+
+"""
+
+import argparse
+import re
+import sys
+from functools import partial
+from typing import Optional, Sequence, Tuple, List
+
+from . import Benchmark, Runner, Baseline, _Builtin, _creds, \
+    _format_results, _format_comparisons
+from ..hashing import BuiltinHash, Cleartext
+from ..identity import ClearIdentity, HashedIdentity
+from ..mechanism import ChallengeResponse, ServerChallenge
+from ..mechanism.crammd5 import CramMD5Mechanism
+from ..mechanism.external import ExternalMechanism
+from ..mechanism.login import LoginMechanism
+from ..mechanism.oauth import OAuth2Mechanism
+from ..mechanism.plain import PlainMechanism
+from ..prep import saslprep
+
+__all__ = ['PREP_INPUTS', 'suite', 'main']
+
+#: The inputs to the :func:`~pysasl.prep.saslprep` benchmarks, by name.
+PREP_INPUTS: Sequence[Sequence[str]] = [
+    ('ascii', 'user@example.com'),
+    ('latin', 'Jürgen.Müßig'),
+    ('cjk', '東京都渋谷区'),
+    ('rtl', 'مرحبا')]
+
+_cram_challenge = b'<1896.697170952@postoffice.example.net>'
+
+
+def _client_steps(mech: _Builtin, challenges: Sequence[ServerChallenge]) \
+        -> List[ChallengeResponse]:
+    return [mech.client_attempt(_creds, challenges[:i])
+            for i in range(len(challenges) + 1)]
+
+
+def _mechanism_suite() -> List[Benchmark]:
+    login_challenges = [ServerChallenge(b'Username:'),
+                        ServerChallenge(b'Password:')]
+    cram_challenges = [ServerChallenge(_cram_challenge)]
+    mechanisms: List[Tuple[_Builtin, List[ServerChallenge]]] = [
+        (PlainMechanism(), []),
+        (LoginMechanism(), login_challenges),
+        (CramMD5Mechanism(), cram_challenges),
+        (ExternalMechanism(), []),
+        (OAuth2Mechanism(), [])]
+    benchmarks: List[Benchmark] = []
+    for mech, challenges in mechanisms:
+        name = mech.name.decode('ascii')
+        responses = _client_steps(mech, challenges)
+        if challenges:
+            responses = responses[1:]
+        benchmarks.append(Benchmark(f'mechanism.{name}.server',
+                                    partial(mech.server_attempt, responses)))
+        benchmarks.append(Benchmark(f'mechanism.{name}.client',
+                                    partial(_client_steps, mech, challenges)))
+    return benchmarks
+
+
+def _prep_suite() -> List[Benchmark]:
+    return [Benchmark(f'prep.saslprep.{name}', partial(saslprep, value))
+            for name, value in PREP_INPUTS]
+
+
+def _identity_suite() -> List[Benchmark]:
+    secret = _creds.secret
+    clear = ClearIdentity(_creds.authcid, secret)
+    hashed = HashedIdentity.create(_creds.authcid, secret, hash=Cleartext())
+    return [Benchmark('identity.ClearIdentity.compare_secret',
+                      lambda: clear.compare_secret(secret)),
+            Benchmark('identity.ClearIdentity.compare_authcid',
+                      lambda: clear.compare_authcid(_creds.authcid)),
+            Benchmark('identity.HashedIdentity.compare_secret',
+                      lambda: hashed.compare_secret(secret))]
+
+
+def _hash_suite(rounds: Sequence[int]) -> List[Benchmark]:
+    benchmarks: List[Benchmark] = []
+    secret = _creds.secret
+    salt = b'\x00' * 16
+    for num in rounds:
+        hash = BuiltinHash(rounds=num)
+        digest = hash.hash(secret, salt)
+        benchmarks.append(Benchmark(f'hashing.BuiltinHash.hash.{num}',
+                                    partial(hash.hash, secret, salt)))
+        benchmarks.append(Benchmark(f'hashing.BuiltinHash.verify.{num}',
+                                    partial(hash.verify, secret, digest)))
+    return benchmarks
+
+
+def suite(*, rounds: Sequence[int] = (1000, 10000, 100000)) \
+        -> List[Benchmark]:
+    """Return the microbenchmarks.
+
+    Args:
+        rounds: The :class:`~pysasl.hashing.BuiltinHash` round counts to
+            benchmark.
+
+    """
+    return _mechanism_suite() + _prep_suite() + _identity_suite() + \
+        _hash_suite(rounds)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Run the microbenchmarks from the command-line.
+
+    Args:
+        argv: The command-line arguments.
+
+    Returns:
+        The exit status.
+
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m pysasl.bench.micro',
+        description='Run the pysasl microbenchmarks.')
+    parser.add_argument('--filter', metavar='REGEX',
+                        help='only run benchmarks matching the pattern')
+    parser.add_argument('--repeat', type=int, default=20,
+                        help='number of samples per benchmark')
+    parser.add_argument('--min-time', type=float, default=0.02,
+                        metavar='SECONDS', help='minimum time per sample')
+    parser.add_argument('--rounds', type=int, nargs='+',
+                        default=[1000, 10000, 100000],
+                        help='BuiltinHash round counts')
+    parser.add_argument('--save', metavar='PATH',
+                        help='save the results as a baseline')
+    parser.add_argument('--baseline', metavar='PATH',
+                        help='compare the results with a baseline')
+    parser.add_argument('--alpha', type=float, default=0.01,
+                        help='significance level of the comparison')
+    parser.add_argument('--threshold', type=float, default=0.05,
+                        help='minimum relative change of the median')
+    args = parser.parse_args(argv)
+
+    benchmarks = suite(rounds=args.rounds)
+    if args.filter:
+        pattern = re.compile(args.filter)
+        benchmarks = [bench for bench in benchmarks
+                      if pattern.search(bench.name)]
+    runner = Runner(repeat=args.repeat, min_time=args.min_time)
+    results = runner.run_all(benchmarks)
+    print(_format_results(results))
+    if args.save:
+        Baseline.from_results(results).save(args.save)
+    if args.baseline:
+        comparisons = Baseline.load(args.baseline).compare(
+            results, alpha=args.alpha, threshold=args.threshold)
+        print()
+        print(_format_comparisons(comparisons))
+        if any(comp.verdict == 'regression' for comp in comparisons):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
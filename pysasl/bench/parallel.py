@@ -0,0 +1,133 @@
+"""Compares the throughput of verifying hashed secrets in parallel with
+thread, process and subinterpreter pools, at increasing worker counts.
+
+Each benchmark prepares and verifies a batch of secrets with
+:class:`~pysasl.interpreters.ParallelVerifier`. The secrets include
+characters that :func:`~pysasl.prep.saslprep` must map and check, so that
+the Python-level parts of verification are measured along with
+:func:`hashlib.pbkdf2_hmac`.
+
+Run with ``python -m pysasl.bench.parallel``. Subinterpreter pools are only
+measured where :data:`~pysasl.interpreters.SUBINTERPRETERS` is true.
+
+"""
+
+import argparse
+import os
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor, \
+    ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Optional, Mapping, Sequence, Tuple, List
+
+from . import Benchmark, Result, Runner, _format_table, _format_time
+from ..hashing import BuiltinHash
+from ..interpreters import SUBINTERPRETERS, new_executor, ParallelVerifier
+
+__all__ = ['EXECUTORS', 'run', 'main']
+
+#: The executor kinds that can be compared, by name.
+EXECUTORS: Mapping[str, Callable[[int], Executor]] = {
+    'thread': ThreadPoolExecutor,
+    'process': ProcessPoolExecutor,
+    'interpreter': new_executor,
+}
+
+
+def _pairs(hash: BuiltinHash, batch: int) -> List[Tuple[str, str]]:
+    pairs: List[Tuple[str, str]] = []
+    for i in range(batch):
+        secret = f'pass\u00a0word\u00ad{i}'
+        digest = hash.hash(f'pass word{i}', b'\x00' * hash.salt_len)
+        pairs.append((secret, digest))
+    return pairs
+
+
+def run(runner: Runner, *, kinds: Sequence[str], workers: Sequence[int],
+        batch: int = 64, rounds: int = 1000) -> List[Result]:
+    """Run the benchmark of each executor kind and worker count.
+
+    Args:
+        runner: The benchmark runner.
+        kinds: The keys of :data:`EXECUTORS` to compare.
+        workers: The worker counts of each executor.
+        batch: The number of verifications in each operation.
+        rounds: The :class:`~pysasl.hashing.BuiltinHash` rounds.
+
+    Raises:
+        ValueError: The executor kind was unknown.
+
+    """
+    hash = BuiltinHash(rounds=rounds)
+    pairs = _pairs(hash, batch)
+    results: List[Result] = []
+    for kind in kinds:
+        if kind not in EXECUTORS:
+            raise ValueError(f'Unknown executor: {kind}')
+        for num in workers:
+            executor = EXECUTORS[kind](num)
+            try:
+                chunksize = max(batch // num, 1)
+                verifier = ParallelVerifier(hash, executor=executor,
+                                            chunksize=chunksize)
+                results.append(runner.run(Benchmark(
+                    f'parallel.{kind}.{num}',
+                    partial(verifier.verify, pairs))))
+            finally:
+                executor.shutdown()
+    return results
+
+
+def _format_throughput(results: Sequence[Result], batch: int) -> str:
+    rows = [['benchmark', 'median', 'throughput']]
+    rows += [[result.name, _format_time(result.median),
+              f'{batch / result.median:.1f}/s'] for result in results]
+    return _format_table(rows)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Run the parallel verification benchmark from the command-line.
+
+    Args:
+        argv: The command-line arguments.
+
+    Returns:
+        The exit status.
+
+    """
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(
+        prog='python -m pysasl.bench.parallel',
+        description='Compare parallel verification with thread, process '
+        'and subinterpreter pools.')
+    parser.add_argument('--executor', nargs='+', dest='kinds',
+                        choices=sorted(EXECUTORS),
+                        help='the executors to compare, by default all '
+                        'that are available')
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, max(cpus // 2, 1), cpus}),
+                        help='worker counts of each executor')
+    parser.add_argument('--batch', type=int, default=64,
+                        help='verifications per operation')
+    parser.add_argument('--rounds', type=int, default=1000,
+                        help='BuiltinHash rounds')
+    parser.add_argument('--repeat', type=int, default=10,
+                        help='number of samples per benchmark')
+    parser.add_argument('--min-time', type=float, default=0.1,
+                        metavar='SECONDS', help='minimum time per sample')
+    args = parser.parse_args(argv)
+
+    kinds = args.kinds
+    if kinds is None:
+        kinds = ['thread', 'process']
+        if SUBINTERPRETERS:  # pragma: no cover
+            kinds.append('interpreter')
+    runner = Runner(repeat=args.repeat, min_time=args.min_time)
+    results = run(runner, kinds=kinds, workers=args.workers,
+                  batch=args.batch, rounds=args.rounds)
+    print(_format_throughput(results, args.batch))
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
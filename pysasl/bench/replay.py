@@ -0,0 +1,275 @@
+"""Replays the transcripts recorded by
+:class:`~pysasl.transcript.TranscriptRecorder` through the server mechanisms
+and credential verification, with no network or event loop involved, to
+benchmark real traffic deterministically.
+
+The identities needed by the transcripts are reconstructed from the
+placeholders of successful attempts, so each replayed attempt should reach
+the same outcome as when it was recorded. Attempts that do not are reported
+as mismatches.
+
+Run with ``python -m pysasl.bench.replay FILE``. The exit status is 1 if any
+transcript mismatched or, with ``--baseline``, any benchmark regressed.
+
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import sys
+from base64 import b64decode
+from collections import Counter
+from functools import partial
+from typing import Optional, TextIO, Sequence, List, Dict, NamedTuple
+from typing_extensions import Final
+
+from . import Benchmark, Runner, Baseline, _format_results, \
+    _format_comparisons
+from .. import SASLAuth
+from ..creds.external import ExternalVerificationRequired
+from ..exception import AuthenticationError, InvalidResponse
+from ..hashing import HashInterface, BuiltinHash
+from ..identity import Identity, ClearIdentity, HashedIdentity
+from ..mechanism import ChallengeResponse, ServerChallenge, ServerMechanism
+
+__all__ = ['Transcript', 'load_transcripts', 'Replayer', 'main']
+
+_builtin_names: Sequence[bytes] = [b'PLAIN', b'LOGIN', b'CRAM-MD5',
+                                   b'EXTERNAL', b'XOAUTH2']
+
+
+class Transcript(NamedTuple):
+    """A recorded authentication attempt."""
+
+    #: The mechanism name.
+    mechanism: bytes
+
+    #: The challenge-response exchanges of the attempt.
+    steps: Sequence[ChallengeResponse]
+
+    #: The recorded outcome, e.g. ``success`` or ``invalid``.
+    outcome: str
+
+
+def load_transcripts(stream: TextIO) -> List[Transcript]:
+    """Load the transcripts written by a
+    :class:`~pysasl.transcript.TranscriptRecorder`.
+
+    Args:
+        stream: The text stream to read.
+
+    Raises:
+        ValueError: The stream was not a valid transcript file.
+
+    """
+    ret: List[Transcript] = []
+    for line in stream:
+        if not line.strip():
+            continue
+        data = json.loads(line)
+        try:
+            steps = [ChallengeResponse(b64decode(challenge),
+                                       b64decode(response))
+                     for challenge, response in data['steps']]
+            mechanism = data['mech'].encode('ascii')
+            outcome = data['outcome']
+        except (TypeError, KeyError, AttributeError) as exc:
+            raise ValueError('Invalid transcript') from exc
+        ret.append(Transcript(mechanism, steps, outcome))
+    return ret
+
+
+def _crammd5_digest(secret: str, challenge: bytes) -> bytes:
+    digest = hmac.new(secret.encode('utf-8'), challenge, hashlib.md5)
+    return digest.hexdigest().encode('ascii')
+
+
+class Replayer:
+    """Replays transcripts through server mechanisms and credential
+    verification.
+
+    Transcripts of mechanisms not available in *auth* are ignored.
+
+    Args:
+        transcripts: The recorded transcripts.
+        auth: The available mechanisms, by default all built-in mechanisms.
+        hash: The hash used for the reconstructed identities.
+
+    """
+
+    __slots__: Sequence[str] = ['transcripts', '_mechanisms', '_hashed',
+                                '_clear']
+
+    def __init__(self, transcripts: Sequence[Transcript], *,
+                 auth: Optional[SASLAuth] = None,
+                 hash: Optional[HashInterface] = None) -> None:
+        super().__init__()
+        if auth is None:
+            auth = SASLAuth.named(_builtin_names)
+        if hash is None:
+            hash = BuiltinHash()
+        self._mechanisms: Dict[bytes, ServerMechanism] = {
+            mech.name: mech for mech in auth.server_mechanisms}
+        self._hashed: Dict[str, HashedIdentity] = {}
+        self._clear: Dict[str, ClearIdentity] = {}
+        self.transcripts: Final = self._reconstruct(
+            [transcript for transcript in transcripts
+             if transcript.mechanism in self._mechanisms], hash)
+
+    def _reconstruct(self, transcripts: Sequence[Transcript],
+                     hash: HashInterface) -> Sequence[Transcript]:
+        secrets: Dict[str, str] = {}
+        for transcript in transcripts:
+            if transcript.outcome != 'success':
+                continue
+            steps = transcript.steps
+            if transcript.mechanism == b'PLAIN' and len(steps) == 1:
+                fields = steps[0].response.split(b'\x00')
+            elif transcript.mechanism == b'LOGIN' and len(steps) == 2:
+                fields = [b'', steps[0].response, steps[1].response]
+            else:
+                continue
+            if len(fields) == 3:
+                _, cid, pw = fields
+                secrets[cid.decode('utf-8')] = pw.decode('utf-8')
+        ret: List[Transcript] = []
+        for transcript in transcripts:
+            if transcript.mechanism == b'CRAM-MD5' and \
+                    transcript.outcome == 'success':
+                challenge = transcript.steps[0].challenge
+                user, _, _ = transcript.steps[0].response.rpartition(b' ')
+                authcid = user.decode('utf-8')
+                secret = secrets.setdefault(authcid, f'{authcid}.secret')
+                digest = _crammd5_digest(secret, challenge)
+                self._clear[authcid] = ClearIdentity(authcid, secret)
+                transcript = transcript._replace(steps=[ChallengeResponse(
+                    challenge, b' '.join((user, digest)))])
+            ret.append(transcript)
+        for authcid, secret in secrets.items():
+            self._hashed[authcid] = HashedIdentity.create(
+                authcid, secret, hash=hash)
+        return ret
+
+    def _lookup(self, authcid: str, clear: bool) -> Optional[Identity]:
+        if clear:
+            return self._clear.get(authcid)
+        return self._hashed.get(authcid)
+
+    def replay(self, transcript: Transcript) -> str:
+        """Replay one transcript, returning its outcome.
+
+        Args:
+            transcript: The transcript to replay.
+
+        """
+        mechanism = self._mechanisms[transcript.mechanism]
+        steps = transcript.steps
+        for i in range(1, len(steps)):
+            try:
+                mechanism.server_attempt(steps[:i])
+            except (ServerChallenge, InvalidResponse):
+                pass
+        try:
+            creds, _ = mechanism.server_attempt(steps)
+        except ServerChallenge:
+            return 'challenge'
+        except InvalidResponse:
+            return 'invalid'
+        if transcript.outcome == 'complete':
+            return 'complete'
+        identity = self._lookup(creds.authcid or creds.authzid,
+                                transcript.mechanism == b'CRAM-MD5')
+        try:
+            return 'success' if creds.verify(identity) else 'failure'
+        except ExternalVerificationRequired:
+            return 'external'
+        except AuthenticationError:
+            return 'error'
+
+    def mismatches(self) -> List[Transcript]:
+        """Replay every transcript, returning those whose outcome differed
+        from the recorded outcome.
+
+        """
+        return [transcript for transcript in self.transcripts
+                if self.replay(transcript) != transcript.outcome]
+
+    def _replay_all(self, transcripts: Sequence[Transcript]) -> None:
+        replay = self.replay
+        for transcript in transcripts:
+            replay(transcript)
+
+    def benchmarks(self) -> List[Benchmark]:
+        """Return a benchmark for each mechanism that replays all of its
+        transcripts.
+
+        """
+        by_mechanism: Dict[bytes, List[Transcript]] = {}
+        for transcript in self.transcripts:
+            by_mechanism.setdefault(transcript.mechanism, []).append(
+                transcript)
+        return [Benchmark(f'replay.{name.decode("ascii")}',
+                          partial(self._replay_all, transcripts))
+                for name, transcripts in sorted(by_mechanism.items())]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Replay transcripts from the command-line.
+
+    Args:
+        argv: The command-line arguments.
+
+    Returns:
+        The exit status.
+
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m pysasl.bench.replay',
+        description='Replay recorded pysasl transcripts.')
+    parser.add_argument('path', metavar='FILE',
+                        help='the recorded transcripts')
+    parser.add_argument('--repeat', type=int, default=20,
+                        help='number of samples per benchmark')
+    parser.add_argument('--min-time', type=float, default=0.02,
+                        metavar='SECONDS', help='minimum time per sample')
+    parser.add_argument('--rounds', type=int, default=10000,
+                        help='BuiltinHash rounds of each password')
+    parser.add_argument('--save', metavar='PATH',
+                        help='save the results as a baseline')
+    parser.add_argument('--baseline', metavar='PATH',
+                        help='compare the results with a baseline')
+    parser.add_argument('--alpha', type=float, default=0.01,
+                        help='significance level of the comparison')
+    parser.add_argument('--threshold', type=float, default=0.05,
+                        help='minimum relative change of the median')
+    args = parser.parse_args(argv)
+
+    with open(args.path) as f:
+        transcripts = load_transcripts(f)
+    replayer = Replayer(transcripts, hash=BuiltinHash(rounds=args.rounds))
+    outcomes = Counter(f'{transcript.mechanism.decode("ascii")} '
+                       f'{transcript.outcome}'
+                       for transcript in replayer.transcripts)
+    for key, count in sorted(outcomes.items()):
+        print(f'{key}: {count}')
+    mismatches = replayer.mismatches()
+    print(f'mismatches: {len(mismatches)}')
+    print()
+    runner = Runner(repeat=args.repeat, min_time=args.min_time)
+    results = runner.run_all(replayer.benchmarks())
+    print(_format_results(results))
+    if args.save:
+        Baseline.from_results(results).save(args.save)
+    regressed = False
+    if args.baseline:
+        comparisons = Baseline.load(args.baseline).compare(
+            results, alpha=args.alpha, threshold=args.threshold)
+        print()
+        print(_format_comparisons(comparisons))
+        regressed = any(comp.verdict == 'regression' for comp in comparisons)
+    return 1 if mismatches or regressed else 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
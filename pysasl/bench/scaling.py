@@ -0,0 +1,171 @@
+"""Measures how the throughput of the Python-level verification path scales
+with the number of threads, to check that shared objects do not serialize
+threads that authenticate at once.
+
+With the GIL, pure-Python work cannot run in parallel and the speedup stays
+near one. On free-threaded builds of Python, the speedup should approach the
+number of threads, up to the number of cores.
+
+Run with ``python -m pysasl.bench.scaling``. With ``--min-efficiency``, the
+exit status is 1 if the speedup of any workload divided by its threads falls
+below the given ratio.
+
+"""
+
+import argparse
+import sys
+import threading
+import time
+from functools import partial
+from typing import Callable, Optional, Mapping, Sequence, List, NamedTuple
+
+from . import _format_table
+from ..creds.plain import PlainCredentials
+from ..identity import ClearIdentity
+from ..instrument import Metrics, set_observer
+from ..prep import saslprep
+
+__all__ = ['WORKLOADS', 'Scaling', 'measure', 'run', 'main']
+
+_creds = PlainCredentials('user@example.com', 'pass word')
+_identity = ClearIdentity('user@example.com', 'pass word')
+
+#: The operations measured, by name.
+WORKLOADS: Mapping[str, Callable[[], object]] = {
+    'PlainCredentials.verify': partial(_creds.verify, _identity),
+    'saslprep': partial(saslprep, 'Jürgen Müßig'),
+}
+
+
+class Scaling(NamedTuple):
+    """The measured throughput of a workload with a number of threads."""
+
+    #: The workload name.
+    name: str
+
+    #: The number of threads.
+    threads: int
+
+    #: The operations completed per second, by all threads.
+    throughput: float
+
+    #: The throughput relative to one thread.
+    speedup: float
+
+    @property
+    def efficiency(self) -> float:
+        """The speedup divided by the number of threads."""
+        return self.speedup / self.threads
+
+
+def measure(func: Callable[[], object], *, threads: int,
+            iterations: int = 10000,
+            timer: Callable[[], float] = time.perf_counter) -> float:
+    """Return the operations per second completed by *threads* threads, each
+    calling *func* *iterations* times, starting together.
+
+    Args:
+        func: The operation.
+        threads: The number of threads.
+        iterations: The number of operations by each thread.
+        timer: Returns the current time in seconds.
+
+    """
+    barrier = threading.Barrier(threads + 1)
+
+    def worker() -> None:
+        barrier.wait()
+        for _ in range(iterations):
+            func()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    start = timer()
+    for thread in workers:
+        thread.join()
+    elapsed = max(timer() - start, 1e-9)
+    return threads * iterations / elapsed
+
+
+def run(names: Sequence[str], *, threads: Sequence[int],
+        iterations: int = 10000) -> List[Scaling]:
+    """Measure each workload with each number of threads.
+
+    Args:
+        names: The keys of :data:`WORKLOADS` to measure.
+        threads: The numbers of threads, where speedups are relative to the
+            first.
+        iterations: The number of operations by each thread.
+
+    Raises:
+        KeyError: The workload name was unknown.
+
+    """
+    results: List[Scaling] = []
+    for name in names:
+        func = WORKLOADS[name]
+        base: Optional[float] = None
+        for num in threads:
+            throughput = measure(func, threads=num, iterations=iterations)
+            if base is None:
+                base = throughput / num
+            results.append(Scaling(name, num, throughput,
+                                   throughput / base))
+    return results
+
+
+def _format_scaling(results: Sequence[Scaling]) -> str:
+    rows = [['workload', 'threads', 'throughput', 'speedup', 'efficiency']]
+    rows += [[r.name, str(r.threads), f'{r.throughput:.1f}/s',
+              f'{r.speedup:.2f}x', f'{r.efficiency:.0%}'] for r in results]
+    return _format_table(rows)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Run the scaling benchmark from the command-line.
+
+    Args:
+        argv: The command-line arguments.
+
+    Returns:
+        The exit status.
+
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m pysasl.bench.scaling',
+        description='Measure verification throughput across threads.')
+    parser.add_argument('--workload', nargs='+', dest='names',
+                        default=sorted(WORKLOADS), choices=sorted(WORKLOADS),
+                        help='the workloads to measure')
+    parser.add_argument('--threads', type=int, nargs='+',
+                        default=[1, 2, 4, 8], help='numbers of threads')
+    parser.add_argument('--iterations', type=int, default=10000,
+                        help='operations by each thread')
+    parser.add_argument('--metrics', action='store_true',
+                        help='record each operation with a Metrics observer')
+    parser.add_argument('--min-efficiency', type=float, metavar='RATIO',
+                        help='fail if any speedup per thread is lower')
+    args = parser.parse_args(argv)
+
+    is_gil_enabled: Optional[Callable[[], bool]] = \
+        getattr(sys, '_is_gil_enabled', None)
+    gil = is_gil_enabled() if is_gil_enabled is not None else True
+    print(f'GIL enabled: {gil}')
+    previous = set_observer(Metrics()) if args.metrics else None
+    try:
+        results = run(args.names, threads=args.threads,
+                      iterations=args.iterations)
+    finally:
+        if args.metrics:
+            set_observer(previous)
+    print(_format_scaling(results))
+    if args.min_efficiency is not None and \
+            any(r.efficiency < args.min_efficiency for r in results):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""Statistics used to compare benchmark samples."""
+
+import math
+from statistics import NormalDist
+from typing import Sequence, List, Dict
+
+__all__ = ['mann_whitney_u', 'percentile']
+
+
+def _ranks(values: Sequence[float]) -> List[float]:
+    order = sorted(range(len(values)), key=values.__getitem__)
+    ranks = [0.0] * len(values)
+    start = 0
+    while start < len(order):
+        end = start
+        while end + 1 < len(order) \
+                and values[order[end + 1]] == values[order[start]]:
+            end += 1
+        rank = (start + end) / 2.0 + 1.0
+        for idx in order[start:end + 1]:
+            ranks[idx] = rank
+        start = end + 1
+    return ranks
+
+
+def mann_whitney_u(first: Sequence[float], second: Sequence[float]) -> float:
+    """Return the two-sided p-value of the Mann-Whitney U test that the two
+    samples come from the same distribution, using the normal approximation
+    with tie and continuity corrections.
+
+    The test makes no assumption about the shape of the distributions, which
+    suits timing samples with their long upper tails.
+
+    Args:
+        first: The first sample.
+        second: The second sample.
+
+    Raises:
+        ValueError: Either sample is empty.
+
+    """
+    n1, n2 = len(first), len(second)
+    if n1 == 0 or n2 == 0:
+        raise ValueError('Samples must not be empty')
+    ranks = _ranks(list(first) + list(second))
+    u1 = sum(ranks[:n1]) - n1 * (n1 + 1) / 2.0
+    total = n1 + n2
+    counts: Dict[float, int] = {}
+    for rank in ranks:
+        counts[rank] = counts.get(rank, 0) + 1
+    ties = sum(count ** 3 - count for count in counts.values())
+    variance = n1 * n2 / 12.0 * (
+        (total + 1) - ties / (total * (total - 1) if total > 1 else 1))
+    if variance <= 0.0:
+        return 1.0
+    mean = n1 * n2 / 2.0
+    delta = abs(u1 - mean) - 0.5
+    z = max(delta, 0.0) / math.sqrt(variance)
+    return min(1.0, 2.0 * (1.0 - NormalDist().cdf(z)))
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Return the *pct* percentile of *values*, interpolating linearly
+    between the closest ranks.
+
+    Args:
+        values: The values, in any order.
+        pct: The percentile, between 0 and 100.
+
+    Raises:
+        ValueError: *values* is empty.
+
+    """
+    if not values:
+        raise ValueError('Values must not be empty')
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * pct / 100.0
+    low = math.floor(pos)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
@@ -0,0 +1,261 @@
+"""Provides primitives for caching the results of expensive authentication
+work, such as hashing or token validation.
+
+"""
+
+import time
+import hashlib
+import secrets
+import threading
+from collections import OrderedDict
+from abc import abstractmethod
+from typing import TypeVar, Generic, Callable, Hashable, Optional, Sequence, \
+    Tuple, List
+from typing_extensions import Protocol, TypeAlias
+
+__all__ = ['Clock', 'Fingerprinter', 'TTLCache', 'StripedTTLCache',
+           'VerifiedCache']
+
+_KT = TypeVar('_KT', bound=Hashable)
+_VT = TypeVar('_VT')
+
+#: A callable returning the current time in seconds, e.g.
+#: :func:`time.monotonic`.
+Clock: TypeAlias = Callable[[], float]
+
+
+class Fingerprinter:
+    """Produces keyed fingerprints of strings, such as secrets, so that they
+    may be used to find cached results without the cache retaining the strings
+    themselves.
+
+    Args:
+        key: The MAC key, up to 64 bytes. By default, a random key is
+            generated that is only valid for the current process.
+
+    """
+
+    __slots__: Sequence[str] = ['_key']
+
+    def __init__(self, key: Optional[bytes] = None) -> None:
+        super().__init__()
+        if key is None:
+            key = secrets.token_bytes(32)
+        elif len(key) > hashlib.blake2b.MAX_KEY_SIZE:
+            raise ValueError('Fingerprint key is too long')
+        self._key = key
+
+    def fingerprint(self, *parts: str) -> bytes:
+        """Return the keyed fingerprint of the given string *parts*.
+
+        Args:
+            parts: The strings to fingerprint, in order.
+
+        """
+        mac = hashlib.blake2b(key=self._key, digest_size=16)
+        for part in parts:
+            part_b = part.encode('utf-8')
+            mac.update(len(part_b).to_bytes(4, 'big'))
+            mac.update(part_b)
+        return mac.digest()
+
+    def __repr__(self) -> str:
+        return 'Fingerprinter(...)'
+
+
+class TTLCache(Generic[_KT, _VT]):
+    """A bounded, thread-safe cache where each entry expires after a
+    time-to-live. When the cache is full, the least-recently used entry is
+    evicted.
+
+    Args:
+        maxsize: The maximum number of entries in the cache.
+        ttl: The default time-to-live of each entry, in seconds.
+        clock: The function used to get the current time.
+
+    """
+
+    __slots__: Sequence[str] = ['maxsize', 'ttl', '_clock', '_lock', '_data']
+
+    def __init__(self, maxsize: int, ttl: float, *,
+                 clock: Clock = time.monotonic) -> None:
+        super().__init__()
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._data: OrderedDict[_KT, Tuple[float, _VT]] = OrderedDict()
+
+    def get(self, key: _KT) -> Optional[_VT]:
+        """Return the cached value for *key*, or ``None`` if it was not found
+        or has expired.
+
+        Args:
+            key: The cache key.
+
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= self._clock():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: _KT, value: _VT, ttl: Optional[float] = None) -> None:
+        """Add or replace the cached value for *key*.
+
+        Args:
+            key: The cache key.
+            value: The value to cache.
+            ttl: The time-to-live of the entry, instead of :attr:`.ttl`.
+
+        """
+        if ttl is None:
+            ttl = self.ttl
+        if ttl <= 0.0:
+            return
+        expires = self._clock() + ttl
+        with self._lock:
+            data = self._data
+            data[key] = (expires, value)
+            data.move_to_end(key)
+            while len(data) > self.maxsize:
+                data.popitem(last=False)
+
+    def discard(self, key: _KT) -> None:
+        """Remove the cached value for *key*, if it exists.
+
+        Args:
+            key: The cache key.
+
+        """
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all entries from the cache."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __repr__(self) -> str:
+        return f'TTLCache({self.maxsize!r}, {self.ttl!r})'
+
+
+class StripedTTLCache(Generic[_KT, _VT]):
+    """A bounded, thread-safe cache split into several :class:`TTLCache`
+    stripes by the hash of each key. Each stripe has its own lock, so that
+    threads using different keys rarely wait for each other.
+
+    Each stripe holds an equal share of *maxsize* entries and evicts its own
+    least-recently used entry when full.
+
+    Args:
+        maxsize: The maximum number of entries in the cache.
+        ttl: The default time-to-live of each entry, in seconds.
+        stripes: The number of stripes.
+        clock: The function used to get the current time.
+
+    """
+
+    __slots__: Sequence[str] = ['maxsize', 'ttl', '_stripes']
+
+    def __init__(self, maxsize: int, ttl: float, *, stripes: int = 16,
+                 clock: Clock = time.monotonic) -> None:
+        super().__init__()
+        self.maxsize = maxsize
+        self.ttl = ttl
+        stripe_size = max(maxsize // stripes, 1)
+        self._stripes: List[TTLCache[_KT, _VT]] = [
+            TTLCache(stripe_size, ttl, clock=clock) for _ in range(stripes)]
+
+    def _stripe(self, key: _KT) -> TTLCache[_KT, _VT]:
+        stripes = self._stripes
+        return stripes[hash(key) % len(stripes)]
+
+    def get(self, key: _KT) -> Optional[_VT]:
+        """Return the cached value for *key*, or ``None`` if it was not found
+        or has expired.
+
+        Args:
+            key: The cache key.
+
+        """
+        return self._stripe(key).get(key)
+
+    def set(self, key: _KT, value: _VT, ttl: Optional[float] = None) -> None:
+        """Add or replace the cached value for *key*.
+
+        Args:
+            key: The cache key.
+            value: The value to cache.
+            ttl: The time-to-live of the entry, instead of :attr:`.ttl`.
+
+        """
+        if ttl is None:
+            ttl = self.ttl
+        self._stripe(key).set(key, value, ttl)
+
+    def discard(self, key: _KT) -> None:
+        """Remove the cached value for *key*, if it exists.
+
+        Args:
+            key: The cache key.
+
+        """
+        self._stripe(key).discard(key)
+
+    def clear(self) -> None:
+        """Remove all entries from the cache."""
+        for stripe in self._stripes:
+            stripe.clear()
+
+    def __len__(self) -> int:
+        return sum(len(stripe) for stripe in self._stripes)
+
+    def __repr__(self) -> str:
+        return f'StripedTTLCache({self.maxsize!r}, {self.ttl!r}, ' \
+            f'stripes={len(self._stripes)!r})'
+
+
+class VerifiedCache(Protocol):
+    """Remembers recent successful verifications of a secret against a
+    digest, so that repeated logins may skip hashing. Because entries are
+    keyed by the digest, changing the secret of an identity makes its
+    entries unreachable.
+
+    See Also:
+        :class:`~pysasl.identity.HashedIdentity`
+
+    """
+
+    @abstractmethod
+    def contains(self, authcid: str, digest: str, secret: str) -> bool:
+        """Return True if the *secret* was recently verified against the
+        *digest*.
+
+        Args:
+            authcid: The authentication identity.
+            digest: The hashed secret string of the identity.
+            secret: The prepared secret string.
+
+        """
+        ...
+
+    @abstractmethod
+    def add(self, authcid: str, digest: str, secret: str) -> None:
+        """Remember that the *secret* was verified against the *digest*.
+
+        Args:
+            authcid: The authentication identity.
+            digest: The hashed secret string of the identity.
+            secret: The prepared secret string.
+
+        """
+        ...
@@ -0,0 +1,189 @@
+"""Calibrates the rounds of :class:`~pysasl.hashing.BuiltinHash` to the
+current machine, so that hashing cost can be chosen from a latency budget
+rather than a constant.
+
+Each measurement runs :meth:`~pysasl.hashing.BuiltinHash.verify` from
+several threads at once, because :func:`hashlib.pbkdf2_hmac` releases the
+GIL and a loaded server verifies many secrets concurrently. The cost of
+PBKDF2 is linear in its rounds, so the rounds meeting a target latency are
+extrapolated from a probe measurement, then measured and stepped down until
+they meet the target.
+
+Run with ``python -m pysasl.calibrate``.
+
+"""
+
+import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from statistics import median
+from typing import Callable, Optional, Sequence, List, NamedTuple
+
+from .bench import _format_table, _format_time
+from .hashing import BuiltinHash
+
+__all__ = ['Measurement', 'measure', 'calibrate', 'main']
+
+_secret = 'calibration-secret'  # noqa: S105
+_salt = b'\x00' * 16
+
+
+class Measurement(NamedTuple):
+    """The measured cost of verifying with a hash."""
+
+    #: The hash name.
+    hash_name: str
+
+    #: The number of hash rounds.
+    rounds: int
+
+    #: The number of concurrent verifications.
+    concurrency: int
+
+    #: The median seconds per verification.
+    latency: float
+
+    #: The verifications completed per second.
+    throughput: float
+
+
+def measure(hash: BuiltinHash, *, concurrency: int = 1,
+            iterations: int = 5,
+            timer: Callable[[], float] = time.perf_counter) -> Measurement:
+    """Measure the latency and throughput of verifying with *hash*.
+
+    Args:
+        hash: The hash to measure.
+        concurrency: The number of threads verifying at once.
+        iterations: The number of verifications by each thread.
+        timer: Returns the current time in seconds.
+
+    """
+    digest = hash.hash(_secret, _salt)
+    latencies: List[float] = []
+    lock = threading.Lock()
+
+    def worker() -> None:
+        verify = hash.verify
+        times: List[float] = []
+        for _ in range(iterations):
+            start = timer()
+            verify(_secret, digest)
+            times.append(timer() - start)
+        with lock:
+            latencies.extend(times)
+
+    start = timer()
+    with ThreadPoolExecutor(concurrency) as executor:
+        futures = [executor.submit(worker) for _ in range(concurrency)]
+        for future in futures:
+            future.result()
+    elapsed = max(timer() - start, 1e-9)
+    return Measurement(hash.hash_name, hash.rounds, concurrency,
+                       median(latencies), len(latencies) / elapsed)
+
+
+def _round_down(rounds: float, min_rounds: int) -> int:
+    digits = str(int(rounds))
+    return max(int(digits[:2].ljust(len(digits), '0')), min_rounds)
+
+
+def _scale(result: Measurement, target: float,
+           min_throughput: Optional[float]) -> float:
+    scale = target / max(result.latency, 1e-9)
+    if min_throughput is not None:
+        scale = min(scale, result.throughput / min_throughput)
+    return scale
+
+
+def calibrate(target: float, *, hash: Optional[BuiltinHash] = None,
+              concurrency: int = 1, min_throughput: Optional[float] = None,
+              probe_rounds: int = 10000, min_rounds: int = 1000,
+              iterations: int = 5,
+              timer: Callable[[], float] = time.perf_counter) -> BuiltinHash:
+    """Return a copy of *hash* with the most rounds, to two significant
+    digits, that meets the target latency and throughput.
+
+    Args:
+        target: The maximum median seconds per verification.
+        hash: The hash to calibrate, by default :class:`BuiltinHash`.
+        concurrency: The number of threads verifying at once.
+        min_throughput: The minimum verifications per second, if any.
+        probe_rounds: The rounds of the first measurement.
+        min_rounds: The fewest rounds returned, even if the targets cannot
+            be met.
+        iterations: The number of verifications by each thread.
+        timer: Returns the current time in seconds.
+
+    """
+    if hash is None:
+        hash = BuiltinHash()
+    rounds = float(probe_rounds)
+    for _ in range(2):
+        result = measure(hash.copy(rounds=max(int(rounds), 1)),
+                         concurrency=concurrency, iterations=iterations,
+                         timer=timer)
+        rounds = result.rounds * _scale(result, target, min_throughput)
+    final = _round_down(rounds, min_rounds)
+    while final > min_rounds:
+        result = measure(hash.copy(rounds=final), concurrency=concurrency,
+                         iterations=iterations, timer=timer)
+        scale = _scale(result, target, min_throughput)
+        if scale >= 1.0:
+            break
+        final = _round_down(final * min(scale, 0.9), min_rounds)
+    return hash.copy(rounds=final)
+
+
+def _format_measurements(measurements: Sequence[Measurement]) -> str:
+    rows = [['hash', 'rounds', 'concurrency', 'latency', 'throughput']]
+    rows += [[m.hash_name, str(m.rounds), str(m.concurrency),
+              _format_time(m.latency), f'{m.throughput:.1f}/s']
+             for m in measurements]
+    return _format_table(rows)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Calibrate the hash rounds from the command-line.
+
+    Args:
+        argv: The command-line arguments.
+
+    Returns:
+        The exit status.
+
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m pysasl.calibrate',
+        description='Calibrate BuiltinHash rounds to a latency budget.')
+    parser.add_argument('--target', type=float, default=0.1,
+                        metavar='SECONDS',
+                        help='maximum median seconds per verification')
+    parser.add_argument('--min-throughput', type=float, metavar='N',
+                        help='minimum verifications per second')
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='number of concurrent verifications')
+    parser.add_argument('--hash-name', nargs='+', dest='hash_names',
+                        default=['sha1', 'sha256', 'sha512'],
+                        choices=['sha1', 'sha256', 'sha512'],
+                        help='the hash names to calibrate')
+    parser.add_argument('--iterations', type=int, default=5,
+                        help='verifications per thread per measurement')
+    args = parser.parse_args(argv)
+
+    measurements: List[Measurement] = []
+    for hash_name in args.hash_names:
+        hash = calibrate(args.target, hash=BuiltinHash(hash_name=hash_name),
+                         concurrency=args.concurrency,
+                         min_throughput=args.min_throughput,
+                         iterations=args.iterations)
+        measurements.append(measure(hash, concurrency=args.concurrency,
+                                    iterations=args.iterations))
+    print(_format_measurements(measurements))
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
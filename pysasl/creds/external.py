@@ -5,6 +5,8 @@ from typing_extensions import Final
 from .server import ServerCredentials
 from ..exception import AuthenticationError
 from ..identity import Identity
+from ..instrument import TOKEN, observed, observe_verify
+from ..token import TokenValidator
 
 __all__ = ['ExternalVerificationRequired', 'ExternalCredentials']
 
@@ -57,6 +59,7 @@ class ExternalCredentials(ServerCredentials):
     def authzid(self) -> str:
         return self._authzid
 
+    @observe_verify
     def verify(self, identity: Optional[Identity]) -> NoReturn:
         """This method always throws :exc:`ExternalVerificationRequired`. For
         applications to support these types of credentials, they must catch
@@ -71,5 +74,24 @@ class ExternalCredentials(ServerCredentials):
         """
         raise ExternalVerificationRequired(identity, self._token)
 
+    @observed(TOKEN, lambda self, validator: type(validator).__name__)
+    def verify_token(self, validator: TokenValidator) -> bool:
+        """Verifies the bearer token using the given *validator*, for
+        applications that can validate tokens without the
+        :exc:`ExternalVerificationRequired` exception.
+
+        Args:
+            validator: Validates the token for the :attr:`.authzid`.
+
+        Returns:
+            ``False`` if no token was provided, otherwise the validation
+            result.
+
+        """
+        token = self._token
+        if token is None:
+            return False
+        return validator.validate(token, self.authzid)
+
     def __repr__(self) -> str:
         return f'ExternalCredentials({self.authzid}, ...)'
@@ -3,6 +3,7 @@ from typing import Optional
 
 from .server import ServerCredentials
 from ..identity import Identity
+from ..instrument import observe_verify
 
 __all__ = ['PlainCredentials']
 
@@ -32,10 +33,16 @@ class PlainCredentials(ServerCredentials):
     def authcid(self) -> str:
         return self._authcid
 
+    @property
+    def secret(self) -> str:
+        """Secret string (the password)."""
+        return self._secret
+
     @property
     def authzid(self) -> str:
         return self._authzid
 
+    @observe_verify
     def verify(self, identity: Optional[Identity]) -> bool:
         if identity is not None:
             return identity.compare_authcid(self.authcid)  \
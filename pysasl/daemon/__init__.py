@@ -0,0 +1,255 @@
+"""Provides a compact protocol for frontend servers to verify credentials in a
+shared authentication process over a Unix domain socket, so that the
+identities, caches and hashing workers of that process are shared by every
+frontend on a host.
+
+Each frontend runs the SASL exchange itself, and sends the mechanism name
+and the challenge-response exchanges to the authentication process, which
+rebuilds the credentials with the same mechanism and verifies them. Every
+message is a frame with a 4-byte big-endian length prefix, and each request
+carries an ID echoed by its response, so that requests may be pipelined and
+answered out of order.
+
+The server listens on, and the client connects to, a Unix domain socket, so
+both are only available on POSIX platforms.
+
+A request frame contains:
+
+* the request ID, as a 4-byte unsigned integer,
+* the mechanism name, prefixed by its 1-byte length,
+* the number of exchanges, as a 2-byte unsigned integer,
+* each challenge and response, prefixed by their 4-byte lengths.
+
+A response frame contains:
+
+* the request ID, as a 4-byte unsigned integer,
+* the :class:`Status`, as a 1-byte unsigned integer,
+* a 1-byte flag that is 1 if a bearer token follows the identities,
+* the authentication identity, authorization identity and the bearer token,
+  each UTF-8 encoded and prefixed by its 2-byte length.
+
+"""
+
+import asyncio
+import struct
+from enum import IntEnum
+from typing import Any, Optional, Sequence, Tuple, List, NamedTuple
+
+from ..mechanism import ChallengeResponse
+
+__all__ = ['MAX_FRAME', 'Status', 'Request', 'Response', 'encode_request',
+           'decode_request', 'encode_response', 'decode_response',
+           'read_frame']
+
+#: The default maximum length of a frame, excluding its length prefix.
+MAX_FRAME = 65536
+
+_length = struct.Struct('!I')
+_request_head = struct.Struct('!IB')
+_response_head = struct.Struct('!IBB')
+_count = struct.Struct('!H')
+_step = struct.Struct('!II')
+_string = struct.Struct('!H')
+
+
+class Status(IntEnum):
+    """The outcome of a verification request."""
+
+    #: The credentials were verified.
+    SUCCESS = 0
+
+    #: The credentials did not verify, or the identity was not found.
+    FAILURE = 1
+
+    #: The mechanism rejected the exchanges as invalid or incomplete.
+    INVALID = 2
+
+    #: The mechanism is not available, or cannot verify the identity.
+    UNSUPPORTED = 3
+
+    #: The credentials must be verified by the frontend, e.g. using the
+    #: bearer token or TLS client certificate.
+    EXTERNAL = 4
+
+    #: An unexpected error occurred during verification.
+    ERROR = 5
+
+
+class Request(NamedTuple):
+    """A request to verify the credentials of a SASL exchange."""
+
+    #: The request ID, echoed by the response.
+    id: int
+
+    #: The SASL mechanism name.
+    mechanism: bytes
+
+    #: The challenge-response exchanges of the attempt.
+    responses: Sequence[ChallengeResponse]
+
+
+class Response(NamedTuple):
+    """The result of a verification request."""
+
+    #: The request ID.
+    id: int
+
+    #: The outcome of the request.
+    status: Status
+
+    #: The authentication identity of the credentials, if known.
+    authcid: str = ''
+
+    #: The authorization identity of the credentials, if known.
+    authzid: str = ''
+
+    #: The bearer token to verify, if the status is :attr:`Status.EXTERNAL`.
+    token: Optional[str] = None
+
+
+def _frame(parts: List[bytes]) -> bytes:
+    body = b''.join(parts)
+    return _length.pack(len(body)) + body
+
+
+def _pack_string(value: str) -> bytes:
+    value_b = value.encode('utf-8')
+    return _string.pack(len(value_b)) + value_b
+
+
+def encode_request(request: Request) -> bytes:
+    """Return the frame of a request, including its length prefix.
+
+    Args:
+        request: The request to encode.
+
+    Raises:
+        struct.error: A field was too long to encode.
+
+    """
+    mechanism = request.mechanism
+    parts = [_request_head.pack(request.id, len(mechanism)), mechanism,
+             _count.pack(len(request.responses))]
+    for step in request.responses:
+        challenge, response = step.challenge, step.response
+        parts += [_step.pack(len(challenge), len(response)), challenge,
+                  response]
+    return _frame(parts)
+
+
+def encode_response(response: Response) -> bytes:
+    """Return the frame of a response, including its length prefix.
+
+    Args:
+        response: The response to encode.
+
+    Raises:
+        struct.error: A field was too long to encode.
+
+    """
+    token = response.token
+    parts = [_response_head.pack(response.id, response.status,
+                                 token is not None),
+             _pack_string(response.authcid), _pack_string(response.authzid),
+             _pack_string(token or '')]
+    return _frame(parts)
+
+
+class _Reader:
+
+    __slots__: Sequence[str] = ['data', 'pos']
+
+    def __init__(self, data: bytes) -> None:
+        super().__init__()
+        self.data = memoryview(data)
+        self.pos = 0
+
+    def unpack(self, fmt: struct.Struct) -> Tuple[Any, ...]:
+        values = fmt.unpack_from(self.data, self.pos)
+        self.pos += fmt.size
+        return values
+
+    def read(self, size: int) -> bytes:
+        end = self.pos + size
+        if end > len(self.data):
+            raise ValueError('Truncated frame')
+        value = self.data[self.pos:end].tobytes()
+        self.pos = end
+        return value
+
+    def string(self) -> str:
+        size, = self.unpack(_string)
+        return self.read(size).decode('utf-8')
+
+    def finish(self) -> None:
+        if self.pos != len(self.data):
+            raise ValueError('Unexpected data in frame')
+
+
+def decode_request(body: bytes) -> Request:
+    """Decode the body of a request frame, without its length prefix.
+
+    Args:
+        body: The frame body.
+
+    Raises:
+        ValueError: The frame was invalid.
+
+    """
+    reader = _Reader(body)
+    try:
+        request_id, mech_len = reader.unpack(_request_head)
+        mechanism = reader.read(mech_len)
+        count, = reader.unpack(_count)
+        responses: List[ChallengeResponse] = []
+        for _ in range(count):
+            chal_len, resp_len = reader.unpack(_step)
+            challenge = reader.read(chal_len)
+            responses.append(ChallengeResponse(challenge,
+                                               reader.read(resp_len)))
+    except struct.error as exc:
+        raise ValueError('Truncated frame') from exc
+    reader.finish()
+    return Request(request_id, mechanism, responses)
+
+
+def decode_response(body: bytes) -> Response:
+    """Decode the body of a response frame, without its length prefix.
+
+    Args:
+        body: The frame body.
+
+    Raises:
+        ValueError: The frame was invalid.
+
+    """
+    reader = _Reader(body)
+    try:
+        response_id, status, has_token = reader.unpack(_response_head)
+        authcid = reader.string()
+        authzid = reader.string()
+        token = reader.string()
+    except struct.error as exc:
+        raise ValueError('Truncated frame') from exc
+    reader.finish()
+    return Response(response_id, Status(status), authcid, authzid,
+                    token if has_token else None)
+
+
+async def read_frame(reader: asyncio.StreamReader,
+                     max_frame: int = MAX_FRAME) -> bytes:
+    """Read the body of the next frame.
+
+    Args:
+        reader: The connection stream reader.
+        max_frame: The maximum length of the frame body.
+
+    Raises:
+        ValueError: The frame was too long.
+        asyncio.IncompleteReadError: The connection was closed.
+
+    """
+    length, = _length.unpack(await reader.readexactly(_length.size))
+    if length > max_frame:
+        raise ValueError('Frame too long')
+    return await reader.readexactly(length)
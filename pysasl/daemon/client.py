@@ -0,0 +1,193 @@
+import asyncio
+import itertools
+from typing import Optional, Sequence, Tuple, Dict
+from typing_extensions import Final
+
+from . import MAX_FRAME, Request, Response, encode_request, \
+    decode_response, read_frame
+from ..creds.server import ServerCredentials
+from ..identity import Identity
+from ..mechanism import ServerMechanism, ChallengeResponse, MechanismCost
+
+__all__ = ['RemoteCredentials', 'RemoteMechanism', 'AuthClient']
+
+
+class RemoteCredentials(ServerCredentials):
+    """Credentials produced by a :class:`RemoteMechanism`, which keep the
+    exchanges of the attempt so that they may be verified remotely with
+    :meth:`AuthClient.verify`.
+
+    Args:
+        creds: The credentials produced by the wrapped mechanism.
+        mechanism: The SASL mechanism name.
+        responses: The challenge-response exchanges of the attempt.
+
+    """
+
+    __slots__: Sequence[str] = ['creds', 'mechanism', 'responses']
+
+    def __init__(self, creds: ServerCredentials, mechanism: bytes,
+                 responses: Sequence[ChallengeResponse]) -> None:
+        super().__init__()
+        self.creds: Final = creds
+        self.mechanism: Final = mechanism
+        self.responses: Final = responses
+
+    @property
+    def authcid(self) -> str:
+        return self.creds.authcid
+
+    @property
+    def authzid(self) -> str:
+        return self.creds.authzid
+
+    def verify(self, identity: Optional[Identity]) -> bool:
+        return self.creds.verify(identity)
+
+    def __repr__(self) -> str:
+        return f'RemoteCredentials({self.creds!r})'
+
+
+class RemoteMechanism(ServerMechanism):
+    """Wraps a server mechanism so that its credentials are
+    :class:`RemoteCredentials`.
+
+    Args:
+        mechanism: The server mechanism to wrap.
+
+    """
+
+    __slots__: Sequence[str] = ['mechanism']
+
+    def __init__(self, mechanism: ServerMechanism) -> None:
+        super().__init__(mechanism.name)
+        self.mechanism: Final = mechanism
+
+    @property
+    def cost(self) -> MechanismCost:  # type: ignore[override]
+        """The expected cost of authenticating with the wrapped mechanism."""
+        return self.mechanism.cost
+
+    def warmup(self) -> None:
+        self.mechanism.warmup()
+
+    def server_attempt(self, responses: Sequence[ChallengeResponse]) \
+            -> Tuple[RemoteCredentials, Optional[bytes]]:
+        creds, final = self.mechanism.server_attempt(responses)
+        return RemoteCredentials(creds, self.name, list(responses)), final
+
+    def __repr__(self) -> str:
+        return f'RemoteMechanism({self.mechanism!r})'
+
+
+class AuthClient:
+    """Sends verification requests to an
+    :class:`~pysasl.daemon.server.AuthServer` over one connection. Requests
+    from concurrent tasks are pipelined on the connection.
+
+    Args:
+        reader: The connection stream reader.
+        writer: The connection stream writer.
+        max_frame: The maximum length of a response frame.
+
+    """
+
+    __slots__: Sequence[str] = ['reader', 'writer', 'max_frame', '_ids',
+                                '_pending', '_task']
+
+    def __init__(self, reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter, *,
+                 max_frame: int = MAX_FRAME) -> None:
+        super().__init__()
+        self.reader: Final = reader
+        self.writer: Final = writer
+        self.max_frame: Final = max_frame
+        self._ids = itertools.count()
+        self._pending: Dict[int, 'asyncio.Future[Response]'] = {}
+        self._task: Optional['asyncio.Future[None]'] = None
+
+    @classmethod
+    async def connect(cls, path: str, *,
+                      max_frame: int = MAX_FRAME) -> 'AuthClient':
+        """Connect to an authentication server on a Unix domain socket.
+
+        Args:
+            path: The socket path.
+            max_frame: The maximum length of a response frame.
+
+        """
+        reader, writer = await asyncio.open_unix_connection(path)
+        return cls(reader, writer, max_frame=max_frame)
+
+    async def _read_responses(self) -> None:
+        pending = self._pending
+        exc: BaseException = ConnectionError('Connection closed')
+        try:
+            while True:
+                response = decode_response(
+                    await read_frame(self.reader, self.max_frame))
+                future = pending.pop(response.id, None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        except asyncio.IncompleteReadError:
+            pass
+        except (ValueError, OSError) as read_exc:
+            exc = read_exc
+        finally:
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(exc)
+            pending.clear()
+
+    async def request(self, mechanism: bytes,
+                      responses: Sequence[ChallengeResponse]) -> Response:
+        """Send a verification request and wait for its response.
+
+        Args:
+            mechanism: The SASL mechanism name.
+            responses: The challenge-response exchanges of the attempt.
+
+        Raises:
+            ConnectionError: The connection was closed.
+            ValueError: The server sent an invalid response frame.
+
+        """
+        task = self._task
+        if task is None:
+            task = self._task = asyncio.ensure_future(self._read_responses())
+        if task.done():
+            raise ConnectionError('Connection closed')
+        request_id = next(self._ids) & 0xffffffff
+        future: 'asyncio.Future[Response]' = \
+            asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            self.writer.write(encode_request(
+                Request(request_id, mechanism, responses)))
+            await self.writer.drain()
+            return await future
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def verify(self, creds: RemoteCredentials) -> Response:
+        """Verify credentials produced by a :class:`RemoteMechanism`.
+
+        Args:
+            creds: The credentials to verify.
+
+        Raises:
+            ConnectionError: The connection was closed.
+            ValueError: The server sent an invalid response frame.
+
+        """
+        return await self.request(creds.mechanism, creds.responses)
+
+    async def close(self) -> None:
+        """Close the connection."""
+        self.writer.close()
+        task = self._task
+        if task is not None:
+            await task
+
+    def __repr__(self) -> str:
+        return 'AuthClient(...)'
@@ -0,0 +1,152 @@
+import asyncio
+import logging
+from concurrent.futures import Executor
+from contextvars import copy_context
+from typing import Callable, Optional, Sequence, Set
+from typing_extensions import Final, TypeAlias
+
+from . import MAX_FRAME, Status, Request, Response, decode_request, \
+    encode_response, read_frame
+from .. import SASLAuth
+from ..creds.external import ExternalVerificationRequired
+from ..exception import InvalidResponse, MechanismUnusable
+from ..identity import Identity
+from ..mechanism import ServerChallenge
+from ..token import TokenValidator
+
+__all__ = ['Lookup', 'AuthServer']
+
+_log = logging.getLogger(__name__)
+
+#: Returns the identity for an authentication identity, if it exists.
+Lookup: TypeAlias = Callable[[str], Optional[Identity]]
+
+
+class AuthServer:
+    """Verifies credentials for frontend servers connected over a Unix domain
+    socket, using one set of identities and one hashing executor for every
+    frontend.
+
+    Each connection may pipeline many requests, which are verified
+    concurrently and answered as they complete.
+
+    Args:
+        auth: The mechanisms used to rebuild the credentials.
+        lookup: Returns the identity of the credentials.
+        validator: Validates the bearer tokens of credentials that require
+            external verification. Without it, such credentials are answered
+            with :attr:`~pysasl.daemon.Status.EXTERNAL`.
+        executor: Runs the identity lookup and verification.
+        max_frame: The maximum length of a request frame.
+        max_pending: The maximum requests verified at once per connection.
+
+    """
+
+    __slots__: Sequence[str] = ['auth', 'lookup', 'validator', 'executor',
+                                'max_frame', 'max_pending']
+
+    def __init__(self, auth: SASLAuth, lookup: Lookup, *,
+                 validator: Optional[TokenValidator] = None,
+                 executor: Optional[Executor] = None,
+                 max_frame: int = MAX_FRAME, max_pending: int = 64) -> None:
+        super().__init__()
+        self.auth: Final = auth
+        self.lookup: Final = lookup
+        self.validator: Final = validator
+        self.executor: Final = executor
+        self.max_frame: Final = max_frame
+        self.max_pending: Final = max_pending
+
+    def verify(self, request: Request) -> Response:
+        """Rebuild and verify the credentials of a request.
+
+        Args:
+            request: The verification request.
+
+        """
+        request_id = request.id
+        mechanism = self.auth.get_server(request.mechanism)
+        if mechanism is None:
+            return Response(request_id, Status.UNSUPPORTED)
+        try:
+            creds, _ = mechanism.server_attempt(request.responses)
+        except (ServerChallenge, InvalidResponse):
+            return Response(request_id, Status.INVALID)
+        authcid, authzid = creds.authcid, creds.authzid
+        try:
+            identity = self.lookup(authcid or authzid)
+            verified = creds.verify(identity)
+        except MechanismUnusable:
+            return Response(request_id, Status.UNSUPPORTED, authcid, authzid)
+        except ExternalVerificationRequired as exc:
+            validator = self.validator
+            if exc.token is None or validator is None:
+                return Response(request_id, Status.EXTERNAL, authcid,
+                                authzid, exc.token)
+            verified = validator.validate(exc.token, authzid)
+        status = Status.SUCCESS if verified else Status.FAILURE
+        return Response(request_id, status, authcid, authzid)
+
+    def _verify_safe(self, request: Request) -> Response:
+        try:
+            return self.verify(request)
+        except Exception:
+            _log.exception('Verification failed: %r', request.mechanism)
+            return Response(request.id, Status.ERROR)
+
+    async def _respond(self, request: Request, writer: asyncio.StreamWriter,
+                       pending: asyncio.Semaphore) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+            try:
+                context = copy_context()
+                response = await loop.run_in_executor(
+                    self.executor, context.run, self._verify_safe, request)
+                frame = encode_response(response)
+            except Exception:
+                _log.exception('Response failed: %r', request.mechanism)
+                frame = encode_response(Response(request.id, Status.ERROR))
+            writer.write(frame)
+            await writer.drain()
+        finally:
+            pending.release()
+
+    async def handle(self, reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter) -> None:
+        """Answer the requests of one connection until it is closed.
+
+        Args:
+            reader: The connection stream reader.
+            writer: The connection stream writer.
+
+        """
+        pending = asyncio.Semaphore(self.max_pending)
+        tasks: Set['asyncio.Future[None]'] = set()
+        try:
+            while True:
+                body = await read_frame(reader, self.max_frame)
+                request = decode_request(body)
+                await pending.acquire()
+                task = asyncio.ensure_future(
+                    self._respond(request, writer, pending))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except asyncio.IncompleteReadError:
+            pass
+        except ValueError as exc:
+            _log.warning('Invalid request: %s', exc)
+        finally:
+            await asyncio.gather(*tasks, return_exceptions=True)
+            writer.close()
+
+    async def start(self, path: str) -> asyncio.AbstractServer:
+        """Start listening for connections on a Unix domain socket.
+
+        Args:
+            path: The socket path.
+
+        """
+        return await asyncio.start_unix_server(self.handle, path)
+
+    def __repr__(self) -> str:
+        return f'AuthServer({self.auth!r})'
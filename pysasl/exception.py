@@ -2,7 +2,7 @@
 from typing import Sequence
 
 __all__ = ['AuthenticationError', 'UnexpectedChallenge', 'InvalidResponse',
-           'MechanismUnusable']
+           'AuthenticationCancelled', 'MechanismUnusable']
 
 
 class AuthenticationError(Exception):
@@ -38,6 +38,18 @@ class InvalidResponse(AuthenticationError):
         super().__init__('Invalid auth response')
 
 
+class AuthenticationCancelled(AuthenticationError):
+    """During server-side authentication, the client cancelled the
+    authentication attempt rather than responding to a challenge.
+
+    """
+
+    __slots__: Sequence[str] = []
+
+    def __init__(self) -> None:
+        super().__init__('Auth cancelled')
+
+
 class MechanismUnusable(AuthenticationError):
     """The mechanism cannot be used to authenticate the given identity. Usually
     this is due to an unsupported hashing algorithm used in the server-side
@@ -8,9 +8,11 @@ import hashlib
 import secrets
 from abc import abstractmethod
 from base64 import b64encode, b64decode
-from typing import TypeVar, Any, Optional, Sequence, Dict
+from typing import TypeVar, Any, Optional, Sequence, Tuple, Dict
 from typing_extensions import Literal, Protocol, Final, TypeAlias
 
+from .instrument import HASH, observed
+
 __all__ = ['HashT', 'HashInterface', 'BuiltinHash', 'Cleartext']
 
 _Pbkdf2Hashes: TypeAlias = Literal['sha1', 'sha256', 'sha512']
@@ -58,6 +60,19 @@ class HashInterface(Protocol):
         """
         ...
 
+    def needs_update(self, hash: str) -> bool:
+        """Check if the given *hash* was produced with different settings than
+        this hash implementation would use, and should be replaced by hashing
+        the secret again. By default, this returns ``False``. Hashes that
+        implement this protocol without subclassing it, and do not define
+        this method, never have their digests replaced.
+
+        Args:
+            hash: The hashed digest string.
+
+        """
+        return False
+
 
 class BuiltinHash(HashInterface):
     """Implements :class:`HashInterface` using the :func:`hashlib.pbkdf2_hmac`
@@ -158,18 +173,38 @@ class BuiltinHash(HashInterface):
         b64_digest = b64encode(digest).decode('ascii')
         return f'${self._pbkdf2_hash}${rounds}${b64_salt}${b64_digest}'
 
-    def verify(self, secret: str, hash: str) -> bool:
+    @classmethod
+    def _parse(cls, hash: str) -> Tuple[str, int, bytes, bytes]:
         prefix, pbkdf2_hash, rounds_str, b64_salt, b64_digest = \
             hash.split('$', 4)
         if prefix != '':
             raise ValueError('Invalid hash prefix')
-        hash_name = self._from_pbkdf2_hash(pbkdf2_hash)
-        rounds = int(rounds_str)
-        salt = b64decode(b64_salt)
-        digest = b64decode(b64_digest)
+        hash_name = cls._from_pbkdf2_hash(pbkdf2_hash)
+        return hash_name, int(rounds_str), b64decode(b64_salt), \
+            b64decode(b64_digest)
+
+    @observed(HASH, 'pbkdf2')
+    def verify(self, secret: str, hash: str) -> bool:
+        hash_name, rounds, salt, digest = self._parse(hash)
         secret_digest = self._hash(hash_name, rounds, secret, salt)
         return secrets.compare_digest(digest, secret_digest)
 
+    def needs_update(self, hash: str) -> bool:
+        """Check if the *hash* uses a different hash name, rounds or salt
+        length than this object. A *hash* that is not in the expected format,
+        such as one from another hash implementation, always needs updating.
+
+        Args:
+            hash: The hashed digest string.
+
+        """
+        try:
+            hash_name, rounds, salt, _ = self._parse(hash)
+        except ValueError:
+            return True
+        return hash_name != self.hash_name or rounds != self.rounds \
+            or len(salt) != self.salt_len
+
     def __repr__(self) -> str:
         return 'BuiltinHash(hash_name=%r, salt_len=%r, rounds=%r)' % \
             (self.hash_name, self.salt_len, self.rounds)
@@ -186,6 +221,7 @@ class Cleartext(HashInterface):
     def hash(self, secret: str) -> str:
         return secret
 
+    @observed(HASH, 'cleartext')
     def verify(self, secret: str, hash: str) -> bool:
         return secrets.compare_digest(secret, hash)
 
@@ -1,12 +1,16 @@
 
 import secrets
 from abc import abstractmethod
-from typing import Optional, Sequence
+from typing import TYPE_CHECKING, Optional, Sequence
 from typing_extensions import Protocol, Self
 
 from .hashing import HashInterface, Cleartext
 from .prep import saslprep, Preparation
 
+if TYPE_CHECKING:  # pragma: no cover
+    from .cache import VerifiedCache
+    from .rehash import RehashQueue
+
 __all__ = ['Identity', 'ClearIdentity', 'HashedIdentity']
 
 
@@ -102,19 +106,29 @@ class HashedIdentity(Identity):
         digest: The hashed secret string, using :attr:`.hash`.
         hash: The hash algorithm to use to verify the secret.
         prepare: The string preparation function.
+        rehash: Receives the secret after each successful
+            :meth:`.compare_secret`, to replace the digest in the background
+            if it uses outdated hash settings.
+        cache: Consulted before hashing in :meth:`.compare_secret`, and
+            given each secret that verified.
 
     """
 
-    __slots__ = ['_authcid', '_digest', '_hash', '_prepare']
+    __slots__ = ['_authcid', '_digest', '_hash', '_prepare', '_rehash',
+                 '_cache']
 
     def __init__(self, authcid: str, digest: str, *,
                  hash: HashInterface,
-                 prepare: Preparation = saslprep) -> None:
+                 prepare: Preparation = saslprep,
+                 rehash: Optional['RehashQueue'] = None,
+                 cache: Optional['VerifiedCache'] = None) -> None:
         super().__init__()
         self._authcid = authcid
         self._digest = digest
         self._hash = hash
         self._prepare = prepare
+        self._rehash = rehash
+        self._cache = cache
 
     @property
     def authcid(self) -> str:
@@ -157,7 +171,20 @@ class HashedIdentity(Identity):
         return self._compare(self.authcid, authcid)
 
     def compare_secret(self, secret: str) -> bool:
-        return self._hash.verify(self._prepare(secret), self._digest)
+        prepared = self._prepare(secret)
+        cache = self._cache
+        if cache is None:
+            verified = self._hash.verify(prepared, self._digest)
+        elif cache.contains(self._authcid, self._digest, prepared):
+            verified = True
+        else:
+            verified = self._hash.verify(prepared, self._digest)
+            if verified:
+                cache.add(self._authcid, self._digest, prepared)
+        rehash = self._rehash
+        if verified and rehash is not None:
+            rehash.submit(self, secret)
+        return verified
 
     def get_clear_secret(self) -> Optional[str]:
         """Return the cleartext secret string, only if :attr:`.hash` is
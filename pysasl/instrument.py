@@ -0,0 +1,486 @@
+"""Provides hooks to observe the latency and outcome of each stage of an
+authentication attempt, and a :class:`Metrics` observer that aggregates them
+into histograms and counters exported in the `Prometheus text format
+<https://prometheus.io/docs/instrumenting/exposition_formats/>`_.
+
+Observation is disabled until :func:`set_observer` is called. While disabled,
+each instrumented call costs one extra function call and a global lookup.
+
+The :class:`Metrics` observer and :class:`ShardedCounter` record into a shard
+owned by the calling thread, so that threads authenticating at once do not
+wait on a shared lock, including on free-threaded builds of Python.
+
+"""
+
+import threading
+import time
+from abc import abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import (Any, Callable, TypeVar, Generic, Hashable, Union,
+                    Optional, Iterator, Sequence, Tuple, List, Dict)
+from typing_extensions import Final, Protocol, TypeAlias
+
+__all__ = ['MECHANISM', 'PREP', 'IDENTITY', 'HASH', 'TOKEN', 'VERIFY',
+           'Label', 'Observer', 'MultiObserver', 'get_observer',
+           'set_observer', 'observe', 'observed', 'observe_attempt',
+           'observe_verify', 'ShardedCounter', 'Metrics']
+
+_F = TypeVar('_F', bound=Callable[..., Any])
+_T = TypeVar('_T')
+_KT = TypeVar('_KT', bound=Hashable)
+
+#: A stage label, or a callable that receives the arguments of the
+#: instrumented call and returns the label.
+Label: TypeAlias = Union[str, Callable[..., str]]
+
+#: The stage of a mechanism parsing client responses.
+MECHANISM: Final = 'mechanism'
+
+#: The stage of preparing a string for comparison.
+PREP: Final = 'prep'
+
+#: The stage of looking up an identity, reported by the application.
+IDENTITY: Final = 'identity'
+
+#: The stage of verifying a secret against a hashed digest.
+HASH: Final = 'hash'
+
+#: The stage of validating a bearer token.
+TOKEN: Final = 'token'  # noqa: S105
+
+#: The stage of verifying credentials against an identity, which encloses the
+#: :data:`PREP` and :data:`HASH` stages.
+VERIFY: Final = 'verify'
+
+_observer: Optional['Observer'] = None
+_mechanism: ContextVar[str] = ContextVar('_mechanism', default='unknown')
+
+
+class Observer(Protocol):
+    """Receives the beginning and end of each observed stage."""
+
+    __slots__: Sequence[str] = []
+
+    @abstractmethod
+    def begin(self, stage: str, label: str) -> Any:
+        """Called when a stage begins.
+
+        Args:
+            stage: The stage name, e.g. :data:`HASH`.
+            label: Identifies what is running the stage, e.g. a mechanism
+                name.
+
+        Returns:
+            A value passed back to :meth:`.end`.
+
+        """
+        ...
+
+    @abstractmethod
+    def end(self, stage: str, label: str, begin: Any, outcome: str) -> None:
+        """Called when a stage ends.
+
+        Args:
+            stage: The stage name, e.g. :data:`HASH`.
+            label: Identifies what ran the stage, e.g. a mechanism name.
+            begin: The value returned by :meth:`.begin`.
+            outcome: The outcome of the stage, e.g. ``success``.
+
+        """
+        ...
+
+
+class MultiObserver(Observer):
+    """An :class:`Observer` that passes each stage to several observers.
+    Stages end in the reverse of the order they begin.
+
+    Args:
+        observers: The observers to pass each stage to.
+
+    """
+
+    __slots__: Sequence[str] = ['observers']
+
+    def __init__(self, *observers: Observer) -> None:
+        super().__init__()
+        self.observers: Final = observers
+
+    def begin(self, stage: str, label: str) -> List[Any]:
+        return [observer.begin(stage, label) for observer in self.observers]
+
+    def end(self, stage: str, label: str, begin: List[Any],
+            outcome: str) -> None:
+        for observer, observer_begin in zip(reversed(self.observers),
+                                            reversed(begin)):
+            observer.end(stage, label, observer_begin, outcome)
+
+
+def get_observer() -> Optional[Observer]:
+    """Return the current observer, or ``None`` if observation is
+    disabled.
+
+    """
+    return _observer
+
+
+def set_observer(observer: Optional[Observer]) -> Optional[Observer]:
+    """Set the observer of all stages, or disable observation with ``None``.
+
+    Args:
+        observer: The new observer.
+
+    Returns:
+        The previous observer.
+
+    """
+    global _observer
+    previous, _observer = _observer, observer
+    return previous
+
+
+@contextmanager
+def observe(stage: str, label: str) -> Iterator[None]:
+    """Observe a stage run by the application, such as an :data:`IDENTITY`
+    lookup. The outcome is ``complete``, or ``error`` if an exception is
+    raised.
+
+    Args:
+        stage: The stage name.
+        label: Identifies what is running the stage.
+
+    """
+    observer = _observer
+    if observer is None:
+        yield
+        return
+    begin = observer.begin(stage, label)
+    try:
+        yield
+    except BaseException:
+        observer.end(stage, label, begin, 'error')
+        raise
+    observer.end(stage, label, begin, 'complete')
+
+
+def observed(stage: str, label: Label) -> Callable[[_F], _F]:
+    """Decorates a function to observe each call as *stage*. The outcome is
+    ``complete``, or ``error`` if an exception is raised.
+
+    Args:
+        stage: The stage name.
+        label: The label of the stage.
+
+    """
+    def deco(func: _F) -> _F:
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            observer = _observer
+            if observer is None:
+                return func(*args, **kwargs)
+            label_str = label if isinstance(label, str) \
+                else label(*args, **kwargs)
+            begin = observer.begin(stage, label_str)
+            try:
+                ret = func(*args, **kwargs)
+            except BaseException:
+                observer.end(stage, label_str, begin, 'error')
+                raise
+            observer.end(stage, label_str, begin, 'complete')
+            return ret
+        return wrapper  # type: ignore
+    return deco
+
+
+def observe_attempt(func: _F) -> _F:
+    """Decorates a :meth:`~pysasl.mechanism.ServerMechanism.server_attempt`
+    method to observe each call as the :data:`MECHANISM` stage, labeled by the
+    mechanism name. The outcome is ``challenge``, ``invalid``, ``complete``
+    or ``error``.
+
+    When the outcome is ``complete``, the mechanism name is remembered in the
+    current :mod:`contextvars` context to label the :data:`VERIFY` stage of
+    the resulting credentials.
+
+    """
+    from .exception import InvalidResponse
+    from .mechanism import ServerChallenge
+
+    @wraps(func)
+    def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+        observer = _observer
+        if observer is None:
+            return func(self, *args, **kwargs)
+        label = self.name.decode('ascii')
+        begin = observer.begin(MECHANISM, label)
+        try:
+            ret = func(self, *args, **kwargs)
+        except ServerChallenge:
+            observer.end(MECHANISM, label, begin, 'challenge')
+            raise
+        except InvalidResponse:
+            observer.end(MECHANISM, label, begin, 'invalid')
+            raise
+        except BaseException:
+            observer.end(MECHANISM, label, begin, 'error')
+            raise
+        observer.end(MECHANISM, label, begin, 'complete')
+        _mechanism.set(label)
+        return ret
+    return wrapper  # type: ignore
+
+
+def observe_verify(func: _F) -> _F:
+    """Decorates a :meth:`~pysasl.creds.server.ServerCredentials.verify`
+    method to observe each call as the :data:`VERIFY` stage, labeled by the
+    mechanism that produced the credentials. The outcome is ``success``,
+    ``failure``, ``external`` or ``error``.
+
+    """
+    @wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        observer = _observer
+        if observer is None:
+            return func(*args, **kwargs)
+        label = _mechanism.get()
+        begin = observer.begin(VERIFY, label)
+        try:
+            ret = func(*args, **kwargs)
+        except BaseException as exc:
+            from .creds.external import ExternalVerificationRequired
+            if isinstance(exc, ExternalVerificationRequired):
+                observer.end(VERIFY, label, begin, 'external')
+            else:
+                observer.end(VERIFY, label, begin, 'error')
+            raise
+        observer.end(VERIFY, label, begin, 'success' if ret else 'failure')
+        return ret
+    return wrapper  # type: ignore
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', r'\\').replace('"', r'\"') \
+        .replace('\n', r'\n')
+
+
+class _PerThread(Generic[_T]):
+
+    __slots__: Sequence[str] = ['_factory', '_local', '_lock', '_shards']
+
+    def __init__(self, factory: Callable[[], _T]) -> None:
+        super().__init__()
+        self._factory = factory
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards: List[_T] = []
+
+    def get(self) -> _T:
+        try:
+            shard: _T = self._local.shard
+        except AttributeError:
+            shard = self._local.shard = self._factory()
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def all(self) -> List[_T]:
+        with self._lock:
+            return list(self._shards)
+
+
+class _CounterShard(Generic[_KT]):
+
+    __slots__: Sequence[str] = ['lock', 'counts']
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.lock = threading.Lock()
+        self.counts: Dict[_KT, int] = {}
+
+
+class ShardedCounter(Generic[_KT]):
+    """Counts by key from many threads at once. Each thread adds to its own
+    shard, only reading the counts sums the shards.
+
+    A shard is kept for each thread that has added to the counter, so this
+    is intended for long-lived threads, such as those of a thread pool.
+
+    """
+
+    __slots__: Sequence[str] = ['_shards']
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._shards: _PerThread[_CounterShard[_KT]] = \
+            _PerThread(_CounterShard)
+
+    def add(self, key: _KT, value: int = 1) -> None:
+        """Add to the count of *key*.
+
+        Args:
+            key: The counted key.
+            value: The amount to add, which may be negative.
+
+        """
+        shard = self._shards.get()
+        with shard.lock:
+            counts = shard.counts
+            counts[key] = counts.get(key, 0) + value
+
+    def get(self, key: _KT) -> int:
+        """Return the count of *key*.
+
+        Args:
+            key: The counted key.
+
+        """
+        total = 0
+        for shard in self._shards.all():
+            with shard.lock:
+                total += shard.counts.get(key, 0)
+        return total
+
+    def totals(self) -> Dict[_KT, int]:
+        """Return the count of every key."""
+        totals: Dict[_KT, int] = {}
+        for shard in self._shards.all():
+            with shard.lock:
+                for key, count in shard.counts.items():
+                    totals[key] = totals.get(key, 0) + count
+        return totals
+
+    def clear(self) -> None:
+        """Reset every count to zero."""
+        for shard in self._shards.all():
+            with shard.lock:
+                shard.counts.clear()
+
+
+class _Histogram:
+
+    __slots__: Sequence[str] = ['counts', 'total']
+
+    def __init__(self, num_buckets: int) -> None:
+        super().__init__()
+        self.counts = [0] * (num_buckets + 1)
+        self.total = 0.0
+
+
+class _HistogramShard:
+
+    __slots__: Sequence[str] = ['lock', 'histograms']
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.lock = threading.Lock()
+        self.histograms: Dict[Tuple[str, str], _Histogram] = {}
+
+
+class Metrics(Observer):
+    """An :class:`Observer` that records a latency histogram for each stage
+    and label, and counts the outcomes of each.
+
+    Args:
+        namespace: The prefix of the exported metric names.
+        buckets: The upper bounds of the histogram buckets, in seconds.
+        clock: Returns the current time, in seconds.
+
+    """
+
+    __slots__: Sequence[str] = ['namespace', 'buckets', 'clock',
+                                '_histograms', '_outcomes']
+
+    #: The default histogram bucket upper bounds, in seconds.
+    default_buckets: Final = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                              0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+                              5.0)
+
+    def __init__(self, *, namespace: str = 'pysasl',
+                 buckets: Sequence[float] = default_buckets,
+                 clock: Callable[[], float] = time.perf_counter) -> None:
+        super().__init__()
+        self.namespace: Final = namespace
+        self.buckets: Final = sorted(buckets)
+        self.clock: Final = clock
+        self._histograms = _PerThread(_HistogramShard)
+        self._outcomes: ShardedCounter[Tuple[str, str, str]] = \
+            ShardedCounter()
+
+    def begin(self, stage: str, label: str) -> float:
+        return self.clock()
+
+    def end(self, stage: str, label: str, begin: float, outcome: str) -> None:
+        elapsed = self.clock() - begin
+        idx = bisect_left(self.buckets, elapsed)
+        shard = self._histograms.get()
+        with shard.lock:
+            key = (stage, label)
+            histogram = shard.histograms.get(key)
+            if histogram is None:
+                histogram = shard.histograms[key] = \
+                    _Histogram(len(self.buckets))
+            histogram.counts[idx] += 1
+            histogram.total += elapsed
+        self._outcomes.add((stage, label, outcome))
+
+    def get_count(self, stage: str, label: str, outcome: str) -> int:
+        """Return the number of times the stage ended with *outcome*.
+
+        Args:
+            stage: The stage name.
+            label: The stage label.
+            outcome: The stage outcome.
+
+        """
+        return self._outcomes.get((stage, label, outcome))
+
+    def reset(self) -> None:
+        """Discard all recorded metrics."""
+        for shard in self._histograms.all():
+            with shard.lock:
+                shard.histograms.clear()
+        self._outcomes.clear()
+
+    def _merge_histograms(self) -> Dict[Tuple[str, str], _Histogram]:
+        merged: Dict[Tuple[str, str], _Histogram] = {}
+        for shard in self._histograms.all():
+            with shard.lock:
+                for key, histogram in shard.histograms.items():
+                    total = merged.get(key)
+                    if total is None:
+                        total = merged[key] = _Histogram(len(self.buckets))
+                    total.counts = [a + b for a, b in
+                                    zip(total.counts, histogram.counts)]
+                    total.total += histogram.total
+        return merged
+
+    def export(self) -> str:
+        """Return the recorded metrics in the Prometheus text format."""
+        histograms = [(key, hist.counts, hist.total) for key, hist
+                      in sorted(self._merge_histograms().items())]
+        outcomes = sorted(self._outcomes.totals().items())
+        duration = f'{self.namespace}_stage_duration_seconds'
+        total = f'{self.namespace}_stage_outcomes_total'
+        lines: List[str] = [
+            f'# HELP {duration} Time spent in each authentication stage.',
+            f'# TYPE {duration} histogram']
+        bounds = [repr(float(bound)) for bound in self.buckets] + ['+Inf']
+        for (stage, label), counts, hist_total in histograms:
+            labels = f'stage="{_escape(stage)}",label="{_escape(label)}"'
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                lines.append(f'{duration}_bucket{{{labels},le="{bound}"}} '
+                             f'{cumulative}')
+            lines.append(f'{duration}_sum{{{labels}}} {hist_total!r}')
+            lines.append(f'{duration}_count{{{labels}}} {cumulative}')
+        lines += [
+            f'# HELP {total} Outcomes of each authentication stage.',
+            f'# TYPE {total} counter']
+        for (stage, label, outcome), count in outcomes:
+            lines.append(f'{total}{{stage="{_escape(stage)}",'
+                         f'label="{_escape(label)}",'
+                         f'outcome="{_escape(outcome)}"}} {count}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,112 @@
+"""Verifies hashed secrets in parallel using subinterpreters, each with its
+own GIL, so that the Python-level parts of verification, such as
+:func:`~pysasl.prep.saslprep` and parsing digests, use every core without the
+memory and IPC costs of worker processes.
+
+Subinterpreters are used through
+:class:`concurrent.futures.InterpreterPoolExecutor`, the supported interface
+to per-interpreter GIL subinterpreters. On interpreters without it,
+:func:`new_executor` logs a warning, once, and falls back to threads, where
+only :func:`hashlib.pbkdf2_hmac` runs in parallel because it releases the
+GIL.
+
+"""
+
+import logging
+import sys
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Iterable, Optional, Sequence, Tuple, List
+from typing_extensions import Final
+
+from .hashing import HashInterface
+from .prep import Preparation, saslprep
+
+if sys.version_info >= (3, 14):  # pragma: no cover
+    from concurrent.futures import InterpreterPoolExecutor
+
+__all__ = ['SUBINTERPRETERS', 'new_executor', 'ParallelVerifier']
+
+#: True if the running interpreter can run verification in subinterpreters.
+SUBINTERPRETERS: Final[bool] = sys.version_info >= (3, 14)
+
+_log = logging.getLogger(__name__)
+_warned = False
+
+
+def new_executor(max_workers: Optional[int] = None, *,
+                 subinterpreters: bool = True) -> Executor:
+    """Return a new executor that runs tasks in subinterpreters, if
+    available, and otherwise in threads. A warning is logged the first time
+    subinterpreters were wanted but are not available.
+
+    Args:
+        max_workers: The maximum number of workers.
+        subinterpreters: False to always use threads.
+
+    """
+    if subinterpreters:
+        if sys.version_info >= (3, 14):  # pragma: no cover
+            return InterpreterPoolExecutor(max_workers)
+        global _warned
+        if not _warned:
+            _warned = True
+            _log.warning('Subinterpreters are not available, using threads')
+    return ThreadPoolExecutor(max_workers)
+
+
+def _verify_chunk(hash: HashInterface, prepare: Preparation,
+                  pairs: Sequence[Tuple[str, str]]) -> List[bool]:
+    verify = hash.verify
+    return [verify(prepare(secret), digest) for secret, digest in pairs]
+
+
+class ParallelVerifier:
+    """Prepares and verifies many secrets against their digests, across the
+    workers of an executor.
+
+    Args:
+        hash: The hash implementation, which must be picklable to use
+            subinterpreters or processes.
+        executor: Runs the verification, by default a new executor from
+            :func:`new_executor`.
+        chunksize: The number of verifications per task.
+        prepare: The string preparation function.
+
+    """
+
+    __slots__: Sequence[str] = ['hash', 'executor', 'chunksize', 'prepare',
+                                '_owned']
+
+    def __init__(self, hash: HashInterface, *,
+                 executor: Optional[Executor] = None, chunksize: int = 16,
+                 prepare: Preparation = saslprep) -> None:
+        super().__init__()
+        self.hash: Final = hash
+        self.executor: Final = executor or new_executor()
+        self.chunksize: Final = chunksize
+        self.prepare: Final = prepare
+        self._owned = executor is None
+
+    def verify(self, pairs: Iterable[Tuple[str, str]]) -> List[bool]:
+        """Prepare each cleartext secret and verify it against its digest.
+
+        Args:
+            pairs: The cleartext secret and hashed digest of each
+                verification.
+
+        Returns:
+            The result of each verification, in order.
+
+        """
+        pairs = list(pairs)
+        size = self.chunksize
+        futures = [self.executor.submit(_verify_chunk, self.hash,
+                                        self.prepare, pairs[i:i + size])
+                   for i in range(0, len(pairs), size)]
+        return [verified for future in futures
+                for verified in future.result()]
+
+    def close(self) -> None:
+        """Shut down the executor, if it was created by this object."""
+        if self._owned:
+            self.executor.shutdown()
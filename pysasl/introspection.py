@@ -0,0 +1,314 @@
+"""Provides an asyncio client for `OAuth 2.0 Token Introspection
+<https://datatracker.ietf.org/doc/html/rfc7662>`_, for bearer tokens that
+cannot be validated locally.
+
+"""
+
+import asyncio
+import json
+import ssl
+from base64 import b64encode
+from functools import partial
+from typing import Any, Optional, Mapping, Sequence, List, Dict, Tuple, Set
+from typing_extensions import Final
+from urllib.parse import urlsplit, urlencode, quote_plus
+
+from .token import AsyncTokenValidator
+
+__all__ = ['IntrospectionError', 'IntrospectionClient']
+
+
+class IntrospectionError(Exception):
+    """The token introspection request failed, e.g. because the endpoint
+    returned an error status or an invalid response.
+
+    """
+
+    __slots__: Sequence[str] = []
+
+
+class _Connection:
+
+    __slots__: Sequence[str] = ['reader', 'writer']
+
+    def __init__(self, reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter) -> None:
+        super().__init__()
+        self.reader = reader
+        self.writer = writer
+
+    def close(self) -> None:
+        self.writer.close()
+
+    async def _read_headers(self) -> Dict[bytes, bytes]:
+        headers: Dict[bytes, bytes] = {}
+        while True:
+            line = await self.reader.readline()
+            if not line.endswith(b'\n'):
+                raise asyncio.IncompleteReadError(line, None)
+            line = line.rstrip(b'\r\n')
+            if not line:
+                return headers
+            name, _, value = line.partition(b':')
+            headers[name.strip().lower()] = value.strip()
+
+    async def _read_chunked(self) -> bytes:
+        reader = self.reader
+        chunks: List[bytes] = []
+        while True:
+            size_line = await reader.readline()
+            size = int(size_line.split(b';', 1)[0], 16)
+            if size == 0:
+                await self._read_headers()
+                return b''.join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+
+    async def exchange(self, request: bytes) -> Tuple[int, bytes, bool]:
+        self.writer.write(request)
+        await self.writer.drain()
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise asyncio.IncompleteReadError(status_line, None)
+        try:
+            version, status_str = status_line.split(None, 2)[0:2]
+            status = int(status_str)
+        except ValueError as exc:
+            raise IntrospectionError('Invalid HTTP response') from exc
+        headers = await self._read_headers()
+        keep_alive = version == b'HTTP/1.1' \
+            and headers.get(b'connection', b'').lower() != b'close'
+        if headers.get(b'transfer-encoding', b'').lower() == b'chunked':
+            body = await self._read_chunked()
+        elif b'content-length' in headers:
+            length = int(headers[b'content-length'])
+            body = await self.reader.readexactly(length)
+        else:
+            body = await self.reader.read()
+            keep_alive = False
+        return status, body, keep_alive
+
+
+class IntrospectionClient(AsyncTokenValidator):
+    """An :class:`~pysasl.token.AsyncTokenValidator` that validates tokens by
+    sending requests to a token introspection endpoint.
+
+    Connections to the endpoint are kept open and reused, up to
+    *max_connections* at a time. Concurrent introspection of the same token
+    is coalesced into a single request.
+
+    If *batch_size* is greater than one, tokens introspected within
+    *batch_delay* seconds of each other are sent together in one request,
+    with one ``token`` parameter for each. The endpoint must respond to these
+    requests with a JSON array containing the introspection response for each
+    token, in order. A batch of one token is sent as a standard request.
+
+    Args:
+        url: The ``http`` or ``https`` URL of the introspection endpoint.
+        client_id: The client ID used to authenticate to the endpoint.
+        client_secret: The client secret used to authenticate to the
+            endpoint.
+        authzid_claim: The response field that must match the authorization
+            identity.
+        max_connections: The maximum number of open connections.
+        timeout: The maximum time for each request, in seconds.
+        batch_size: The maximum number of tokens in one request.
+        batch_delay: The time to wait for a batch to fill, in seconds.
+        ssl_context: The SSL context for ``https`` URLs.
+
+    """
+
+    __slots__: Sequence[str] = ['authzid_claim', 'timeout', 'batch_size',
+                                'batch_delay', '_host', '_port', '_path',
+                                '_ssl', '_headers', '_max_connections',
+                                '_semaphore', '_idle', '_inflight',
+                                '_pending', '_flush_handle', '_tasks']
+
+    def __init__(self, url: str, *,
+                 client_id: Optional[str] = None,
+                 client_secret: Optional[str] = None,
+                 authzid_claim: str = 'username',
+                 max_connections: int = 10,
+                 timeout: float = 10.0,
+                 batch_size: int = 1,
+                 batch_delay: float = 0.005,
+                 ssl_context: Optional[ssl.SSLContext] = None) -> None:
+        super().__init__()
+        parsed = urlsplit(url)
+        if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+            raise ValueError(f'Invalid introspection URL: {url}')
+        self.authzid_claim: Final = authzid_claim
+        self.timeout: Final = timeout
+        self.batch_size: Final = batch_size
+        self.batch_delay: Final = batch_delay
+        self._host = parsed.hostname
+        if parsed.scheme == 'https':
+            default_port = 443
+            self._ssl: Optional[ssl.SSLContext] = \
+                ssl_context or ssl.create_default_context()
+        else:
+            default_port = 80
+            self._ssl = None
+        self._port = parsed.port or default_port
+        path = parsed.path or '/'
+        self._path = f'{path}?{parsed.query}' if parsed.query else path
+        host = f'[{self._host}]' if ':' in self._host else self._host
+        if self._port != default_port:
+            host = f'{host}:{self._port}'
+        headers = [f'Host: {host}',
+                   'Accept: application/json',
+                   'Content-Type: application/x-www-form-urlencoded']
+        if client_id is not None:
+            # RFC 6749 2.3.1: form-urlencoded before the Basic encoding
+            userpass = f'{quote_plus(client_id)}:' \
+                f'{quote_plus(client_secret or "")}'
+            basic = b64encode(userpass.encode('ascii')).decode('ascii')
+            headers.append(f'Authorization: Basic {basic}')
+        self._headers = ''.join(f'{header}\r\n' for header in headers)
+        self._max_connections = max_connections
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._idle: List[_Connection] = []
+        self._inflight: Dict[str, 'asyncio.Future[Mapping[str, Any]]'] = {}
+        self._pending: List[
+            Tuple[str, 'asyncio.Future[Mapping[str, Any]]']] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set['asyncio.Future[None]'] = set()
+
+    async def _connect(self) -> _Connection:
+        reader, writer = await asyncio.open_connection(
+            self._host, self._port, ssl=self._ssl)
+        return _Connection(reader, writer)
+
+    def _build_request(self, tokens: Sequence[str]) -> bytes:
+        params = [('token', token) for token in tokens]
+        params.append(('token_type_hint', 'access_token'))
+        body = urlencode(params).encode('ascii')
+        return b''.join((
+            f'POST {self._path} HTTP/1.1\r\n'.encode('ascii'),
+            self._headers.encode('utf-8'),
+            f'Content-Length: {len(body)}\r\n\r\n'.encode('ascii'),
+            body))
+
+    async def _send(self, request: bytes) -> Tuple[int, bytes]:
+        semaphore = self._semaphore
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self._max_connections)
+            self._semaphore = semaphore
+        async with semaphore:
+            while True:
+                reused = bool(self._idle)
+                conn = self._idle.pop() if reused else await self._connect()
+                try:
+                    status, body, keep_alive = await conn.exchange(request)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    conn.close()
+                    if reused:
+                        continue
+                    raise
+                except BaseException:
+                    conn.close()
+                    raise
+                if keep_alive:
+                    self._idle.append(conn)
+                else:
+                    conn.close()
+                return status, body
+
+    async def _post(self, tokens: Sequence[str]) -> Any:
+        request = self._build_request(tokens)
+        try:
+            status, body = await asyncio.wait_for(
+                self._send(request), self.timeout)
+        except (OSError, ValueError, asyncio.IncompleteReadError,
+                asyncio.TimeoutError) as exc:
+            raise IntrospectionError('Introspection request failed') from exc
+        if status != 200:
+            raise IntrospectionError(f'Introspection returned {status}')
+        try:
+            return json.loads(body)
+        except ValueError as exc:
+            raise IntrospectionError('Invalid introspection response') \
+                from exc
+
+    async def _introspect_batch(
+            self, pending: Sequence[
+                Tuple[str, 'asyncio.Future[Mapping[str, Any]]']]) -> None:
+        try:
+            if len(pending) == 1:
+                results = [await self._post([pending[0][0]])]
+            else:
+                results = await self._post([token for token, _ in pending])
+            if not isinstance(results, list) \
+                    or len(results) != len(pending) \
+                    or not all(isinstance(res, dict) for res in results):
+                raise IntrospectionError('Invalid introspection response')
+        except Exception as exc:
+            for _, fut in pending:
+                if not fut.done():
+                    fut.set_exception(exc)
+        else:
+            for (_, fut), result in zip(pending, results):
+                if not fut.done():
+                    fut.set_result(result)
+
+    def _batch_done(self, pending: Sequence[
+                        Tuple[str, 'asyncio.Future[Mapping[str, Any]]']],
+                    task: 'asyncio.Future[None]') -> None:
+        self._tasks.discard(task)
+        # the batch was cancelled, perhaps before it started
+        for _, fut in pending:
+            if not fut.done():
+                fut.set_exception(IntrospectionError(
+                    'Introspection request was cancelled'))
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, []
+        task = asyncio.ensure_future(self._introspect_batch(pending))
+        self._tasks.add(task)
+        task.add_done_callback(partial(self._batch_done, pending))
+
+    def _start(self, token: str) -> 'asyncio.Future[Mapping[str, Any]]':
+        loop = asyncio.get_running_loop()
+        fut: 'asyncio.Future[Mapping[str, Any]]' = loop.create_future()
+        self._pending.append((token, fut))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_delay, self._flush)
+        return fut
+
+    async def introspect(self, token: str) -> Mapping[str, Any]:
+        """Return the introspection response for *token*.
+
+        Args:
+            token: The bearer token string.
+
+        Raises:
+            IntrospectionError: The introspection request failed.
+
+        """
+        inflight = self._inflight
+        fut = inflight.get(token)
+        if fut is None:
+            fut = inflight[token] = self._start(token)
+            fut.add_done_callback(lambda _: inflight.pop(token, None))
+        return await asyncio.shield(fut)
+
+    async def validate(self, token: str, authzid: str) -> bool:
+        result = await self.introspect(token)
+        return result.get('active') is True \
+            and result.get(self.authzid_claim) == authzid
+
+    async def aclose(self) -> None:
+        """Close all idle connections to the introspection endpoint."""
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+        for conn in idle:
+            await conn.writer.wait_closed()
+
+    def __repr__(self) -> str:
+        return f'IntrospectionClient({self._host!r}, ...)'
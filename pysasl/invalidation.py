@@ -0,0 +1,456 @@
+"""Invalidates cached verification results and token validations when a
+password changes or an account is locked, on every process and node that
+caches them.
+
+Each process keeps :class:`Generations`, counters that increase whenever an
+authentication identity or a digest is invalidated, or when the global epoch
+is bumped to invalidate everything. Cached entries are stored and found
+under the current generation of their identity, so an invalidation makes
+them unreachable at once, and they expire or are evicted as usual.
+
+An :class:`Invalidator` applies invalidations locally and publishes them
+with a pluggable :class:`Transport`. The :class:`DatagramTransport` sends
+each invalidation as one datagram over UDP multicast, for many nodes, or Unix
+domain sockets, for the processes of one host. Messages may be authenticated
+with a shared key. Because each message only bumps a counter, lost messages
+are the only risk, and duplicate or reordered messages are harmless.
+
+"""
+
+import hashlib
+import hmac
+import logging
+import socket
+import struct
+import threading
+from abc import abstractmethod
+from typing import Any, Optional, Mapping, Sequence, Tuple, Dict
+from typing_extensions import Final, Protocol
+
+from .cache import Fingerprinter, VerifiedCache
+
+__all__ = ['Generations', 'Transport', 'DatagramTransport', 'Invalidator',
+           'GenerationalCache']
+
+_log = logging.getLogger(__name__)
+
+_AUTHCID = 1
+_DIGEST = 2
+_EPOCH = 3
+_tag_size = 16
+
+
+class Generations:
+    """Counts the invalidations of each authentication identity and digest,
+    and of everything, in the current process.
+
+    Counters are only kept for invalidated identities and digests, and are
+    discarded when the epoch is bumped.
+
+    """
+
+    __slots__: Sequence[str] = ['_lock', '_epoch', '_authcids', '_digests',
+                                '_restored', '_fingerprinter']
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._lock = threading.Lock()
+        self._epoch = 0
+        self._authcids: Dict[str, int] = {}
+        self._digests: Dict[str, int] = {}
+        self._restored: Dict[bytes, int] = {}
+        self._fingerprinter: Optional[Fingerprinter] = None
+
+    @property
+    def epoch(self) -> int:
+        """The number of times everything was invalidated."""
+        return self._epoch
+
+    def get(self, authcid: str, digest: str = '') -> Tuple[int, int, int]:
+        """Return the current generation of an identity, which increases
+        with each invalidation that applies to it.
+
+        Args:
+            authcid: The authentication identity.
+            digest: The hashed secret string of the identity, if any.
+
+        """
+        with self._lock:
+            return (self._epoch, self._count(self._authcids, 'a', authcid),
+                    self._count(self._digests, 'd', digest) if digest else 0)
+
+    def _count(self, counts: Dict[str, int], kind: str, value: str) -> int:
+        count = counts.get(value)
+        if count is not None:
+            return count
+        restored = self._restored
+        fingerprinter = self._fingerprinter
+        if not restored or fingerprinter is None:
+            return 0
+        count = restored.pop(fingerprinter.fingerprint(kind, value), 0)
+        if count:
+            counts[value] = count
+        return count
+
+    def key(self, authcid: str, digest: str = '') -> str:
+        """Return the current generation of an identity as a string, to
+        include in cache keys.
+
+        Args:
+            authcid: The authentication identity.
+            digest: The hashed secret string of the identity, if any.
+
+        """
+        return '%d.%d.%d' % self.get(authcid, digest)
+
+    def invalidate_authcid(self, authcid: str) -> None:
+        """Increase the generation of an authentication identity.
+
+        Args:
+            authcid: The authentication identity.
+
+        """
+        with self._lock:
+            authcids = self._authcids
+            authcids[authcid] = self._count(authcids, 'a', authcid) + 1
+
+    def invalidate_digest(self, digest: str) -> None:
+        """Increase the generation of the identities with a digest.
+
+        Args:
+            digest: The hashed secret string.
+
+        """
+        with self._lock:
+            digests = self._digests
+            digests[digest] = self._count(digests, 'd', digest) + 1
+
+    def bump_epoch(self) -> None:
+        """Increase the generation of every identity."""
+        with self._lock:
+            self._epoch += 1
+            self._authcids.clear()
+            self._digests.clear()
+            self._restored.clear()
+
+    def dump(self, fingerprinter: Fingerprinter) \
+            -> Tuple[int, Dict[bytes, int]]:
+        """Return the epoch and the counters of the invalidated identities
+        and digests, so that they may be restored after a restart. The
+        counters are keyed by fingerprints, so that the identities and digests
+        themselves are not revealed.
+
+        Args:
+            fingerprinter: Produces the fingerprints of the counter keys.
+
+        """
+        with self._lock:
+            counters = dict(self._restored) \
+                if fingerprinter is self._fingerprinter else {}
+            for kind, counts in (('a', self._authcids),
+                                 ('d', self._digests)):
+                for value, count in counts.items():
+                    counters[fingerprinter.fingerprint(kind, value)] = count
+            return self._epoch, counters
+
+    def restore(self, epoch: int, counters: Mapping[bytes, int],
+                fingerprinter: Fingerprinter) -> bool:
+        """Restore the epoch and counters returned by :meth:`.dump`, keeping
+        the greater of each counter.
+
+        Args:
+            epoch: The restored epoch.
+            counters: The restored counters, keyed by fingerprint.
+            fingerprinter: Produced the fingerprints of the counter keys.
+
+        Returns:
+            False if the restored epoch was already bumped, and nothing was
+            restored.
+
+        """
+        with self._lock:
+            if epoch < self._epoch:
+                return False
+            elif epoch > self._epoch:
+                self._epoch = epoch
+                self._authcids.clear()
+                self._digests.clear()
+                self._restored.clear()
+            restored = self._restored
+            for fingerprint, count in counters.items():
+                restored[fingerprint] = max(restored.get(fingerprint, 0),
+                                            count)
+            for kind, counts in (('a', self._authcids),
+                                 ('d', self._digests)):
+                for value in counts:
+                    count = restored.pop(
+                        fingerprinter.fingerprint(kind, value), 0)
+                    counts[value] = max(counts[value], count)
+            self._fingerprinter = fingerprinter
+            return True
+
+    def __repr__(self) -> str:
+        return f'Generations(epoch={self._epoch!r})'
+
+
+class Transport(Protocol):
+    """Delivers invalidation messages between processes."""
+
+    @abstractmethod
+    def send(self, message: bytes) -> None:
+        """Send a message to every subscribed process.
+
+        Args:
+            message: The message to send.
+
+        """
+        ...
+
+    @abstractmethod
+    def recv(self, timeout: Optional[float]) -> Optional[bytes]:
+        """Wait for the next message.
+
+        Args:
+            timeout: The maximum time to wait, in seconds.
+
+        Returns:
+            The message, or ``None`` if the timeout elapsed.
+
+        """
+        ...
+
+    @abstractmethod
+    def close(self) -> None:
+        """Release the resources of the transport."""
+        ...
+
+
+class DatagramTransport(Transport):
+    """A :class:`Transport` that sends each message as one datagram from a
+    bound socket to each peer address.
+
+    Args:
+        sock: The bound datagram socket.
+        peers: The addresses that messages are sent to.
+
+    """
+
+    __slots__: Sequence[str] = ['sock', 'peers']
+
+    def __init__(self, sock: socket.socket, peers: Sequence[Any]) -> None:
+        super().__init__()
+        self.sock: Final = sock
+        self.peers: Final = peers
+
+    @classmethod
+    def unix(cls, path: str, peers: Sequence[str]) -> 'DatagramTransport':
+        """Create a transport between processes on one host, using Unix
+        domain datagram sockets. This is only available on POSIX platforms.
+
+        Args:
+            path: The socket path of this process.
+            peers: The socket paths of the other processes.
+
+        """
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(path)
+        return cls(sock, peers)
+
+    @classmethod
+    def multicast(cls, group: str, port: int, *, ttl: int = 1,
+                  interface: Optional[str] = None) -> 'DatagramTransport':
+        """Create a transport between nodes, using UDP multicast.
+
+        Args:
+            group: The IPv4 multicast group address.
+            port: The UDP port.
+            ttl: The multicast time-to-live, which limits the hops a message
+                may travel.
+            interface: The address of the local interface to use, by
+                default any interface.
+
+        """
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(('', port))
+        if interface is None:
+            local = struct.pack('!L', socket.INADDR_ANY)
+        else:
+            local = socket.inet_aton(interface)
+        membership = socket.inet_aton(group) + local
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP,
+                        membership)
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, ttl)
+        return cls(sock, [(group, port)])
+
+    def send(self, message: bytes) -> None:
+        for peer in self.peers:
+            try:
+                self.sock.sendto(message, peer)
+            except OSError as exc:
+                _log.warning('Invalidation not sent to %r: %s', peer, exc)
+
+    def recv(self, timeout: Optional[float]) -> Optional[bytes]:
+        sock = self.sock
+        sock.settimeout(timeout)
+        try:
+            return sock.recv(65535)
+        except (socket.timeout, BlockingIOError):
+            return None
+
+    def close(self) -> None:
+        self.sock.close()
+
+    def __repr__(self) -> str:
+        return f'DatagramTransport({self.peers!r})'
+
+
+class Invalidator:
+    """Invalidates cached entries in the current process, and publishes each
+    invalidation to the other processes subscribed to a transport.
+
+    Args:
+        generations: The generations of the current process.
+        transport: Delivers invalidations between processes.
+        key: The shared key authenticating each message, if any.
+        poll: The longest time, in seconds, :meth:`.close` waits for the
+            receiving thread to notice.
+
+    """
+
+    __slots__: Sequence[str] = ['generations', 'transport', 'poll', '_key',
+                                '_closed', '_thread']
+
+    def __init__(self, generations: Generations, transport: Transport, *,
+                 key: Optional[bytes] = None, poll: float = 0.5) -> None:
+        super().__init__()
+        self.generations: Final = generations
+        self.transport: Final = transport
+        self.poll: Final = poll
+        self._key = key
+        self._closed = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _tag(self, body: bytes) -> bytes:
+        key = self._key
+        if key is None:
+            return b''
+        return hmac.new(key, body, hashlib.sha256).digest()[:_tag_size]
+
+    def _publish(self, kind: int, value: str) -> None:
+        body = struct.pack('!B', kind) + value.encode('utf-8')
+        self.transport.send(body + self._tag(body))
+
+    def invalidate_authcid(self, authcid: str) -> None:
+        """Invalidate the cached entries of an authentication identity.
+
+        Args:
+            authcid: The authentication identity.
+
+        """
+        self.generations.invalidate_authcid(authcid)
+        self._publish(_AUTHCID, authcid)
+
+    def invalidate_digest(self, digest: str) -> None:
+        """Invalidate the cached entries of the identities with a digest.
+
+        Args:
+            digest: The hashed secret string.
+
+        """
+        self.generations.invalidate_digest(digest)
+        self._publish(_DIGEST, digest)
+
+    def bump_epoch(self) -> None:
+        """Invalidate every cached entry."""
+        self.generations.bump_epoch()
+        self._publish(_EPOCH, '')
+
+    def receive(self, message: bytes) -> bool:
+        """Apply an invalidation published by another process.
+
+        Args:
+            message: The received message.
+
+        Returns:
+            True if the message was valid and applied.
+
+        """
+        if self._key is not None:
+            body, tag = message[:-_tag_size], message[-_tag_size:]
+            if not hmac.compare_digest(tag, self._tag(body)):
+                return False
+        else:
+            body = message
+        if not body:
+            return False
+        kind = body[0]
+        try:
+            value = body[1:].decode('utf-8')
+        except UnicodeDecodeError:
+            return False
+        generations = self.generations
+        if kind == _AUTHCID:
+            generations.invalidate_authcid(value)
+        elif kind == _DIGEST:
+            generations.invalidate_digest(value)
+        elif kind == _EPOCH:
+            generations.bump_epoch()
+        else:
+            return False
+        return True
+
+    def _run(self) -> None:
+        transport = self.transport
+        closed = self._closed
+        while not closed.is_set():
+            message = transport.recv(self.poll)
+            if message is not None and not self.receive(message):
+                _log.warning('Invalid invalidation message')
+
+    def start(self) -> None:
+        """Start receiving invalidations in a background thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name='pysasl-invalidation', daemon=True)
+            self._thread.start()
+
+    def close(self) -> None:
+        """Stop receiving invalidations and close the transport."""
+        self._closed.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+        self.transport.close()
+
+
+class GenerationalCache(VerifiedCache):
+    """Wraps a :class:`~pysasl.cache.VerifiedCache` so that its entries are
+    stored and found under the current generation of their identity.
+
+    Args:
+        cache: The cache to wrap.
+        generations: The generations of the current process.
+
+    """
+
+    __slots__: Sequence[str] = ['cache', 'generations']
+
+    def __init__(self, cache: VerifiedCache,
+                 generations: Generations) -> None:
+        super().__init__()
+        self.cache: Final = cache
+        self.generations: Final = generations
+
+    def _digest(self, authcid: str, digest: str) -> str:
+        return digest + '\x00' + self.generations.key(authcid, digest)
+
+    def contains(self, authcid: str, digest: str, secret: str) -> bool:
+        return self.cache.contains(authcid, self._digest(authcid, digest),
+                                   secret)
+
+    def add(self, authcid: str, digest: str, secret: str) -> None:
+        self.cache.add(authcid, self._digest(authcid, digest), secret)
+
+    def __repr__(self) -> str:
+        return f'GenerationalCache({self.cache!r})'
@@ -1,19 +1,53 @@
 
 
 from abc import abstractmethod, ABCMeta
-from typing import Union, Optional, Tuple, Sequence
+from enum import IntEnum
+from typing import Union, Optional, Tuple, Sequence, NamedTuple, ClassVar
 from typing_extensions import TypeAlias
 
 from ..creds.client import ClientCredentials
 from ..creds.server import ServerCredentials
 
-__all__ = ['Mechanism', 'ServerChallenge', 'ChallengeResponse',
-           'ServerMechanism', 'ClientMechanism']
+__all__ = ['Mechanism', 'VerifyCost', 'MechanismCost', 'ServerChallenge',
+           'ChallengeResponse', 'ServerMechanism', 'ClientMechanism']
 
 #: A type alias for either server or client mechanisms.
 Mechanism: TypeAlias = Union['ServerMechanism', 'ClientMechanism']
 
 
+class VerifyCost(IntEnum):
+    """The expected CPU cost of verifying the credentials produced by a
+    mechanism, in increasing order.
+
+    """
+
+    #: No verification is done by the server, e.g. it relies on TLS.
+    NONE = 0
+
+    #: Verification is cheap, e.g. a single HMAC.
+    LOW = 1
+
+    #: Verification is mostly waiting on the network, e.g. a token
+    #: introspection request.
+    NETWORK = 2
+
+    #: Verification may require an expensive key derivation, e.g. PBKDF2.
+    HIGH = 3
+
+
+class MechanismCost(NamedTuple):
+    """Describes the expected cost of authenticating with a mechanism."""
+
+    #: The number of responses the client sends to complete authentication.
+    round_trips: int
+
+    #: True if the server receives the secret in cleartext.
+    cleartext: bool
+
+    #: The expected cost of verifying the credentials.
+    verify: VerifyCost
+
+
 class ServerChallenge(Exception):
     """Raised by :meth:`~ServerMechanism.server_attempt` to provide server
     challenges.
@@ -83,6 +117,13 @@ class _BaseMechanism:
         """The SASL name for this mechanism."""
         return self._name
 
+    def warmup(self) -> None:
+        """Performs any one-time work the mechanism would otherwise do on first
+        use, such as populating caches. By default, this does nothing.
+
+        """
+        pass
+
     def __eq__(self, other: object) -> bool:
         if isinstance(other, _BaseMechanism):
             return self.name == other.name
@@ -97,6 +138,11 @@ class ServerMechanism(_BaseMechanism, metaclass=ABCMeta):
 
     __slots__: Sequence[str] = []
 
+    #: The expected cost of authenticating with this mechanism. By default,
+    #: this assumes the worst case.
+    cost: ClassVar[MechanismCost] = MechanismCost(
+        round_trips=1, cleartext=True, verify=VerifyCost.HIGH)
+
     @abstractmethod
     def server_attempt(self, responses: Sequence[ChallengeResponse]) \
             -> Tuple[ServerCredentials, Optional[bytes]]:
@@ -1,21 +1,29 @@
 
 import re
 import hmac
+import socket
 import hashlib
 import email.utils
+from functools import lru_cache
 from typing import Union, Optional, Tuple, Sequence
 
 from . import (ServerMechanism, ClientMechanism, ServerChallenge,
-               ChallengeResponse)
+               ChallengeResponse, MechanismCost, VerifyCost)
 from ..creds.client import ClientCredentials
 from ..creds.server import ServerCredentials
 from ..exception import InvalidResponse, MechanismUnusable, UnexpectedChallenge
 from ..identity import Identity
+from ..instrument import observe_attempt, observe_verify
 from ..prep import saslprep
 
 __all__ = ['CramMD5Result', 'CramMD5Mechanism']
 
 
+@lru_cache(maxsize=None)
+def _get_domain() -> str:
+    return socket.getfqdn()
+
+
 class CramMD5Result(ServerCredentials):
     """Because this mechanism uses hash algorithms to compare secrets, the
     :meth:`~CramMD5Mechanism.server_attempt` method returns this sub-class
@@ -39,6 +47,7 @@ class CramMD5Result(ServerCredentials):
     def authzid(self) -> str:
         return self._username
 
+    @observe_verify
     def verify(self, identity: Optional[Identity]) -> bool:
         if identity is None:
             return False
@@ -64,18 +73,24 @@ class CramMD5Mechanism(ServerMechanism, ClientMechanism):
 
     _pattern = re.compile(br'^(.*) ([^ ]+)$')
 
+    cost = MechanismCost(round_trips=1, cleartext=False,
+                         verify=VerifyCost.LOW)
+
     def __init__(self, name: Union[str, bytes] = b'CRAM-MD5') -> None:
         super().__init__(name)
 
+    def warmup(self) -> None:
+        _get_domain()
+
+    @observe_attempt
     def server_attempt(self, responses: Sequence[ChallengeResponse]) \
             -> Tuple[CramMD5Result, None]:
-        try:
-            first = responses[0]
-        except IndexError as exc:
-            challenge = email.utils.make_msgid().encode('utf-8')
-            raise ServerChallenge(challenge) from exc
+        if not responses:
+            msgid = email.utils.make_msgid(domain=_get_domain())
+            raise ServerChallenge(msgid.encode('utf-8'))
 
-        match = re.match(self._pattern, first.response)
+        first = responses[0]
+        match = self._pattern.match(first.response)
         if not match:
             raise InvalidResponse()
         username, digest = match.groups()
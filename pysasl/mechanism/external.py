@@ -2,10 +2,11 @@
 from typing import Union, Tuple, Sequence
 
 from . import (ServerMechanism, ClientMechanism, ServerChallenge,
-               ChallengeResponse)
+               ChallengeResponse, MechanismCost, VerifyCost)
 from ..creds.client import ClientCredentials
 from ..creds.external import ExternalCredentials
 from ..exception import UnexpectedChallenge
+from ..instrument import observe_attempt
 
 __all__ = ['ExternalMechanism']
 
@@ -18,16 +19,18 @@ class ExternalMechanism(ServerMechanism, ClientMechanism):
 
     """
 
+    cost = MechanismCost(round_trips=1, cleartext=False,
+                         verify=VerifyCost.NONE)
+
     def __init__(self, name: Union[str, bytes] = b'EXTERNAL') -> None:
         super().__init__(name)
 
+    @observe_attempt
     def server_attempt(self, responses: Sequence[ChallengeResponse]) \
             -> Tuple[ExternalCredentials, None]:
-        try:
-            first = responses[0]
-        except IndexError as exc:
-            raise ServerChallenge(b'') from exc
-        authzid_str = first.response.decode('utf-8')
+        if not responses:
+            raise ServerChallenge(b'')
+        authzid_str = responses[0].response.decode('utf-8')
         return ExternalCredentials(authzid_str), None
 
     def client_attempt(self, creds: ClientCredentials,
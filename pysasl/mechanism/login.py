@@ -2,10 +2,11 @@
 from typing import Union, Tuple, Sequence
 
 from . import (ServerMechanism, ClientMechanism, ServerChallenge,
-               ChallengeResponse)
+               ChallengeResponse, MechanismCost, VerifyCost)
 from ..creds.client import ClientCredentials
 from ..creds.plain import PlainCredentials
 from ..exception import UnexpectedChallenge
+from ..instrument import observe_attempt
 
 __all__ = ['LoginMechanism']
 
@@ -13,21 +14,22 @@ __all__ = ['LoginMechanism']
 class LoginMechanism(ServerMechanism, ClientMechanism):
     """Implements the LOGIN authentication mechanism."""
 
+    cost = MechanismCost(round_trips=2, cleartext=True,
+                         verify=VerifyCost.HIGH)
+
     def __init__(self, name: Union[str, bytes] = b'LOGIN') -> None:
         super().__init__(name)
 
+    @observe_attempt
     def server_attempt(self, responses: Sequence[ChallengeResponse]) \
             -> Tuple[PlainCredentials, None]:
-        try:
-            first = responses[0]
-        except (IndexError, ValueError) as exc:
-            raise ServerChallenge(b'Username:') from exc
-        try:
-            second = responses[1]
-        except (IndexError, ValueError) as exc:
-            raise ServerChallenge(b'Password:') from exc
-        username = first.response.decode('utf-8')
-        password = second.response.decode('utf-8')
+        num_responses = len(responses)
+        if num_responses < 1:
+            raise ServerChallenge(b'Username:')
+        elif num_responses < 2:
+            raise ServerChallenge(b'Password:')
+        username = responses[0].response.decode('utf-8')
+        password = responses[1].response.decode('utf-8')
         return PlainCredentials(username, password, username), None
 
     def client_attempt(self, creds: ClientCredentials,
@@ -3,10 +3,11 @@ import re
 from typing import Union, Tuple, Sequence
 
 from . import (ServerMechanism, ClientMechanism, ServerChallenge,
-               ChallengeResponse)
+               ChallengeResponse, MechanismCost, VerifyCost)
 from ..creds.client import ClientCredentials
 from ..creds.external import ExternalCredentials
 from ..exception import InvalidResponse, UnexpectedChallenge
+from ..instrument import observe_attempt
 
 __all__ = ['OAuth2Mechanism']
 
@@ -23,17 +24,19 @@ class OAuth2Mechanism(ServerMechanism, ClientMechanism):
     _pattern = re.compile(br'^user=(.*?)\x01auth=[bB][eE][aA][rR][eE][rR] '
                           br'(.*?)\x01\x01$')
 
+    cost = MechanismCost(round_trips=1, cleartext=False,
+                         verify=VerifyCost.NETWORK)
+
     def __init__(self, name: Union[str, bytes] = b'XOAUTH2') -> None:
         super().__init__(name)
 
+    @observe_attempt
     def server_attempt(self, responses: Sequence[ChallengeResponse]) \
             -> Tuple[ExternalCredentials, None]:
-        try:
-            first = responses[0]
-        except IndexError as exc:
-            raise ServerChallenge(b'') from exc
+        if not responses:
+            raise ServerChallenge(b'')
 
-        match = re.match(self._pattern, first.response)
+        match = self._pattern.match(responses[0].response)
         if not match:
             raise InvalidResponse()
         user, token = match.groups()
@@ -3,10 +3,11 @@ import re
 from typing import Union, Tuple, Sequence
 
 from . import (ServerMechanism, ClientMechanism, ServerChallenge,
-               ChallengeResponse)
+               ChallengeResponse, MechanismCost, VerifyCost)
 from ..creds.client import ClientCredentials
 from ..creds.plain import PlainCredentials
 from ..exception import InvalidResponse, UnexpectedChallenge
+from ..instrument import observe_attempt
 
 __all__ = ['PlainMechanism']
 
@@ -18,17 +19,19 @@ class PlainMechanism(ServerMechanism, ClientMechanism):
 
     __slots__: Sequence[str] = []
 
+    cost = MechanismCost(round_trips=1, cleartext=True,
+                         verify=VerifyCost.HIGH)
+
     def __init__(self, name: Union[str, bytes] = b'PLAIN') -> None:
         super().__init__(name)
 
+    @observe_attempt
     def server_attempt(self, responses: Sequence[ChallengeResponse]) \
             -> Tuple[PlainCredentials, None]:
-        try:
-            first = responses[0]
-        except IndexError as exc:
-            raise ServerChallenge(b'') from exc
+        if not responses:
+            raise ServerChallenge(b'')
 
-        match = re.match(self._pattern, first.response)
+        match = self._pattern.match(responses[0].response)
         if not match:
             raise InvalidResponse()
         zid, cid, secret = match.groups()
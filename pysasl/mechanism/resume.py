@@ -0,0 +1,290 @@
+"""Implements a mechanism that redeems short-lived session-resumption tickets,
+so that a client reconnecting soon after an expensive login, e.g. PLAIN with
+a PBKDF2 digest or XOAUTH2 with token introspection, costs one HMAC.
+
+After a successful login, the server issues a ticket with
+:meth:`TicketKeys.issue` and sends it to the client, e.g. in the final
+response of the protocol. The ticket holds its expiration time and is signed
+for the authorization identity and an optional client binding, such as the
+fingerprint of a TLS client certificate, which the server must observe rather
+than receive from the client. The server gives the binding of each connection
+to :func:`set_binding` before authenticating it, and the credentials parsed
+by :class:`ResumeServerMechanism` are verified against it. Tickets are
+signed with the current key of a :class:`TicketKeys`, and the previous keys
+continue to verify tickets until they are rotated out.
+
+Because each server must be given its ticket keys, this mechanism is not one
+of the built-in mechanisms loaded by :meth:`~pysasl.SASLAuth.defaults`.
+
+"""
+
+import base64
+import binascii
+import hashlib
+import hmac
+import re
+import struct
+import threading
+import time
+from contextvars import ContextVar
+from typing import Union, Optional, Sequence, Tuple
+from typing_extensions import Final
+
+from . import (ServerMechanism, ClientMechanism, ServerChallenge,
+               ChallengeResponse, MechanismCost, VerifyCost)
+from ..cache import Clock
+from ..creds.client import ClientCredentials
+from ..creds.server import ServerCredentials
+from ..exception import InvalidResponse, UnexpectedChallenge
+from ..identity import Identity
+from ..instrument import observe_attempt, observe_verify
+
+__all__ = ['set_binding', 'TicketKeys', 'ResumeCredentials',
+           'ResumeServerMechanism', 'ResumeClientMechanism']
+
+_version = 1
+_ticket_head = struct.Struct('!B4sQ')
+_tag_size = 16
+_length = struct.Struct('!I')
+
+_binding: ContextVar[bytes] = ContextVar('_binding', default=b'')
+
+
+def set_binding(binding: bytes) -> None:
+    """Set the client binding observed by the server for the current
+    :mod:`contextvars` context, e.g. the task handling a connection. Tickets
+    redeemed with :class:`ResumeServerMechanism` in this context must have
+    been issued for the same binding.
+
+    Args:
+        binding: Identifies the client, e.g. the fingerprint of its TLS
+            client certificate.
+
+    """
+    _binding.set(binding)
+
+
+def _key_id(key: bytes) -> bytes:
+    return hashlib.sha256(key).digest()[:4]
+
+
+class TicketKeys:
+    """Issues and redeems session-resumption tickets, signed with rotating
+    keys.
+
+    Args:
+        keys: The signing keys, newest first. Tickets are signed with the
+            first key, and verified with any of them.
+        ttl: The lifetime of each ticket, in seconds.
+        clock: Returns the current time in seconds since the epoch, which
+            must agree between the servers sharing the keys.
+
+    Raises:
+        ValueError: No keys were given.
+
+    """
+
+    __slots__: Sequence[str] = ['ttl', '_keys', '_index', '_lock', '_clock']
+
+    def __init__(self, keys: Sequence[bytes], *, ttl: float = 3600.0,
+                 clock: Clock = time.time) -> None:
+        super().__init__()
+        if not keys:
+            raise ValueError('At least one ticket key is required')
+        self.ttl: Final = ttl
+        self._keys = tuple(keys)
+        self._index = {_key_id(key): key for key in reversed(keys)}
+        self._lock = threading.Lock()
+        self._clock = clock
+
+    @property
+    def keys(self) -> Sequence[bytes]:
+        """The signing keys, newest first."""
+        return self._keys
+
+    def rotate(self, key: bytes, *, keep: int = 2) -> None:
+        """Sign new tickets with *key*, and stop verifying tickets signed with
+        the oldest keys.
+
+        Args:
+            key: The new signing key.
+            keep: The number of keys that verify tickets, including *key*.
+
+        """
+        with self._lock:
+            keys = (key, ) + tuple(old for old in self._keys if old != key)
+            keys = keys[:max(keep, 1)]
+            index = {_key_id(key): key for key in reversed(keys)}
+            self._keys, self._index = keys, index
+
+    @classmethod
+    def _sign(cls, key: bytes, head: bytes, authzid: str,
+              binding: bytes) -> bytes:
+        authzid_b = authzid.encode('utf-8')
+        mac = hmac.new(key, head, hashlib.sha256)
+        mac.update(_length.pack(len(authzid_b)))
+        mac.update(authzid_b)
+        mac.update(binding)
+        return mac.digest()[:_tag_size]
+
+    def issue(self, authzid: str, binding: bytes = b'') -> str:
+        """Return a new ticket for an authorization identity.
+
+        Args:
+            authzid: The authorization identity of the successful login.
+            binding: Identifies the client, e.g. the fingerprint of its TLS
+                client certificate.
+
+        """
+        key = self._keys[0]
+        key_id = _key_id(key)
+        expires = int(self._clock() + self.ttl)
+        head = _ticket_head.pack(_version, key_id, expires)
+        ticket = head + self._sign(key, head, authzid, binding)
+        return base64.urlsafe_b64encode(ticket).rstrip(b'=').decode('ascii')
+
+    def redeem(self, ticket: str, authzid: str,
+               binding: bytes = b'') -> bool:
+        """Check that a ticket was issued by :meth:`.issue` for the
+        authorization identity and binding, and has not expired.
+
+        Args:
+            ticket: The ticket string.
+            authzid: The authorization identity of the login.
+            binding: Identifies the client, e.g. the fingerprint of its TLS
+                client certificate.
+
+        """
+        try:
+            padding = '=' * (-len(ticket) % 4)
+            data = base64.b64decode(ticket + padding, altchars=b'-_',
+                                    validate=True)
+        except (binascii.Error, ValueError):
+            return False
+        if len(data) != _ticket_head.size + _tag_size:
+            return False
+        head, tag = data[:_ticket_head.size], data[_ticket_head.size:]
+        version, key_id, expires = _ticket_head.unpack(head)
+        key = self._index.get(key_id)
+        if version != _version or key is None or expires <= self._clock():
+            return False
+        expected = self._sign(key, head, authzid, binding)
+        return hmac.compare_digest(expected, tag)
+
+    def __repr__(self) -> str:
+        return f'TicketKeys(ttl={self.ttl!r})'
+
+
+class ResumeCredentials(ServerCredentials):
+    """Credentials produced by :class:`ResumeServerMechanism`, which are
+    verified by redeeming their ticket rather than comparing a secret.
+
+    Args:
+        authzid: The authorization identity the ticket was issued for.
+        ticket: The ticket string.
+        keys: The ticket keys used to redeem the ticket.
+        binding: Identifies the client, which must match the binding the
+            ticket was issued for.
+
+    """
+
+    __slots__: Sequence[str] = ['_authzid', '_ticket', '_keys', '_binding']
+
+    def __init__(self, authzid: str, ticket: str, keys: TicketKeys,
+                 binding: bytes = b'') -> None:
+        super().__init__()
+        self._authzid = authzid
+        self._ticket = ticket
+        self._keys = keys
+        self._binding = binding
+
+    @property
+    def authcid(self) -> str:
+        return self._authzid
+
+    @property
+    def authzid(self) -> str:
+        return self._authzid
+
+    @observe_verify
+    def verify(self, identity: Optional[Identity]) -> bool:
+        """Redeem the ticket, if *identity* still exists.
+
+        Args:
+            identity: The identity being authenticated.
+
+        """
+        if identity is None or not identity.compare_authcid(self._authzid):
+            return False
+        return self._keys.redeem(self._ticket, self._authzid, self._binding)
+
+    def __repr__(self) -> str:
+        return f'ResumeCredentials({self.authzid!r}, ...)'
+
+
+class ResumeServerMechanism(ServerMechanism):
+    """Implements server-side authentication with a session-resumption
+    ticket. The client sends the authorization identity and the ticket,
+    separated by a null byte. The credentials carry the binding given to
+    :func:`set_binding` in the current context.
+
+    Args:
+        keys: The ticket keys used to redeem tickets.
+        name: The SASL mechanism name.
+
+    """
+
+    _pattern = re.compile(br'^([^\x00]+)\x00([A-Za-z0-9_-]+)$')
+
+    __slots__: Sequence[str] = ['keys']
+
+    cost = MechanismCost(round_trips=1, cleartext=False,
+                         verify=VerifyCost.LOW)
+
+    def __init__(self, keys: TicketKeys,
+                 name: Union[str, bytes] = b'X-RESUME') -> None:
+        super().__init__(name)
+        self.keys: Final = keys
+
+    @observe_attempt
+    def server_attempt(self, responses: Sequence[ChallengeResponse]) \
+            -> Tuple[ResumeCredentials, None]:
+        if not responses:
+            raise ServerChallenge(b'')
+        match = self._pattern.match(responses[0].response)
+        if not match:
+            raise InvalidResponse()
+        authzid, ticket = match.groups()
+        return ResumeCredentials(authzid.decode('utf-8'),
+                                 ticket.decode('ascii'), self.keys,
+                                 _binding.get()), None
+
+
+class ResumeClientMechanism(ClientMechanism):
+    """Implements client-side authentication with a session-resumption
+    ticket, given as the secret of the
+    :class:`~pysasl.creds.client.ClientCredentials`. The authentication
+    identity is sent if no authorization identity is given.
+
+    Args:
+        name: The SASL mechanism name.
+
+    """
+
+    __slots__: Sequence[str] = []
+
+    def __init__(self, name: Union[str, bytes] = b'X-RESUME') -> None:
+        super().__init__(name)
+
+    def client_attempt(self, creds: ClientCredentials,
+                       challenges: Sequence[ServerChallenge]) \
+            -> ChallengeResponse:
+        if len(challenges) == 0:
+            challenge = b''
+        elif len(challenges) == 1:
+            challenge = challenges[0].data
+        else:
+            raise UnexpectedChallenge()
+        authzid = (creds.authzid or creds.authcid).encode('utf-8')
+        ticket = creds.secret.encode('ascii')
+        return ChallengeResponse(challenge, b'\x00'.join((authzid, ticket)))
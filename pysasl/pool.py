@@ -0,0 +1,326 @@
+"""Verifies hashed secrets in a pool of warm worker processes, so that a
+dedicated authentication server can use every core for hashing.
+
+Each worker receives the hash implementation once, when it starts, and each
+request carries only the prepared secret and digest. Requests arriving close
+together are sent to a worker in one batch, so small requests do not each pay
+for a round-trip to a worker process, but each request in a batch succeeds or
+fails on its own. If a worker crashes, the pool is
+restarted and the affected batch is retried once. Workers are started with
+the ``forkserver`` method where it is available, and ``spawn`` otherwise, so
+that they are never forked from a process with running threads.
+
+A :class:`PoolHash` plugs the pool into
+:class:`~pysasl.identity.HashedIdentity` unchanged.
+
+"""
+
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.context import BaseContext
+from typing import Any, Optional, Union, Sequence, Tuple, List, NamedTuple
+from typing_extensions import Final
+
+from .hashing import HashInterface
+from .instrument import HASH, observed
+
+__all__ = ['PoolStats', 'VerifyPool', 'PoolHash']
+
+_Request = Tuple[str, str, 'Future[bool]']
+
+_worker_hash: Optional[HashInterface] = None
+
+
+def _init_worker(hash: HashInterface) -> None:  # pragma: no cover
+    global _worker_hash
+    _worker_hash = hash
+
+
+def _verify_batch(pairs: Sequence[Tuple[str, str]]) \
+        -> List[Union[bool, Exception]]:  # pragma: no cover
+    verify = _worker_hash.verify  # type: ignore
+    results: List[Union[bool, Exception]] = []
+    for secret, digest in pairs:
+        try:
+            results.append(verify(secret, digest))
+        except Exception as exc:
+            results.append(exc)
+    return results
+
+
+def _default_context() -> BaseContext:
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')  # pragma: no cover
+
+
+class _Broken(NamedTuple):
+    batch: Sequence[_Request]
+    executor: ProcessPoolExecutor
+    exc: BaseException
+    retry: bool
+
+
+_Item = Union[None, _Request, _Broken]
+
+
+class PoolStats(NamedTuple):
+    """A snapshot of the state of a :class:`VerifyPool`."""
+
+    #: The requests waiting to be sent to a worker.
+    queued: int
+
+    #: The requests sent to a worker and not yet completed.
+    in_flight: int
+
+    #: The total requests received.
+    requests: int
+
+    #: The total batches sent to a worker.
+    batches: int
+
+    #: The number of times the pool was restarted after a worker crashed.
+    restarts: int
+
+
+class VerifyPool:
+    """Verifies secrets against digests in a pool of worker processes, sending
+    requests to the workers in batches.
+
+    Args:
+        hash: The hash implementation used by the workers, which must be
+            picklable.
+        workers: The number of worker processes.
+        max_batch: The most requests sent to a worker at once.
+        max_delay: The longest time, in seconds, a request waits for others
+            to join its batch.
+        mp_context: The multiprocessing context used to start the workers.
+
+    """
+
+    __slots__: Sequence[str] = ['hash', 'workers', 'max_batch', 'max_delay',
+                                'mp_context', '_queue', '_lock', '_executor',
+                                '_thread', '_in_flight', '_requests',
+                                '_batches', '_restarts']
+
+    def __init__(self, hash: HashInterface, *,
+                 workers: Optional[int] = None, max_batch: int = 32,
+                 max_delay: float = 0.001,
+                 mp_context: Optional[BaseContext] = None) -> None:
+        super().__init__()
+        self.hash: Final = hash
+        self.workers: Final = workers or os.cpu_count() or 1
+        self.max_batch: Final = max_batch
+        self.max_delay: Final = max_delay
+        self.mp_context: Final = mp_context or _default_context()
+        self._queue: 'queue.Queue[_Item]' = queue.Queue()
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._in_flight = 0
+        self._requests = 0
+        self._batches = 0
+        self._restarts = 0
+
+    @property
+    def stats(self) -> PoolStats:
+        """A snapshot of the state of the pool."""
+        with self._lock:
+            return PoolStats(self._queue.qsize(), self._in_flight,
+                             self._requests, self._batches, self._restarts)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            executor = self._executor
+            if executor is None:
+                executor = self._executor = ProcessPoolExecutor(
+                    self.workers, mp_context=self.mp_context,
+                    initializer=_init_worker, initargs=(self.hash,))
+            return executor
+
+    def _restart(self, broken: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is not broken:
+                return
+            self._executor = None
+            self._restarts += 1
+        broken.shutdown(wait=False)
+
+    def submit(self, secret: str, digest: str) -> 'Future[bool]':
+        """Queue a request to verify *secret* against *digest*.
+
+        Args:
+            secret: The prepared secret string.
+            digest: The hashed digest string.
+
+        Returns:
+            A future of the verification result.
+
+        """
+        future: 'Future[bool]' = Future()
+        with self._lock:
+            self._requests += 1
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='pysasl-pool', daemon=True)
+                self._thread.start()
+        self._queue.put((secret, digest, future))
+        return future
+
+    def verify(self, secret: str, digest: str) -> bool:
+        """Verify *secret* against *digest*, waiting for the result.
+
+        Args:
+            secret: The prepared secret string.
+            digest: The hashed digest string.
+
+        """
+        return self.submit(secret, digest).result()
+
+    def _run(self) -> None:
+        get = self._queue.get
+        closing = False
+        while not closing:
+            item = get()
+            if item is None:
+                break
+            elif isinstance(item, _Broken):
+                self._recover(item)
+                continue
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = get(timeout=timeout) if timeout > 0.0 \
+                        else get(block=False)
+                except queue.Empty:
+                    break
+                if item is None:
+                    closing = True
+                    break
+                elif isinstance(item, _Broken):
+                    self._recover(item)
+                else:
+                    batch.append(item)
+            self._dispatch(batch, True)
+
+    def _recover(self, broken: _Broken) -> None:
+        self._restart(broken.executor)
+        if broken.retry:
+            self._dispatch(broken.batch, False)
+        else:
+            self._fail(broken.batch, broken.exc)
+
+    def _dispatch(self, batch: Sequence[_Request], retry: bool) -> None:
+        pairs = [(secret, digest) for secret, digest, _ in batch]
+        try:
+            executor = self._get_executor()
+        except Exception as exc:
+            self._fail(batch, exc)
+            return
+        with self._lock:
+            self._in_flight += len(batch)
+            self._batches += 1
+        try:
+            result = executor.submit(_verify_batch, pairs)
+        except RuntimeError as exc:
+            result = Future()
+            result.set_exception(exc)
+        result.add_done_callback(
+            lambda result: self._complete(batch, retry, executor, result))
+
+    def _complete(self, batch: Sequence[_Request], retry: bool,
+                  executor: ProcessPoolExecutor,
+                  result: 'Future[List[Union[bool, Exception]]]') \
+            -> None:
+        # This may run on a thread of the executor, which must not be used
+        # to shut down or replace it, so broken batches are handed back to
+        # the dispatcher thread.
+        with self._lock:
+            self._in_flight -= len(batch)
+        exc = result.exception()
+        if isinstance(exc, BrokenProcessPool):
+            self._queue.put(_Broken(batch, executor, exc, retry))
+        elif exc is not None:
+            self._fail(batch, exc)
+        else:
+            for (_, _, future), verified in zip(batch, result.result()):
+                if isinstance(verified, Exception):
+                    future.set_exception(verified)
+                else:
+                    future.set_result(verified)
+
+    @classmethod
+    def _fail(cls, batch: Sequence[_Request], exc: BaseException) -> None:
+        for _, _, future in batch:
+            if not future.done():
+                future.set_exception(exc)
+
+    def close(self) -> None:
+        """Stop the pool, after completing the queued requests. Requests
+        whose worker crashed while closing are failed rather than retried.
+
+        """
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+        with self._lock:
+            executor = self._executor
+            self._executor = None
+        if executor is not None:
+            executor.shutdown()
+        while True:
+            try:
+                item = self._queue.get(block=False)
+            except queue.Empty:
+                break
+            if isinstance(item, _Broken):
+                self._fail(item.batch, item.exc)
+            elif item is not None:
+                self._fail([item], RuntimeError('Pool is closed'))
+
+
+class PoolHash(HashInterface):
+    """Wraps a hash implementation so that :meth:`.verify` runs in a
+    :class:`VerifyPool`. Hashing new secrets still happens in the calling
+    process.
+
+    Args:
+        pool: The verification pool.
+        hash: The hash implementation used for :meth:`.hash` and
+            :meth:`.needs_update`, by default the hash of the pool.
+
+    """
+
+    __slots__: Sequence[str] = ['pool', 'hash_impl']
+
+    def __init__(self, pool: VerifyPool,
+                 hash: Optional[HashInterface] = None) -> None:
+        super().__init__()
+        self.pool: Final = pool
+        self.hash_impl: Final = hash or pool.hash
+
+    def copy(self, **kwargs: Any) -> 'PoolHash':
+        return PoolHash(self.pool, self.hash_impl.copy(**kwargs))
+
+    def hash(self, secret: str) -> str:
+        return self.hash_impl.hash(secret)
+
+    @observed(HASH, 'pool')
+    def verify(self, secret: str, hash: str) -> bool:
+        return self.pool.verify(secret, hash)
+
+    def needs_update(self, hash: str) -> bool:
+        return self.hash_impl.needs_update(hash)
+
+    def __repr__(self) -> str:
+        return f'PoolHash({self.hash_impl!r})'
@@ -18,6 +18,8 @@ from typing import Callable
 from typing_extensions import TypeAlias
 from unicodedata import normalize
 
+from .instrument import PREP, observed
+
 __all__ = ['Preparation', 'noprep', 'saslprep']
 
 #: Any callable that prepares a string value to improve the likelihood that
@@ -37,6 +39,7 @@ def noprep(source: str) -> str:
     return source
 
 
+@observed(PREP, 'saslprep')
 def saslprep(source: str, *, allow_unassigned: bool = False) -> str:
     """The SASLprep algorithm defined by `RFC 4013
     <https://datatracker.ietf.org/doc/html/rfc4013>`_.
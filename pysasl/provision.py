@@ -0,0 +1,262 @@
+"""Provisions hashed identities in bulk, preparing and hashing secrets across
+a process pool so that re-provisioning many users is not limited to one
+core.
+
+Identities are read as JSON lines or CSV with ``authcid`` and ``secret``
+fields, and written as JSON lines with ``authcid`` and ``digest`` fields in
+the same order. Because the output is ordered, an interrupted run can resume
+by skipping as many input records as there are complete output lines.
+
+Run with ``python -m pysasl.provision INPUT OUTPUT``.
+
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import (Any, Callable, Iterable, Iterator, Optional, TextIO,
+                    Sequence, Tuple, List, Deque)
+from typing_extensions import Final
+
+from .hashing import HashInterface, BuiltinHash
+from .identity import HashedIdentity
+from .prep import Preparation, saslprep
+
+__all__ = ['read_users', 'write_identities', 'Provisioner', 'main']
+
+
+def read_users(stream: TextIO, format: str = 'jsonl') \
+        -> Iterator[Tuple[str, str]]:
+    """Read the authentication identity and cleartext secret of each user.
+
+    Args:
+        stream: The text stream to read.
+        format: Either ``jsonl`` or ``csv``. CSV input must have a header row.
+
+    Raises:
+        ValueError: The format was unknown or a record was invalid.
+
+    """
+    records: Iterable[Any]
+    if format == 'jsonl':
+        records = (json.loads(line) for line in stream if line.strip())
+    elif format == 'csv':
+        records = csv.DictReader(stream)
+    else:
+        raise ValueError(f'Unknown format: {format}')
+    for record in records:
+        try:
+            authcid, secret = record['authcid'], record['secret']
+        except (TypeError, KeyError) as exc:
+            raise ValueError('Invalid user record') from exc
+        yield authcid, secret
+
+
+def write_identities(stream: TextIO,
+                     identities: Iterable[HashedIdentity]) -> None:
+    """Write each identity as a line of JSON.
+
+    Args:
+        stream: The text stream to write.
+        identities: The hashed identities.
+
+    """
+    for identity in identities:
+        line = json.dumps({'authcid': identity.authcid,
+                           'digest': identity.digest})
+        stream.write(line + '\n')
+
+
+def _hash_chunk(hash: HashInterface, prepare: Preparation,
+                secrets: Sequence[str]) -> List[str]:
+    return [hash.hash(prepare(secret)) for secret in secrets]
+
+
+class Provisioner:
+    """Prepares and hashes the secrets of many users, optionally across the
+    processes of an executor.
+
+    Secrets are submitted in chunks, with at most *max_pending* chunks in
+    flight at once, and identities are produced in the order of their
+    users.
+
+    Args:
+        hash: The hash algorithm, which must be picklable to use a
+            :class:`~concurrent.futures.ProcessPoolExecutor`.
+        executor: Runs the hashing, or ``None`` to hash in the calling
+            thread.
+        chunksize: The number of secrets hashed per task.
+        max_pending: The maximum number of chunks in flight. By default, two
+            for each CPU.
+        prepare: The string preparation function.
+
+    """
+
+    __slots__: Sequence[str] = ['hash', 'executor', 'chunksize',
+                                'max_pending', 'prepare']
+
+    def __init__(self, hash: HashInterface, *,
+                 executor: Optional[Executor] = None, chunksize: int = 16,
+                 max_pending: Optional[int] = None,
+                 prepare: Preparation = saslprep) -> None:
+        super().__init__()
+        if max_pending is None:
+            max_pending = (os.cpu_count() or 1) * 2
+        self.hash: Final = hash
+        self.executor: Final = executor
+        self.chunksize: Final = chunksize
+        self.max_pending: Final = max_pending
+        self.prepare: Final = prepare
+
+    def _submit(self, secrets: Sequence[str]) -> 'Future[List[str]]':
+        executor = self.executor
+        if executor is None:
+            future: 'Future[List[str]]' = Future()
+            future.set_result(_hash_chunk(self.hash, self.prepare, secrets))
+            return future
+        return executor.submit(_hash_chunk, self.hash, self.prepare, secrets)
+
+    def _finish(self, authcids: Sequence[str],
+                future: 'Future[List[str]]') -> Iterator[HashedIdentity]:
+        hash = self.hash
+        prepare = self.prepare
+        for authcid, digest in zip(authcids, future.result()):
+            yield HashedIdentity(authcid, digest, hash=hash, prepare=prepare)
+
+    def run(self, users: Iterable[Tuple[str, str]]) \
+            -> Iterator[HashedIdentity]:
+        """Hash the secret of each user, producing identities in order.
+
+        Args:
+            users: The authentication identity and cleartext secret of each
+                user.
+
+        """
+        pending: Deque[Tuple[Sequence[str], 'Future[List[str]]']] = deque()
+        iterator = iter(users)
+        try:
+            while True:
+                chunk = list(itertools.islice(iterator, self.chunksize))
+                if not chunk:
+                    break
+                authcids = [authcid for authcid, _ in chunk]
+                secrets = [secret for _, secret in chunk]
+                pending.append((authcids, self._submit(secrets)))
+                if len(pending) >= self.max_pending:
+                    yield from self._finish(*pending.popleft())
+            while pending:
+                yield from self._finish(*pending.popleft())
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
+def _resume(path: str) -> int:
+    count = complete = 0
+    try:
+        with open(path, 'rb+') as f:
+            for line in f:
+                if line.endswith(b'\n'):
+                    count += 1
+                    complete += len(line)
+            f.truncate(complete)
+    except FileNotFoundError:
+        return 0
+    return count
+
+
+class _Progress:
+
+    __slots__: Sequence[str] = ['stream', 'every', 'done', '_start',
+                                '_clock']
+
+    def __init__(self, stream: TextIO, every: int, done: int, *,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        super().__init__()
+        self.stream = stream
+        self.every = every
+        self.done = done
+        self._start = clock()
+        self._clock = clock
+
+    def update(self, identities: Iterable[HashedIdentity]) \
+            -> Iterator[HashedIdentity]:
+        count = 0
+        for identity in identities:
+            yield identity
+            count += 1
+            if self.every and count % self.every == 0:
+                self.report(count)
+        self.report(count)
+
+    def report(self, count: int) -> None:
+        elapsed = max(self._clock() - self._start, 1e-9)
+        print(f'{self.done + count} identities, {count / elapsed:.1f}/s',
+              file=self.stream)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Provision identities from the command-line.
+
+    Args:
+        argv: The command-line arguments.
+
+    Returns:
+        The exit status.
+
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m pysasl.provision',
+        description='Hash the secrets of many users across processes.')
+    parser.add_argument('input', metavar='INPUT',
+                        help='the users, as JSON lines or CSV')
+    parser.add_argument('output', metavar='OUTPUT',
+                        help='the hashed identities, as JSON lines')
+    parser.add_argument('--format', choices=['jsonl', 'csv'],
+                        help='the input format, by default from the extension')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='number of worker processes, or 0 for none')
+    parser.add_argument('--chunksize', type=int, default=16,
+                        help='number of secrets hashed per task')
+    parser.add_argument('--max-pending', type=int,
+                        help='maximum number of tasks in flight')
+    parser.add_argument('--hash-name', default='sha256',
+                        choices=['sha1', 'sha256', 'sha512'],
+                        help='BuiltinHash hash name')
+    parser.add_argument('--rounds', type=int, default=500000,
+                        help='BuiltinHash rounds')
+    parser.add_argument('--resume', action='store_true',
+                        help='skip the users already in the output')
+    parser.add_argument('--progress', type=int, default=10000, metavar='N',
+                        help='report progress every N identities')
+    args = parser.parse_args(argv)
+
+    format = args.format
+    if format is None:
+        format = 'csv' if args.input.endswith('.csv') else 'jsonl'
+    done = _resume(args.output) if args.resume else 0
+    hash = BuiltinHash(hash_name=args.hash_name, rounds=args.rounds)
+    executor = ProcessPoolExecutor(args.workers) if args.workers else None
+    try:
+        provisioner = Provisioner(hash, executor=executor,
+                                  chunksize=args.chunksize,
+                                  max_pending=args.max_pending)
+        progress = _Progress(sys.stderr, args.progress, done)
+        with open(args.input, newline='') as in_f, \
+                open(args.output, 'a' if args.resume else 'w') as out_f:
+            users = itertools.islice(read_users(in_f, format), done, None)
+            write_identities(out_f, progress.update(provisioner.run(users)))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""Replaces digests that use outdated hash settings in the background, so
+that raising the rounds or changing the hash name of
+:class:`~pysasl.hashing.BuiltinHash` does not double the cost of the next
+login for each user.
+
+A :class:`RehashQueue` is given to each
+:class:`~pysasl.identity.HashedIdentity`, which submits the secret after a
+successful :meth:`~pysasl.identity.HashedIdentity.compare_secret`. If the
+digest needs updating, a background thread hashes the secret again, at a
+limited rate, and passes the new identity to a callback that stores it.
+
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Optional, Sequence, Tuple, Set
+from typing_extensions import Final
+
+from .hashing import HashInterface
+from .identity import HashedIdentity
+from .prep import Preparation, saslprep
+
+__all__ = ['RehashQueue']
+
+_log = logging.getLogger(__name__)
+
+
+class RehashQueue:
+    """Hashes secrets again in a background thread when their digest needs
+    updating, and stores the result with a callback.
+
+    Submitted secrets are held in memory until they are hashed. Submissions
+    are dropped when the queue is full or an identity is already queued.
+
+    Args:
+        hash: The hash with the current settings.
+        callback: Stores the updated identity.
+        rate: The maximum number of secrets hashed per second.
+        maxsize: The maximum number of queued secrets.
+        prepare: The string preparation function.
+        clock: Returns the current time in seconds.
+
+    """
+
+    __slots__: Sequence[str] = ['hash', 'callback', 'rate', 'prepare',
+                                '_queue', '_pending', '_lock', '_closed',
+                                '_thread', '_clock']
+
+    def __init__(self, hash: HashInterface,
+                 callback: Callable[[HashedIdentity], None], *,
+                 rate: float = 10.0, maxsize: int = 1024,
+                 prepare: Preparation = saslprep,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        super().__init__()
+        self.hash: Final = hash
+        self.callback: Final = callback
+        self.rate: Final = rate
+        self.prepare: Final = prepare
+        self._queue: 'queue.Queue[Optional[Tuple[str, str]]]' = \
+            queue.Queue(maxsize)
+        self._pending: Set[str] = set()
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._clock = clock
+
+    def submit(self, identity: HashedIdentity, secret: str) -> bool:
+        """Queue the secret to be hashed again, if the digest of *identity*
+        needs updating.
+
+        Args:
+            identity: The identity that was verified.
+            secret: The cleartext secret that verified.
+
+        Returns:
+            True if the secret was queued.
+
+        """
+        needs_update = getattr(self.hash, 'needs_update', None)
+        if needs_update is None or not needs_update(identity.digest):
+            return False
+        authcid = identity.authcid
+        with self._lock:
+            if self._closed.is_set() or authcid in self._pending:
+                return False
+            try:
+                self._queue.put_nowait((authcid, secret))
+            except queue.Full:
+                return False
+            self._pending.add(authcid)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='pysasl-rehash', daemon=True)
+                self._thread.start()
+        return True
+
+    def _rehash(self, authcid: str, secret: str) -> None:
+        try:
+            identity = HashedIdentity.create(authcid, secret, hash=self.hash,
+                                             prepare=self.prepare)
+            self.callback(identity)
+        except Exception:
+            _log.exception('Rehash failed: %s', authcid)
+        finally:
+            with self._lock:
+                self._pending.discard(authcid)
+
+    def _run(self) -> None:
+        interval = 1.0 / self.rate
+        clock = self._clock
+        next_time = clock()
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    break
+                delay = next_time - clock()
+                if delay > 0.0 and self._closed.wait(delay):
+                    continue
+                next_time = max(next_time, clock()) + interval
+                self._rehash(*item)
+            finally:
+                self._queue.task_done()
+
+    def join(self) -> None:
+        """Wait until every queued secret has been hashed and stored."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Stop the background thread, discarding any queued secrets."""
+        with self._lock:
+            self._closed.set()
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
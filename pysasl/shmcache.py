@@ -0,0 +1,319 @@
+"""Provides a :class:`~pysasl.cache.VerifiedCache` in shared memory, so that
+a login verified by one pre-forked worker process skips hashing when the
+next connection of that user lands on another worker.
+
+The cache is a fixed-size table in :mod:`multiprocessing.shared_memory`,
+divided into stripes that each have their own lock. Each entry holds only a
+keyed fingerprint of the authentication identity, digest and secret, and its
+expiration time. Entries are found by probing a few slots from the position
+given by the fingerprint, and when none are free, the probed entries are
+evicted with the second-chance, or clock, algorithm.
+
+The cache must be created before the worker processes are forked, so that
+they inherit the locks and the fingerprint key.
+
+So that a restart does not begin with an empty cache, the entries may be
+saved to a snapshot file on shutdown and loaded on startup. The snapshot
+holds only the fingerprints and remaining lifetimes of the entries, along
+with the fingerprinted counters of :class:`~pysasl.invalidation.Generations`,
+and is authenticated with an HMAC-SHA256 tag. The fingerprints are only
+useful to a cache created with the same fingerprint key.
+
+"""
+
+import hashlib
+import hmac
+import mmap
+import multiprocessing
+import os
+import struct
+import tempfile
+import time
+from multiprocessing.shared_memory import SharedMemory
+from typing import TYPE_CHECKING, Optional, Sequence, Tuple, Dict, List
+
+from .cache import Clock, Fingerprinter, VerifiedCache
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .invalidation import Generations
+
+__all__ = ['SharedVerifiedCache']
+
+_entry = struct.Struct('=16sdB7x')
+_fp_size = 16
+_ref_offset = 24
+
+_snapshot_magic = b'PYSASLS1'
+_snapshot_head = struct.Struct('!8sdQII16s')
+_snapshot_counter = struct.Struct('!16sQ')
+_snapshot_entry = struct.Struct('!16sd')
+_snapshot_tag_size = hashlib.sha256().digest_size
+
+
+class SharedVerifiedCache(VerifiedCache):
+    """A :class:`~pysasl.cache.VerifiedCache` shared by the processes forked
+    after it is created.
+
+    Args:
+        slots: The number of entries in the table.
+        stripes: The number of independently locked stripes.
+        ttl: The time-to-live of each entry, in seconds.
+        probes: The number of slots probed for each entry.
+        key: The fingerprint key. By default, a random key is generated
+            and inherited by forked processes.
+        clock: Returns the current time in seconds, which must agree between
+            processes, such as :func:`time.monotonic`.
+
+    """
+
+    __slots__: Sequence[str] = ['ttl', 'slots', 'stripes', 'probes', '_ways',
+                                '_shm', '_buf', '_locks', '_fingerprinter',
+                                '_clock']
+
+    def __init__(self, *, slots: int = 65536, stripes: int = 64,
+                 ttl: float = 300.0, probes: int = 8,
+                 key: Optional[bytes] = None,
+                 clock: Clock = time.monotonic) -> None:
+        super().__init__()
+        ways = max(slots // stripes, 1)
+        self.ttl = ttl
+        self.slots = ways * stripes
+        self.stripes = stripes
+        self.probes = min(probes, ways)
+        self._ways = ways
+        self._shm = SharedMemory(create=True,
+                                 size=self.slots * _entry.size)
+        self._buf: Optional[memoryview] = self._shm.buf
+        self._locks = [multiprocessing.Lock() for _ in range(stripes)]
+        self._fingerprinter = Fingerprinter(key)
+        self._clock = clock
+
+    @property
+    def name(self) -> str:
+        """The name of the shared memory block."""
+        return self._shm.name
+
+    def _locate(self, authcid: str, digest: str, secret: str) \
+            -> Tuple[bytes, int, List[int]]:
+        fingerprint = self._fingerprinter.fingerprint(authcid, digest, secret)
+        stripe, offsets = self._probe(fingerprint)
+        return fingerprint, stripe, offsets
+
+    def _probe(self, fingerprint: bytes) -> Tuple[int, List[int]]:
+        position = int.from_bytes(fingerprint[:8], 'little')
+        stripe = position % self.stripes
+        ways = self._ways
+        first = position // self.stripes
+        base = stripe * ways
+        offsets = [(base + (first + i) % ways) * _entry.size
+                   for i in range(self.probes)]
+        return stripe, offsets
+
+    def _get_buf(self) -> memoryview:
+        buf = self._buf
+        if buf is None:
+            raise ValueError('Cache is closed')
+        return buf
+
+    def contains(self, authcid: str, digest: str, secret: str) -> bool:
+        buf = self._get_buf()
+        fingerprint, stripe, offsets = self._locate(authcid, digest, secret)
+        now = self._clock()
+        with self._locks[stripe]:
+            for offset in offsets:
+                if buf[offset:offset + _fp_size] != fingerprint:
+                    continue
+                _, expires, _ = _entry.unpack_from(buf, offset)
+                if expires <= now:
+                    _entry.pack_into(buf, offset, b'', 0.0, 0)
+                    return False
+                buf[offset + _ref_offset] = 1
+                return True
+        return False
+
+    def add(self, authcid: str, digest: str, secret: str) -> None:
+        buf = self._get_buf()
+        fingerprint, stripe, offsets = self._locate(authcid, digest, secret)
+        now = self._clock()
+        self._store(buf, fingerprint, stripe, offsets, now, now + self.ttl)
+
+    def _store(self, buf: memoryview, fingerprint: bytes, stripe: int,
+               offsets: List[int], now: float, expires: float) -> None:
+        with self._locks[stripe]:
+            victim: Optional[int] = None
+            for offset in offsets:
+                entry_fp, entry_expires, _ = _entry.unpack_from(buf, offset)
+                if entry_fp == fingerprint or entry_expires <= now:
+                    victim = offset
+                    break
+            if victim is None:
+                for offset in offsets:
+                    if not buf[offset + _ref_offset]:
+                        victim = offset
+                        break
+                    buf[offset + _ref_offset] = 0
+                else:
+                    victim = offsets[0]
+            _entry.pack_into(buf, victim, fingerprint, expires, 0)
+
+    def __len__(self) -> int:
+        buf = self._get_buf()
+        now = self._clock()
+        return sum(1 for _, expires, _ in _entry.iter_unpack(buf)
+                   if expires > now)
+
+    def clear(self) -> None:
+        """Remove all entries from the cache."""
+        buf = self._get_buf()
+        ways_size = self._ways * _entry.size
+        for stripe, lock in enumerate(self._locks):
+            start = stripe * ways_size
+            with lock:
+                buf[start:start + ways_size] = bytes(ways_size)
+
+    def _key_check(self) -> bytes:
+        return self._fingerprinter.fingerprint('pysasl.shmcache.snapshot')
+
+    def save(self, path: str, key: bytes, *,
+             generations: Optional['Generations'] = None) -> int:
+        """Write the unexpired entries to a snapshot file, replacing it
+        atomically.
+
+        Args:
+            path: The snapshot file path.
+            key: The key authenticating the snapshot.
+            generations: The generations that the cached entries were stored
+                under, if any.
+
+        Returns:
+            The number of entries saved.
+
+        """
+        buf = self._get_buf()
+        counters: Dict[bytes, int] = {}
+        epoch = 0
+        if generations is not None:
+            epoch, counters = generations.dump(self._fingerprinter)
+        entries: List[bytes] = []
+        now = self._clock()
+        saved_at = time.time()
+        ways_size = self._ways * _entry.size
+        for stripe, lock in enumerate(self._locks):
+            start = stripe * ways_size
+            with lock:
+                data = bytes(buf[start:start + ways_size])
+            for fingerprint, expires, _ in _entry.iter_unpack(data):
+                if expires > now:
+                    entries.append(_snapshot_entry.pack(
+                        fingerprint, expires - now))
+        parts = [_snapshot_head.pack(_snapshot_magic, saved_at, epoch,
+                                     len(counters), len(entries),
+                                     self._key_check())]
+        parts += [_snapshot_counter.pack(fingerprint, count)
+                  for fingerprint, count in counters.items()]
+        parts += entries
+        body = b''.join(parts)
+        tag = hmac.new(key, body, hashlib.sha256).digest()
+        # The temporary file is created with mode 0o600 and a unique name,
+        # so concurrent saves to the same path do not write the same file.
+        snapshot = tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(path) or os.curdir,
+            prefix=os.path.basename(path) + '.', suffix='.tmp', delete=False)
+        try:
+            with snapshot:
+                snapshot.write(body)
+                snapshot.write(tag)
+            os.replace(snapshot.name, path)
+        except BaseException:
+            os.unlink(snapshot.name)
+            raise
+        return len(entries)
+
+    def load(self, path: str, key: bytes, *,
+             generations: Optional['Generations'] = None) -> int:
+        """Add the unexpired entries of a snapshot file written by
+        :meth:`.save`, which is memory-mapped rather than read.
+
+        If *generations* is given, the counters in the snapshot are restored,
+        so that entries invalidated before the snapshot was written remain
+        unreachable. If the epoch was bumped since, no entries are loaded.
+
+        Args:
+            path: The snapshot file path.
+            key: The key authenticating the snapshot.
+            generations: The generations that the cached entries are found
+                under, if any.
+
+        Returns:
+            The number of entries loaded.
+
+        Raises:
+            OSError: The snapshot file could not be opened.
+            ValueError: The snapshot was invalid, or not authenticated by
+                *key*.
+
+        """
+        self._get_buf()
+        with open(path, 'rb') as snapshot:
+            size = os.fstat(snapshot.fileno()).st_size
+            if size < _snapshot_head.size + _snapshot_tag_size:
+                raise ValueError('Invalid snapshot')
+            with mmap.mmap(snapshot.fileno(), 0,
+                           access=mmap.ACCESS_READ) as mapped:
+                return self._load(mapped, key, generations)
+
+    def _load(self, mapped: mmap.mmap, key: bytes,
+              generations: Optional['Generations']) -> int:
+        body_size = len(mapped) - _snapshot_tag_size
+        with memoryview(mapped) as view, view[:body_size] as body:
+            expected = hmac.new(key, body, hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, mapped[body_size:]):
+            raise ValueError('Invalid snapshot')
+        magic, saved_at, epoch, num_counters, num_entries, key_check = \
+            _snapshot_head.unpack_from(mapped)
+        counters_start = _snapshot_head.size
+        entries_start = counters_start + num_counters * _snapshot_counter.size
+        if magic != _snapshot_magic or body_size != entries_start + \
+                num_entries * _snapshot_entry.size:
+            raise ValueError('Invalid snapshot')
+        elif not hmac.compare_digest(key_check, self._key_check()):
+            return 0
+        if generations is not None:
+            counters = dict(
+                _snapshot_counter.unpack_from(mapped, offset)
+                for offset in range(counters_start, entries_start,
+                                    _snapshot_counter.size))
+            if not generations.restore(epoch, counters, self._fingerprinter):
+                return 0
+        buf = self._get_buf()
+        now = self._clock()
+        elapsed = max(time.time() - saved_at, 0.0)
+        loaded = 0
+        for offset in range(entries_start, body_size, _snapshot_entry.size):
+            fingerprint, remaining = \
+                _snapshot_entry.unpack_from(mapped, offset)
+            expires = now + min(remaining, self.ttl) - elapsed
+            if expires > now:
+                stripe, offsets = self._probe(fingerprint)
+                self._store(buf, fingerprint, stripe, offsets, now, expires)
+                loaded += 1
+        return loaded
+
+    def close(self) -> None:
+        """Detach this process from the shared memory block."""
+        if self._buf is not None:
+            self._buf.release()
+            self._buf = None
+            self._shm.close()
+
+    def unlink(self) -> None:
+        """Destroy the shared memory block, once every process is done with
+        it. This should be called only by the process that created the cache.
+
+        """
+        self.close()
+        self._shm.unlink()
+
+    def __repr__(self) -> str:
+        return f'SharedVerifiedCache(slots={self.slots!r}, ' \
+            f'stripes={self.stripes!r}, ttl={self.ttl!r})'
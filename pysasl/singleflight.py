@@ -0,0 +1,219 @@
+"""Provides single-flight coalescing of identical concurrent work, so that
+connections arriving together with the same credentials share one expensive
+verification rather than each running their own.
+
+Results are only shared by calls that overlap in time. Once a computation
+finishes, the next call with the same key starts a new one.
+
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from contextvars import copy_context
+from typing import TypeVar, Generic, Any, Awaitable, Callable, Dict, \
+    Hashable, Optional, Sequence
+
+from .cache import Fingerprinter
+from .creds.plain import PlainCredentials
+from .creds.server import ServerCredentials
+from .hashing import HashInterface
+from .identity import Identity, HashedIdentity
+
+__all__ = ['SingleFlight', 'AsyncSingleFlight', 'SingleFlightHash',
+           'SingleFlightVerifier']
+
+_T = TypeVar('_T')
+
+
+class SingleFlight(Generic[_T]):
+    """Coalesces concurrent calls with the same key, across threads. The first
+    caller runs the function and every caller that arrives before it finishes
+    receives the same result, or exception.
+
+    """
+
+    __slots__: Sequence[str] = ['_lock', '_calls']
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future[_T]] = {}
+
+    def do(self, key: Hashable, func: Callable[[], _T]) -> _T:
+        """Call *func* and return its result, unless a call with the same
+        *key* is already in progress, in which case wait for and return its
+        result instead.
+
+        Args:
+            key: Identifies calls that produce the same result.
+            func: The function to call.
+
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = self._calls[key] = Future()
+        if not leader:
+            return call.result()
+        try:
+            result = func()
+        except BaseException as exc:
+            self._finish(key)
+            call.set_exception(exc)
+            raise
+        self._finish(key)
+        call.set_result(result)
+        return result
+
+    def _finish(self, key: Hashable) -> None:
+        with self._lock:
+            del self._calls[key]
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+
+class AsyncSingleFlight(Generic[_T]):
+    """Coalesces concurrent calls with the same key, across :mod:`asyncio`
+    tasks. The first caller starts the awaitable and every caller that
+    arrives before it finishes receives the same result, or exception.
+
+    A caller that is cancelled does not cancel the shared awaitable.
+
+    """
+
+    __slots__: Sequence[str] = ['_calls']
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._calls: Dict[Hashable, 'asyncio.Future[_T]'] = {}
+
+    async def _run(self, key: Hashable, func: Callable[[], Awaitable[_T]]) \
+            -> _T:
+        try:
+            return await func()
+        finally:
+            del self._calls[key]
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[_T]]) \
+            -> _T:
+        """Await *func* and return its result, unless a call with the same
+        *key* is already in progress, in which case wait for and return its
+        result instead.
+
+        Args:
+            key: Identifies calls that produce the same result.
+            func: Returns the awaitable to run.
+
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = self._calls[key] = asyncio.ensure_future(
+                self._run(key, func))
+        return await asyncio.shield(call)
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+
+class SingleFlightHash(HashInterface):
+    """Wraps another :class:`~pysasl.hashing.HashInterface` so that concurrent
+    calls to :meth:`.verify` with the same digest and secret, from different
+    threads, share one verification. Calls are keyed by the digest, which
+    identifies the stored credentials, and a keyed fingerprint of the secret.
+
+    Args:
+        hash: The hash implementation to wrap.
+        fingerprinter: Produces the fingerprints of the secret.
+
+    """
+
+    __slots__: Sequence[str] = ['_hash', '_fingerprinter', '_flight']
+
+    def __init__(self, hash: HashInterface, *,
+                 fingerprinter: Optional[Fingerprinter] = None) -> None:
+        super().__init__()
+        self._hash = hash
+        self._fingerprinter = fingerprinter or Fingerprinter()
+        self._flight: SingleFlight[bool] = SingleFlight()
+
+    def copy(self, **kwargs: Any) -> 'SingleFlightHash':
+        return SingleFlightHash(self._hash.copy(**kwargs),
+                                fingerprinter=self._fingerprinter)
+
+    def hash(self, secret: str) -> str:
+        return self._hash.hash(secret)
+
+    def verify(self, secret: str, hash: str) -> bool:
+        key = self._fingerprinter.fingerprint(hash, secret)
+        return self._flight.do(key, lambda: self._hash.verify(secret, hash))
+
+    def needs_update(self, hash: str) -> bool:
+        return self._hash.needs_update(hash)
+
+    def __repr__(self) -> str:
+        return f'SingleFlightHash({self._hash!r})'
+
+
+class SingleFlightVerifier:
+    """Verifies credentials in an executor, from :mod:`asyncio` tasks, such
+    that concurrent identical verifications of
+    :class:`~pysasl.creds.plain.PlainCredentials` against a
+    :class:`~pysasl.identity.HashedIdentity` share one verification. Calls
+    are keyed by the identity, its digest, and a keyed fingerprint of the
+    credentials.
+
+    Other credentials and identities are verified without coalescing.
+
+    Unless *executor* is a :class:`~concurrent.futures.ProcessPoolExecutor`,
+    verifications run in a copy of the calling :mod:`contextvars` context, so
+    that they are observed as part of the same trace.
+
+    Args:
+        executor: The executor to run verifications in, or ``None`` for the
+            event loop default.
+        fingerprinter: Produces the fingerprints of the credentials.
+
+    """
+
+    __slots__: Sequence[str] = ['executor', '_fingerprinter', '_flight']
+
+    def __init__(self, *, executor: Optional[Executor] = None,
+                 fingerprinter: Optional[Fingerprinter] = None) -> None:
+        super().__init__()
+        self.executor = executor
+        self._fingerprinter = fingerprinter or Fingerprinter()
+        self._flight: AsyncSingleFlight[bool] = AsyncSingleFlight()
+
+    async def verify(self, creds: ServerCredentials,
+                     identity: Optional[Identity]) -> bool:
+        """Verify *creds* against *identity* in the executor, sharing the
+        result with concurrent identical calls.
+
+        Args:
+            creds: The credentials to verify.
+            identity: The identity being authenticated.
+
+        See Also:
+            :meth:`~pysasl.creds.server.ServerCredentials.verify`
+
+        """
+        loop = asyncio.get_running_loop()
+
+        def run() -> 'asyncio.Future[bool]':
+            if isinstance(self.executor, ProcessPoolExecutor):
+                return loop.run_in_executor(self.executor, creds.verify,
+                                            identity)
+            context = copy_context()
+            return loop.run_in_executor(self.executor, context.run,
+                                        creds.verify, identity)
+
+        if not isinstance(creds, PlainCredentials) \
+                or not isinstance(identity, HashedIdentity):
+            return await run()
+        key = self._fingerprinter.fingerprint(
+            identity.authcid, identity.digest,
+            creds.authcid, creds.authzid, creds.secret)
+        return await self._flight.do(key, run)
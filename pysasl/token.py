@@ -0,0 +1,406 @@
+"""Provides validation of the bearer tokens received by mechanisms such as
+:class:`~pysasl.mechanism.oauth.OAuth2Mechanism`, so that applications do not
+need to repeat expensive validation work for every authentication attempt.
+
+"""
+
+import hmac
+import json
+import time
+import hashlib
+from abc import abstractmethod
+from base64 import urlsafe_b64decode
+from typing import (TYPE_CHECKING, Any, Optional, Mapping, Callable,
+                    Sequence, Tuple, Dict)
+from typing_extensions import Protocol, Final, TypeAlias
+
+from .cache import Clock, TTLCache, StripedTTLCache
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .invalidation import Generations
+
+__all__ = ['TokenValidator', 'AsyncTokenValidator', 'CachedTokenValidator',
+           'JWTKey', 'HMACKey', 'RSAKey', 'load_jwk', 'KeyLoader',
+           'JWTValidator']
+
+_hmac_algs: Mapping[str, str] = {'HS256': 'sha256',
+                                 'HS384': 'sha384',
+                                 'HS512': 'sha512'}
+
+_rsa_algs: Mapping[str, Tuple[str, bytes]] = {
+    'RS256': ('sha256', bytes.fromhex(
+        '3031300d060960864801650304020105000420')),
+    'RS384': ('sha384', bytes.fromhex(
+        '3041300d060960864801650304020205000430')),
+    'RS512': ('sha512', bytes.fromhex(
+        '3051300d060960864801650304020305000440')),
+}
+
+
+def _b64url_decode(data: str) -> bytes:
+    return urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+class TokenValidator(Protocol):
+    """Defines an interface for validating a bearer token, such as the one
+    carried by :exc:`~pysasl.creds.external.ExternalVerificationRequired`.
+
+    """
+
+    __slots__: Sequence[str] = []
+
+    @abstractmethod
+    def validate(self, token: str, authzid: str) -> bool:
+        """Return ``True`` if *token* is valid and authorizes *authzid*.
+
+        Args:
+            token: The bearer token string.
+            authzid: The authorization identity string.
+
+        """
+        ...
+
+    def get_expiration(self, token: str) -> Optional[float]:
+        """Return the time that *token* expires, in seconds since the epoch,
+        if it is known. This is used to avoid caching a result longer than the
+        token is valid.
+
+        Args:
+            token: The bearer token string.
+
+        """
+        return None
+
+
+class AsyncTokenValidator(Protocol):
+    """Defines an interface for validating a bearer token asynchronously, e.g.
+    by sending a request to the authorization server.
+
+    """
+
+    __slots__: Sequence[str] = []
+
+    @abstractmethod
+    async def validate(self, token: str, authzid: str) -> bool:
+        """Return ``True`` if *token* is valid and authorizes *authzid*.
+
+        Args:
+            token: The bearer token string.
+            authzid: The authorization identity string.
+
+        """
+        ...
+
+
+class CachedTokenValidator(TokenValidator):
+    """Wraps another :class:`TokenValidator` and caches its results, keyed by
+    a hash of the token and the authorization identity. Failed validations
+    are cached as well, usually for a shorter time.
+
+    Args:
+        validator: The validator whose results are cached.
+        maxsize: The maximum number of cached results.
+        ttl: The time-to-live of successful results, in seconds.
+        negative_ttl: The time-to-live of failed results, in seconds.
+        stripes: The number of independently locked cache stripes, which
+            reduces waiting when many threads validate tokens at once.
+        generations: Invalidates the cached results of an authorization
+            identity when its generation increases.
+        clock: The function used to get the current time.
+
+    """
+
+    __slots__: Sequence[str] = ['validator', 'negative_ttl', 'generations',
+                                '_cache']
+
+    def __init__(self, validator: TokenValidator, *, maxsize: int = 1024,
+                 ttl: float = 300.0, negative_ttl: float = 30.0,
+                 stripes: int = 1,
+                 generations: Optional['Generations'] = None,
+                 clock: Clock = time.monotonic) -> None:
+        super().__init__()
+        self.validator: Final = validator
+        self.negative_ttl: Final = negative_ttl
+        self.generations: Final = generations
+        self._cache: StripedTTLCache[bytes, bool] = StripedTTLCache(
+            maxsize, ttl, stripes=stripes, clock=clock)
+
+    @classmethod
+    def _key(cls, token: str, authzid: str, generation: str = '') -> bytes:
+        authzid_b = authzid.encode('utf-8')
+        key = hashlib.sha256(len(authzid_b).to_bytes(4, 'big'))
+        key.update(authzid_b)
+        generation_b = generation.encode('ascii')
+        key.update(len(generation_b).to_bytes(4, 'big'))
+        key.update(generation_b)
+        key.update(token.encode('utf-8'))
+        return key.digest()
+
+    def validate(self, token: str, authzid: str) -> bool:
+        generations = self.generations
+        generation = generations.key(authzid) \
+            if generations is not None else ''
+        key = self._key(token, authzid, generation)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        result = self.validator.validate(token, authzid)
+        if result:
+            ttl = self._cache.ttl
+            expiration = self.validator.get_expiration(token)
+            if expiration is not None:
+                ttl = min(ttl, expiration - time.time())
+        else:
+            ttl = self.negative_ttl
+        self._cache.set(key, result, ttl)
+        return result
+
+    def get_expiration(self, token: str) -> Optional[float]:
+        return self.validator.get_expiration(token)
+
+    def __repr__(self) -> str:
+        return f'CachedTokenValidator({self.validator!r})'
+
+
+class JWTKey(Protocol):
+    """Defines an interface for a key that verifies `JWT
+    <https://datatracker.ietf.org/doc/html/rfc7519>`_ signatures.
+
+    """
+
+    __slots__: Sequence[str] = []
+
+    @abstractmethod
+    def verify(self, alg: str, message: bytes, signature: bytes) -> bool:
+        """Return ``True`` if *signature* is valid for *message*.
+
+        Args:
+            alg: The JWS ``alg`` header value.
+            message: The JWS signing input.
+            signature: The decoded signature.
+
+        """
+        ...
+
+
+class HMACKey(JWTKey):
+    """A :class:`JWTKey` for the ``HS256``, ``HS384``, and ``HS512``
+    algorithms.
+
+    Args:
+        secret: The shared secret key.
+
+    """
+
+    __slots__: Sequence[str] = ['_secret']
+
+    def __init__(self, secret: bytes) -> None:
+        super().__init__()
+        self._secret = secret
+
+    def verify(self, alg: str, message: bytes, signature: bytes) -> bool:
+        digestmod = _hmac_algs.get(alg)
+        if digestmod is None:
+            return False
+        expected = hmac.new(self._secret, message, digestmod).digest()
+        return hmac.compare_digest(expected, signature)
+
+    def __repr__(self) -> str:
+        return 'HMACKey(...)'
+
+
+class RSAKey(JWTKey):
+    """A :class:`JWTKey` for the ``RS256``, ``RS384``, and ``RS512``
+    algorithms, which use RSASSA-PKCS1-v1_5 signatures.
+
+    Args:
+        n: The public key modulus.
+        e: The public key exponent.
+
+    """
+
+    __slots__: Sequence[str] = ['n', 'e', '_size']
+
+    def __init__(self, n: int, e: int) -> None:
+        super().__init__()
+        self.n: Final = n
+        self.e: Final = e
+        self._size = (n.bit_length() + 7) // 8
+
+    def verify(self, alg: str, message: bytes, signature: bytes) -> bool:
+        rsa_alg = _rsa_algs.get(alg)
+        size = self._size
+        if rsa_alg is None or len(signature) != size:
+            return False
+        hash_name, digest_info = rsa_alg
+        digest = hashlib.new(hash_name, message).digest()
+        padding_len = size - len(digest_info) - len(digest) - 3
+        if padding_len < 8:
+            return False
+        expected = b''.join((b'\x00\x01', b'\xff' * padding_len, b'\x00',
+                             digest_info, digest))
+        sig_int = int.from_bytes(signature, 'big')
+        if sig_int >= self.n:
+            return False
+        decrypted = pow(sig_int, self.e, self.n).to_bytes(size, 'big')
+        return hmac.compare_digest(expected, decrypted)
+
+    def __repr__(self) -> str:
+        return f'RSAKey(..., {self.e!r})'
+
+
+def load_jwk(jwk: Mapping[str, Any]) -> JWTKey:
+    """Load a :class:`JWTKey` from a `JWK
+    <https://datatracker.ietf.org/doc/html/rfc7517>`_ object.
+
+    Args:
+        jwk: The parsed JSON Web Key.
+
+    Raises:
+        ValueError: The key type is not supported.
+
+    """
+    kty = jwk.get('kty')
+    if kty == 'oct':
+        return HMACKey(_b64url_decode(jwk['k']))
+    elif kty == 'RSA':
+        n = int.from_bytes(_b64url_decode(jwk['n']), 'big')
+        e = int.from_bytes(_b64url_decode(jwk['e']), 'big')
+        return RSAKey(n, e)
+    raise ValueError(f'Unsupported key type: {kty}')
+
+
+#: Loads the :class:`JWTKey` for a ``kid`` header value, or returns ``None``
+#: if the key ID is not recognized.
+KeyLoader: TypeAlias = Callable[[str], Optional[JWTKey]]
+
+
+class JWTValidator(TokenValidator):
+    """A :class:`TokenValidator` that verifies `JWT
+    <https://datatracker.ietf.org/doc/html/rfc7519>`_ access tokens locally,
+    without contacting the authorization server.
+
+    The token is valid if its signature is verified by the key matching its
+    ``kid`` header, its ``exp`` and ``nbf`` claims are satisfied, and its
+    *authzid_claim* matches the authorization identity. Keys that are not in
+    *keys* are loaded with *key_loader*, and the result is cached for
+    *key_ttl* seconds. Key IDs that *key_loader* does not recognize are cached
+    separately, for *miss_ttl* seconds, so that a key published after its
+    first use is found soon after and unknown key IDs do not evict known
+    keys.
+
+    Args:
+        keys: Known keys, by key ID. The empty string is used for tokens with
+            no ``kid`` header.
+        key_loader: Loads unknown keys, e.g. from a JWKS endpoint.
+        key_ttl: The time-to-live of keys loaded by *key_loader*.
+        miss_ttl: The time-to-live of key IDs not recognized by
+            *key_loader*.
+        authzid_claim: The claim that must match the authorization identity.
+        issuer: If given, the required ``iss`` claim.
+        audience: If given, the required ``aud`` claim.
+        leeway: Allowed clock skew, in seconds.
+
+    """
+
+    __slots__: Sequence[str] = ['authzid_claim', 'issuer', 'audience',
+                                'leeway', '_keys', '_key_loader',
+                                '_loaded_keys', '_missed_keys']
+
+    def __init__(self, keys: Optional[Mapping[str, JWTKey]] = None, *,
+                 key_loader: Optional[KeyLoader] = None,
+                 key_ttl: float = 3600.0,
+                 miss_ttl: float = 60.0,
+                 authzid_claim: str = 'sub',
+                 issuer: Optional[str] = None,
+                 audience: Optional[str] = None,
+                 leeway: float = 0.0) -> None:
+        super().__init__()
+        self.authzid_claim: Final = authzid_claim
+        self.issuer: Final = issuer
+        self.audience: Final = audience
+        self.leeway: Final = leeway
+        self._keys = dict(keys or {})
+        self._key_loader = key_loader
+        self._loaded_keys: TTLCache[str, JWTKey] = TTLCache(256, key_ttl)
+        self._missed_keys: TTLCache[str, bool] = TTLCache(256, miss_ttl)
+
+    def _get_key(self, kid: str) -> Optional[JWTKey]:
+        key = self._keys.get(kid)
+        if key is not None or self._key_loader is None:
+            return key
+        key = self._loaded_keys.get(kid)
+        if key is not None or self._missed_keys.get(kid):
+            return key
+        key = self._key_loader(kid)
+        if key is None:
+            self._missed_keys.set(kid, True)
+        else:
+            self._loaded_keys.set(kid, key)
+        return key
+
+    @classmethod
+    def _decode_claims(cls, payload_b64: str) -> Optional[Dict[str, Any]]:
+        try:
+            claims = json.loads(_b64url_decode(payload_b64))
+        except ValueError:
+            return None
+        if not isinstance(claims, dict):
+            return None
+        return claims
+
+    def _decode(self, token: str) -> Optional[Dict[str, Any]]:
+        try:
+            header_b64, payload_b64, signature_b64 = token.split('.')
+            header = json.loads(_b64url_decode(header_b64))
+            signature = _b64url_decode(signature_b64)
+        except ValueError:
+            return None
+        if not isinstance(header, dict):
+            return None
+        key = self._get_key(str(header.get('kid', '')))
+        if key is None:
+            return None
+        message = f'{header_b64}.{payload_b64}'.encode('ascii', 'replace')
+        if not key.verify(str(header.get('alg')), message, signature):
+            return None
+        return self._decode_claims(payload_b64)
+
+    def _check_claims(self, claims: Mapping[str, Any], authzid: str) -> bool:
+        now = time.time()
+        leeway = self.leeway
+        exp = claims.get('exp')
+        if exp is not None and (not isinstance(exp, (int, float))
+                                or exp + leeway <= now):
+            return False
+        nbf = claims.get('nbf')
+        if nbf is not None and (not isinstance(nbf, (int, float))
+                                or nbf - leeway > now):
+            return False
+        if self.issuer is not None and claims.get('iss') != self.issuer:
+            return False
+        if self.audience is not None:
+            aud = claims.get('aud')
+            auds = aud if isinstance(aud, list) else [aud]
+            if self.audience not in auds:
+                return False
+        return claims.get(self.authzid_claim) == authzid
+
+    def validate(self, token: str, authzid: str) -> bool:
+        claims = self._decode(token)
+        if claims is None:
+            return False
+        return self._check_claims(claims, authzid)
+
+    def get_expiration(self, token: str) -> Optional[float]:
+        _, _, rest = token.partition('.')
+        payload_b64, _, _ = rest.partition('.')
+        claims = self._decode_claims(payload_b64)
+        if claims is not None:
+            exp = claims.get('exp')
+            if isinstance(exp, (int, float)):
+                return float(exp)
+        return None
+
+    def __repr__(self) -> str:
+        return f'JWTValidator(..., authzid_claim={self.authzid_claim!r})'
@@ -0,0 +1,257 @@
+"""Provides a :class:`~pysasl.instrument.Observer` that records each observed
+stage of an authentication attempt as a span, in a format compatible with
+`OpenTelemetry <https://opentelemetry.io/docs/specs/otel/trace/api/>`_ but
+without depending on it.
+
+Spans are nested using :mod:`contextvars`, so a stage that begins while
+another is in progress, in the same thread or :mod:`asyncio` task, becomes
+its child. Work handed off to other threads should be run with
+:meth:`contextvars.Context.run` on a copy of the current context to remain in
+the same trace. The span of a verification is the child of the span of the
+mechanism that produced the credentials, which has ended by then.
+
+"""
+
+import json
+import random
+import threading
+import time
+from abc import abstractmethod
+from collections import deque
+from contextvars import ContextVar, Token
+from typing import (Any, Callable, Optional, Union, Sequence, Tuple, List,
+                    Dict, Deque, TextIO)
+from typing_extensions import Final, Protocol, TypeAlias
+
+from .instrument import MECHANISM, VERIFY, Observer
+
+__all__ = ['AttributeValue', 'Span', 'SpanSink', 'MemorySink',
+           'JSONLinesSink', 'Tracer', 'current_span']
+
+#: The types of span attribute values.
+AttributeValue: TypeAlias = Union[str, bool, int, float]
+
+_Begin: TypeAlias = Tuple['Token[Optional[Span]]', Optional['Span']]
+
+
+class Span:
+    """A timed operation within a trace.
+
+    Args:
+        name: The span name.
+        trace_id: The 128-bit identifier of the trace.
+        span_id: The 64-bit identifier of the span.
+        parent_id: The identifier of the parent span, if any.
+        start: The start time, in nanoseconds since the epoch.
+
+    """
+
+    __slots__: Sequence[str] = ['name', 'trace_id', 'span_id', 'parent_id',
+                                'start', 'end', 'attributes', 'error']
+
+    def __init__(self, name: str, trace_id: int, span_id: int,
+                 parent_id: Optional[int], start: int) -> None:
+        super().__init__()
+        self.name: Final = name
+        self.trace_id: Final = trace_id
+        self.span_id: Final = span_id
+        self.parent_id: Final = parent_id
+        self.start: Final = start
+        self.end: Optional[int] = None
+        self.attributes: Dict[str, AttributeValue] = {}
+        self.error = False
+
+    def set_attribute(self, key: str, value: AttributeValue) -> None:
+        """Set an attribute on the span.
+
+        Args:
+            key: The attribute key.
+            value: The attribute value.
+
+        """
+        self.attributes[key] = value
+
+    @classmethod
+    def _attribute_value(cls, value: AttributeValue) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            return {'boolValue': value}
+        elif isinstance(value, int):
+            return {'intValue': str(value)}
+        elif isinstance(value, float):
+            return {'doubleValue': value}
+        else:
+            return {'stringValue': value}
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """Return the span as a JSON-compatible dictionary in the `OTLP
+        <https://opentelemetry.io/docs/specs/otlp/#json-protobuf-encoding>`_
+        span format.
+
+        """
+        ret: Dict[str, Any] = {
+            'traceId': f'{self.trace_id:032x}',
+            'spanId': f'{self.span_id:016x}',
+            'name': self.name,
+            'kind': 1,
+            'startTimeUnixNano': str(self.start),
+            'endTimeUnixNano': str(self.end or self.start),
+            'attributes': [{'key': key, 'value': self._attribute_value(val)}
+                           for key, val in self.attributes.items()],
+            'status': {'code': 2 if self.error else 0}}
+        if self.parent_id is not None:
+            ret['parentSpanId'] = f'{self.parent_id:016x}'
+        return ret
+
+    def __repr__(self) -> str:
+        return f'Span({self.name!r}, {self.trace_id:032x}, ' \
+            f'{self.span_id:016x})'
+
+
+_unsampled: Final = Span('', 0, 0, None, 0)
+_current: ContextVar[Optional[Span]] = ContextVar('_current', default=None)
+_mechanism: ContextVar[Optional[Span]] = ContextVar(
+    '_mechanism', default=None)
+
+
+def current_span() -> Optional[Span]:
+    """Return the sampled span in progress in the current context, if any."""
+    span = _current.get()
+    if span is _unsampled:
+        return None
+    return span
+
+
+class SpanSink(Protocol):
+    """Receives spans as they end."""
+
+    __slots__: Sequence[str] = []
+
+    @abstractmethod
+    def export(self, span: Span) -> None:
+        """Export a span that has ended. This may be called from any thread.
+
+        Args:
+            span: The span to export.
+
+        """
+        ...
+
+
+class MemorySink(SpanSink):
+    """Keeps the most recent spans in memory.
+
+    Args:
+        maxlen: The maximum number of spans kept.
+
+    """
+
+    __slots__: Sequence[str] = ['_spans']
+
+    def __init__(self, maxlen: Optional[int] = 1000) -> None:
+        super().__init__()
+        self._spans: Deque[Span] = deque(maxlen=maxlen)
+
+    @property
+    def spans(self) -> List[Span]:
+        """The spans kept, oldest first."""
+        return list(self._spans)
+
+    def export(self, span: Span) -> None:
+        self._spans.append(span)
+
+    def clear(self) -> None:
+        """Discard all spans."""
+        self._spans.clear()
+
+
+class JSONLinesSink(SpanSink):
+    """Writes each span to a text stream as a line of JSON, in the format
+    returned by :meth:`Span.to_otlp`.
+
+    Args:
+        stream: The text stream to write to.
+
+    """
+
+    __slots__: Sequence[str] = ['stream', '_lock']
+
+    def __init__(self, stream: TextIO) -> None:
+        super().__init__()
+        self.stream: Final = stream
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_otlp(), separators=(',', ':'))
+        with self._lock:
+            self.stream.write(line + '\n')
+
+
+class Tracer(Observer):
+    """An :class:`~pysasl.instrument.Observer` that records each stage as a
+    :class:`Span` named ``pysasl.<stage>``, with the stage label and outcome
+    as attributes, and exports it to *sink* when it ends.
+
+    Sampling decisions are made when a trace begins, and are shared by the
+    spans nested within it. Unsampled traces cost one context variable update
+    per stage.
+
+    Args:
+        sink: Receives spans as they end.
+        sample_rate: The fraction of traces recorded, between 0.0 and 1.0.
+        random: Returns a random float in the interval ``[0.0, 1.0)``.
+        getrandbits: Returns an integer with the given number of random bits.
+        clock: Returns the current time, in nanoseconds since the epoch.
+
+    """
+
+    __slots__: Sequence[str] = ['sink', 'sample_rate', '_random',
+                                '_getrandbits', '_clock']
+
+    def __init__(self, sink: SpanSink, *,
+                 sample_rate: float = 0.01,
+                 random: Callable[[], float] = random.random,
+                 getrandbits: Callable[[int], int] = random.getrandbits,
+                 clock: Callable[[], int] = time.time_ns) -> None:
+        super().__init__()
+        self.sink: Final = sink
+        self.sample_rate: Final = sample_rate
+        self._random = random
+        self._getrandbits = getrandbits
+        self._clock = clock
+
+    def _new_id(self, bits: int) -> int:
+        return self._getrandbits(bits) or 1
+
+    def begin(self, stage: str, label: str) -> _Begin:
+        parent = _current.get()
+        if stage == VERIFY:
+            mechanism = _mechanism.get()
+            if mechanism is not None and (
+                    parent is None or parent.trace_id == mechanism.trace_id):
+                parent = mechanism
+        if parent is _unsampled:
+            return _current.set(_unsampled), None
+        elif parent is None:
+            if self._random() >= self.sample_rate:
+                return _current.set(_unsampled), None
+            trace_id = self._new_id(128)
+            parent_id: Optional[int] = None
+        else:
+            trace_id = parent.trace_id
+            parent_id = parent.span_id
+        span = Span(f'pysasl.{stage}', trace_id, self._new_id(64),
+                    parent_id, self._clock())
+        span.attributes['pysasl.label'] = label
+        return _current.set(span), span
+
+    def end(self, stage: str, label: str, begin: _Begin,
+            outcome: str) -> None:
+        token, span = begin
+        _current.reset(token)
+        if stage == MECHANISM and outcome == 'complete':
+            _mechanism.set(span or _unsampled)
+        if span is not None:
+            span.end = self._clock()
+            span.attributes['pysasl.outcome'] = outcome
+            span.error = outcome == 'error'
+            self.sink.export(span)
@@ -0,0 +1,286 @@
+"""Provides an opt-in recorder of the challenge-response exchanges seen by
+server mechanisms, so that real traffic can be replayed later by
+:mod:`pysasl.bench.replay`.
+
+Identities, secrets and tokens are replaced with stable placeholders before
+anything is written. Placeholders are keyed fingerprints, so the same value
+produces the same placeholder within a recording but cannot be reversed.
+The structure of each response is kept, so malformed responses remain
+malformed when replayed.
+
+"""
+
+import json
+import random
+import re
+import threading
+from base64 import b64encode
+from contextvars import ContextVar
+from typing import (Any, Callable, Mapping, Optional, Sequence, Tuple, List,
+                    Dict, TextIO)
+from typing_extensions import Final, TypeAlias
+
+from .cache import Fingerprinter
+from .creds.server import ServerCredentials
+from .exception import InvalidResponse
+from .instrument import VERIFY, Observer
+from .mechanism import ServerMechanism, ChallengeResponse, MechanismCost
+
+__all__ = ['TranscriptRecorder', 'RecordingMechanism']
+
+_Steps: TypeAlias = List[ChallengeResponse]
+_Sanitizer: TypeAlias = Callable[['_Placeholders', _Steps], _Steps]
+
+
+_xoauth2_pattern = re.compile(br'^user=(.*?)\x01auth=([bB][eE][aA][rR][eE][rR]'
+                              br' )(.*?)\x01\x01$', re.DOTALL)
+_crammd5_pattern = re.compile(br'^(.*) ([^ ]+)$', re.DOTALL)
+
+
+class _Pending:
+
+    __slots__: Sequence[str] = ['recorder', 'name', 'steps', 'done']
+
+    def __init__(self, recorder: 'TranscriptRecorder', name: bytes,
+                 steps: _Steps) -> None:
+        super().__init__()
+        self.recorder: Final = recorder
+        self.name: Final = name
+        self.steps: Final = steps
+        self.done = False
+
+
+_pending: ContextVar[Optional[_Pending]] = ContextVar(
+    '_pending', default=None)
+
+
+class _Placeholders:
+
+    __slots__: Sequence[str] = ['_fingerprinter']
+
+    def __init__(self, fingerprinter: Fingerprinter) -> None:
+        super().__init__()
+        self._fingerprinter = fingerprinter
+
+    def get(self, kind: str, *values: bytes) -> bytes:
+        if not values[-1]:
+            return b''
+        parts = [value.decode('latin-1') for value in values]
+        digest = self._fingerprinter.fingerprint(kind, *parts)
+        return kind.encode('ascii') + b'-' + digest[:8].hex().encode('ascii')
+
+
+def _sanitize_plain(placeholders: _Placeholders, steps: _Steps) -> _Steps:
+    ret: _Steps = []
+    for step in steps:
+        fields = step.response.split(b'\x00')
+        if len(fields) == 3:
+            zid, cid, secret = fields
+            fields = [placeholders.get('user', zid),
+                      placeholders.get('user', cid),
+                      placeholders.get('secret', cid, secret)]
+        else:
+            fields = [placeholders.get('data', field) for field in fields]
+        ret.append(ChallengeResponse(step.challenge, b'\x00'.join(fields)))
+    return ret
+
+
+def _sanitize_login(placeholders: _Placeholders, steps: _Steps) -> _Steps:
+    ret: _Steps = []
+    username = b''
+    for i, step in enumerate(steps):
+        if i == 0:
+            username = step.response
+            response = placeholders.get('user', username)
+        else:
+            response = placeholders.get('secret', username, step.response)
+        ret.append(ChallengeResponse(step.challenge, response))
+    return ret
+
+
+def _sanitize_crammd5(placeholders: _Placeholders, steps: _Steps) -> _Steps:
+    ret: _Steps = []
+    for step in steps:
+        challenge = placeholders.get('challenge', step.challenge)
+        match = _crammd5_pattern.match(step.response)
+        if match is None:
+            response = placeholders.get('data', step.response)
+        else:
+            username, digest = match.groups()
+            response = b' '.join((placeholders.get('user', username),
+                                  placeholders.get('digest', digest)))
+        ret.append(ChallengeResponse(b'<' + challenge + b'>', response))
+    return ret
+
+
+def _sanitize_external(placeholders: _Placeholders, steps: _Steps) -> _Steps:
+    return [ChallengeResponse(step.challenge,
+                              placeholders.get('user', step.response))
+            for step in steps]
+
+
+def _sanitize_xoauth2(placeholders: _Placeholders, steps: _Steps) -> _Steps:
+    ret: _Steps = []
+    for step in steps:
+        match = _xoauth2_pattern.match(step.response)
+        if match is None:
+            response = placeholders.get('data', step.response)
+        else:
+            user, bearer, token = match.groups()
+            response = b''.join((b'user=', placeholders.get('user', user),
+                                 b'\x01auth=', bearer,
+                                 placeholders.get('token', token),
+                                 b'\x01\x01'))
+        ret.append(ChallengeResponse(step.challenge, response))
+    return ret
+
+
+def _sanitize_other(placeholders: _Placeholders, steps: _Steps) -> _Steps:
+    return [ChallengeResponse(placeholders.get('data', step.challenge),
+                              placeholders.get('data', step.response))
+            for step in steps]
+
+
+_sanitizers: Mapping[bytes, _Sanitizer] = {
+    b'PLAIN': _sanitize_plain,
+    b'LOGIN': _sanitize_login,
+    b'CRAM-MD5': _sanitize_crammd5,
+    b'EXTERNAL': _sanitize_external,
+    b'XOAUTH2': _sanitize_xoauth2}
+
+
+class TranscriptRecorder(Observer):
+    """Records sanitized transcripts of authentication attempts to a text
+    stream, one JSON object per line.
+
+    Mechanisms must be wrapped with :meth:`.wrap` to be recorded. The outcome
+    of each attempt is ``invalid`` if the mechanism rejected a response, or
+    else the outcome of verifying the credentials. To observe verification,
+    the recorder must also be set as an observer with
+    :func:`~pysasl.instrument.set_observer`, perhaps with a
+    :class:`~pysasl.instrument.MultiObserver`. Completed attempts that are
+    never verified are recorded with the outcome ``complete`` when the next
+    attempt in the same context begins. Verification offloaded to an
+    executor must be run in a copy of the attempt's context, e.g. with
+    :meth:`contextvars.Context.run`, to be observed.
+
+    Args:
+        stream: The text stream to write to.
+        key: The key used to produce placeholders. By default, a random key is
+            generated that is only valid for this recorder.
+        sample_rate: The fraction of attempts recorded, between 0.0 and 1.0.
+        random: Returns a random float in the interval ``[0.0, 1.0)``.
+
+    """
+
+    __slots__: Sequence[str] = ['stream', 'sample_rate', '_placeholders',
+                                '_random', '_lock']
+
+    def __init__(self, stream: TextIO, *, key: Optional[bytes] = None,
+                 sample_rate: float = 1.0,
+                 random: Callable[[], float] = random.random) -> None:
+        super().__init__()
+        self.stream: Final = stream
+        self.sample_rate: Final = sample_rate
+        self._placeholders = _Placeholders(Fingerprinter(key))
+        self._random = random
+        self._lock = threading.Lock()
+
+    def wrap(self, mechanism: ServerMechanism) -> 'RecordingMechanism':
+        """Wrap a server mechanism so that its attempts are recorded.
+
+        Args:
+            mechanism: The server mechanism.
+
+        """
+        return RecordingMechanism(mechanism, self)
+
+    def _write(self, name: bytes, steps: _Steps, outcome: str) -> None:
+        sanitize = _sanitizers.get(name, _sanitize_other)
+        sanitized = sanitize(self._placeholders, steps)
+        data: Dict[str, Any] = {
+            'mech': name.decode('ascii'),
+            'steps': [[b64encode(step.challenge).decode('ascii'),
+                       b64encode(step.response).decode('ascii')]
+                      for step in sanitized],
+            'outcome': outcome}
+        line = json.dumps(data, separators=(',', ':'))
+        with self._lock:
+            self.stream.write(line + '\n')
+
+    def _take(self, pending: _Pending) -> bool:
+        with self._lock:
+            if pending.done:
+                return False
+            pending.done = True
+            return True
+
+    def _flush_pending(self) -> None:
+        pending = _pending.get()
+        if pending is not None:
+            _pending.set(None)
+            recorder = pending.recorder
+            if recorder._take(pending):
+                recorder._write(pending.name, pending.steps, 'complete')
+
+    def _attempted(self, name: bytes, responses: Sequence[ChallengeResponse],
+                   complete: bool) -> None:
+        self._flush_pending()
+        if self._random() >= self.sample_rate:
+            return
+        steps = list(responses)
+        if complete:
+            _pending.set(_Pending(self, name, steps))
+        else:
+            self._write(name, steps, 'invalid')
+
+    def begin(self, stage: str, label: str) -> None:
+        return None
+
+    def end(self, stage: str, label: str, begin: Any, outcome: str) -> None:
+        if stage != VERIFY:
+            return
+        pending = _pending.get()
+        if pending is not None and pending.recorder is self:
+            _pending.set(None)
+            if self._take(pending):
+                self._write(pending.name, pending.steps, outcome)
+
+
+class RecordingMechanism(ServerMechanism):
+    """Wraps a server mechanism so that its attempts are recorded by a
+    :class:`TranscriptRecorder`.
+
+    Args:
+        mechanism: The server mechanism to wrap.
+        recorder: The transcript recorder.
+
+    """
+
+    __slots__: Sequence[str] = ['mechanism', 'recorder']
+
+    def __init__(self, mechanism: ServerMechanism,
+                 recorder: TranscriptRecorder) -> None:
+        super().__init__(mechanism.name)
+        self.mechanism: Final = mechanism
+        self.recorder: Final = recorder
+
+    @property
+    def cost(self) -> MechanismCost:  # type: ignore[override]
+        return self.mechanism.cost
+
+    def warmup(self) -> None:
+        self.mechanism.warmup()
+
+    def server_attempt(self, responses: Sequence[ChallengeResponse]) \
+            -> Tuple[ServerCredentials, Optional[bytes]]:
+        try:
+            ret = self.mechanism.server_attempt(responses)
+        except InvalidResponse:
+            self.recorder._attempted(self.name, responses, False)
+            raise
+        self.recorder._attempted(self.name, responses, True)
+        return ret
+
+    def __repr__(self) -> str:
+        return f'RecordingMechanism({self.mechanism!r})'
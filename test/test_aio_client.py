@@ -0,0 +1,165 @@
+from __future__ import absolute_import
+
+import asyncio
+import socket
+import unittest
+from typing import List, Tuple
+
+from pysasl import SASLAuth
+from pysasl.aio import Framing, IMAP, SMTP, POP3
+from pysasl.aio.client import ClientAuthenticator
+from pysasl.aio.server import ServerExchange
+from pysasl.creds.client import ClientCredentials
+from pysasl.exception import AuthenticationCancelled
+from pysasl.identity import ClearIdentity
+from pysasl.mechanism.crammd5 import CramMD5Mechanism
+from pysasl.mechanism.login import LoginMechanism
+from pysasl.mechanism.plain import PlainMechanism
+
+_Streams = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+class StandInServer:
+
+    def __init__(self, framing: Framing) -> None:
+        self.framing = framing
+        self.auth = SASLAuth.named([b'PLAIN', b'LOGIN', b'CRAM-MD5'])
+        self.identity = ClearIdentity('testuser', 'testpass')
+        self.active = 0
+        self.max_active = 0
+        self.delay = 0.0
+
+    def _final(self, tag: bytes, success: bool) -> bytes:
+        if self.framing is IMAP:
+            return tag + (b' OK done\r\n' if success else b' NO failed\r\n')
+        elif self.framing is SMTP:
+            return b'235 done\r\n' if success \
+                else b'535-failed\r\n535 failed\r\n'
+        else:
+            return b'+OK done\r\n' if success else b'-ERR failed\r\n'
+
+    async def serve(self, reader: asyncio.StreamReader,
+                    writer: asyncio.StreamWriter) -> None:
+        exchange = ServerExchange(reader, writer, self.framing)
+        parts = (await reader.readline()).rstrip(b'\r\n').split(b' ')
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        tag = b''
+        if self.framing.tagged:
+            tag = parts.pop(0)
+            writer.write(b'* untagged\r\n')
+        mech = self.auth.get_server(parts[1])
+        assert mech is not None
+        initial = parts[2] if len(parts) > 2 else None
+        try:
+            creds, _ = await exchange.authenticate(mech, initial)
+        except AuthenticationCancelled:
+            success = False
+        else:
+            success = creds.verify(self.identity)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        writer.write(self._final(tag, success))
+
+
+class TestClientAuthenticator(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.writers: List[asyncio.StreamWriter] = []
+        self.tasks: List['asyncio.Task[None]'] = []
+
+    async def asyncTearDown(self) -> None:
+        await asyncio.gather(*self.tasks)
+        for writer in self.writers:
+            writer.close()
+
+    async def _connect(self, server: StandInServer) -> _Streams:
+        server_sock, client_sock = socket.socketpair()
+        server_reader, server_writer = await asyncio.open_connection(
+            sock=server_sock)
+        reader, writer = await asyncio.open_connection(sock=client_sock)
+        self.writers += [server_writer, writer]
+        self.tasks.append(asyncio.create_task(
+            server.serve(server_reader, server_writer)))
+        return reader, writer
+
+    async def test_imap_initial_response(self) -> None:
+        server = StandInServer(IMAP)
+        client = ClientAuthenticator(IMAP)
+        reader, writer = await self._connect(server)
+        result = await client.authenticate(
+            reader, writer, PlainMechanism(),
+            ClientCredentials('testuser', 'testpass'), tag=b'a1')
+        self.assertTrue(result)
+        self.assertEqual(b'OK done', result.response)
+        self.assertEqual(0, result.round_trips)
+        self.assertGreater(result.elapsed, 0.0)
+
+    async def test_imap_no_initial_response(self) -> None:
+        server = StandInServer(IMAP)
+        client = ClientAuthenticator(IMAP, initial_response=False)
+        reader, writer = await self._connect(server)
+        result = await client.authenticate(
+            reader, writer, PlainMechanism(),
+            ClientCredentials('testuser', 'badpass'))
+        self.assertFalse(result)
+        self.assertEqual(b'NO failed', result.response)
+        self.assertEqual(1, result.round_trips)
+
+    async def test_smtp(self) -> None:
+        server = StandInServer(SMTP)
+        client = ClientAuthenticator(SMTP)
+        reader, writer = await self._connect(server)
+        result = await client.authenticate(
+            reader, writer, LoginMechanism(),
+            ClientCredentials('testuser', 'testpass'))
+        self.assertTrue(result)
+        self.assertEqual(2, result.round_trips)
+        reader, writer = await self._connect(server)
+        result = await client.authenticate(
+            reader, writer, LoginMechanism(),
+            ClientCredentials('testuser', 'badpass'))
+        self.assertFalse(result)
+        self.assertEqual(b'535 failed', result.response)
+
+    async def test_pop3(self) -> None:
+        server = StandInServer(POP3)
+        client = ClientAuthenticator(POP3)
+        reader, writer = await self._connect(server)
+        result = await client.authenticate(
+            reader, writer, CramMD5Mechanism(),
+            ClientCredentials('testuser', 'testpass'))
+        self.assertTrue(result)
+        self.assertEqual(1, result.round_trips)
+
+    async def test_unexpected_challenge(self) -> None:
+        server_sock, client_sock = socket.socketpair()
+        server_reader, server_writer = await asyncio.open_connection(
+            sock=server_sock)
+        reader, writer = await asyncio.open_connection(sock=client_sock)
+        self.writers += [server_writer, writer]
+        server_writer.write(b'334 !!!\r\n334\r\n334 AA==\r\n535 failed\r\n')
+        client = ClientAuthenticator(SMTP)
+        result = await client.authenticate(
+            reader, writer, PlainMechanism(),
+            ClientCredentials('testuser', 'testpass'))
+        self.assertFalse(result)
+        self.assertEqual(2, result.round_trips)
+        self.assertEqual(b'AUTH PLAIN AHRlc3R1c2VyAHRlc3RwYXNz\r\n',
+                         await server_reader.readline())
+        self.assertEqual([b'*\r\n', b'AHRlc3R1c2VyAHRlc3RwYXNz\r\n',
+                          b'*\r\n'],
+                         [await server_reader.readline() for _ in range(3)])
+
+    async def test_concurrency(self) -> None:
+        server = StandInServer(IMAP)
+        server.delay = 0.01
+        client = ClientAuthenticator(IMAP, concurrency=2)
+        creds = ClientCredentials('testuser', 'testpass')
+        connections = [await self._connect(server) for _ in range(6)]
+        results = await asyncio.gather(*[
+            client.authenticate(reader, writer, PlainMechanism(), creds)
+            for reader, writer in connections])
+        self.assertTrue(all(results))
+        self.assertEqual(2, server.max_active)
+        self.assertGreater(max(result.queued for result in results), 0.0)
@@ -0,0 +1,119 @@
+from __future__ import absolute_import
+
+import asyncio
+import socket
+import unittest
+
+from pysasl.aio import IMAP, SMTP
+from pysasl.aio.server import ServerExchange
+from pysasl.creds.external import ExternalCredentials
+from pysasl.creds.plain import PlainCredentials
+from pysasl.exception import AuthenticationCancelled, InvalidResponse
+from pysasl.mechanism.external import ExternalMechanism
+from pysasl.mechanism.login import LoginMechanism
+from pysasl.mechanism.plain import PlainMechanism
+
+
+class TestServerExchange(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self) -> None:
+        server_sock, client_sock = socket.socketpair()
+        self.reader, self.writer = await asyncio.open_connection(
+            sock=server_sock)
+        self.client_reader, self.client_writer = \
+            await asyncio.open_connection(sock=client_sock)
+
+    async def asyncTearDown(self) -> None:
+        self.writer.close()
+        self.client_writer.close()
+
+    async def test_initial_response(self) -> None:
+        exchange = ServerExchange(self.reader, self.writer, IMAP)
+        creds, final = await exchange.authenticate(
+            PlainMechanism(), b'AHRlc3R1c2VyAHRlc3RwYXNz')
+        self.assertIsInstance(creds, PlainCredentials)
+        self.assertEqual('testuser', creds.authcid)
+        self.assertIsNone(final)
+
+    async def test_empty_initial_response(self) -> None:
+        exchange = ServerExchange(self.reader, self.writer, IMAP)
+        creds, _ = await exchange.authenticate(ExternalMechanism(), b'=')
+        self.assertIsInstance(creds, ExternalCredentials)
+        self.assertEqual('', creds.authzid)
+
+    async def test_challenge(self) -> None:
+        exchange = ServerExchange(self.reader, self.writer, IMAP)
+        self.client_writer.write(b'AHRlc3R1c2VyAHRlc3RwYXNz\r\n')
+        creds, _ = await exchange.authenticate(PlainMechanism())
+        self.assertEqual('testuser', creds.authcid)
+        self.assertEqual(b'+ \r\n', await self.client_reader.readline())
+
+    async def test_multiple_challenges(self) -> None:
+        exchange = ServerExchange(self.reader, self.writer, SMTP)
+        self.client_writer.write(b'dGVzdHVzZXI=\r\ndGVzdHBhc3M=\n')
+        for _ in range(2):
+            creds, _ = await exchange.authenticate(LoginMechanism())
+            self.assertEqual('testuser', creds.authcid)
+            self.assertEqual(b'334 VXNlcm5hbWU6\r\n',
+                             await self.client_reader.readline())
+            self.assertEqual(b'334 UGFzc3dvcmQ6\r\n',
+                             await self.client_reader.readline())
+            self.client_writer.write(b'dGVzdHVzZXI=\r\ndGVzdHBhc3M=\r\n')
+
+    async def test_cancel(self) -> None:
+        exchange = ServerExchange(self.reader, self.writer, IMAP)
+        self.client_writer.write(b'*\r\n')
+        with self.assertRaises(AuthenticationCancelled):
+            await exchange.authenticate(PlainMechanism())
+
+    async def test_invalid(self) -> None:
+        exchange = ServerExchange(self.reader, self.writer, IMAP)
+        with self.assertRaises(InvalidResponse):
+            await exchange.authenticate(PlainMechanism(), b'abc!')
+        self.client_writer.write(b'abc\r\n')
+        with self.assertRaises(InvalidResponse):
+            await exchange.authenticate(PlainMechanism())
+
+    async def test_line_too_long(self) -> None:
+        exchange = ServerExchange(self.reader, self.writer, IMAP,
+                                  max_line=8)
+        self.client_writer.write(b'AHRlc3R1c2VyAHRlc3RwYXNz\r\n')
+        with self.assertRaises(InvalidResponse):
+            await exchange.authenticate(PlainMechanism())
+
+    async def test_line_overrun(self) -> None:
+        reader = asyncio.StreamReader(limit=8)
+        reader.feed_data(b'AHRlc3R1c2VyAHRlc3RwYXNz\r\n')
+        exchange = ServerExchange(reader, self.writer, IMAP, max_line=8)
+        with self.assertRaises(InvalidResponse):
+            await exchange.authenticate(PlainMechanism())
+        reader.feed_data(b'A' * 16)
+        task = asyncio.create_task(exchange.authenticate(PlainMechanism()))
+        while not reader._waiter:  # type: ignore
+            await asyncio.sleep(0)
+        reader.feed_data(b'A' * 16 + b'\r\n*\r\n')
+        with self.assertRaises(InvalidResponse):
+            await task
+        with self.assertRaises(AuthenticationCancelled):
+            await exchange.authenticate(PlainMechanism())
+
+    async def test_line_overrun_eof(self) -> None:
+        reader = asyncio.StreamReader(limit=8)
+        reader.feed_data(b'AHRlc3R1c2VyAHRlc3RwYXNz')
+        reader.feed_eof()
+        exchange = ServerExchange(reader, self.writer, IMAP, max_line=8)
+        with self.assertRaises(asyncio.IncompleteReadError):
+            await exchange.authenticate(PlainMechanism())
+
+    async def test_timeout(self) -> None:
+        exchange = ServerExchange(self.reader, self.writer, IMAP,
+                                  timeout=0.01)
+        with self.assertRaises(asyncio.TimeoutError):
+            await exchange.authenticate(PlainMechanism())
+
+    async def test_eof(self) -> None:
+        exchange = ServerExchange(self.reader, self.writer, IMAP)
+        self.client_writer.write(b'AHRlc3R1')
+        self.client_writer.write_eof()
+        with self.assertRaises(asyncio.IncompleteReadError):
+            await exchange.authenticate(PlainMechanism())
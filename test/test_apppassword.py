@@ -0,0 +1,137 @@
+from __future__ import absolute_import
+
+import unittest
+from typing import Set, Tuple, List
+from unittest.mock import patch
+
+from pysasl.apppassword import AppPassword, AppPasswordIdentity
+from pysasl.cache import VerifiedCache
+from pysasl.creds.plain import PlainCredentials
+from pysasl.hashing import Cleartext
+
+
+class CountingHash(Cleartext):
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls: List[str] = []
+
+    def verify(self, secret: str, hash: str) -> bool:
+        self.calls.append(secret)
+        return super().verify(secret, hash)
+
+
+class SetCache(VerifiedCache):
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.entries: Set[Tuple[str, str, str]] = set()
+
+    def contains(self, authcid: str, digest: str, secret: str) -> bool:
+        return (authcid, digest, secret) in self.entries
+
+    def add(self, authcid: str, digest: str, secret: str) -> None:
+        self.entries.add((authcid, digest, secret))
+
+
+class TestAppPasswordIdentity(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.hash = CountingHash()
+        self.used: List[AppPassword] = []
+        self.identity = AppPasswordIdentity(
+            'user', hash=self.hash, on_used=self.used.append,
+            clock=lambda: 100.0)
+
+    def test_compare_secret(self) -> None:
+        identity = self.identity
+        mail, mail_pw = identity.create('mail')
+        cal, cal_pw = identity.create('calendar')
+        self.assertEqual(2, len(identity.passwords))
+        self.assertTrue(mail.startswith(mail_pw.key_id + '.'))
+        self.assertEqual(100.0, mail_pw.created)
+        self.assertIsNone(mail_pw.last_used)
+        self.assertTrue(identity.compare_secret(cal))
+        self.assertFalse(identity.compare_secret(mail_pw.key_id + '.wrong'))
+        self.assertFalse(identity.compare_secret('unknown.secret'))
+        self.assertFalse(identity.compare_secret('nokeyid'))
+        self.assertEqual([cal, mail_pw.key_id + '.wrong'], self.hash.calls)
+        self.assertEqual(100.0, cal_pw.last_used)
+        self.assertIsNone(mail_pw.last_used)
+        self.assertEqual([cal_pw], self.used)
+        self.assertIsNone(identity.get_clear_secret())
+        self.assertTrue(repr(mail_pw).startswith('AppPassword('))
+        self.assertTrue(repr(identity).startswith('AppPasswordIdentity('))
+
+    def test_revoke(self) -> None:
+        identity = self.identity
+        mail, mail_pw = identity.create('mail')
+        self.assertIs(mail_pw, identity.get(mail_pw.key_id))
+        self.assertTrue(identity.revoke(mail_pw.key_id))
+        self.assertFalse(identity.revoke(mail_pw.key_id))
+        self.assertIsNone(identity.get(mail_pw.key_id))
+        self.assertFalse(identity.compare_secret(mail))
+        self.assertEqual([], self.hash.calls)
+        identity.add(mail_pw)
+        self.assertTrue(identity.compare_secret(mail))
+
+    def test_stored(self) -> None:
+        stored = AppPassword('abcd1234', 'abcd1234.secret', label='mail',
+                             created=1.0, last_used=2.0)
+        identity = AppPasswordIdentity('user', [stored], hash=self.hash)
+        self.assertTrue(identity.compare_authcid('user'))
+        self.assertFalse(identity.compare_authcid('other'))
+        self.assertIs(self.hash, identity.hash)
+        self.assertTrue(identity.compare_secret('abcd1234.secret'))
+        self.assertGreater(stored.last_used or 0.0, 2.0)
+
+    def test_create_collision(self) -> None:
+        identity = self.identity
+        identity.add(AppPassword('00000000', ''))
+        with patch('secrets.token_hex', side_effect=['00000000', '00000001']):
+            _, created = identity.create()
+        self.assertEqual('00000001', created.key_id)
+
+    def test_create_unlocked(self) -> None:
+        identity = self.identity
+        locked: List[bool] = []
+
+        def hash(value: str) -> str:
+            locked.append(identity._lock.locked())
+            if len(locked) == 1:
+                identity.add(AppPassword('00000000', ''))
+            return value
+        with patch.object(self.hash, 'hash', side_effect=hash), \
+                patch('secrets.token_hex',
+                      side_effect=['00000000', '00000001']):
+            _, created = identity.create()
+        self.assertEqual([False, False], locked)
+        self.assertEqual('00000001', created.key_id)
+        self.assertEqual('', identity.passwords[0].digest)
+
+    def test_revoke_while_verifying(self) -> None:
+        identity = self.identity
+        mail, mail_pw = identity.create('mail')
+
+        def verify(secret: str, hash: str) -> bool:
+            identity.revoke(mail_pw.key_id)
+            return True
+        with patch.object(self.hash, 'verify', side_effect=verify):
+            self.assertFalse(identity.compare_secret(mail))
+        self.assertIsNone(mail_pw.last_used)
+        self.assertEqual([], self.used)
+
+    def test_cache(self) -> None:
+        cache = SetCache()
+        identity = AppPasswordIdentity('user', hash=self.hash, cache=cache)
+        mail, _ = identity.create('mail')
+        self.assertFalse(identity.compare_secret(mail + 'x'))
+        self.assertTrue(identity.compare_secret(mail))
+        self.assertTrue(identity.compare_secret(mail))
+        self.assertEqual([mail + 'x', mail], self.hash.calls)
+
+    def test_creds(self) -> None:
+        mail, _ = self.identity.create('mail')
+        self.assertTrue(PlainCredentials('user', mail).verify(self.identity))
+        self.assertFalse(PlainCredentials('user', 'x.y').verify(
+            self.identity))
@@ -0,0 +1,74 @@
+from __future__ import absolute_import
+
+import gc
+import unittest
+
+from pysasl import LoadPolicy, SASLAuth, _builtin_cache
+from pysasl.mechanism import VerifyCost
+from pysasl.mechanism.crammd5 import CramMD5Mechanism
+
+
+class TestSASLAuth(unittest.TestCase):
+
+    def test_named_shares_builtin(self) -> None:
+        sasl1 = SASLAuth.named([b'PLAIN'])
+        sasl2 = SASLAuth.named([b'PLAIN', b'LOGIN'])
+        self.assertIs(sasl1.get_server(b'PLAIN'), sasl2.get_server(b'PLAIN'))
+        self.assertRaises(KeyError, SASLAuth.named, [b'INVALID'])
+
+    def test_warmup(self) -> None:
+        SASLAuth.warmup()
+        builtin = _builtin_cache[SASLAuth]
+        mech = SASLAuth.named([b'CRAM-MD5']).get_server(b'CRAM-MD5')
+        self.assertIsInstance(mech, CramMD5Mechanism)
+        self.assertIs(builtin[b'CRAM-MD5'], mech)
+        SASLAuth.warmup()
+        self.assertIs(builtin, _builtin_cache[SASLAuth])
+
+    def test_warmup_freeze(self) -> None:
+        try:
+            SASLAuth.warmup(freeze=True)
+            self.assertGreater(gc.get_freeze_count(), 0)
+            builtin = _builtin_cache[SASLAuth]
+            sasl1 = SASLAuth.named([b'PLAIN', b'CRAM-MD5'])
+            sasl2 = SASLAuth.named([b'PLAIN', b'CRAM-MD5'])
+            for name in (b'PLAIN', b'CRAM-MD5'):
+                self.assertIs(builtin[name], sasl1.get_server(name))
+                self.assertIs(builtin[name], sasl2.get_server(name))
+            self.assertIs(builtin, _builtin_cache[SASLAuth])
+        finally:
+            gc.unfreeze()
+
+    def test_cost(self) -> None:
+        sasl = SASLAuth.named([b'PLAIN', b'LOGIN', b'CRAM-MD5', b'EXTERNAL',
+                               b'XOAUTH2'])
+        costs = {mech.name: mech.cost for mech in sasl.server_mechanisms}
+        self.assertEqual(VerifyCost.HIGH, costs[b'PLAIN'].verify)
+        self.assertTrue(costs[b'PLAIN'].cleartext)
+        self.assertEqual(2, costs[b'LOGIN'].round_trips)
+        self.assertEqual(VerifyCost.LOW, costs[b'CRAM-MD5'].verify)
+        self.assertFalse(costs[b'CRAM-MD5'].cleartext)
+        self.assertEqual(VerifyCost.NONE, costs[b'EXTERNAL'].verify)
+        self.assertEqual(VerifyCost.NETWORK, costs[b'XOAUTH2'].verify)
+
+    def test_load_policy(self) -> None:
+        load = 0.0
+        names = [b'PLAIN', b'XOAUTH2', b'CRAM-MD5']
+        sasl = SASLAuth.named(names, load_policy=LoadPolicy(lambda: load))
+        self.assertEqual(names, [m.name for m in sasl.server_mechanisms])
+        load = 1.0
+        self.assertEqual([b'CRAM-MD5', b'XOAUTH2', b'PLAIN'],
+                         [m.name for m in sasl.server_mechanisms])
+        self.assertIsNotNone(sasl.get_server(b'PLAIN'))
+
+    def test_load_policy_shed(self) -> None:
+        load = 0.0
+        load_policy = LoadPolicy(lambda: load, threshold=0.5,
+                                 shed_cost=VerifyCost.NETWORK)
+        sasl = SASLAuth.defaults(load_policy=load_policy)
+        self.assertEqual([b'PLAIN', b'LOGIN'],
+                         [m.name for m in sasl.server_mechanisms])
+        load = 0.5
+        self.assertEqual([], sasl.server_mechanisms)
+        self.assertEqual([b'PLAIN', b'LOGIN'],
+                         [m.name for m in sasl.client_mechanisms])
@@ -0,0 +1,109 @@
+from __future__ import absolute_import
+
+import os.path
+import tempfile
+import unittest
+
+from pysasl.bench import Benchmark, Result, Runner, Comparison, Baseline, \
+    _format_results, _format_comparisons
+from pysasl.bench.stats import mann_whitney_u, percentile
+
+
+class FakeTimer:
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def tick(self) -> None:
+        self.now += 0.25
+
+
+class TestStats(unittest.TestCase):
+
+    def test_mann_whitney_u(self) -> None:
+        self.assertAlmostEqual(0.01219, mann_whitney_u(
+            [1, 2, 3, 4, 5], [6, 7, 8, 9, 10]), places=5)
+        self.assertAlmostEqual(0.01219, mann_whitney_u(
+            [6, 7, 8, 9, 10], [1, 2, 3, 4, 5]), places=5)
+        self.assertEqual(1.0, mann_whitney_u([1, 2, 3], [1, 2, 3]))
+        self.assertEqual(1.0, mann_whitney_u([1, 1], [1, 1]))
+        self.assertEqual(1.0, mann_whitney_u([1], [1]))
+        self.assertAlmostEqual(0.0109, mann_whitney_u(
+            [1, 1, 2, 2, 3, 3], [3, 3, 4, 4, 5, 5]), places=4)
+        with self.assertRaises(ValueError):
+            mann_whitney_u([], [1])
+
+    def test_percentile(self) -> None:
+        values = [5.0, 1.0, 4.0, 2.0, 3.0]
+        self.assertEqual(1.0, percentile(values, 0))
+        self.assertEqual(3.0, percentile(values, 50))
+        self.assertEqual(4.6, percentile(values, 90))
+        self.assertEqual(5.0, percentile(values, 100))
+        self.assertEqual(7.0, percentile([7.0], 99))
+        with self.assertRaises(ValueError):
+            percentile([], 50)
+
+
+class TestRunner(unittest.TestCase):
+
+    def test_run(self) -> None:
+        timer = FakeTimer()
+        runner = Runner(repeat=3, min_time=1.0, timer=timer)
+        result, = runner.run_all([Benchmark('tick', timer.tick)])
+        self.assertEqual('tick', result.name)
+        self.assertEqual([0.25, 0.25, 0.25], result.samples)
+        self.assertEqual(0.25, result.median)
+
+
+class TestBaseline(unittest.TestCase):
+
+    def test_save_load(self) -> None:
+        baseline = Baseline.from_results([Result('one', [1.0, 2.0])])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'baseline.json')
+            baseline.save(path)
+            loaded = Baseline.load(path)
+            with open(path, 'w') as f:
+                f.write('[]')
+            with self.assertRaises(ValueError):
+                Baseline.load(path)
+        self.assertEqual({'one': [1.0, 2.0]}, loaded.samples)
+        self.assertIn('python', loaded.metadata)
+        self.assertEqual({}, Baseline({}).metadata)
+
+    def test_compare(self) -> None:
+        baseline = Baseline({'slower': [1.0, 1.1, 1.2, 1.3, 1.4, 1.5],
+                             'faster': [1.0, 1.1, 1.2, 1.3, 1.4, 1.5],
+                             'same': [1.0, 1.1, 1.2, 1.3, 1.4, 1.5],
+                             'small': [1.0, 1.0, 1.0, 1.0, 1.0, 1.0],
+                             'zero': [0.0]})
+        results = [Result('slower', [2.0, 2.1, 2.2, 2.3, 2.4, 2.5]),
+                   Result('faster', [0.5, 0.6, 0.7, 0.8, 0.9, 0.95]),
+                   Result('same', [1.05, 1.15, 1.25, 1.35, 1.45, 1.55]),
+                   Result('small', [1.01, 1.01, 1.01, 1.01, 1.01, 1.01]),
+                   Result('zero', [0.0]),
+                   Result('new', [1.0])]
+        comparisons = baseline.compare(results, alpha=0.05)
+        self.assertEqual(['regression', 'improvement', 'unchanged',
+                          'unchanged', 'unchanged'],
+                         [comp.verdict for comp in comparisons])
+        self.assertAlmostEqual(1.8, comparisons[0].ratio)
+        self.assertEqual(1.0, comparisons[-1].ratio)
+
+    def test_format(self) -> None:
+        results = [Result('short', [1.5, 2.0]), Result('longer', [0.0015]),
+                   Result('tiny', [0.0000015])]
+        self.assertEqual('benchmark  median    min\n'
+                         'short      1.750 s   1.500 s\n'
+                         'longer     1.500 ms  1.500 ms\n'
+                         'tiny       1.500 us  1.500 us',
+                         _format_results(results))
+        comparisons = [Comparison('short', 1.0, 1.5, 0.001, 'regression')]
+        self.assertEqual('benchmark  baseline  current  change  p-value  '
+                         'verdict\n'
+                         'short      1.000 s   1.500 s  +50.0%  0.0010   '
+                         'regression',
+                         _format_comparisons(comparisons))
@@ -0,0 +1,147 @@
+from __future__ import absolute_import
+
+import asyncio
+import contextlib
+import gc
+import io
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+from pysasl import SASLAuth
+from pysasl.aio import SMTP
+from pysasl.bench.load import Population, LoadServer, SessionResult, \
+    LoadGenerator, format_report, main, _parse_mix
+from pysasl.instrument import VERIFY, Observer, set_observer
+from pysasl.mechanism.login import LoginMechanism
+
+
+class Recorder(Observer):
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.ended: List[Tuple[str, str, str]] = []
+
+    def begin(self, stage: str, label: str) -> Any:
+        return None
+
+    def end(self, stage: str, label: str, begin: Any, outcome: str) -> None:
+        self.ended.append((stage, label, outcome))
+
+
+class TestLoad(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.population = Population(3, rounds=1)
+
+    async def test_generator(self) -> None:
+        auth = SASLAuth.named([b'PLAIN', b'CRAM-MD5', b'EXTERNAL',
+                               b'XOAUTH2'])
+        server = LoadServer(auth, self.population, framing=SMTP)
+        host, port = await server.start()
+        try:
+            generator = LoadGenerator(
+                host, port, self.population, framing=SMTP,
+                mix={'PLAIN': 1, 'LOGIN': 1, 'CRAM-MD5': 1, 'EXTERNAL': 1,
+                     'XOAUTH2': 1},
+                failure_ratio=0.5, concurrency=5, seed=1)
+            results = await generator.run(50)
+        finally:
+            await server.close()
+        await server.close()
+        unexpected = {result.mechanism for result in results
+                      if result.unexpected}
+        self.assertEqual({'LOGIN'}, unexpected)
+        self.assertTrue(any(result.success for result in results))
+        self.assertTrue(any(not result.expected for result in results))
+
+    async def test_errors(self) -> None:
+        server = LoadServer(SASLAuth.defaults(), self.population)
+        host, port = await server.start()
+        try:
+            for data in [b'', b'a1 AUTHENTICATE PLAIN !!!\r\n',
+                         b'a1 AUTHENTICATE LOGIN\r\n']:
+                reader, writer = await asyncio.open_connection(host, port)
+                writer.write(data)
+                writer.write_eof()
+                self.assertIn(await reader.readline(),
+                              [b'a1 NO done\r\n', b'* NO done\r\n',
+                               b'+ VXNlcm5hbWU6\r\n'])
+                writer.close()
+        finally:
+            await server.close()
+        generator = LoadGenerator(host, port, self.population,
+                                  mix={'PLAIN': 1})
+        result, = await generator.run(1)
+        self.assertTrue(result.error)
+        self.assertTrue(result.unexpected)
+
+    async def test_timeout(self) -> None:
+        errors: List[Dict[str, Any]] = []
+        asyncio.get_running_loop().set_exception_handler(
+            lambda loop, context: errors.append(context))
+        server = LoadServer(SASLAuth([LoginMechanism()]), self.population,
+                            timeout=0.01)
+        host, port = await server.start()
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(b'a1 AUTHENTICATE LOGIN\r\n')
+            self.assertEqual(b'+ VXNlcm5hbWU6\r\n', await reader.readline())
+            self.assertEqual(b'', await reader.read())
+            writer.close()
+        finally:
+            await server.close()
+        gc.collect()
+        self.assertEqual([], errors)
+
+    async def test_verify_label(self) -> None:
+        server = LoadServer(SASLAuth.named([b'PLAIN']), self.population,
+                            executor=ThreadPoolExecutor(1))
+        host, port = await server.start()
+        recorder = Recorder()
+        set_observer(recorder)
+        try:
+            generator = LoadGenerator(host, port, self.population,
+                                      mix={'PLAIN': 1}, seed=1)
+            await generator.run(3)
+        finally:
+            set_observer(None)
+            await server.close()
+            server.executor.shutdown()  # type: ignore
+        self.assertEqual({'PLAIN'}, {label for stage, label, _
+                                     in recorder.ended if stage == VERIFY})
+
+
+class TestReport(unittest.TestCase):
+
+    def test_format_report(self) -> None:
+        results = [SessionResult('PLAIN', True, True, 0.001, False),
+                   SessionResult('PLAIN', False, False, 0.003, False),
+                   SessionResult('LOGIN', True, False, 0.002, True)]
+        self.assertEqual(
+            'sessions: 3, elapsed: 0.500 s, throughput: 6.0/s\n'
+            '\n'
+            'mechanism  sessions  success  failure  unexpected  p50 ms  '
+            'p95 ms  p99 ms\n'
+            'LOGIN      1         0        1        1           2.000   '
+            '2.000   2.000\n'
+            'PLAIN      2         1        1        0           2.000   '
+            '2.900   2.980\n'
+            'total      3         1        2        1           2.000   '
+            '2.900   2.980', format_report(results, 0.5))
+        self.assertIn('total      0         0        0        0           -'
+                      '       -       -', format_report([], 1.0))
+        self.assertIn('elapsed: 0.000 s, throughput: n/a\n',
+                      format_report(results, 0.0))
+
+    def test_parse_mix(self) -> None:
+        self.assertEqual({'PLAIN': 1.0, 'LOGIN': 2.5},
+                         _parse_mix('plain, login=2.5'))
+
+    def test_main(self) -> None:
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            self.assertEqual(0, main(['--sessions', '20', '--users', '3',
+                                      '--rounds', '1', '--seed', '1',
+                                      '--framing', 'pop3']))
+        self.assertIn('throughput', stdout.getvalue())
@@ -0,0 +1,73 @@
+from __future__ import absolute_import
+
+import contextlib
+import io
+import sys
+import tracemalloc
+import unittest
+from unittest.mock import patch
+
+from pysasl.bench.memory import Footprint, Budget, BUDGETS, measure, suite, \
+    check, main
+
+
+class TestMemory(unittest.TestCase):
+
+    def test_suite(self) -> None:
+        names = [name for name, _ in suite()]
+        self.assertEqual(['PLAIN', 'LOGIN', 'CRAM-MD5', 'EXTERNAL', 'XOAUTH2'],
+                         names)
+        self.assertEqual(sorted(names), sorted(BUDGETS))
+
+    def test_measure(self) -> None:
+        for name, session in suite():
+            footprint = measure(name, session, sessions=10)
+            self.assertEqual(name, footprint.name)
+            self.assertGreater(footprint.peak, 0)
+            self.assertGreater(footprint.size, 0)
+            self.assertGreaterEqual(footprint.blocks, 1)
+        self.assertFalse(tracemalloc.is_tracing())
+        tracemalloc.start()
+        try:
+            measure(name, session, sessions=10)
+            self.assertTrue(tracemalloc.is_tracing())
+        finally:
+            tracemalloc.stop()
+
+    def test_check(self) -> None:
+        budgets = {'one': Budget(peak=100, size=10, blocks=1)}
+        self.assertEqual([], check([Footprint('one', 100, 10.0, 1.0),
+                                    Footprint('two', 999, 99.0, 9.0)],
+                                   budgets))
+        self.assertEqual(['one: peak 101.0 exceeds 100',
+                          'one: blocks 1.5 exceeds 1'],
+                         check([Footprint('one', 101, 10.0, 1.5)], budgets))
+
+    def test_budgets(self) -> None:
+        # only a gross regression fails, since the footprints vary between
+        # Python versions and allocators
+        budgets = {name: Budget(*(limit * 2 for limit in budget))
+                   for name, budget in BUDGETS.items()}
+        if sys.gettrace() is not None:
+            # a tracer allocates on each call, so only the in-flight
+            # footprint is meaningful
+            budgets = {name: budget._replace(peak=sys.maxsize)
+                       for name, budget in budgets.items()}
+        footprints = [measure(name, session, sessions=100)
+                      for name, session in suite()]
+        self.assertEqual([], check(footprints, budgets))
+
+    def test_main(self) -> None:
+        loose = {name: Budget(sys.maxsize, sys.maxsize, sys.maxsize)
+                 for name in BUDGETS}
+        stdout = io.StringIO()
+        with patch.dict(BUDGETS, loose), contextlib.redirect_stdout(stdout):
+            self.assertEqual(0, main(['--sessions', '10']))
+        self.assertIn('CRAM-MD5', stdout.getvalue())
+        stdout = io.StringIO()
+        tight = {'PLAIN': Budget(peak=0, size=0, blocks=0)}
+        with patch.dict(BUDGETS, tight), contextlib.redirect_stdout(stdout):
+            self.assertEqual(1, main(['--sessions', '10',
+                                      '--filter', 'PLAIN']))
+        self.assertNotIn('LOGIN', stdout.getvalue())
+        self.assertIn('PLAIN: size', stdout.getvalue())
@@ -0,0 +1,41 @@
+from __future__ import absolute_import
+
+import contextlib
+import io
+import os.path
+import tempfile
+import unittest
+
+from pysasl.bench import Baseline
+from pysasl.bench.micro import suite, main
+
+
+class TestMicro(unittest.TestCase):
+
+    def test_suite(self) -> None:
+        names = [bench.name for bench in suite(rounds=[1])]
+        self.assertIn('mechanism.CRAM-MD5.server', names)
+        self.assertIn('prep.saslprep.rtl', names)
+        self.assertIn('hashing.BuiltinHash.verify.1', names)
+        for bench in suite(rounds=[1]):
+            bench.func()
+
+    def test_main(self) -> None:
+        args = ['--repeat', '3', '--min-time', '0', '--rounds', '1']
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'baseline.json')
+            stdout = io.StringIO()
+            with contextlib.redirect_stdout(stdout):
+                self.assertEqual(0, main(args + ['--save', path]))
+            self.assertIn('hashing.BuiltinHash.hash.1', stdout.getvalue())
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.assertEqual(0, main(args + ['--baseline', path,
+                                                 '--filter', 'LOGIN',
+                                                 '--alpha', '0']))
+            Baseline({'mechanism.PLAIN.server': [0.0] * 10}).save(path)
+            stdout = io.StringIO()
+            with contextlib.redirect_stdout(stdout):
+                self.assertEqual(1, main(args + ['--baseline', path,
+                                                 '--filter', 'PLAIN',
+                                                 '--repeat', '10']))
+            self.assertIn('regression', stdout.getvalue())
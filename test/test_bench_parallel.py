@@ -0,0 +1,30 @@
+from __future__ import absolute_import
+
+import contextlib
+import io
+import unittest
+
+from pysasl.bench import Runner
+from pysasl.bench.parallel import run, main
+
+
+class TestParallel(unittest.TestCase):
+
+    def test_run(self) -> None:
+        runner = Runner(repeat=2, min_time=0.0)
+        results = run(runner, kinds=['thread', 'interpreter'],
+                      workers=[1, 2], batch=4, rounds=1)
+        self.assertEqual(['parallel.thread.1', 'parallel.thread.2',
+                          'parallel.interpreter.1', 'parallel.interpreter.2'],
+                         [result.name for result in results])
+        with self.assertRaises(ValueError):
+            run(runner, kinds=['unknown'], workers=[1])
+
+    def test_main(self) -> None:
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            self.assertEqual(0, main(['--repeat', '2', '--min-time', '0',
+                                      '--rounds', '1', '--batch', '4',
+                                      '--workers', '1']))
+        self.assertIn('parallel.thread.1', stdout.getvalue())
+        self.assertIn('parallel.process.1', stdout.getvalue())
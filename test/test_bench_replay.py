@@ -0,0 +1,181 @@
+from __future__ import absolute_import
+
+import contextlib
+import io
+import os.path
+import tempfile
+import unittest
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Optional, Sequence, Tuple, List
+
+from pysasl import SASLAuth
+from pysasl.bench import Baseline
+from pysasl.bench.replay import Transcript, load_transcripts, Replayer, main
+from pysasl.creds.client import ClientCredentials
+from pysasl.creds.external import ExternalVerificationRequired
+from pysasl.creds.server import ServerCredentials
+from pysasl.exception import MechanismUnusable
+from pysasl.hashing import BuiltinHash
+from pysasl.identity import Identity, ClearIdentity
+from pysasl.instrument import set_observer
+from pysasl.mechanism import ChallengeResponse, ServerChallenge, \
+    ServerMechanism
+from pysasl.transcript import TranscriptRecorder
+
+
+class UnusableCredentials(ServerCredentials):
+
+    @property
+    def authcid(self) -> str:
+        return 'testuser'
+
+    @property
+    def authzid(self) -> str:
+        return 'testuser'
+
+    def verify(self, identity: Optional[Identity]) -> bool:
+        raise MechanismUnusable('X-UNUSABLE')
+
+
+class UnusableMechanism(ServerMechanism):
+
+    def __init__(self) -> None:
+        super().__init__(b'X-UNUSABLE')
+
+    def server_attempt(self, responses: Sequence[ChallengeResponse]) \
+            -> Tuple[UnusableCredentials, None]:
+        return UnusableCredentials(), None
+
+
+def _record(sessions: Sequence[Tuple[bytes, str, Optional[str]]],
+            executor: Optional[Executor] = None) -> str:
+    stream = io.StringIO()
+    recorder = TranscriptRecorder(stream)
+    auth = SASLAuth.named([b'PLAIN', b'LOGIN', b'CRAM-MD5', b'EXTERNAL',
+                           b'XOAUTH2'])
+    set_observer(recorder)
+    try:
+        for name, secret, verify_secret in sessions:
+            server = recorder.wrap(auth.get_server(name))  # type: ignore
+            client = auth.get_client(name)
+            assert client is not None
+            creds = ClientCredentials('testuser', secret)
+            challenges: List[ServerChallenge] = []
+            responses: List[ChallengeResponse] = []
+            while True:
+                responses.append(client.client_attempt(creds, challenges))
+                try:
+                    result, _ = server.server_attempt(responses[1:])
+                except ServerChallenge as chal:
+                    challenges.append(chal)
+                else:
+                    break
+            if verify_secret is None:
+                continue
+            identity = ClearIdentity('testuser', verify_secret)
+            try:
+                if executor is None:
+                    result.verify(identity)
+                else:
+                    context = copy_context()
+                    executor.submit(context.run, result.verify,
+                                    identity).result()
+            except ExternalVerificationRequired:
+                pass
+    finally:
+        set_observer(None)
+    return stream.getvalue()
+
+
+class TestReplay(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.data = _record([
+            (b'PLAIN', 'testpass', 'testpass'),
+            (b'PLAIN', 'badpass', 'testpass'),
+            (b'LOGIN', 'testpass', 'testpass'),
+            (b'LOGIN', 'testpass', None),
+            (b'CRAM-MD5', 'testpass', 'testpass'),
+            (b'CRAM-MD5', 'badpass', 'testpass'),
+            (b'EXTERNAL', 'testpass', 'testpass'),
+            (b'XOAUTH2', 'token', 'testpass')])
+
+    def test_replay(self) -> None:
+        transcripts = load_transcripts(io.StringIO(self.data + '\n'))
+        self.assertEqual(['success', 'failure', 'success', 'complete',
+                          'success', 'failure', 'external', 'external'],
+                         [transcript.outcome for transcript in transcripts])
+        replayer = Replayer(transcripts, hash=BuiltinHash(rounds=1))
+        self.assertEqual([], replayer.mismatches())
+        names = [bench.name for bench in replayer.benchmarks()]
+        self.assertEqual(['replay.CRAM-MD5', 'replay.EXTERNAL',
+                          'replay.LOGIN', 'replay.PLAIN', 'replay.XOAUTH2'],
+                         names)
+        for bench in replayer.benchmarks():
+            bench.func()
+
+    def test_replay_executor(self) -> None:
+        with ThreadPoolExecutor(1) as executor:
+            data = _record([(b'PLAIN', 'testpass', 'testpass'),
+                            (b'PLAIN', 'badpass', 'testpass'),
+                            (b'CRAM-MD5', 'testpass', 'testpass')],
+                           executor)
+        transcripts = load_transcripts(io.StringIO(data))
+        self.assertEqual(['success', 'failure', 'success'],
+                         [transcript.outcome for transcript in transcripts])
+        replayer = Replayer(transcripts, hash=BuiltinHash(rounds=1))
+        self.assertEqual([], replayer.mismatches())
+
+    def test_replay_outcomes(self) -> None:
+        invalid = Transcript(b'PLAIN', [ChallengeResponse(b'', b'x')],
+                             'success')
+        challenge = Transcript(b'LOGIN', [ChallengeResponse(b'', b'x')],
+                               'success')
+        unusable = Transcript(b'X-UNUSABLE', [], 'error')
+        replayer = Replayer([invalid, challenge, unusable])
+        self.assertEqual([invalid, challenge], replayer.mismatches())
+        self.assertEqual('invalid', replayer.replay(invalid))
+        self.assertEqual('challenge', replayer.replay(challenge))
+        replayer = Replayer([unusable],
+                            auth=SASLAuth([UnusableMechanism()]))
+        self.assertEqual([], replayer.mismatches())
+
+    def test_load_invalid(self) -> None:
+        with self.assertRaises(ValueError):
+            load_transcripts(io.StringIO('[]\n'))
+        with self.assertRaises(ValueError):
+            load_transcripts(io.StringIO('{"mech": "PLAIN"}\n'))
+        with self.assertRaises(ValueError):
+            load_transcripts(io.StringIO(
+                '{"mech": 1, "steps": [], "outcome": "success"}\n'))
+        with self.assertRaises(ValueError):
+            load_transcripts(io.StringIO(
+                '{"mech": "PLAIN", "steps": [[1, 2]], "outcome": ""}\n'))
+
+    def test_main(self) -> None:
+        args = ['--repeat', '3', '--min-time', '0', '--rounds', '1']
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'transcripts.jsonl')
+            baseline = os.path.join(tmp, 'baseline.json')
+            with open(path, 'w') as f:
+                f.write(self.data)
+            stdout = io.StringIO()
+            with contextlib.redirect_stdout(stdout):
+                self.assertEqual(0, main(args + [path, '--save', baseline]))
+            self.assertIn('PLAIN success: 1', stdout.getvalue())
+            self.assertIn('mismatches: 0', stdout.getvalue())
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.assertEqual(0, main(args + [path, '--baseline', baseline,
+                                                 '--alpha', '0']))
+            Baseline({'replay.PLAIN': [0.0] * 10}).save(baseline)
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.assertEqual(1, main(args + [path, '--baseline', baseline,
+                                                 '--repeat', '10']))
+            with open(path, 'a') as f:
+                f.write('{"mech":"PLAIN","steps":[["","eA=="]],'
+                        '"outcome":"success"}\n')
+            stdout = io.StringIO()
+            with contextlib.redirect_stdout(stdout):
+                self.assertEqual(1, main(args + [path]))
+            self.assertIn('mismatches: 1', stdout.getvalue())
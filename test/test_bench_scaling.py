@@ -0,0 +1,35 @@
+from __future__ import absolute_import
+
+import contextlib
+import io
+import unittest
+
+from pysasl.bench.scaling import run, main
+from pysasl.instrument import get_observer
+
+
+class TestScaling(unittest.TestCase):
+
+    def test_run(self) -> None:
+        results = run(['saslprep', 'PlainCredentials.verify'],
+                      threads=[1, 2], iterations=10)
+        self.assertEqual([('saslprep', 1), ('saslprep', 2),
+                          ('PlainCredentials.verify', 1),
+                          ('PlainCredentials.verify', 2)],
+                         [(r.name, r.threads) for r in results])
+        self.assertEqual(1.0, results[0].speedup)
+        self.assertEqual(results[1].speedup / 2, results[1].efficiency)
+        with self.assertRaises(KeyError):
+            run(['unknown'], threads=[1])
+
+    def test_main(self) -> None:
+        args = ['--threads', '1', '2', '--iterations', '10']
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            self.assertEqual(0, main(args + ['--metrics']))
+        self.assertIsNone(get_observer())
+        self.assertIn('GIL enabled:', stdout.getvalue())
+        self.assertIn('PlainCredentials.verify', stdout.getvalue())
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(0, main(args + ['--min-efficiency', '0']))
+            self.assertEqual(1, main(args + ['--min-efficiency', '100']))
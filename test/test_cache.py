@@ -0,0 +1,107 @@
+from __future__ import absolute_import
+
+import unittest
+
+from pysasl.cache import Fingerprinter, TTLCache, StripedTTLCache
+
+
+class FakeClock:
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTTLCache(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+        self.cache: TTLCache[str, int] = TTLCache(2, 10.0, clock=self.clock)
+
+    def test_get_set(self) -> None:
+        self.assertIsNone(self.cache.get('one'))
+        self.cache.set('one', 1)
+        self.assertEqual(1, self.cache.get('one'))
+        self.assertEqual(1, len(self.cache))
+
+    def test_expired(self) -> None:
+        self.cache.set('one', 1)
+        self.cache.set('two', 2, 20.0)
+        self.clock.now = 10.0
+        self.assertIsNone(self.cache.get('one'))
+        self.assertEqual(2, self.cache.get('two'))
+        self.assertEqual(1, len(self.cache))
+
+    def test_zero_ttl(self) -> None:
+        self.cache.set('one', 1, 0.0)
+        self.assertIsNone(self.cache.get('one'))
+
+    def test_evict_least_recent(self) -> None:
+        self.cache.set('one', 1)
+        self.cache.set('two', 2)
+        self.assertEqual(1, self.cache.get('one'))
+        self.cache.set('three', 3)
+        self.assertEqual(1, self.cache.get('one'))
+        self.assertIsNone(self.cache.get('two'))
+        self.assertEqual(3, self.cache.get('three'))
+
+    def test_discard_clear(self) -> None:
+        self.cache.set('one', 1)
+        self.cache.set('two', 2)
+        self.cache.discard('one')
+        self.cache.discard('one')
+        self.assertIsNone(self.cache.get('one'))
+        self.assertEqual(2, self.cache.get('two'))
+        self.cache.clear()
+        self.assertEqual(0, len(self.cache))
+
+
+class TestStripedTTLCache(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+        self.cache: StripedTTLCache[int, int] = StripedTTLCache(
+            8, 10.0, stripes=4, clock=self.clock)
+
+    def test_get_set(self) -> None:
+        self.assertIsNone(self.cache.get(1))
+        for i in range(8):
+            self.cache.set(i, i)
+        self.cache.set(100, 100, 0.0)
+        self.assertIsNone(self.cache.get(100))
+        self.assertEqual(1, self.cache.get(1))
+        self.assertEqual(8, len(self.cache))
+        self.cache.set(9, 9)
+        self.assertIsNone(self.cache.get(5))
+        self.assertEqual(1, self.cache.get(1))
+        self.clock.now = 10.0
+        self.assertIsNone(self.cache.get(1))
+        self.assertEqual('StripedTTLCache(8, 10.0, stripes=4)',
+                         repr(self.cache))
+
+    def test_discard_clear(self) -> None:
+        self.cache.set(1, 1)
+        self.cache.set(2, 2)
+        self.cache.discard(1)
+        self.assertIsNone(self.cache.get(1))
+        self.assertEqual(2, self.cache.get(2))
+        self.cache.clear()
+        self.assertEqual(0, len(self.cache))
+
+
+class TestFingerprinter(unittest.TestCase):
+
+    def test_fingerprint(self) -> None:
+        fingerprinter = Fingerprinter(b'key')
+        self.assertEqual(fingerprinter.fingerprint('a', 'b'),
+                         fingerprinter.fingerprint('a', 'b'))
+        self.assertNotEqual(fingerprinter.fingerprint('a\x00', 'b'),
+                            fingerprinter.fingerprint('a', '\x00b'))
+        self.assertNotEqual(fingerprinter.fingerprint('a', 'b'),
+                            Fingerprinter().fingerprint('a', 'b'))
+
+    def test_key_too_long(self) -> None:
+        with self.assertRaises(ValueError):
+            Fingerprinter(b'x' * 65)
@@ -0,0 +1,54 @@
+from __future__ import absolute_import
+
+import contextlib
+import io
+import itertools
+import unittest
+
+from pysasl.calibrate import Measurement, measure, calibrate, main
+from pysasl.hashing import BuiltinHash
+
+
+class TestCalibrate(unittest.TestCase):
+
+    def test_measure(self) -> None:
+        result = measure(BuiltinHash(rounds=100), concurrency=2,
+                         iterations=3)
+        self.assertIsInstance(result, Measurement)
+        self.assertEqual('sha256', result.hash_name)
+        self.assertEqual(100, result.rounds)
+        self.assertEqual(2, result.concurrency)
+        self.assertGreater(result.latency, 0.0)
+        self.assertGreater(result.throughput, 0.0)
+
+    def test_calibrate(self) -> None:
+        hash = calibrate(0.002, hash=BuiltinHash(hash_name='sha1'),
+                         probe_rounds=1000, min_rounds=100)
+        self.assertEqual('sha1', hash.hash_name)
+        self.assertGreaterEqual(hash.rounds, 100)
+        digits = str(hash.rounds).rstrip('0')
+        self.assertLessEqual(len(digits), 2)
+        hash = calibrate(10.0, min_throughput=1e12, probe_rounds=1000,
+                         min_rounds=500)
+        self.assertEqual(500, hash.rounds)
+        self.assertEqual('sha256', hash.hash_name)
+
+    def test_calibrate_measured(self) -> None:
+        # every verification takes one tick of the timer, whatever the rounds
+        timer = itertools.count(0.0, 0.125).__next__
+        hash = calibrate(0.125, probe_rounds=10000, timer=timer)
+        self.assertEqual(10000, hash.rounds)
+        timer = itertools.count(0.0, 0.125).__next__
+        hash = calibrate(0.0625, probe_rounds=10000, timer=timer)
+        self.assertEqual(1000, hash.rounds)
+
+    def test_main(self) -> None:
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            self.assertEqual(0, main(['--target', '0.001',
+                                      '--hash-name', 'sha1', 'sha512',
+                                      '--iterations', '2']))
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual(3, len(lines))
+        self.assertTrue(lines[1].startswith('sha1 '))
+        self.assertTrue(lines[2].startswith('sha512 '))
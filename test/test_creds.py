@@ -86,6 +86,18 @@ class TestCreds(unittest.TestCase):
             builtin_hash.verify('password',
                                 password_sha256.replace('pbkdf2-', '', 1))
 
+    def test_builtin_needs_update(self) -> None:
+        self.assertFalse(builtin_hash.needs_update(password_sha256))
+        self.assertTrue(builtin_hash.needs_update(password_sha1))
+        self.assertTrue(builtin_hash.copy(rounds=2000)
+                        .needs_update(password_sha256))
+        self.assertTrue(builtin_hash.copy(salt_len=8)
+                        .needs_update(password_sha256))
+        self.assertFalse(Cleartext().needs_update('password'))
+        self.assertTrue(builtin_hash.needs_update('invalid'))
+        self.assertTrue(builtin_hash.needs_update(
+            password_sha256.replace('pbkdf2-', '', 1)))
+
     def test_cleartext_good(self) -> None:
         creds = PlainCredentials('username', 'password')
         stored = ClearIdentity('username', 'password')
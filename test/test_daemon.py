@@ -0,0 +1,289 @@
+from __future__ import absolute_import
+
+import asyncio
+import os.path
+import socket
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional, Tuple
+
+from pysasl import SASLAuth
+from pysasl.creds.plain import PlainCredentials
+from pysasl.daemon import Status, Request, Response, encode_request, \
+    decode_request, encode_response, decode_response, read_frame
+from pysasl.daemon.client import RemoteCredentials, RemoteMechanism, \
+    AuthClient
+from pysasl.daemon.server import AuthServer
+from pysasl.hashing import BuiltinHash
+from pysasl.identity import Identity, ClearIdentity, HashedIdentity
+from pysasl.instrument import VERIFY, Observer, set_observer
+from pysasl.mechanism import ChallengeResponse
+from pysasl.mechanism.crammd5 import CramMD5Mechanism
+from pysasl.mechanism.external import ExternalMechanism
+from pysasl.mechanism.oauth import OAuth2Mechanism
+from pysasl.mechanism.plain import PlainMechanism
+from pysasl.token import TokenValidator
+
+_identities = {
+    'testuser': HashedIdentity.create('testuser', 'testpass',
+                                      hash=BuiltinHash(rounds=1)),
+    'clearuser': ClearIdentity('clearuser', 'testpass')}
+
+
+def _lookup(authcid: str) -> Optional[Identity]:
+    if authcid == 'error':
+        raise KeyError(authcid)
+    return _identities.get(authcid)
+
+
+def _plain(authcid: str, secret: str) -> ChallengeResponse:
+    return ChallengeResponse(b'', b'\x00%b\x00%b' % (authcid.encode(),
+                                                     secret.encode()))
+
+
+def _oauth(token: str) -> ChallengeResponse:
+    return ChallengeResponse(
+        b'', b'user=testuser\x01auth=Bearer %b\x01\x01' % token.encode())
+
+
+def _crammd5(authcid: str, digest: bytes) -> ChallengeResponse:
+    return ChallengeResponse(b'<1.2@example.com>',
+                             authcid.encode() + b' ' + digest)
+
+
+class Recorder(Observer):
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.ended: List[Tuple[str, str, str]] = []
+
+    def begin(self, stage: str, label: str) -> Any:
+        return None
+
+    def end(self, stage: str, label: str, begin: Any, outcome: str) -> None:
+        self.ended.append((stage, label, outcome))
+
+
+class Validator(TokenValidator):
+
+    def validate(self, token: str, authzid: str) -> bool:
+        return token == 'good'  # noqa: S105
+
+
+class TestProtocol(unittest.TestCase):
+
+    def test_request(self) -> None:
+        request = Request(7, b'PLAIN', [_plain('user', 'pass'),
+                                        ChallengeResponse(b'abc', b'')])
+        frame = encode_request(request)
+        self.assertEqual(len(frame) - 4, int.from_bytes(frame[:4], 'big'))
+        decoded = decode_request(frame[4:])
+        self.assertEqual(7, decoded.id)
+        self.assertEqual(b'PLAIN', decoded.mechanism)
+        self.assertEqual([(step.challenge, step.response)
+                          for step in request.responses],
+                         [(step.challenge, step.response)
+                          for step in decoded.responses])
+        with self.assertRaises(ValueError):
+            decode_request(frame[4:-1])
+        with self.assertRaises(ValueError):
+            decode_request(frame[4:] + b'x')
+        with self.assertRaises(ValueError):
+            decode_request(frame[4:8])
+
+    def test_response(self) -> None:
+        for response in [Response(1, Status.SUCCESS, 'user', 'zid'),
+                         Response(2, Status.EXTERNAL, '', 'zid', 'tok'),
+                         Response(3, Status.ERROR)]:
+            frame = encode_response(response)
+            self.assertEqual(response, decode_response(frame[4:]))
+        with self.assertRaises(ValueError):
+            decode_response(frame[4:-1])
+        with self.assertRaises(ValueError):
+            decode_response(frame[4:9])
+        with self.assertRaises(ValueError):
+            decode_response(b'\x00\x00\x00\x01\x63\x00' + b'\x00' * 6)
+
+
+class TestAuthServer(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.server = AuthServer(
+            SASLAuth([PlainMechanism(), CramMD5Mechanism(),
+                      ExternalMechanism(), OAuth2Mechanism()]), _lookup)
+
+    def _verify(self, server: AuthServer, mechanism: bytes,
+                *responses: ChallengeResponse) -> Response:
+        return server.verify(Request(1, mechanism, responses))
+
+    def test_verify(self) -> None:
+        server = self.server
+        self.assertEqual(Response(1, Status.SUCCESS, 'testuser', 'testuser'),
+                         self._verify(server, b'PLAIN',
+                                      _plain('testuser', 'testpass')))
+        self.assertEqual(Status.FAILURE, self._verify(
+            server, b'PLAIN', _plain('testuser', 'wrong')).status)
+        self.assertEqual(Status.FAILURE, self._verify(
+            server, b'PLAIN', _plain('nobody', 'testpass')).status)
+        self.assertEqual(Status.INVALID, self._verify(
+            server, b'PLAIN', ChallengeResponse(b'', b'invalid')).status)
+        self.assertEqual(Status.INVALID,
+                         self._verify(server, b'CRAM-MD5').status)
+        self.assertEqual(Status.UNSUPPORTED,
+                         self._verify(server, b'LOGIN').status)
+        self.assertEqual(Status.UNSUPPORTED, self._verify(
+            server, b'CRAM-MD5', _crammd5('testuser', b'0' * 32)).status)
+        self.assertEqual(Status.FAILURE, self._verify(
+            server, b'CRAM-MD5', _crammd5('clearuser', b'0' * 32)).status)
+
+    def test_verify_external(self) -> None:
+        server = self.server
+        self.assertEqual(Response(1, Status.EXTERNAL, '', 'zid'),
+                         self._verify(server, b'EXTERNAL',
+                                      ChallengeResponse(b'', b'zid')))
+        self.assertEqual(Response(1, Status.EXTERNAL, '', 'testuser', 'good'),
+                         self._verify(server, b'XOAUTH2', _oauth('good')))
+        server = AuthServer(server.auth, _lookup, validator=Validator())
+        self.assertEqual(Status.SUCCESS, self._verify(
+            server, b'XOAUTH2', _oauth('good')).status)
+        self.assertEqual(Status.FAILURE, self._verify(
+            server, b'XOAUTH2', _oauth('bad')).status)
+        self.assertEqual(Status.EXTERNAL, self._verify(
+            server, b'EXTERNAL', ChallengeResponse(b'', b'')).status)
+
+
+class TestRemoteMechanism(unittest.TestCase):
+
+    def test_server_attempt(self) -> None:
+        mech = RemoteMechanism(PlainMechanism())
+        mech.warmup()
+        self.assertEqual(b'PLAIN', mech.name)
+        creds, final = mech.server_attempt([_plain('testuser', 'testpass')])
+        self.assertIsInstance(creds, RemoteCredentials)
+        self.assertIsInstance(creds.creds, PlainCredentials)
+        self.assertIsNone(final)
+        self.assertEqual(b'PLAIN', creds.mechanism)
+        self.assertEqual('testuser', creds.authcid)
+        self.assertEqual('testuser', creds.authzid)
+        self.assertTrue(creds.verify(_identities['testuser']))
+        self.assertEqual(PlainMechanism.cost, mech.cost)
+        self.assertEqual(OAuth2Mechanism.cost,
+                         RemoteMechanism(OAuth2Mechanism()).cost)
+        self.assertTrue(repr(mech).startswith('RemoteMechanism('))
+        self.assertTrue(repr(creds).startswith('RemoteCredentials('))
+
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'requires Unix sockets')
+class TestDaemon(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'auth.sock')
+        self.server = AuthServer(SASLAuth([PlainMechanism()]), _lookup,
+                                 max_pending=2)
+        self.listener = await self.server.start(self.path)
+
+    async def asyncTearDown(self) -> None:
+        self.listener.close()
+        await self.listener.wait_closed()
+        self.tmp.cleanup()
+
+    async def test_pipelined(self) -> None:
+        client = await AuthClient.connect(self.path)
+        mech = RemoteMechanism(PlainMechanism())
+        attempts = [_plain('testuser', 'testpass'),
+                    _plain('testuser', 'wrong'),
+                    _plain('error', 'testpass')] * 4
+        results = await asyncio.gather(*[
+            client.verify(mech.server_attempt([attempt])[0])
+            for attempt in attempts])
+        self.assertEqual([Status.SUCCESS, Status.FAILURE, Status.ERROR] * 4,
+                         [result.status for result in results])
+        self.assertEqual('AuthClient(...)', repr(client))
+        self.assertTrue(repr(self.server).startswith('AuthServer('))
+        await client.close()
+        with self.assertRaises(ConnectionError):
+            await client.request(b'PLAIN', [])
+
+    async def test_oversized_response(self) -> None:
+        self.listener.close()
+        await self.listener.wait_closed()
+        server = AuthServer(SASLAuth([PlainMechanism()]), _lookup,
+                            max_frame=1 << 20)
+        self.listener = await server.start(self.path)
+        client = await AuthClient.connect(self.path)
+        with self.assertLogs('pysasl.daemon.server', 'ERROR'):
+            result = await client.request(
+                b'PLAIN', [_plain('x' * 70000, 'testpass')])
+        self.assertEqual(Response(0, Status.ERROR), result)
+        await client.close()
+
+    async def test_executor_error(self) -> None:
+        self.listener.close()
+        await self.listener.wait_closed()
+        executor = ThreadPoolExecutor(1)
+        executor.shutdown()
+        server = AuthServer(SASLAuth([PlainMechanism()]), _lookup,
+                            executor=executor)
+        self.listener = await server.start(self.path)
+        client = await AuthClient.connect(self.path)
+        with self.assertLogs('pysasl.daemon.server', 'ERROR'):
+            result = await client.request(
+                b'PLAIN', [_plain('testuser', 'testpass')])
+        self.assertEqual(Status.ERROR, result.status)
+        await client.close()
+
+    async def test_verify_label(self) -> None:
+        self.listener.close()
+        await self.listener.wait_closed()
+        executor = ThreadPoolExecutor(1)
+        server = AuthServer(SASLAuth([PlainMechanism()]), _lookup,
+                            executor=executor)
+        self.listener = await server.start(self.path)
+        client = await AuthClient.connect(self.path)
+        recorder = Recorder()
+        set_observer(recorder)
+        try:
+            result = await client.request(
+                b'PLAIN', [_plain('testuser', 'testpass')])
+            creds = PlainCredentials('testuser', 'testpass')
+            await asyncio.get_running_loop().run_in_executor(
+                executor, creds.verify, _identities['testuser'])
+        finally:
+            set_observer(None)
+            await client.close()
+            executor.shutdown()
+        self.assertEqual(Status.SUCCESS, result.status)
+        self.assertEqual(['PLAIN', 'unknown'],
+                         [label for stage, label, _ in recorder.ended
+                          if stage == VERIFY])
+
+    async def test_invalid_request(self) -> None:
+        client = await AuthClient.connect(self.path)
+        client.writer.write(b'\x00\x00\x00\x01x')
+        with self.assertRaises(ConnectionError):
+            await client.request(b'PLAIN', [])
+        await client.close()
+
+    async def test_frame_too_long(self) -> None:
+        reader, writer = await asyncio.open_unix_connection(self.path)
+        writer.write(b'\xff\xff\xff\xff')
+        self.assertEqual(b'', await reader.read())
+        writer.close()
+
+    async def test_invalid_response(self) -> None:
+        server_sock, client_sock = socket.socketpair()
+        server_reader, server_writer = await asyncio.open_connection(
+            sock=server_sock)
+        reader, writer = await asyncio.open_connection(sock=client_sock)
+        client = AuthClient(reader, writer)
+        request = asyncio.ensure_future(client.request(b'PLAIN', []))
+        body = await read_frame(server_reader)
+        self.assertEqual(0, decode_request(body).id)
+        server_writer.write(encode_response(Response(5, Status.SUCCESS)))
+        server_writer.write(b'\x00\x00\x00\x01x')
+        with self.assertRaises(ValueError):
+            await request
+        await client.close()
+        server_writer.close()
@@ -0,0 +1,260 @@
+from __future__ import absolute_import
+
+import threading
+import unittest
+from contextvars import copy_context
+from typing import Any, List, Tuple
+
+from pysasl.creds.external import ExternalVerificationRequired
+from pysasl.exception import InvalidResponse, MechanismUnusable
+from pysasl.hashing import BuiltinHash
+from pysasl.identity import ClearIdentity, HashedIdentity
+from pysasl.instrument import Observer, Metrics, ShardedCounter, \
+    get_observer, set_observer, observe, observed
+from pysasl.mechanism import ChallengeResponse, ServerChallenge
+from pysasl.mechanism.crammd5 import CramMD5Mechanism
+from pysasl.mechanism.external import ExternalMechanism
+from pysasl.mechanism.oauth import OAuth2Mechanism
+from pysasl.mechanism.plain import PlainMechanism
+from pysasl.token import TokenValidator
+
+
+class Recorder(Observer):
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.ended: List[Tuple[str, str, str]] = []
+
+    def begin(self, stage: str, label: str) -> Any:
+        return None
+
+    def end(self, stage: str, label: str, begin: Any, outcome: str) -> None:
+        self.ended.append((stage, label, outcome))
+
+
+class FakeClock:
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        self.now += 0.0625
+        return self.now
+
+
+class Validator(TokenValidator):
+
+    def validate(self, token: str, authzid: str) -> bool:
+        return token in ('good',)
+
+
+class TestInstrument(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.recorder = Recorder()
+        self.assertIsNone(set_observer(self.recorder))
+
+    def tearDown(self) -> None:
+        self.assertIs(self.recorder, set_observer(None))
+        self.assertIsNone(get_observer())
+
+    def test_disabled(self) -> None:
+        set_observer(None)
+        creds, _ = PlainMechanism().server_attempt(
+            [ChallengeResponse(b'', b'\x00user\x00pass')])
+        self.assertTrue(creds.verify(ClearIdentity('user', 'pass')))
+        with observe('identity', 'test'):
+            pass
+        set_observer(self.recorder)
+        self.assertEqual([], self.recorder.ended)
+
+    def test_plain(self) -> None:
+        mech = PlainMechanism()
+        identity = HashedIdentity.create(
+            'user', 'pass', hash=BuiltinHash(rounds=1))
+        self.recorder.ended.clear()
+
+        def run() -> None:
+            with self.assertRaises(ServerChallenge):
+                mech.server_attempt([])
+            creds, _ = mech.server_attempt(
+                [ChallengeResponse(b'', b'\x00user\x00pass')])
+            self.assertTrue(creds.verify(identity))
+            self.assertFalse(creds.verify(None))
+        copy_context().run(run)
+        self.assertEqual([('mechanism', 'PLAIN', 'challenge'),
+                          ('mechanism', 'PLAIN', 'complete'),
+                          ('prep', 'saslprep', 'complete'),
+                          ('prep', 'saslprep', 'complete'),
+                          ('prep', 'saslprep', 'complete'),
+                          ('hash', 'pbkdf2', 'complete'),
+                          ('verify', 'PLAIN', 'success'),
+                          ('verify', 'PLAIN', 'failure')],
+                         self.recorder.ended)
+
+    def test_invalid_and_error(self) -> None:
+        mech = PlainMechanism()
+        with self.assertRaises(InvalidResponse):
+            mech.server_attempt([ChallengeResponse(b'', b'invalid')])
+        with self.assertRaises(UnicodeDecodeError):
+            mech.server_attempt([ChallengeResponse(b'', b'\x00\xff\x00a')])
+        self.assertEqual([('mechanism', 'PLAIN', 'invalid'),
+                          ('mechanism', 'PLAIN', 'error')],
+                         self.recorder.ended)
+
+    def test_verify_error(self) -> None:
+        identity = HashedIdentity.create(
+            'user', 'pass', hash=BuiltinHash(rounds=1))
+        self.recorder.ended.clear()
+
+        def run() -> None:
+            creds, _ = CramMD5Mechanism().server_attempt(
+                [ChallengeResponse(b'<abc>', b'user 0123')])
+            with self.assertRaises(MechanismUnusable):
+                creds.verify(identity)
+        copy_context().run(run)
+        self.assertEqual([('mechanism', 'CRAM-MD5', 'complete'),
+                          ('verify', 'CRAM-MD5', 'error')],
+                         self.recorder.ended)
+
+    def test_external(self) -> None:
+        def run() -> None:
+            creds, _ = ExternalMechanism().server_attempt(
+                [ChallengeResponse(b'', b'user')])
+            with self.assertRaises(ExternalVerificationRequired):
+                creds.verify(None)
+            creds, _ = OAuth2Mechanism().server_attempt(
+                [ChallengeResponse(
+                    b'', b'user=user\x01auth=Bearer good\x01\x01')])
+            self.assertTrue(creds.verify_token(Validator()))
+        copy_context().run(run)
+        self.assertEqual([('mechanism', 'EXTERNAL', 'complete'),
+                          ('verify', 'EXTERNAL', 'external'),
+                          ('mechanism', 'XOAUTH2', 'complete'),
+                          ('token', 'Validator', 'complete')],
+                         self.recorder.ended)
+
+    def test_observe(self) -> None:
+        with observe('identity', 'test'):
+            pass
+        with self.assertRaises(KeyError):
+            with observe('identity', 'test'):
+                raise KeyError()
+
+        @observed('identity', lambda key: key)
+        def lookup(key: str) -> str:
+            raise KeyError(key)
+        with self.assertRaises(KeyError):
+            lookup('other')
+        self.assertEqual([('identity', 'test', 'complete'),
+                          ('identity', 'test', 'error'),
+                          ('identity', 'other', 'error')],
+                         self.recorder.ended)
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_export(self) -> None:
+        metrics = Metrics(namespace='test', buckets=[0.1, 0.01],
+                          clock=FakeClock())
+        for outcome in ['success', 'failure', 'success']:
+            begin = metrics.begin('verify', 'PLAIN')
+            metrics.end('verify', 'PLAIN', begin, outcome)
+        metrics.end('hash', 'a"b\\c\n', metrics.begin('hash', ''), 'complete')
+        metrics.end('hash', 'slow', -1.0, 'complete')
+        self.assertEqual(2, metrics.get_count('verify', 'PLAIN', 'success'))
+        self.assertEqual(0, metrics.get_count('verify', 'PLAIN', 'error'))
+        self.assertEqual(
+            '# HELP test_stage_duration_seconds Time spent in each '
+            'authentication stage.\n'
+            '# TYPE test_stage_duration_seconds histogram\n'
+            'test_stage_duration_seconds_bucket{stage="hash",'
+            'label="a\\"b\\\\c\\n",le="0.01"} 0\n'
+            'test_stage_duration_seconds_bucket{stage="hash",'
+            'label="a\\"b\\\\c\\n",le="0.1"} 1\n'
+            'test_stage_duration_seconds_bucket{stage="hash",'
+            'label="a\\"b\\\\c\\n",le="+Inf"} 1\n'
+            'test_stage_duration_seconds_sum{stage="hash",'
+            'label="a\\"b\\\\c\\n"} 0.0625\n'
+            'test_stage_duration_seconds_count{stage="hash",'
+            'label="a\\"b\\\\c\\n"} 1\n'
+            'test_stage_duration_seconds_bucket{stage="hash",'
+            'label="slow",le="0.01"} 0\n'
+            'test_stage_duration_seconds_bucket{stage="hash",'
+            'label="slow",le="0.1"} 0\n'
+            'test_stage_duration_seconds_bucket{stage="hash",'
+            'label="slow",le="+Inf"} 1\n'
+            'test_stage_duration_seconds_sum{stage="hash",'
+            'label="slow"} 1.5625\n'
+            'test_stage_duration_seconds_count{stage="hash",'
+            'label="slow"} 1\n'
+            'test_stage_duration_seconds_bucket{stage="verify",'
+            'label="PLAIN",le="0.01"} 0\n'
+            'test_stage_duration_seconds_bucket{stage="verify",'
+            'label="PLAIN",le="0.1"} 3\n'
+            'test_stage_duration_seconds_bucket{stage="verify",'
+            'label="PLAIN",le="+Inf"} 3\n'
+            'test_stage_duration_seconds_sum{stage="verify",'
+            'label="PLAIN"} 0.1875\n'
+            'test_stage_duration_seconds_count{stage="verify",'
+            'label="PLAIN"} 3\n'
+            '# HELP test_stage_outcomes_total Outcomes of each '
+            'authentication stage.\n'
+            '# TYPE test_stage_outcomes_total counter\n'
+            'test_stage_outcomes_total{stage="hash",label="a\\"b\\\\c\\n",'
+            'outcome="complete"} 1\n'
+            'test_stage_outcomes_total{stage="hash",label="slow",'
+            'outcome="complete"} 1\n'
+            'test_stage_outcomes_total{stage="verify",label="PLAIN",'
+            'outcome="failure"} 1\n'
+            'test_stage_outcomes_total{stage="verify",label="PLAIN",'
+            'outcome="success"} 2\n',
+            metrics.export())
+        metrics.reset()
+        self.assertEqual(0, metrics.get_count('verify', 'PLAIN', 'success'))
+
+    def test_threads(self) -> None:
+        metrics = Metrics(namespace='test', buckets=[0.1],
+                          clock=FakeClock())
+
+        def worker() -> None:
+            for _ in range(100):
+                metrics.end('verify', 'PLAIN', metrics.begin('verify', ''),
+                            'success')
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(400, metrics.get_count('verify', 'PLAIN', 'success'))
+        self.assertIn('test_stage_duration_seconds_count{stage="verify",'
+                      'label="PLAIN"} 400\n', metrics.export())
+        metrics.reset()
+        self.assertEqual(0, metrics.get_count('verify', 'PLAIN', 'success'))
+        self.assertNotIn('_count{', metrics.export())
+
+
+class TestShardedCounter(unittest.TestCase):
+
+    def test_add(self) -> None:
+        counter: ShardedCounter[str] = ShardedCounter()
+        self.assertEqual(0, counter.get('one'))
+
+        def worker() -> None:
+            for _ in range(100):
+                counter.add('one')
+            counter.add('two', 5)
+            counter.add('two', -2)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        counter.add('one')
+        self.assertEqual(401, counter.get('one'))
+        self.assertEqual({'one': 401, 'two': 12}, counter.totals())
+        counter.clear()
+        self.assertEqual(0, counter.get('one'))
+        self.assertEqual({}, counter.totals())
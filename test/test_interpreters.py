@@ -0,0 +1,63 @@
+from __future__ import absolute_import
+
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from pysasl.hashing import BuiltinHash, Cleartext
+from pysasl import interpreters
+from pysasl.interpreters import SUBINTERPRETERS, new_executor, \
+    ParallelVerifier
+
+
+class TestParallelVerifier(unittest.TestCase):
+
+    def test_new_executor(self) -> None:
+        with new_executor(2, subinterpreters=False) as executor:
+            self.assertIsInstance(executor, ThreadPoolExecutor)
+
+    @unittest.skipIf(SUBINTERPRETERS, 'subinterpreters are available')
+    @patch.object(interpreters, '_warned', False)
+    def test_new_executor_fallback(self) -> None:
+        with self.assertLogs('pysasl.interpreters', 'WARNING') as logs:
+            executor = new_executor(2)
+            new_executor(2).shutdown()
+        with executor:
+            self.assertIsInstance(executor, ThreadPoolExecutor)
+        self.assertEqual(1, len(logs.records))
+
+    @unittest.skipUnless(SUBINTERPRETERS, 'subinterpreters are unavailable')
+    def test_subinterpreters(self) -> None:
+        with new_executor(2) as executor:
+            self.assertNotIsInstance(executor, ThreadPoolExecutor)
+            hash = BuiltinHash(rounds=1)
+            digest = hash.hash('pass word', b'\x00' * 16)
+            verifier = ParallelVerifier(hash, executor=executor,
+                                        chunksize=1)
+            self.assertEqual([True, False, True], verifier.verify([
+                ('pass\u00a0word', digest),
+                ('wrong', digest),
+                ('pass word\u00ad', digest)]))
+
+    def test_verify(self) -> None:
+        hash = BuiltinHash(rounds=1)
+        digest = hash.hash('pass word', b'\x00' * 16)
+        verifier = ParallelVerifier(hash, chunksize=2)
+        try:
+            self.assertEqual([True, False, True],
+                             verifier.verify([
+                                 ('pass\u00a0word', digest),
+                                 ('wrong', digest),
+                                 ('pass word\u00ad', digest)]))
+            self.assertEqual([], verifier.verify([]))
+        finally:
+            verifier.close()
+
+    def test_executor(self) -> None:
+        with ThreadPoolExecutor(2) as executor:
+            verifier = ParallelVerifier(Cleartext(), executor=executor,
+                                        prepare=str.lower)
+            self.assertEqual([True, False], verifier.verify(
+                [('PASS', 'pass'), ('pass', 'PASS')]))
+            verifier.close()
+            self.assertEqual([True], verifier.verify([('a', 'a')]))
@@ -0,0 +1,241 @@
+from __future__ import absolute_import
+
+import asyncio
+import json
+from base64 import b64encode
+import unittest
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs
+
+from pysasl.introspection import IntrospectionError, IntrospectionClient
+
+
+class StandInServer:
+
+    def __init__(self) -> None:
+        self.mode = 'normal'
+        self.delay = 0.0
+        self.connections = 0
+        self.requests: List[List[str]] = []
+        self.headers: Dict[str, str] = {}
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.port = 0
+
+    async def start(self) -> None:
+        self.server = await asyncio.start_server(
+            self._handle, '127.0.0.1', 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        assert self.server is not None
+        self.server.close()
+        await self.server.wait_closed()
+
+    def _result(self, token: str) -> Dict[str, Any]:
+        if token.startswith('good'):
+            return {'active': True, 'username': 'user'}
+        return {'active': False}
+
+    def _response(self, body: bytes, status: str = '200 OK',
+                  extra: str = '') -> bytes:
+        mode = self.mode
+        if mode == 'chunked':
+            chunks = b''.join(b'%x\r\n%b\r\n' % (1, body[i:i + 1])
+                              for i in range(len(body)))
+            return (f'HTTP/1.1 {status}\r\nTransfer-Encoding: chunked\r\n'
+                    f'{extra}\r\n').encode('ascii') + chunks + b'0\r\n\r\n'
+        elif mode == 'eof':
+            return f'HTTP/1.0 {status}\r\n\r\n'.encode('ascii') + body
+        elif mode == 'bad-status':
+            return b'garbage\r\n\r\n'
+        elif mode == 'truncated':
+            return b'HTTP/1.1 200 OK\r\nContent-Le'
+        return (f'HTTP/1.1 {status}\r\nContent-Length: {len(body)}\r\n'
+                f'{extra}\r\n').encode('ascii') + body
+
+    async def _handle(self, reader: asyncio.StreamReader,
+                      writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers: Dict[str, str] = {}
+                while True:
+                    line = (await reader.readline()).rstrip(b'\r\n')
+                    if not line:
+                        break
+                    name, _, value = line.decode('ascii').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                self.headers = headers
+                body = await reader.readexactly(
+                    int(headers['content-length']))
+                tokens = parse_qs(body.decode('ascii'))['token']
+                self.requests.append(tokens)
+                await asyncio.sleep(self.delay)
+                if self.mode == 'error':
+                    writer.write(self._response(b'{}', '500 Error'))
+                elif self.mode == 'invalid':
+                    writer.write(self._response(b'invalid'))
+                elif self.mode == 'short-batch':
+                    writer.write(self._response(b'[]'))
+                else:
+                    if len(tokens) == 1:
+                        result: Any = self._result(tokens[0])
+                    else:
+                        result = [self._result(token) for token in tokens]
+                    data = json.dumps(result).encode('utf-8')
+                    writer.write(self._response(data))
+                await writer.drain()
+                if self.mode in ('eof', 'stale', 'bad-status', 'truncated'):
+                    break
+        finally:
+            writer.close()
+
+
+class TestIntrospectionClient(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self) -> None:
+        self.server = StandInServer()
+        await self.server.start()
+        self.url = f'http://127.0.0.1:{self.server.port}/introspect'
+
+    async def asyncTearDown(self) -> None:
+        await self.server.stop()
+
+    async def test_validate(self) -> None:
+        client = IntrospectionClient(self.url, client_id='id',
+                                     client_secret='secret')  # noqa: S106
+        self.assertTrue(await client.validate('good', 'user'))
+        self.assertFalse(await client.validate('good', 'other'))
+        self.assertFalse(await client.validate('bad', 'user'))
+        self.assertEqual(1, self.server.connections)
+        self.assertEqual(3, len(self.server.requests))
+        self.assertEqual('Basic aWQ6c2VjcmV0',
+                         self.server.headers['authorization'])
+        self.assertEqual(f'127.0.0.1:{self.server.port}',
+                         self.server.headers['host'])
+        await client.aclose()
+
+    async def test_client_credentials(self) -> None:
+        client = IntrospectionClient(self.url, client_id='my id',
+                                     client_secret='se:cret')  # noqa: S106
+        self.assertTrue(await client.validate('good', 'user'))
+        self.assertEqual(f'Basic {b64encode(b"my+id:se%3Acret").decode()}',
+                         self.server.headers['authorization'])
+        await client.aclose()
+
+    async def test_cancelled(self) -> None:
+        self.server.delay = 1.0
+        client = IntrospectionClient(self.url)
+        for token in ('good1', 'good2'):
+            validate = asyncio.ensure_future(client.validate(token, 'user'))
+            while not client._tasks:
+                await asyncio.sleep(0)
+            if token == 'good2':  # noqa: S105
+                while not self.server.requests:
+                    await asyncio.sleep(0.001)
+            for task in client._tasks:
+                task.cancel()
+            with self.assertRaises(IntrospectionError):
+                await asyncio.wait_for(validate, 1.0)
+        await client.aclose()
+
+    async def test_coalesce(self) -> None:
+        self.server.delay = 0.01
+        client = IntrospectionClient(self.url)
+        results = await asyncio.gather(
+            *[client.validate('good', 'user') for _ in range(5)])
+        self.assertEqual([True] * 5, results)
+        self.assertEqual([['good']], self.server.requests)
+        await client.aclose()
+
+    async def test_batch(self) -> None:
+        client = IntrospectionClient(self.url, batch_size=10,
+                                     batch_delay=0.01)
+        tokens = [f'good{i}' for i in range(5)] + ['bad']
+        results = await asyncio.gather(
+            *[client.validate(token, 'user') for token in tokens])
+        self.assertEqual([True] * 5 + [False], results)
+        self.assertEqual([tokens], self.server.requests)
+        self.assertTrue(await client.validate('good', 'user'))
+        self.assertEqual(['good'], self.server.requests[-1])
+        await client.aclose()
+
+    async def test_batch_full(self) -> None:
+        client = IntrospectionClient(self.url, batch_size=2,
+                                     batch_delay=10.0)
+        results = await asyncio.gather(client.validate('good1', 'user'),
+                                       client.validate('good2', 'user'))
+        self.assertEqual([True, True], results)
+        self.assertEqual([['good1', 'good2']], self.server.requests)
+        await client.aclose()
+
+    async def test_batch_invalid(self) -> None:
+        self.server.mode = 'short-batch'
+        client = IntrospectionClient(self.url, batch_size=10)
+        with self.assertRaises(IntrospectionError):
+            await asyncio.gather(client.validate('good1', 'user'),
+                                 client.validate('good2', 'user'))
+        await client.aclose()
+
+    async def test_chunked(self) -> None:
+        self.server.mode = 'chunked'
+        client = IntrospectionClient(self.url)
+        self.assertTrue(await client.validate('good', 'user'))
+        self.assertTrue(await client.validate('good', 'user'))
+        self.assertEqual(1, self.server.connections)
+        await client.aclose()
+
+    async def test_eof(self) -> None:
+        self.server.mode = 'eof'
+        client = IntrospectionClient(self.url)
+        self.assertTrue(await client.validate('good', 'user'))
+        self.assertTrue(await client.validate('good', 'user'))
+        self.assertEqual(2, self.server.connections)
+        await client.aclose()
+
+    async def test_stale(self) -> None:
+        self.server.mode = 'stale'
+        client = IntrospectionClient(self.url)
+        self.assertTrue(await client.validate('good', 'user'))
+        await asyncio.sleep(0.01)
+        self.assertTrue(await client.validate('good', 'user'))
+        self.assertEqual(2, self.server.connections)
+        await client.aclose()
+
+    async def test_errors(self) -> None:
+        client = IntrospectionClient(self.url)
+        for mode in ('error', 'invalid', 'bad-status', 'truncated'):
+            self.server.mode = mode
+            with self.assertRaises(IntrospectionError):
+                await client.validate('good', 'user')
+        await client.aclose()
+
+    async def test_timeout(self) -> None:
+        self.server.delay = 1.0
+        client = IntrospectionClient(self.url, timeout=0.01)
+        with self.assertRaises(IntrospectionError):
+            await client.validate('good', 'user')
+        await client.aclose()
+
+    async def test_connection_refused(self) -> None:
+        await self.server.stop()
+        client = IntrospectionClient(self.url)
+        with self.assertRaises(IntrospectionError):
+            await client.validate('good', 'user')
+        await self.server.start()
+
+    def test_url(self) -> None:
+        with self.assertRaises(ValueError):
+            IntrospectionClient('ftp://example.com/')
+        client = IntrospectionClient('https://example.com?query')
+        self.assertIn(b'POST /?query HTTP/1.1\r\n',
+                      client._build_request(['token']))
+        self.assertIn(b'Host: example.com\r\n',
+                      client._build_request(['token']))
+        client = IntrospectionClient('http://user:pass@[::1]:8080/')
+        request = client._build_request(['token'])
+        self.assertIn(b'Host: [::1]:8080\r\n', request)
+        self.assertNotIn(b'pass', request)
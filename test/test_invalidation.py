@@ -0,0 +1,196 @@
+from __future__ import absolute_import
+
+import os.path
+import socket
+import tempfile
+import time
+import unittest
+from typing import Callable, Set, Tuple
+
+from pysasl.cache import Fingerprinter, VerifiedCache
+from pysasl.hashing import Cleartext
+from pysasl.identity import HashedIdentity
+from pysasl.invalidation import Generations, DatagramTransport, \
+    Invalidator, GenerationalCache
+from pysasl.token import CachedTokenValidator, TokenValidator
+
+
+class SetCache(VerifiedCache):
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.entries: Set[Tuple[str, str, str]] = set()
+
+    def contains(self, authcid: str, digest: str, secret: str) -> bool:
+        return (authcid, digest, secret) in self.entries
+
+    def add(self, authcid: str, digest: str, secret: str) -> None:
+        self.entries.add((authcid, digest, secret))
+
+
+class CountingValidator(TokenValidator):
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls = 0
+
+    def validate(self, token: str, authzid: str) -> bool:
+        self.calls += 1
+        return True
+
+
+def _wait(condition: Callable[[], bool]) -> bool:
+    deadline = time.monotonic() + 5.0
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class TestGenerations(unittest.TestCase):
+
+    def test_generations(self) -> None:
+        generations = Generations()
+        self.assertEqual((0, 0, 0), generations.get('user', 'digest'))
+        generations.invalidate_authcid('user')
+        generations.invalidate_digest('digest')
+        generations.invalidate_digest('digest')
+        self.assertEqual((0, 1, 2), generations.get('user', 'digest'))
+        self.assertEqual('0.1.0', generations.key('user'))
+        self.assertEqual('0.0.2', generations.key('other', 'digest'))
+        generations.bump_epoch()
+        self.assertEqual(1, generations.epoch)
+        self.assertEqual((1, 0, 0), generations.get('user', 'digest'))
+        self.assertEqual('Generations(epoch=1)', repr(generations))
+
+    def test_dump_restore(self) -> None:
+        fingerprinter = Fingerprinter(b'key')
+        generations = Generations()
+        generations.invalidate_authcid('user')
+        generations.invalidate_authcid('user')
+        generations.invalidate_digest('digest')
+        epoch, counters = generations.dump(fingerprinter)
+        self.assertEqual(0, epoch)
+        self.assertEqual(2, len(counters))
+        restored = Generations()
+        restored.invalidate_authcid('user')
+        self.assertEqual((0, 0, 0), restored.get('nobody', 'digest2'))
+        self.assertTrue(restored.restore(epoch, counters, fingerprinter))
+        self.assertEqual(2, len(restored.dump(fingerprinter)[1]))
+        self.assertEqual(1, len(restored.dump(Fingerprinter())[1]))
+        self.assertEqual((0, 2, 1), restored.get('user', 'digest'))
+        self.assertEqual((0, 0, 1), restored.get('other', 'digest'))
+        self.assertEqual(2, len(restored.dump(fingerprinter)[1]))
+        restored.restore(0, {fingerprinter.fingerprint('d', 'new'): 1},
+                         fingerprinter)
+        restored.invalidate_digest('new')
+        self.assertEqual((0, 0, 2), restored.get('other', 'new'))
+        self.assertTrue(restored.restore(2, counters, fingerprinter))
+        self.assertEqual((2, 2, 0), restored.get('user', 'new'))
+        self.assertFalse(restored.restore(1, counters, fingerprinter))
+        restored.bump_epoch()
+        self.assertEqual((3, 0, 0), restored.get('user', 'digest'))
+
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'requires Unix sockets')
+class TestInvalidator(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        path_a = os.path.join(self.tmp.name, 'a.sock')
+        path_b = os.path.join(self.tmp.name, 'b.sock')
+        path_c = os.path.join(self.tmp.name, 'c.sock')
+        self.gens_a = Generations()
+        self.gens_b = Generations()
+        self.node_a = Invalidator(
+            self.gens_a, DatagramTransport.unix(path_a, [path_b, path_c]),
+            key=b'secret', poll=0.01)
+        self.node_b = Invalidator(
+            self.gens_b, DatagramTransport.unix(path_b, [path_a]),
+            key=b'secret', poll=0.01)
+
+    def tearDown(self) -> None:
+        self.node_a.close()
+        self.node_b.close()
+        self.tmp.cleanup()
+
+    def test_publish(self) -> None:
+        self.node_b.start()
+        self.node_b.start()
+        with self.assertLogs('pysasl.invalidation', 'WARNING'):
+            self.node_a.invalidate_authcid('user')
+        self.node_a.invalidate_digest('digest')
+        self.assertEqual((0, 1, 1), self.gens_a.get('user', 'digest'))
+        self.assertTrue(_wait(
+            lambda: self.gens_b.get('user', 'digest') == (0, 1, 1)))
+        self.node_a.bump_epoch()
+        self.assertTrue(_wait(lambda: self.gens_b.epoch == 1))
+        with self.assertLogs('pysasl.invalidation', 'WARNING'):
+            self.node_a.transport.send(b'\x01forged' + b'\x00' * 16)
+            self.node_a.invalidate_authcid('other')
+            self.assertTrue(_wait(
+                lambda: self.gens_b.get('other') == (1, 1, 0)))
+        self.assertEqual((1, 0, 0), self.gens_b.get('user'))
+        self.assertTrue(repr(self.node_a.transport).startswith(
+            'DatagramTransport('))
+
+    def test_receive(self) -> None:
+        node = Invalidator(Generations(), self.node_a.transport)
+        self.assertTrue(node.receive(b'\x02digest'))
+        self.assertEqual((0, 0, 1), node.generations.get('', 'digest'))
+        self.assertFalse(node.receive(b''))
+        self.assertFalse(node.receive(b'\x09value'))
+        self.assertFalse(node.receive(b'\x01\xff'))
+        self.assertFalse(self.node_b.receive(b'\x03'))
+
+
+class TestMulticast(unittest.TestCase):
+
+    def test_multicast(self) -> None:
+        transport = DatagramTransport.multicast('239.255.77.77', 45871)
+        node = Invalidator(Generations(), transport)
+        node.invalidate_authcid('user')
+        message = transport.recv(5.0)
+        self.assertIsNotNone(message)
+        self.assertIsNone(transport.recv(0.0))
+        node.close()
+
+    def test_multicast_interface(self) -> None:
+        transport = DatagramTransport.multicast(
+            '239.255.77.78', 45872, interface='127.0.0.1')
+        self.assertEqual([('239.255.77.78', 45872)], transport.peers)
+        transport.close()
+
+
+class TestGenerationalCache(unittest.TestCase):
+
+    def test_identity(self) -> None:
+        generations = Generations()
+        inner = SetCache()
+        cache = GenerationalCache(inner, generations)
+        identity = HashedIdentity('user', 'pass', hash=Cleartext(),
+                                  cache=cache)
+        self.assertTrue(identity.compare_secret('pass'))
+        self.assertTrue(cache.contains('user', 'pass', 'pass'))
+        generations.invalidate_authcid('user')
+        self.assertFalse(cache.contains('user', 'pass', 'pass'))
+        self.assertTrue(identity.compare_secret('pass'))
+        self.assertEqual(2, len(inner.entries))
+        generations.invalidate_digest('pass')
+        self.assertFalse(cache.contains('user', 'pass', 'pass'))
+        self.assertTrue(repr(cache).startswith('GenerationalCache('))
+
+    def test_token_validator(self) -> None:
+        generations = Generations()
+        inner = CountingValidator()
+        validator = CachedTokenValidator(inner, generations=generations)
+        self.assertTrue(validator.validate('token', 'user'))
+        self.assertTrue(validator.validate('token', 'user'))
+        self.assertEqual(1, inner.calls)
+        generations.invalidate_authcid('user')
+        self.assertTrue(validator.validate('token', 'user'))
+        self.assertEqual(2, inner.calls)
+        generations.bump_epoch()
+        self.assertTrue(validator.validate('token', 'user'))
+        self.assertEqual(3, inner.calls)
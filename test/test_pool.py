@@ -0,0 +1,201 @@
+from __future__ import absolute_import
+
+import multiprocessing
+import os
+import unittest
+from concurrent.futures.process import BrokenProcessPool
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any
+from unittest.mock import patch
+
+from pysasl.hashing import HashInterface, BuiltinHash
+from pysasl.identity import HashedIdentity
+from pysasl.pool import _Broken, VerifyPool, PoolHash
+
+builtin_hash = BuiltinHash(rounds=1)
+
+
+class CrashHash(HashInterface):
+
+    def copy(self, **kwargs: Any) -> 'CrashHash':
+        return self
+
+    def hash(self, secret: str) -> str:
+        return secret
+
+    def verify(self, secret: str, hash: str) -> bool:
+        if secret == 'crash':  # noqa: S105
+            os._exit(1)
+        return secret == hash
+
+
+class TestVerifyPool(unittest.TestCase):
+
+    def test_verify(self) -> None:
+        pool = VerifyPool(builtin_hash, workers=2, max_batch=4)
+        try:
+            digest = builtin_hash.hash('pass')
+            futures = [pool.submit('pass' if i % 2 else 'wrong', digest)
+                       for i in range(10)]
+            self.assertEqual([bool(i % 2) for i in range(10)],
+                             [future.result() for future in futures])
+            self.assertTrue(pool.verify('pass', digest))
+            stats = pool.stats
+            self.assertEqual(0, stats.queued)
+            self.assertEqual(0, stats.in_flight)
+            self.assertEqual(11, stats.requests)
+            self.assertGreaterEqual(stats.batches, 3)
+            self.assertLessEqual(stats.batches, 11)
+            self.assertEqual(0, stats.restarts)
+            with self.assertRaises(ValueError):
+                pool.verify('pass', 'invalid')
+        finally:
+            pool.close()
+        pool.close()
+
+    def test_bad_digest_in_batch(self) -> None:
+        pool = VerifyPool(builtin_hash, workers=1, max_batch=8,
+                          max_delay=0.5)
+        try:
+            digest = builtin_hash.hash('pass')
+            futures = [pool.submit('pass', digest),
+                       pool.submit('pass', 'invalid'),
+                       pool.submit('wrong', digest)]
+            self.assertTrue(futures[0].result())
+            with self.assertRaises(ValueError):
+                futures[1].result()
+            self.assertFalse(futures[2].result())
+            self.assertEqual(1, pool.stats.batches)
+        finally:
+            pool.close()
+
+    def test_executor_error(self) -> None:
+        pool = VerifyPool(builtin_hash, workers=1)
+        digest = builtin_hash.hash('pass')
+        try:
+            with patch('pysasl.pool.ProcessPoolExecutor',
+                       side_effect=OSError('Too many open files')):
+                with self.assertRaises(OSError):
+                    pool.verify('pass', digest)
+            self.assertTrue(pool.verify('pass', digest))
+        finally:
+            pool.close()
+
+    def test_no_delay(self) -> None:
+        pool = VerifyPool(builtin_hash, workers=1, max_delay=0.0)
+        try:
+            digest = builtin_hash.hash('pass')
+            futures = [pool.submit('pass', digest) for _ in range(5)]
+            self.assertTrue(all(future.result() for future in futures))
+        finally:
+            pool.close()
+
+    def test_close_pending(self) -> None:
+        pool = VerifyPool(builtin_hash, workers=1, max_delay=10.0)
+        future = pool.submit('pass', builtin_hash.hash('pass'))
+        pool.close()
+        self.assertTrue(future.result())
+
+    def test_crash(self) -> None:
+        pool = VerifyPool(CrashHash(), workers=1)
+        try:
+            self.assertTrue(pool.verify('pass', 'pass'))
+            with self.assertRaises(BrokenProcessPool):
+                pool.verify('crash', 'pass')
+            self.assertEqual(2, pool.stats.restarts)
+            self.assertTrue(pool.verify('pass', 'pass'))
+            pool._restart(ProcessPoolExecutor(1))
+            self.assertEqual(2, pool.stats.restarts)
+        finally:
+            pool.close()
+
+    def test_broken_submit(self) -> None:
+        pool = VerifyPool(CrashHash(), workers=1)
+        submit = ProcessPoolExecutor.submit
+        calls = []
+
+        def broken_submit(executor: Any, *args: Any) -> Any:
+            calls.append(executor)
+            if len(calls) == 1:
+                raise BrokenProcessPool()
+            return submit(executor, *args)
+        try:
+            with patch.object(ProcessPoolExecutor, 'submit', broken_submit):
+                self.assertTrue(pool.verify('pass', 'pass'))
+            self.assertEqual(1, pool.stats.restarts)
+            self.assertIsNot(calls[0], calls[1])
+        finally:
+            pool.close()
+
+    def test_closed_submit(self) -> None:
+        pool = VerifyPool(CrashHash(), workers=1)
+
+        def closed_submit(executor: Any, *args: Any) -> Any:
+            raise RuntimeError('cannot schedule new futures after shutdown')
+        try:
+            with patch.object(ProcessPoolExecutor, 'submit', closed_submit):
+                with self.assertRaises(RuntimeError):
+                    pool.verify('pass', 'pass')
+            self.assertTrue(pool.verify('pass', 'pass'))
+            self.assertEqual(0, pool.stats.restarts)
+        finally:
+            pool.close()
+
+    def test_close_broken(self) -> None:
+        pool = VerifyPool(CrashHash(), workers=1)
+        broken: 'Future[bool]' = Future()
+        queued: 'Future[bool]' = Future()
+        executor = ProcessPoolExecutor(1)
+        pool._queue.put(_Broken([('crash', 'pass', broken)], executor,
+                                BrokenProcessPool(), True))
+        pool._queue.put(('pass', 'pass', queued))
+        pool.close()
+        executor.shutdown()
+        with self.assertRaises(BrokenProcessPool):
+            broken.result()
+        with self.assertRaises(RuntimeError):
+            queued.result()
+
+    def test_broken_while_batching(self) -> None:
+        pool = VerifyPool(CrashHash(), workers=1, max_delay=0.5)
+        broken: 'Future[bool]' = Future()
+        executor = ProcessPoolExecutor(1)
+        try:
+            future = pool.submit('pass', 'pass')
+            pool._queue.put(_Broken([('crash', 'pass', broken)], executor,
+                                    BrokenProcessPool(), False))
+            with self.assertRaises(BrokenProcessPool):
+                broken.result()
+            self.assertTrue(future.result())
+            self.assertEqual(0, pool.stats.restarts)
+        finally:
+            pool.close()
+            executor.shutdown()
+
+    def test_mp_context(self) -> None:
+        context = multiprocessing.get_context('spawn')
+        pool = VerifyPool(builtin_hash, workers=1, mp_context=context)
+        try:
+            self.assertIs(context, pool.mp_context)
+            self.assertTrue(pool.verify('pass', builtin_hash.hash('pass')))
+        finally:
+            pool.close()
+
+    def test_pool_hash(self) -> None:
+        pool = VerifyPool(builtin_hash, workers=1)
+        try:
+            hash = PoolHash(pool)
+            self.assertIs(builtin_hash, hash.hash_impl)
+            self.assertEqual('PoolHash(BuiltinHash(hash_name=\'sha256\', '
+                             'salt_len=16, rounds=1))', repr(hash))
+            identity = HashedIdentity.create('user', 'pass', hash=hash)
+            self.assertTrue(identity.compare_secret('pass'))
+            self.assertFalse(identity.compare_secret('wrong'))
+            self.assertFalse(hash.needs_update(identity.digest))
+            copy = hash.copy(rounds=2)
+            self.assertIs(pool, copy.pool)
+            self.assertTrue(copy.needs_update(identity.digest))
+            self.assertTrue(HashedIdentity(
+                'user', identity.digest, hash=copy).compare_secret('pass'))
+        finally:
+            pool.close()
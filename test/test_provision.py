@@ -0,0 +1,94 @@
+from __future__ import absolute_import
+
+import contextlib
+import io
+import json
+import os.path
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+from pysasl.hashing import BuiltinHash
+from pysasl.provision import read_users, write_identities, Provisioner, main
+
+builtin_hash = BuiltinHash(rounds=1)
+
+
+class TestProvision(unittest.TestCase):
+
+    def test_read_users(self) -> None:
+        jsonl = io.StringIO('{"authcid": "one", "secret": "pass1"}\n\n'
+                            '{"authcid": "two", "secret": "pass2"}\n')
+        self.assertEqual([('one', 'pass1'), ('two', 'pass2')],
+                         list(read_users(jsonl)))
+        csv = io.StringIO('authcid,secret\r\none,pass1\r\n')
+        self.assertEqual([('one', 'pass1')], list(read_users(csv, 'csv')))
+        with self.assertRaises(ValueError):
+            list(read_users(io.StringIO('[]\n')))
+        with self.assertRaises(ValueError):
+            list(read_users(io.StringIO('{"authcid": "one"}\n')))
+        with self.assertRaises(ValueError):
+            list(read_users(io.StringIO(''), 'xml'))
+
+    def test_run(self) -> None:
+        users = [(f'user{i}', f'pass{i}') for i in range(10)]
+        provisioner = Provisioner(builtin_hash, chunksize=3, max_pending=2)
+        identities = list(provisioner.run(users))
+        self.assertEqual([authcid for authcid, _ in users],
+                         [identity.authcid for identity in identities])
+        for identity, (_, secret) in zip(identities, users):
+            self.assertTrue(identity.compare_secret(secret))
+            self.assertFalse(identity.compare_secret('wrong'))
+        stream = io.StringIO()
+        write_identities(stream, identities[:1])
+        self.assertEqual({'authcid': 'user0', 'digest': identities[0].digest},
+                         json.loads(stream.getvalue()))
+
+    def test_run_process_pool(self) -> None:
+        users = [(f'user{i}', f'pass{i}') for i in range(5)]
+        with ProcessPoolExecutor(2) as executor:
+            provisioner = Provisioner(builtin_hash, executor=executor,
+                                      chunksize=2)
+            identities = list(provisioner.run(users))
+            self.assertEqual(['user0', 'user1', 'user2', 'user3', 'user4'],
+                             [identity.authcid for identity in identities])
+            self.assertTrue(identities[4].compare_secret('pass4'))
+            for identity in provisioner.run(users):
+                self.assertEqual('user0', identity.authcid)
+                break
+
+    def test_main(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            in_path = os.path.join(tmp, 'users.csv')
+            out_path = os.path.join(tmp, 'identities.jsonl')
+            with open(in_path, 'w') as f:
+                f.write('authcid,secret\n')
+                for i in range(5):
+                    f.write(f'user{i},pass{i}\n')
+            args = [in_path, out_path, '--rounds', '1', '--progress', '2']
+            stderr = io.StringIO()
+            with contextlib.redirect_stderr(stderr):
+                self.assertEqual(0, main(args + ['--workers', '0']))
+            self.assertIn('4 identities', stderr.getvalue())
+            self.assertIn('5 identities', stderr.getvalue())
+            with open(out_path) as f:
+                lines = f.readlines()
+            self.assertEqual(5, len(lines))
+            with open(out_path, 'w') as f:
+                f.writelines(lines[:2])
+                f.write(lines[2][:10])
+            with contextlib.redirect_stderr(io.StringIO()):
+                self.assertEqual(0, main(args + ['--resume', '--workers', '1',
+                                                 '--format', 'csv']))
+            with open(out_path) as f:
+                resumed = f.readlines()
+            self.assertEqual(lines[:2], resumed[:2])
+            self.assertEqual(['user2', 'user3', 'user4'],
+                             [json.loads(line)['authcid']
+                              for line in resumed[2:]])
+            os.remove(out_path)
+            with contextlib.redirect_stderr(io.StringIO()):
+                self.assertEqual(0, main(args + ['--resume', '--workers', '0',
+                                                 '--progress', '0']))
+            with open(out_path) as f:
+                self.assertEqual(5, len(f.readlines()))
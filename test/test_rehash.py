@@ -0,0 +1,118 @@
+from __future__ import absolute_import
+
+import threading
+import time
+import unittest
+from typing import Any, List
+
+from pysasl.hashing import BuiltinHash, Cleartext
+from pysasl.identity import HashedIdentity
+from pysasl.rehash import RehashQueue
+
+old_hash = BuiltinHash(rounds=1)
+new_hash = BuiltinHash(rounds=2)
+
+
+class TestRehashQueue(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.stored: List[HashedIdentity] = []
+
+    def test_compare_secret(self) -> None:
+        rehash = RehashQueue(new_hash, self.stored.append, rate=1000.0)
+        identity = HashedIdentity.create('user', 'pass', hash=old_hash)
+        identity = HashedIdentity('user', identity.digest, hash=new_hash,
+                                  rehash=rehash)
+        self.assertFalse(identity.compare_secret('wrong'))
+        self.assertTrue(identity.compare_secret('pass'))
+        rehash.join()
+        stored, = self.stored
+        self.assertEqual('user', stored.authcid)
+        self.assertFalse(new_hash.needs_update(stored.digest))
+        self.assertTrue(stored.compare_secret('pass'))
+        self.assertTrue(identity.compare_secret('pass'))
+        rehash.join()
+        self.assertEqual(2, len(self.stored))
+        rehash.close()
+        self.assertFalse(rehash.submit(identity, 'pass'))
+
+    def test_up_to_date(self) -> None:
+        rehash = RehashQueue(new_hash, self.stored.append)
+        identity = HashedIdentity.create('user', 'pass', hash=new_hash)
+        self.assertFalse(rehash.submit(identity, 'pass'))
+        rehash.close()
+
+    def test_legacy_digest(self) -> None:
+        rehash = RehashQueue(new_hash, self.stored.append, rate=1000.0)
+        identity = HashedIdentity('user', 'pass', hash=Cleartext(),
+                                  rehash=rehash)
+        self.assertTrue(new_hash.needs_update('pass'))
+        self.assertTrue(identity.compare_secret('pass'))
+        rehash.join()
+        stored, = self.stored
+        self.assertFalse(new_hash.needs_update(stored.digest))
+        self.assertTrue(stored.compare_secret('pass'))
+        rehash.close()
+
+    def test_no_needs_update(self) -> None:
+        class _Hash:
+            def copy(self, **kwargs: Any) -> '_Hash':
+                return self
+
+            def hash(self, secret: str) -> str:
+                return secret
+
+            def verify(self, secret: str, hash: str) -> bool:
+                return secret == hash
+
+        rehash = RehashQueue(_Hash(), self.stored.append)  # type: ignore
+        identity = HashedIdentity('user', 'pass', hash=Cleartext())
+        self.assertFalse(rehash.submit(identity, 'pass'))
+        rehash.close()
+
+    def test_pending(self) -> None:
+        event = threading.Event()
+
+        def callback(identity: HashedIdentity) -> None:
+            event.wait()
+            self.stored.append(identity)
+
+        rehash = RehashQueue(new_hash, callback, rate=1000.0, maxsize=1)
+        one = HashedIdentity.create('one', 'pass', hash=old_hash)
+        two = HashedIdentity.create('two', 'pass', hash=old_hash)
+        three = HashedIdentity.create('three', 'pass', hash=old_hash)
+        self.assertTrue(rehash.submit(one, 'pass'))
+        self.assertFalse(rehash.submit(one, 'pass'))
+        while rehash._queue.qsize():
+            time.sleep(0.001)
+        self.assertTrue(rehash.submit(two, 'pass'))
+        self.assertFalse(rehash.submit(three, 'pass'))
+        event.set()
+        rehash.join()
+        self.assertEqual(['one', 'two'],
+                         [identity.authcid for identity in self.stored])
+        rehash.close()
+
+    def test_rate(self) -> None:
+        rehash = RehashQueue(new_hash, self.stored.append, rate=0.001)
+        one = HashedIdentity.create('one', 'pass', hash=old_hash)
+        two = HashedIdentity.create('two', 'pass', hash=old_hash)
+        self.assertTrue(rehash.submit(one, 'pass'))
+        self.assertTrue(rehash.submit(two, 'pass'))
+        while not self.stored:
+            time.sleep(0.001)
+        rehash.close()
+        self.assertEqual(['one'],
+                         [identity.authcid for identity in self.stored])
+
+    def test_callback_error(self) -> None:
+        def callback(identity: HashedIdentity) -> None:
+            raise RuntimeError(identity.authcid)
+
+        rehash = RehashQueue(new_hash, callback, rate=1000.0)
+        identity = HashedIdentity.create('user', 'pass', hash=old_hash)
+        with self.assertLogs('pysasl.rehash') as logs:
+            self.assertTrue(rehash.submit(identity, 'pass'))
+            rehash.join()
+        self.assertIn('Rehash failed: user', logs.output[0])
+        rehash.close()
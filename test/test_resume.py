@@ -0,0 +1,129 @@
+from __future__ import absolute_import
+
+import unittest
+from contextvars import copy_context
+
+from pysasl import SASLAuth
+from pysasl.creds.client import ClientCredentials
+from pysasl.exception import InvalidResponse, UnexpectedChallenge
+from pysasl.identity import ClearIdentity
+from pysasl.mechanism import ServerChallenge, ChallengeResponse
+from pysasl.mechanism.resume import set_binding, TicketKeys, \
+    ResumeCredentials, ResumeServerMechanism, ResumeClientMechanism
+
+
+class FakeClock:
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTicketKeys(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+        self.keys = TicketKeys([b'key one'], ttl=60.0, clock=self.clock)
+
+    def test_init(self) -> None:
+        with self.assertRaises(ValueError):
+            TicketKeys([])
+        self.assertEqual('TicketKeys(ttl=60.0)', repr(self.keys))
+
+    def test_redeem(self) -> None:
+        keys = self.keys
+        ticket = keys.issue('user', b'binding')
+        self.assertTrue(keys.redeem(ticket, 'user', b'binding'))
+        self.assertFalse(keys.redeem(ticket, 'user'))
+        self.assertFalse(keys.redeem(ticket, 'other', b'binding'))
+        self.assertFalse(keys.redeem(ticket[:-2], 'user', b'binding'))
+        self.assertFalse(keys.redeem(ticket + 'AAAA', 'user', b'binding'))
+        tampered = ticket[:20] + ('B' if ticket[20] == 'A' else 'A') + \
+            ticket[21:]
+        self.assertFalse(keys.redeem(tampered, 'user', b'binding'))
+        self.assertFalse(keys.redeem('!' + ticket, 'user', b'binding'))
+        self.assertFalse(keys.redeem('B' + ticket[1:], 'user', b'binding'))
+        self.clock.now += 60.0
+        self.assertFalse(keys.redeem(ticket, 'user', b'binding'))
+
+    def test_rotate(self) -> None:
+        keys = self.keys
+        first = keys.issue('user')
+        keys.rotate(b'key two')
+        self.assertEqual((b'key two', b'key one'), keys.keys)
+        second = keys.issue('user')
+        self.assertNotEqual(first, second)
+        self.assertTrue(keys.redeem(first, 'user'))
+        self.assertTrue(keys.redeem(second, 'user'))
+        keys.rotate(b'key three')
+        keys.rotate(b'key three')
+        self.assertEqual((b'key three', b'key two'), keys.keys)
+        self.assertFalse(keys.redeem(first, 'user'))
+        self.assertTrue(keys.redeem(second, 'user'))
+        keys.rotate(b'key four', keep=0)
+        self.assertEqual((b'key four', ), keys.keys)
+        self.assertFalse(keys.redeem(second, 'user'))
+
+
+class TestResumeMechanism(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.keys = TicketKeys([b'key'])
+        self.server = ResumeServerMechanism(self.keys)
+        self.client = ResumeClientMechanism()
+
+    def test_availability(self) -> None:
+        sasl = SASLAuth.defaults()
+        self.assertIsNone(sasl.get_server(b'X-RESUME'))
+        self.assertIsNone(sasl.get_client(b'X-RESUME'))
+        sasl = SASLAuth([self.server, self.client])
+        self.assertEqual([self.server], sasl.server_mechanisms)
+        self.assertEqual([self.client], sasl.client_mechanisms)
+
+    def test_server_attempt_issues_challenge(self) -> None:
+        with self.assertRaises(ServerChallenge) as raised:
+            self.server.server_attempt([])
+        self.assertEqual(b'', raised.exception.data)
+
+    def test_server_attempt_bad_response(self) -> None:
+        self.assertRaises(InvalidResponse, self.server.server_attempt,
+                          [ChallengeResponse(b'', b'user\x00bad ticket')])
+        self.assertRaises(InvalidResponse, self.server.server_attempt,
+                          [ChallengeResponse(b'', b'\x00ticket')])
+
+    def test_server_attempt_successful(self) -> None:
+        ticket = self.keys.issue('user', b'binding')
+        creds = ClientCredentials('user', ticket)
+        response = self.client.client_attempt(creds, [])
+
+        def attempt(binding: bytes) -> ResumeCredentials:
+            set_binding(binding)
+            result, final = self.server.server_attempt([response])
+            self.assertIsNone(final)
+            return result
+
+        result = copy_context().run(attempt, b'binding')
+        self.assertIsInstance(result, ResumeCredentials)
+        self.assertEqual('user', result.authcid)
+        self.assertEqual('user', result.authzid)
+        identity = ClearIdentity('user', 'unused')
+        self.assertTrue(result.verify(identity))
+        self.assertFalse(result.verify(ClearIdentity('other', 'unused')))
+        self.assertFalse(result.verify(None))
+        self.assertEqual("ResumeCredentials('user', ...)", repr(result))
+        unbound, _ = self.server.server_attempt([response])
+        self.assertFalse(unbound.verify(identity))
+        other = copy_context().run(attempt, b'other')
+        self.assertFalse(other.verify(identity))
+
+    def test_client_attempt(self) -> None:
+        creds = ClientCredentials('user', 'ticket', 'zid')
+        resp1 = self.client.client_attempt(creds, [])
+        self.assertEqual(b'zid\x00ticket', resp1.response)
+        resp2 = self.client.client_attempt(creds, [ServerChallenge(b'')])
+        self.assertEqual(b'zid\x00ticket', resp2.response)
+        self.assertRaises(UnexpectedChallenge, self.client.client_attempt,
+                          creds, [ServerChallenge(b''),
+                                  ServerChallenge(b'')])
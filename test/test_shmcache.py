@@ -0,0 +1,227 @@
+from __future__ import absolute_import
+
+import hashlib
+import hmac
+import multiprocessing
+import os.path
+import tempfile
+import time
+import unittest
+from typing import Any, List
+from unittest.mock import patch
+
+from pysasl.hashing import Cleartext
+from pysasl.identity import HashedIdentity
+from pysasl.invalidation import Generations, GenerationalCache
+from pysasl.shmcache import SharedVerifiedCache
+
+
+class FakeClock:
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class CountingHash(Cleartext):
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls: List[str] = []
+
+    def verify(self, secret: str, hash: str) -> bool:
+        self.calls.append(secret)
+        return super().verify(secret, hash)
+
+
+class TestSharedVerifiedCache(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+        self.cache = SharedVerifiedCache(slots=64, stripes=4, ttl=10.0,
+                                         clock=self.clock)
+
+    def tearDown(self) -> None:
+        self.cache.unlink()
+
+    def test_contains(self) -> None:
+        cache = self.cache
+        self.assertFalse(cache.contains('user', 'digest', 'secret'))
+        cache.add('user', 'digest', 'secret')
+        cache.add('user', 'digest', 'secret')
+        self.assertTrue(cache.contains('user', 'digest', 'secret'))
+        self.assertFalse(cache.contains('user', 'digest', 'other'))
+        self.assertFalse(cache.contains('user', 'changed', 'secret'))
+        self.assertFalse(cache.contains('other', 'digest', 'secret'))
+        self.assertEqual(1, len(cache))
+        self.clock.now = 10.0
+        self.assertFalse(cache.contains('user', 'digest', 'secret'))
+        self.assertEqual(0, len(cache))
+        cache.add('user', 'digest', 'secret')
+        self.assertTrue(cache.contains('user', 'digest', 'secret'))
+        cache.clear()
+        self.assertFalse(cache.contains('user', 'digest', 'secret'))
+        self.assertTrue(cache.name)
+        self.assertEqual('SharedVerifiedCache(slots=64, stripes=4, '
+                         'ttl=10.0)', repr(cache))
+
+    def test_clock_eviction(self) -> None:
+        self.cache.unlink()
+        cache = self.cache = SharedVerifiedCache(
+            slots=2, stripes=1, probes=4, clock=self.clock)
+        self.assertEqual(2, cache.probes)
+        cache.add('user', 'digest', 'one')
+        cache.add('user', 'digest', 'two')
+        self.assertTrue(cache.contains('user', 'digest', 'one'))
+        cache.add('user', 'digest', 'three')
+        self.assertTrue(cache.contains('user', 'digest', 'one'))
+        self.assertFalse(cache.contains('user', 'digest', 'two'))
+        self.assertTrue(cache.contains('user', 'digest', 'three'))
+        cache.add('user', 'digest', 'four')
+        self.assertEqual(2, len(cache))
+        self.assertTrue(cache.contains('user', 'digest', 'four'))
+
+    def test_close(self) -> None:
+        self.cache.close()
+        self.cache.close()
+        with self.assertRaises(ValueError):
+            self.cache.contains('user', 'digest', 'secret')
+
+    @unittest.skipUnless('fork' in multiprocessing.get_all_start_methods(),
+                         'requires the fork start method')
+    def test_fork(self) -> None:
+        cache = SharedVerifiedCache(slots=64, stripes=4)
+        try:
+            ctx: Any = multiprocessing.get_context('fork')
+            proc = ctx.Process(target=cache.add,
+                               args=('user', 'digest', 'secret'))
+            proc.start()
+            proc.join()
+            self.assertEqual(0, proc.exitcode)
+            self.assertTrue(cache.contains('user', 'digest', 'secret'))
+        finally:
+            cache.unlink()
+
+    def test_identity(self) -> None:
+        hash = CountingHash()
+        identity = HashedIdentity('user', 'pass word', hash=hash,
+                                  cache=self.cache)
+        self.assertFalse(identity.compare_secret('wrong'))
+        self.assertTrue(identity.compare_secret('pass word'))
+        self.assertTrue(identity.compare_secret('pass word'))
+        self.assertFalse(identity.compare_secret('wrong'))
+        self.assertEqual(['wrong', 'pass word', 'wrong'], hash.calls)
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'cache.snapshot')
+        self.clock = FakeClock()
+        self.caches: List[SharedVerifiedCache] = []
+
+    def tearDown(self) -> None:
+        for cache in self.caches:
+            cache.unlink()
+        self.tmp.cleanup()
+
+    def _new_cache(self, key: bytes = b'fingerprint key',
+                   slots: int = 64) -> SharedVerifiedCache:
+        cache = SharedVerifiedCache(slots=slots, stripes=4, ttl=10.0,
+                                    key=key, clock=self.clock)
+        self.caches.append(cache)
+        return cache
+
+    def test_save_load(self) -> None:
+        cache = self._new_cache()
+        cache.add('user', 'digest', 'secret')
+        self.clock.now = 5.0
+        cache.add('user', 'digest', 'other')
+        self.clock.now = 12.0
+        cache.add('user', 'digest', 'third')
+        self.assertEqual(2, cache.save(self.path, b'snapshot key'))
+        self.assertEqual(0o600, os.stat(self.path).st_mode & 0o777)
+        restored = self._new_cache(slots=128)
+        self.clock.now = 100.0
+        self.assertEqual(2, restored.load(self.path, b'snapshot key'))
+        self.assertFalse(restored.contains('user', 'digest', 'secret'))
+        self.assertTrue(restored.contains('user', 'digest', 'other'))
+        self.assertTrue(restored.contains('user', 'digest', 'third'))
+        self.clock.now = 103.0
+        self.assertFalse(restored.contains('user', 'digest', 'other'))
+        self.assertTrue(restored.contains('user', 'digest', 'third'))
+        later = time.time() + 5.0
+        with patch.object(time, 'time', return_value=later):
+            self.assertEqual(1, restored.load(self.path, b'snapshot key'))
+
+    def test_save_error(self) -> None:
+        cache = self._new_cache()
+        cache.add('user', 'digest', 'secret')
+        with patch.object(os, 'replace', side_effect=OSError):
+            with self.assertRaises(OSError):
+                cache.save(self.path, b'snapshot key')
+        self.assertEqual([], os.listdir(self.tmp.name))
+        self.assertEqual(1, cache.save(self.path, b'snapshot key'))
+        self.assertEqual(['cache.snapshot'], os.listdir(self.tmp.name))
+
+    def test_load_invalid(self) -> None:
+        cache = self._new_cache()
+        cache.add('user', 'digest', 'secret')
+        cache.save(self.path, b'snapshot key')
+        with self.assertRaises(ValueError):
+            cache.load(self.path, b'wrong key')
+        with open(self.path, 'rb') as snapshot:
+            data = snapshot.read()
+        with open(self.path, 'wb') as snapshot:
+            snapshot.write(data[:40])
+        with self.assertRaises(ValueError):
+            cache.load(self.path, b'snapshot key')
+        with self.assertRaises(FileNotFoundError):
+            cache.load(self.path + '.missing', b'snapshot key')
+        cache.close()
+        with self.assertRaises(ValueError):
+            cache.load(self.path, b'snapshot key')
+
+    def test_load_truncated(self) -> None:
+        cache = self._new_cache()
+        cache.add('user', 'digest', 'secret')
+        cache.save(self.path, b'snapshot key')
+        with open(self.path, 'rb') as snapshot:
+            data = snapshot.read()
+        body = data[:-32] + b'extra'
+        with open(self.path, 'wb') as snapshot:
+            snapshot.write(body)
+            snapshot.write(hmac.new(b'snapshot key', body,
+                                    hashlib.sha256).digest())
+        with self.assertRaises(ValueError):
+            cache.load(self.path, b'snapshot key')
+
+    def test_load_other_key(self) -> None:
+        cache = self._new_cache()
+        cache.add('user', 'digest', 'secret')
+        cache.save(self.path, b'snapshot key')
+        restored = self._new_cache(key=b'other fingerprint key')
+        self.assertEqual(0, restored.load(self.path, b'snapshot key'))
+
+    def test_generations(self) -> None:
+        generations = Generations()
+        shared = self._new_cache()
+        cache = GenerationalCache(shared, generations)
+        cache.add('user', 'digest', 'old')
+        generations.invalidate_authcid('user')
+        cache.add('user', 'digest', 'new')
+        shared.save(self.path, b'snapshot key', generations=generations)
+        restored_generations = Generations()
+        restored_shared = self._new_cache()
+        restored = GenerationalCache(restored_shared, restored_generations)
+        self.assertEqual(2, restored_shared.load(
+            self.path, b'snapshot key', generations=restored_generations))
+        self.assertFalse(restored.contains('user', 'digest', 'old'))
+        self.assertTrue(restored.contains('user', 'digest', 'new'))
+        bumped = Generations()
+        bumped.bump_epoch()
+        self.assertEqual(0, self._new_cache().load(
+            self.path, b'snapshot key', generations=bumped))
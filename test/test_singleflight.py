@@ -0,0 +1,160 @@
+from __future__ import absolute_import
+
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, List
+
+from pysasl.creds.external import ExternalCredentials, \
+    ExternalVerificationRequired
+from pysasl.creds.plain import PlainCredentials
+from pysasl.hashing import HashInterface, BuiltinHash, Cleartext
+from pysasl.identity import ClearIdentity, HashedIdentity
+from pysasl.singleflight import SingleFlight, AsyncSingleFlight, \
+    SingleFlightHash, SingleFlightVerifier
+
+
+class SlowHash(HashInterface):
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.cleartext = Cleartext()
+
+    def copy(self, **kwargs: Any) -> 'SlowHash':
+        return self
+
+    def hash(self, secret: str) -> str:
+        return self.cleartext.hash(secret)
+
+    def verify(self, secret: str, hash: str) -> bool:
+        self.calls += 1
+        time.sleep(0.05)
+        return self.cleartext.verify(secret, hash)
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def test_do(self) -> None:
+        flight: SingleFlight[int] = SingleFlight()
+        calls: List[int] = []
+        results: List[int] = []
+
+        def func() -> int:
+            calls.append(1)
+            time.sleep(0.05)
+            return 42
+
+        def run() -> None:
+            results.append(flight.do('key', func))
+
+        threads = [threading.Thread(target=run) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([42] * 5, results)
+        self.assertEqual([1], calls)
+        self.assertEqual(0, len(flight))
+        self.assertEqual(42, flight.do('key', func))
+        self.assertEqual([1, 1], calls)
+
+    def test_do_exception(self) -> None:
+        flight: SingleFlight[int] = SingleFlight()
+        errors: List[BaseException] = []
+
+        def func() -> int:
+            time.sleep(0.05)
+            raise ValueError()
+
+        def run() -> None:
+            try:
+                flight.do('key', func)
+            except ValueError as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=run) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(3, len(errors))
+        self.assertEqual(0, len(flight))
+
+    def test_hash(self) -> None:
+        slow = SlowHash()
+        hash = SingleFlightHash(slow)
+        identity = HashedIdentity.create('user', 'pass', hash=hash)
+        results: List[bool] = []
+
+        def run() -> None:
+            creds = PlainCredentials('user', 'pass')
+            results.append(creds.verify(identity))
+
+        threads = [threading.Thread(target=run) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([True] * 5, results)
+        self.assertEqual(1, slow.calls)
+        self.assertFalse(PlainCredentials('user', 'bad').verify(identity))
+        self.assertEqual(2, slow.calls)
+        self.assertIsInstance(hash.copy(), SingleFlightHash)
+
+    def test_hash_needs_update(self) -> None:
+        hash = SingleFlightHash(BuiltinHash(rounds=1))
+        identity = HashedIdentity.create('user', 'pass', hash=hash)
+        self.assertFalse(hash.needs_update(identity.digest))
+        self.assertTrue(hash.copy(rounds=2).needs_update(identity.digest))
+
+
+class TestAsyncSingleFlight(unittest.IsolatedAsyncioTestCase):
+
+    async def test_do(self) -> None:
+        flight: AsyncSingleFlight[int] = AsyncSingleFlight()
+        calls: List[int] = []
+
+        async def func() -> int:
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 42
+
+        results = await asyncio.gather(
+            *[flight.do('key', func) for _ in range(5)])
+        self.assertEqual([42] * 5, results)
+        self.assertEqual([1], calls)
+        self.assertEqual(0, len(flight))
+
+    async def test_verifier(self) -> None:
+        slow = SlowHash()
+        identity = HashedIdentity.create('user', 'pass', hash=slow)
+        with ThreadPoolExecutor(5) as executor:
+            verifier = SingleFlightVerifier(executor=executor)
+            results = await asyncio.gather(*[
+                verifier.verify(PlainCredentials('user', 'pass'), identity)
+                for _ in range(5)])
+            self.assertEqual([True] * 5, results)
+            self.assertEqual(1, slow.calls)
+            good, bad = await asyncio.gather(
+                verifier.verify(PlainCredentials('user', 'pass'), identity),
+                verifier.verify(PlainCredentials('user', 'bad'), identity))
+            self.assertTrue(good)
+            self.assertFalse(bad)
+            self.assertEqual(3, slow.calls)
+
+    async def test_verifier_uncoalesced(self) -> None:
+        verifier = SingleFlightVerifier()
+        creds = PlainCredentials('user', 'pass')
+        self.assertTrue(await verifier.verify(
+            creds, ClearIdentity('user', 'pass')))
+        with self.assertRaises(ExternalVerificationRequired):
+            await verifier.verify(ExternalCredentials('user', 'token'), None)
+
+    async def test_verifier_process_pool(self) -> None:
+        with ProcessPoolExecutor(1) as executor:
+            verifier = SingleFlightVerifier(executor=executor)
+            self.assertTrue(await verifier.verify(
+                PlainCredentials('user', 'pass'),
+                ClearIdentity('user', 'pass')))
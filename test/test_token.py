@@ -0,0 +1,239 @@
+from __future__ import absolute_import
+
+import hmac
+import json
+import time
+import hashlib
+import unittest
+from base64 import urlsafe_b64encode
+from typing import Any, Dict, Optional
+
+from pysasl.creds.external import ExternalCredentials
+from pysasl.token import TokenValidator, CachedTokenValidator, JWTKey, \
+    HMACKey, RSAKey, load_jwk, JWTValidator
+
+rsa_n = int(
+    'a85dacdd074599ee0c67d84b18680f3894a2d343c1465feefd4f5e3b6066364fd2241c'
+    '2d05d16fb1ab3e20adecb83a0b208a5645d39f6f9b6c60a36ff4a33d3b13b6551c77d4'
+    'a265559b7683d775293f7679df2805b4b6fb85680183b49947ed660940ee2a33164db6'
+    '64b95b07390ef2aa704a6afd6e42f0da36ee52173bd3a5', 16)
+rsa_d = int(
+    '29fe435155b0fc75ad4e715a399a2ac1b800eca4a79e3feb41eefbd7df715ef685b94f'
+    'f5c2cfbc061a6a02889ed44c55de25e2e2c3a7ae949b71771243783b9b0ae7d56ac791'
+    '1e0574387712313f9c38de5023d793b3908e43b1c87a83c24723ab94deb5ba6f79b815'
+    'f94cce7bfe68e623d152d7152b6a838c3c9c81306b6581', 16)
+rsa_e = 65537
+hmac_secret = b'testsecret'
+
+
+def _b64(data: bytes) -> str:
+    return urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _rsa_sign(message: bytes) -> bytes:
+    digest_info = bytes.fromhex('3031300d060960864801650304020105000420')
+    digest = hashlib.sha256(message).digest()
+    size = (rsa_n.bit_length() + 7) // 8
+    padding = b'\xff' * (size - len(digest_info) - len(digest) - 3)
+    encoded = b'\x00\x01' + padding + b'\x00' + digest_info + digest
+    signed = pow(int.from_bytes(encoded, 'big'), rsa_d, rsa_n)
+    return signed.to_bytes(size, 'big')
+
+
+def _make_jwt(claims: Any, *, alg: str = 'HS256', kid: str = '',
+              header: Any = None) -> str:
+    if header is None:
+        header = {'alg': alg, 'typ': 'JWT', 'kid': kid}
+    header_b64 = _b64(json.dumps(header).encode('utf-8'))
+    payload_b64 = _b64(json.dumps(claims).encode('utf-8'))
+    message = f'{header_b64}.{payload_b64}'.encode('ascii')
+    if alg == 'RS256':
+        signature = _rsa_sign(message)
+    else:
+        signature = hmac.new(hmac_secret, message, 'sha256').digest()
+    return f'{header_b64}.{payload_b64}.{_b64(signature)}'
+
+
+class CountingValidator(TokenValidator):
+
+    def __init__(self, expiration: Optional[float] = None) -> None:
+        self.calls = 0
+        self.expiration = expiration
+
+    def validate(self, token: str, authzid: str) -> bool:
+        self.calls += 1
+        return token in ('good', )
+
+    def get_expiration(self, token: str) -> Optional[float]:
+        return self.expiration
+
+
+class TestCachedTokenValidator(unittest.TestCase):
+
+    def test_validate(self) -> None:
+        inner = CountingValidator()
+        validator = CachedTokenValidator(inner)
+        self.assertTrue(validator.validate('good', 'user'))
+        self.assertTrue(validator.validate('good', 'user'))
+        self.assertEqual(1, inner.calls)
+        self.assertTrue(validator.validate('good', 'other'))
+        self.assertEqual(2, inner.calls)
+        self.assertIsNone(validator.get_expiration('good'))
+
+    def test_validate_striped(self) -> None:
+        inner = CountingValidator()
+        validator = CachedTokenValidator(inner, stripes=8)
+        for authzid in ['a', 'b', 'c', 'a', 'b', 'c']:
+            self.assertTrue(validator.validate('good', authzid))
+        self.assertEqual(3, inner.calls)
+
+    def test_validate_negative(self) -> None:
+        inner = CountingValidator()
+        validator = CachedTokenValidator(inner)
+        self.assertFalse(validator.validate('bad', 'user'))
+        self.assertFalse(validator.validate('bad', 'user'))
+        self.assertEqual(1, inner.calls)
+        validator = CachedTokenValidator(inner, negative_ttl=0.0)
+        self.assertFalse(validator.validate('bad', 'user'))
+        self.assertFalse(validator.validate('bad', 'user'))
+        self.assertEqual(3, inner.calls)
+
+    def test_validate_expired(self) -> None:
+        inner = CountingValidator(time.time() - 1.0)
+        validator = CachedTokenValidator(inner)
+        self.assertTrue(validator.validate('good', 'user'))
+        self.assertTrue(validator.validate('good', 'user'))
+        self.assertEqual(2, inner.calls)
+
+    def test_default_expiration(self) -> None:
+
+        class Validator(TokenValidator):
+            def validate(self, token: str, authzid: str) -> bool:
+                return True
+
+        validator = CachedTokenValidator(Validator())
+        self.assertIsNone(validator.get_expiration('good'))
+
+    def test_key_ambiguity(self) -> None:
+        inner = CountingValidator()
+        validator = CachedTokenValidator(inner)
+        self.assertTrue(validator.validate('good', 'a\x00b'))
+        self.assertFalse(validator.validate('b\x00good', 'a'))
+
+
+class TestJWTValidator(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.keys: Dict[str, JWTKey] = {'': HMACKey(hmac_secret),
+                                        'rsa': RSAKey(rsa_n, rsa_e)}
+
+    def test_hmac(self) -> None:
+        validator = JWTValidator(self.keys)
+        token = _make_jwt({'sub': 'user'})
+        self.assertTrue(validator.validate(token, 'user'))
+        self.assertFalse(validator.validate(token, 'other'))
+        self.assertFalse(validator.validate(token + 'x', 'user'))
+        self.assertIsNone(validator.get_expiration(token))
+
+    def test_rsa(self) -> None:
+        validator = JWTValidator(self.keys)
+        token = _make_jwt({'sub': 'user'}, alg='RS256', kid='rsa')
+        self.assertTrue(validator.validate(token, 'user'))
+        header, payload, _ = token.split('.')
+        short_sig = _b64(b'short')
+        large_sig = _b64(b'\xff' * 128)
+        self.assertFalse(validator.validate(
+            f'{header}.{payload}.{short_sig}', 'user'))
+        self.assertFalse(validator.validate(
+            f'{header}.{payload}.{large_sig}', 'user'))
+        token = _make_jwt({'sub': 'user'}, alg='HS256', kid='rsa')
+        self.assertFalse(validator.validate(token, 'user'))
+        token = _make_jwt({'sub': 'user'}, alg='RS256', kid='')
+        self.assertFalse(validator.validate(token, 'user'))
+
+    def test_rsa_small_key(self) -> None:
+        key = RSAKey(0xffff, rsa_e)
+        self.assertFalse(key.verify('RS256', b'message', b'\x00\x01'))
+
+    def test_claims(self) -> None:
+        validator = JWTValidator(self.keys, issuer='iss', audience='aud',
+                                 leeway=10.0)
+        now = time.time()
+        token = _make_jwt({'sub': 'user', 'iss': 'iss', 'aud': ['aud'],
+                           'exp': now + 5.0, 'nbf': now + 5.0})
+        self.assertTrue(validator.validate(token, 'user'))
+        self.assertEqual(now + 5.0, validator.get_expiration(token))
+        token = _make_jwt({'sub': 'user', 'iss': 'iss', 'aud': 'aud',
+                           'exp': now - 15.0})
+        self.assertFalse(validator.validate(token, 'user'))
+        token = _make_jwt({'sub': 'user', 'iss': 'iss', 'aud': 'aud',
+                           'nbf': now + 15.0})
+        self.assertFalse(validator.validate(token, 'user'))
+        token = _make_jwt({'sub': 'user', 'iss': 'iss', 'aud': 'aud',
+                           'exp': 'invalid'})
+        self.assertFalse(validator.validate(token, 'user'))
+        token = _make_jwt({'sub': 'user', 'iss': 'other', 'aud': 'aud'})
+        self.assertFalse(validator.validate(token, 'user'))
+        token = _make_jwt({'sub': 'user', 'iss': 'iss', 'aud': 'other'})
+        self.assertFalse(validator.validate(token, 'user'))
+
+    def test_invalid(self) -> None:
+        validator = JWTValidator(self.keys)
+        self.assertFalse(validator.validate('invalid', 'user'))
+        self.assertFalse(validator.validate('a.b.c', 'user'))
+        self.assertFalse(validator.validate(
+            _make_jwt({'sub': 'user'}, header=['invalid']), 'user'))
+        self.assertFalse(validator.validate(_make_jwt(['invalid']), 'user'))
+        self.assertFalse(validator.validate(
+            _make_jwt({'sub': 'user'}, kid='unknown'), 'user'))
+        self.assertFalse(validator.validate(
+            _make_jwt({'sub': 'user'}, alg='none'), 'user'))
+        self.assertIsNone(validator.get_expiration('invalid'))
+
+    def test_key_loader(self) -> None:
+        loaded = []
+
+        def key_loader(kid: str) -> Optional[JWTKey]:
+            loaded.append(kid)
+            return self.keys.get(kid)
+
+        validator = JWTValidator(key_loader=key_loader)
+        token = _make_jwt({'sub': 'user'}, alg='RS256', kid='rsa')
+        self.assertTrue(validator.validate(token, 'user'))
+        self.assertTrue(validator.validate(token, 'user'))
+        token = _make_jwt({'sub': 'user'}, kid='unknown')
+        self.assertFalse(validator.validate(token, 'user'))
+        self.assertFalse(validator.validate(token, 'user'))
+        self.assertEqual(['rsa', 'unknown'], loaded)
+
+    def test_key_loader_miss(self) -> None:
+        keys: Dict[str, JWTKey] = {}
+        validator = JWTValidator(key_loader=keys.get, miss_ttl=0.0)
+        token = _make_jwt({'sub': 'user'}, alg='RS256', kid='rsa')
+        self.assertFalse(validator.validate(token, 'user'))
+        keys['rsa'] = self.keys['rsa']
+        self.assertTrue(validator.validate(token, 'user'))
+        del keys['rsa']
+        self.assertTrue(validator.validate(token, 'user'))
+
+    def test_load_jwk(self) -> None:
+        key = load_jwk({'kty': 'oct', 'k': _b64(hmac_secret)})
+        self.assertIsInstance(key, HMACKey)
+        key = load_jwk({'kty': 'RSA', 'n': _b64(rsa_n.to_bytes(128, 'big')),
+                        'e': 'AQAB'})
+        self.assertIsInstance(key, RSAKey)
+        assert isinstance(key, RSAKey)
+        self.assertEqual(rsa_n, key.n)
+        self.assertEqual(rsa_e, key.e)
+        with self.assertRaises(ValueError):
+            load_jwk({'kty': 'EC'})
+
+    def test_verify_token(self) -> None:
+        validator = JWTValidator(self.keys)
+        token = _make_jwt({'sub': 'user'})
+        creds = ExternalCredentials('user', token)
+        self.assertTrue(creds.verify_token(validator))
+        creds = ExternalCredentials('other', token)
+        self.assertFalse(creds.verify_token(validator))
+        creds = ExternalCredentials('user')
+        self.assertFalse(creds.verify_token(validator))
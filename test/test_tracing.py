@@ -0,0 +1,194 @@
+from __future__ import absolute_import
+
+import asyncio
+import io
+import json
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Dict, List
+
+from pysasl.creds.plain import PlainCredentials
+from pysasl.hashing import BuiltinHash
+from pysasl.identity import HashedIdentity
+from pysasl.instrument import MultiObserver, Metrics, set_observer, observe
+from pysasl.mechanism import ChallengeResponse
+from pysasl.mechanism.plain import PlainMechanism
+from pysasl.singleflight import SingleFlightVerifier
+from pysasl.tracing import Span, MemorySink, JSONLinesSink, Tracer, \
+    current_span
+
+
+class Counter:
+
+    def __init__(self) -> None:
+        self.value = 0
+
+    def __call__(self, *args: int) -> int:
+        self.value += 1
+        return self.value
+
+
+class TestTracer(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.sink = MemorySink()
+        self.tracer = Tracer(self.sink, sample_rate=1.0,
+                             getrandbits=Counter(), clock=Counter())
+        self.identity = HashedIdentity.create(
+            'user', 'pass', hash=BuiltinHash(rounds=1))
+        set_observer(self.tracer)
+
+    def tearDown(self) -> None:
+        set_observer(None)
+
+    def _parents(self) -> Dict[str, str]:
+        names = {span.span_id: span.name for span in self.sink.spans}
+        return {span.name: names.get(span.parent_id or 0, '')
+                for span in self.sink.spans}
+
+    def test_nested(self) -> None:
+        with observe('attempt', 'IMAP'):
+            root = current_span()
+            assert root is not None
+            root.set_attribute('client', '127.0.0.1')
+            creds, _ = PlainMechanism().server_attempt(
+                [ChallengeResponse(b'', b'\x00user\x00pass')])
+            self.assertTrue(creds.verify(self.identity))
+        self.assertIsNone(current_span())
+        spans = self.sink.spans
+        self.assertEqual(['pysasl.mechanism', 'pysasl.prep', 'pysasl.prep',
+                          'pysasl.prep', 'pysasl.hash', 'pysasl.verify',
+                          'pysasl.attempt'],
+                         [span.name for span in spans])
+        self.assertEqual({spans[-1].trace_id}, {s.trace_id for s in spans})
+        self.assertEqual({'pysasl.attempt': '',
+                          'pysasl.mechanism': 'pysasl.attempt',
+                          'pysasl.verify': 'pysasl.mechanism',
+                          'pysasl.prep': 'pysasl.verify',
+                          'pysasl.hash': 'pysasl.verify'},
+                         self._parents())
+        self.assertEqual({'client': '127.0.0.1',
+                          'pysasl.label': 'IMAP',
+                          'pysasl.outcome': 'complete'},
+                         spans[-1].attributes)
+        self.assertEqual('PLAIN', spans[-2].attributes['pysasl.label'])
+        self.assertEqual('success', spans[-2].attributes['pysasl.outcome'])
+
+    def test_mechanism_verify(self) -> None:
+        def attempt() -> None:
+            creds, _ = PlainMechanism().server_attempt(
+                [ChallengeResponse(b'', b'\x00user\x00pass')])
+            self.assertIsNone(current_span())
+            self.assertTrue(creds.verify(self.identity))
+        copy_context().run(attempt)
+        mechanism, *_, verify = self.sink.spans
+        self.assertEqual('pysasl.mechanism', mechanism.name)
+        self.assertEqual('pysasl.verify', verify.name)
+        self.assertIsNone(mechanism.parent_id)
+        self.assertEqual(mechanism.span_id, verify.parent_id)
+        self.assertEqual(mechanism.trace_id, verify.trace_id)
+
+    def test_sampling(self) -> None:
+        sampled = Tracer(self.sink, sample_rate=0.5, random=lambda: 0.4)
+        unsampled = Tracer(self.sink, sample_rate=0.5, random=lambda: 0.5)
+        set_observer(unsampled)
+        with observe('attempt', 'IMAP'):
+            self.assertIsNone(current_span())
+            set_observer(sampled)
+            with observe('identity', 'test'):
+                self.assertIsNone(current_span())
+        self.assertEqual([], self.sink.spans)
+        with observe('attempt', 'IMAP'):
+            self.assertIsNotNone(current_span())
+        self.assertEqual(1, len(self.sink.spans))
+
+    async def test_tasks(self) -> None:
+        async def attempt(label: str) -> None:
+            with observe('attempt', label):
+                await asyncio.sleep(0)
+                with observe('identity', label):
+                    await asyncio.sleep(0)
+        await asyncio.gather(attempt('one'), attempt('two'))
+        traces = {(span.trace_id, span.attributes['pysasl.label'])
+                  for span in self.sink.spans}
+        self.assertEqual(2, len(traces))
+        self.assertEqual(4, len(self.sink.spans))
+
+    async def test_verifier(self) -> None:
+        with ThreadPoolExecutor(1) as executor:
+            verifier = SingleFlightVerifier(executor=executor)
+            with observe('attempt', 'IMAP'):
+                self.assertTrue(await verifier.verify(
+                    PlainCredentials('user', 'pass'), self.identity))
+        self.assertEqual('pysasl.attempt',
+                         self._parents()['pysasl.verify'])
+
+    def test_thread(self) -> None:
+        def lookup() -> None:
+            with observe('identity', 'test'):
+                pass
+        with observe('attempt', 'IMAP'):
+            context = copy_context()
+            with ThreadPoolExecutor(1) as executor:
+                executor.submit(context.run, lookup).result()
+        self.assertEqual('pysasl.attempt',
+                         self._parents()['pysasl.identity'])
+
+    def test_multi_observer(self) -> None:
+        metrics = Metrics()
+        set_observer(MultiObserver(metrics, self.tracer))
+        with self.assertRaises(KeyError):
+            with observe('identity', 'test'):
+                raise KeyError()
+        self.assertEqual(1, metrics.get_count('identity', 'test', 'error'))
+        span, = self.sink.spans
+        self.assertTrue(span.error)
+
+
+class TestSpan(unittest.TestCase):
+
+    def test_to_otlp(self) -> None:
+        span = Span('test', 1, 2, 3, 100)
+        span.set_attribute('str', 'value')
+        span.set_attribute('bool', True)
+        span.set_attribute('int', 5)
+        span.set_attribute('float', 1.5)
+        self.assertEqual({
+            'traceId': '00000000000000000000000000000001',
+            'spanId': '0000000000000002',
+            'parentSpanId': '0000000000000003',
+            'name': 'test',
+            'kind': 1,
+            'startTimeUnixNano': '100',
+            'endTimeUnixNano': '100',
+            'attributes': [
+                {'key': 'str', 'value': {'stringValue': 'value'}},
+                {'key': 'bool', 'value': {'boolValue': True}},
+                {'key': 'int', 'value': {'intValue': '5'}},
+                {'key': 'float', 'value': {'doubleValue': 1.5}}],
+            'status': {'code': 0}}, span.to_otlp())
+        self.assertEqual("Span('test', 00000000000000000000000000000001, "
+                         "0000000000000002)", repr(span))
+
+    def test_sinks(self) -> None:
+        stream = io.StringIO()
+        json_sink = JSONLinesSink(stream)
+        memory_sink = MemorySink(maxlen=1)
+        spans: List[Span] = []
+        for i in range(2):
+            span = Span('test', 1, i + 1, None, 100)
+            span.end = 200
+            span.error = True
+            spans.append(span)
+            json_sink.export(span)
+            memory_sink.export(span)
+        self.assertEqual(spans[1:], memory_sink.spans)
+        memory_sink.clear()
+        self.assertEqual([], memory_sink.spans)
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(['0000000000000001', '0000000000000002'],
+                         [line['spanId'] for line in lines])
+        self.assertEqual({'code': 2}, lines[0]['status'])
+        self.assertEqual('200', lines[0]['endTimeUnixNano'])
+        self.assertNotIn('parentSpanId', lines[0])
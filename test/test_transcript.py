@@ -0,0 +1,197 @@
+from __future__ import absolute_import
+
+import io
+import json
+import unittest
+from base64 import b64decode
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Any, Optional, Sequence, Tuple, List
+
+from pysasl.creds.external import ExternalVerificationRequired
+from pysasl.creds.plain import PlainCredentials
+from pysasl.exception import InvalidResponse
+from pysasl.identity import ClearIdentity
+from pysasl.instrument import set_observer
+from pysasl.mechanism import ChallengeResponse, ServerChallenge, \
+    ServerMechanism
+from pysasl.mechanism.crammd5 import CramMD5Mechanism
+from pysasl.mechanism.external import ExternalMechanism
+from pysasl.mechanism.login import LoginMechanism
+from pysasl.mechanism.oauth import OAuth2Mechanism
+from pysasl.mechanism.plain import PlainMechanism
+from pysasl.transcript import TranscriptRecorder, RecordingMechanism
+
+
+class EchoMechanism(ServerMechanism):
+
+    def __init__(self) -> None:
+        super().__init__(b'X-ECHO')
+
+    def server_attempt(self, responses: Sequence[ChallengeResponse]) \
+            -> Tuple[PlainCredentials, None]:
+        if not responses:
+            raise ServerChallenge(b'echo')
+        return PlainCredentials('', responses[0].response.decode()), None
+
+
+class TestTranscriptRecorder(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.stream = io.StringIO()
+        self.recorder = TranscriptRecorder(self.stream, key=b'k' * 16)
+        set_observer(self.recorder)
+
+    def tearDown(self) -> None:
+        set_observer(None)
+
+    def _records(self) -> List[Any]:
+        return [json.loads(line) for line in self.stream.getvalue().split()]
+
+    def _steps(self, record: Any) -> List[Tuple[bytes, bytes]]:
+        return [(b64decode(challenge), b64decode(response))
+                for challenge, response in record['steps']]
+
+    def _attempt(self, mech: RecordingMechanism,
+                 responses: Sequence[ChallengeResponse],
+                 secret: Optional[str] = None) -> None:
+        creds, _ = mech.server_attempt(responses)
+        try:
+            creds.verify(ClearIdentity('testuser', secret or 'testpass'))
+        except ExternalVerificationRequired:
+            pass
+
+    def test_plain(self) -> None:
+        mech = self.recorder.wrap(PlainMechanism())
+        response = ChallengeResponse(b'', b'\x00testuser\x00testpass')
+        self._attempt(mech, [response])
+        self._attempt(mech, [response], 'other')
+        with self.assertRaises(InvalidResponse):
+            mech.server_attempt([ChallengeResponse(b'', b'testuser')])
+        first, second, third = self._records()
+        self.assertEqual('PLAIN', first['mech'])
+        self.assertEqual('success', first['outcome'])
+        self.assertEqual('failure', second['outcome'])
+        self.assertEqual(first['steps'], second['steps'])
+        (_, data), = self._steps(first)
+        zid, cid, secret = data.split(b'\x00')
+        self.assertEqual(b'', zid)
+        self.assertTrue(cid.startswith(b'user-'))
+        self.assertTrue(secret.startswith(b'secret-'))
+        self.assertNotIn(b'testuser', data)
+        self.assertNotIn(b'testpass', data)
+        self.assertEqual('invalid', third['outcome'])
+        (_, data), = self._steps(third)
+        self.assertTrue(data.startswith(b'data-'))
+
+    def test_login(self) -> None:
+        mech = self.recorder.wrap(LoginMechanism())
+        with self.assertRaises(ServerChallenge):
+            mech.server_attempt([])
+        self._attempt(mech, [ChallengeResponse(b'Username:', b'testuser'),
+                             ChallengeResponse(b'Password:', b'testpass')])
+        record, = self._records()
+        self.assertEqual('success', record['outcome'])
+        first, second = self._steps(record)
+        self.assertEqual(b'Username:', first[0])
+        self.assertTrue(first[1].startswith(b'user-'))
+        self.assertTrue(second[1].startswith(b'secret-'))
+
+    def test_crammd5(self) -> None:
+        mech = self.recorder.wrap(CramMD5Mechanism())
+        self.assertTrue(repr(mech).startswith('RecordingMechanism('))
+        mech.warmup()
+        self._attempt(mech, [ChallengeResponse(b'<abc@example.com>',
+                                               b'testuser 0123abcd')])
+        with self.assertRaises(InvalidResponse):
+            mech.server_attempt([ChallengeResponse(b'<abc@example.com>',
+                                                   b'testuser')])
+        first, second = self._records()
+        self.assertEqual('failure', first['outcome'])
+        (challenge, response), = self._steps(first)
+        self.assertTrue(challenge.startswith(b'<challenge-'))
+        user, digest = response.split(b' ')
+        self.assertTrue(user.startswith(b'user-'))
+        self.assertTrue(digest.startswith(b'digest-'))
+        self.assertEqual('invalid', second['outcome'])
+
+    def test_external(self) -> None:
+        mech = self.recorder.wrap(ExternalMechanism())
+        self._attempt(mech, [ChallengeResponse(b'', b'testuser')])
+        record, = self._records()
+        self.assertEqual('external', record['outcome'])
+        (_, response), = self._steps(record)
+        self.assertTrue(response.startswith(b'user-'))
+
+    def test_xoauth2(self) -> None:
+        mech = self.recorder.wrap(OAuth2Mechanism())
+        self._attempt(mech, [ChallengeResponse(
+            b'', b'user=testuser\x01auth=Bearer abc\x01\x01')])
+        record, = self._records()
+        self.assertEqual('external', record['outcome'])
+        (_, response), = self._steps(record)
+        self.assertRegex(response, b'^user=user-[0-9a-f]+\x01'
+                                   b'auth=Bearer token-[0-9a-f]+\x01\x01$')
+        self.stream.seek(0)
+        self.stream.truncate()
+        with self.assertRaises(InvalidResponse):
+            mech.server_attempt([ChallengeResponse(b'', b'abc')])
+        record, = self._records()
+        (_, response), = self._steps(record)
+        self.assertTrue(response.startswith(b'data-'))
+
+    def test_other(self) -> None:
+        mech = self.recorder.wrap(EchoMechanism())
+        self._attempt(mech, [ChallengeResponse(b'echo', b'testpass')])
+        record, = self._records()
+        self.assertEqual('X-ECHO', record['mech'])
+        (challenge, response), = self._steps(record)
+        self.assertTrue(challenge.startswith(b'data-'))
+        self.assertTrue(response.startswith(b'data-'))
+
+    def test_stable(self) -> None:
+        other = io.StringIO()
+        recorder = TranscriptRecorder(other, key=b'k' * 16)
+        set_observer(recorder)
+        self._attempt(recorder.wrap(PlainMechanism()), [
+            ChallengeResponse(b'', b'\x00testuser\x00testpass')])
+        set_observer(self.recorder)
+        self._attempt(self.recorder.wrap(PlainMechanism()), [
+            ChallengeResponse(b'', b'\x00testuser\x00testpass')])
+        self.assertEqual(other.getvalue(), self.stream.getvalue())
+
+    def test_complete(self) -> None:
+        mech = self.recorder.wrap(PlainMechanism())
+        response = ChallengeResponse(b'', b'\x00testuser\x00testpass')
+        mech.server_attempt([response])
+        self.assertEqual('', self.stream.getvalue())
+        self._attempt(mech, [response])
+        first, second = self._records()
+        self.assertEqual('complete', first['outcome'])
+        self.assertEqual('success', second['outcome'])
+
+    def test_executor(self) -> None:
+        mech = self.recorder.wrap(PlainMechanism())
+        self.assertEqual(PlainMechanism.cost, mech.cost)
+        response = ChallengeResponse(b'', b'\x00testuser\x00testpass')
+        identity = ClearIdentity('testuser', 'testpass')
+        with ThreadPoolExecutor(1) as executor:
+            for _ in range(2):
+                creds, _ = mech.server_attempt([response])
+                context = copy_context()
+                executor.submit(context.run, creds.verify,
+                                identity).result()
+        mech.server_attempt([ChallengeResponse(b'', b'\x00a\x00b')])
+        self.assertEqual(['success', 'success'],
+                         [record['outcome'] for record in self._records()])
+
+    def test_sample_rate(self) -> None:
+        recorder = TranscriptRecorder(self.stream, sample_rate=0.5,
+                                      random=iter([0.75, 0.25]).__next__)
+        set_observer(recorder)
+        mech = recorder.wrap(PlainMechanism())
+        self._attempt(mech, [ChallengeResponse(b'', b'\x00a\x00b')])
+        self.assertEqual('', self.stream.getvalue())
+        self._attempt(mech, [ChallengeResponse(b'', b'\x00a\x00b')])
+        record, = self._records()
+        self.assertEqual('failure', record['outcome'])